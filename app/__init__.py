@@ -16,6 +16,8 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from app.utils.sftp_scanner import scan_and_map_torrents
 from app.utils.staging_processor import process_pending_staging_items
 from app.utils.trailer_manager import clean_stale_entries
+from app.utils.trailer_prefetcher import prefetch_missing_trailers
+from app.utils.plex_mirror import sync_plex_mirror
 from app.utils.seedbox_cleaner import run_seedbox_cleaner_task
 from app.utils.dashboard_scheduler import scheduled_dashboard_refresh
 import atexit
@@ -251,6 +253,20 @@ def create_app(config_class=Config):
                 cleaned_count = clean_stale_entries()
                 current_app.logger.info(f"Scheduler: Trailer cleanup job finished. Cleaned {cleaned_count} entries.")
 
+        # Define the function for the trailer prefetch job
+        trailer_prefetch_interval_hours = app.config.get('TRAILER_PREFETCH_INTERVAL_HOURS', 0)
+        def scheduled_trailer_prefetch_job():
+            with app.app_context():
+                current_app.logger.info(f"Scheduler: Triggering trailer prefetch job. Interval: {trailer_prefetch_interval_hours} hours.")
+                prefetch_missing_trailers()
+
+        # Define the function for the Plex mirror sync job
+        plex_mirror_sync_interval = app.config.get('PLEX_MIRROR_SYNC_INTERVAL_MINUTES', 0)
+        def scheduled_plex_mirror_sync_job():
+            with app.app_context():
+                current_app.logger.info(f"Scheduler: Triggering Plex mirror sync job. Interval: {plex_mirror_sync_interval} mins.")
+                sync_plex_mirror()
+
         # Add the rTorrent scanner job
         scheduler.add_job(
             func=scheduled_rtorrent_scan_job,
@@ -281,6 +297,34 @@ def create_app(config_class=Config):
             replace_existing=True
         )
 
+        # Add the trailer prefetch job (quota-bounded, runs after the cleanup has pruned stale entries)
+        if trailer_prefetch_interval_hours and trailer_prefetch_interval_hours > 0:
+            scheduler.add_job(
+                func=scheduled_trailer_prefetch_job,
+                trigger='interval',
+                hours=trailer_prefetch_interval_hours,
+                id='trailer_prefetch_job',
+                start_date=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=10), # Run 10 mins after startup
+                replace_existing=True
+            )
+            app.logger.info(f"Trailer prefetch job scheduled every {trailer_prefetch_interval_hours} hours.")
+        else:
+            app.logger.info("Trailer prefetch is disabled (TRAILER_PREFETCH_INTERVAL_HOURS is 0). Job not scheduled.")
+
+        # Add the Plex mirror sync job (incremental; the first run builds the mirror)
+        if plex_mirror_sync_interval and plex_mirror_sync_interval > 0 and app.config.get('PLEX_MIRROR_DB_FILE'):
+            scheduler.add_job(
+                func=scheduled_plex_mirror_sync_job,
+                trigger='interval',
+                minutes=plex_mirror_sync_interval,
+                id='plex_mirror_sync_job',
+                start_date=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30),
+                replace_existing=True
+            )
+            app.logger.info(f"Plex mirror sync job scheduled every {plex_mirror_sync_interval} minutes.")
+        else:
+            app.logger.info("Plex mirror sync is disabled (PLEX_MIRROR_SYNC_INTERVAL_MINUTES is 0 or PLEX_MIRROR_DB_FILE is empty). Job not scheduled.")
+
         scheduler.start()
         app.logger.info(f"APScheduler started. rTorrent scan job scheduled every {rtorrent_scan_interval} minutes. Staging processor job scheduled every 1 minute. Trailer cleanup job scheduled every 24 hours.")
 
@@ -88,6 +88,32 @@ def get_locked_trailer_id_route():
         current_app.logger.error(f"Erreur inattendue dans get_locked_trailer_id_route pour {media_type}_{external_id}: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': 'Une erreur interne est survenue.'}), 500
 
+@agent_bp.route('/trailer_statuses', methods=['POST'])
+def get_trailer_statuses_route():
+    """
+    Statuts de bande-annonce ('LOCKED', 'UNLOCKED', 'NONE') pour une liste de médias,
+    en une seule requête. Corps attendu : {"items": [{"media_type": "movie", "external_id": 123}, ...]}.
+    Réponse : {"status": "success", "statuses": {"movie_123": "LOCKED", ...}}.
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+
+    if not isinstance(items, list):
+        return jsonify({'status': 'error', 'message': 'Le paramètre items (liste de media_type/external_id) est requis.'}), 400
+
+    try:
+        pairs = [(item.get('media_type'), str(item['external_id']) if item.get('external_id') else None)
+                 for item in items if isinstance(item, dict)]
+        statuses = trailer_manager.get_trailer_statuses(pairs)
+        return jsonify({
+            'status': 'success',
+            'statuses': {trailer_manager._get_key(media_type, external_id): status
+                         for (media_type, external_id), status in statuses.items() if media_type and external_id}
+        })
+    except Exception as e:
+        current_app.logger.error(f"Erreur inattendue dans get_trailer_statuses_route ({len(items)} élément(s)): {e}", exc_info=True)
+        return jsonify({'status': 'error', 'message': 'Une erreur interne est survenue.'}), 500
+
 @agent_bp.route('/media/details/<media_type>/<int:external_id>', methods=['GET'])
 def get_media_details_route(media_type, external_id):
     """
@@ -1,8 +1,9 @@
 import google.generativeai as genai
 import json
 from flask import current_app
+from app.utils import metadata_cache
 from app.utils.trailer_finder import find_youtube_trailer, get_videos_details
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 from app.utils.tvdb_client import CustomTVDBClient
 
 def get_actual_title(plex_item):
@@ -10,7 +11,7 @@ def get_actual_title(plex_item):
     if plex_item.type == 'movie':
         tmdb_id = next((g.id.replace('tmdb://', '') for g in plex_item.guids if g.id.startswith('tmdb://')), None)
         if tmdb_id:
-            tmdb_client = TheMovieDBClient()
+            tmdb_client = get_tmdb_client()
             movie_details = tmdb_client.get_movie_details(tmdb_id)
             if movie_details and movie_details.get('title'):
                 return movie_details['title']
@@ -55,18 +56,30 @@ def generate_youtube_queries(title, year, media_type):
             print("AVERTISSEMENT: Clé GEMINI_API_KEY non configurée. Utilisation des requêtes de secours.")
         return _get_fallback_queries(title, year, media_type)
 
+    # Requêtes mémorisées : mêmes requêtes d'une ouverture à l'autre, donc mêmes entrées du cache de recherche YouTube
+    found, cached_queries = metadata_cache.lookup('gemini', 'youtube_queries', title, year, media_type, model_name)
+    if found and cached_queries:
+        return cached_queries
+
     try:
         model = genai.GenerativeModel(model_name)
         prompt = f"Génère une liste de 3 requêtes de recherche YouTube optimisées pour trouver la bande-annonce officielle du {media_type} '{title}' ({year}). Priorise la langue française (VF puis VOSTFR). Le format de sortie doit être une liste JSON de chaînes de caractères. Ne retourne que le JSON brut."
         response = model.generate_content(prompt)
         json_response = response.text.strip().replace('```json', '').replace('```', '')
-        return json.loads(json_response)
+        queries = json.loads(json_response)
+        if isinstance(queries, list) and queries:
+            metadata_cache.store('gemini', 'youtube_queries', title, year, media_type, model_name,
+                                 value=queries, tier=metadata_cache.TIER_LONG)
+        return queries
     except Exception as e:
         print(f"ERREUR lors de la génération des requêtes Gemini avec le modèle '{model_name}': {e}. Utilisation des requêtes de secours.")
         return _get_fallback_queries(title, year, media_type)
 
-def _search_and_score_trailers(title, year, media_type):
-    """Helper function to search and score trailers, used by multiple routes."""
+def _search_and_score_trailers(title, year, media_type, background=False):
+    """
+    Helper function to search and score trailers, used by multiple routes.
+    background=True for scheduled jobs: searches stop before the quota share kept for the UI.
+    """
     youtube_api_key = current_app.config.get('YOUTUBE_API_KEY')
     if not youtube_api_key:
         return {'success': False, 'error': "La clé API YouTube n'est pas configurée."}
@@ -76,11 +89,13 @@ def _search_and_score_trailers(title, year, media_type):
 
     all_results = []
     seen_video_ids = set()
+    quota_exceeded = False
 
     # We now fetch more results to allow for better pagination.
     # Let's aim for ~20-25 results. find_youtube_trailer fetches max 10 per query.
     for current_query in search_queries[:3]: # Limit to 3 queries to avoid long waits
-        search_result = find_youtube_trailer(current_query, youtube_api_key, max_results=10)
+        search_result = find_youtube_trailer(current_query, youtube_api_key, max_results=10, background=background)
+        quota_exceeded = quota_exceeded or bool(search_result.get('quota_exceeded'))
         if search_result and search_result['results']:
             for result in search_result['results']:
                 if result['videoId'] not in seen_video_ids:
@@ -88,6 +103,9 @@ def _search_and_score_trailers(title, year, media_type):
                     seen_video_ids.add(result['videoId'])
 
     if not all_results:
+        if quota_exceeded:
+            return {'success': False, 'quota_exceeded': True,
+                    'error': 'Quota YouTube du jour atteint. Réessayez demain.'}
         return {'success': False, 'error': 'Aucun résultat trouvé pour les requêtes générées.'}
 
     sorted_by_title = score_and_sort_results(all_results, title, year, media_type)
@@ -95,7 +113,7 @@ def _search_and_score_trailers(title, year, media_type):
     # Fetch details for up to 25 top results to refine scoring
     top_ids = [res['videoId'] for res in sorted_by_title[:25]]
     if top_ids:
-        video_details = get_videos_details(top_ids, youtube_api_key)
+        video_details = get_videos_details(top_ids, youtube_api_key, background=background)
         final_sorted_list = score_and_sort_results(sorted_by_title, title, year, media_type, video_details=video_details)
     else:
         final_sorted_list = sorted_by_title
@@ -3,6 +3,7 @@ from . import api_bp
 from app.utils.cookie_manager import get_ygg_cookie_status
 from app.auth import login_required
 from app.utils.plex_client import get_plex_admin_server
+from app.utils.plex_mirror import get_mirrored_libraries
 from app.utils.arr_client import get_sonarr_root_folders, get_radarr_root_folders
 from app.utils.plex_mapping_manager import get_plex_mappings, save_plex_mappings
 
@@ -23,20 +24,24 @@ def get_mapping_data():
     y compris les mappings actuellement sauvegardés.
     """
     try:
-        plex_server = get_plex_admin_server()
-        if not plex_server:
-            return jsonify({"error": "Plex server not available or configured"}), 503
+        # Sections films/séries et leurs dossiers : depuis le miroir local s'il est synchronisé
+        sections = get_mirrored_libraries()
+        if not sections:
+            plex_server = get_plex_admin_server()
+            if not plex_server:
+                return jsonify({"error": "Plex server not available or configured"}), 503
+            sections = [{"title": section.title, "type": section.type, "locations": section.locations}
+                        for section in plex_server.library.sections() if section.type in ['movie', 'show']]
 
         plex_libs_aggregated = {}
-        for section in plex_server.library.sections():
-            if section.type in ['movie', 'show']:
-                if section.title not in plex_libs_aggregated:
-                    plex_libs_aggregated[section.title] = {
-                        "name": section.title,
-                        "type": section.type,
-                        "locations": []
-                    }
-                plex_libs_aggregated[section.title]["locations"].extend(section.locations)
+        for section in sections:
+            if section["title"] not in plex_libs_aggregated:
+                plex_libs_aggregated[section["title"]] = {
+                    "name": section["title"],
+                    "type": section["type"],
+                    "locations": []
+                }
+            plex_libs_aggregated[section["title"]]["locations"].extend(section["locations"])
 
         plex_libraries = list(plex_libs_aggregated.values())
 
@@ -9,7 +9,7 @@ import requests
 # Import Prowlarr client
 from app.utils.prowlarr_client import get_latest_from_prowlarr, get_prowlarr_applications
 # Import TMDB client for ID conversion
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 # Import Arr client for checking existing media and parsing names
 from app.utils.arr_client import get_sonarr_series_by_guid, get_radarr_movie_by_guid, parse_media_name
 # Import mapping manager to check pending torrents
@@ -18,6 +18,8 @@ from app.utils.mapping_manager import get_all_torrent_hashes
 from app.utils.status_manager import get_media_statuses
 # Import the release parser
 from app.utils.release_parser import parse_release_data
+# Progress of the scheduled refresh enrichment stage
+from app.utils.dashboard_scheduler import get_refresh_progress
 
 # Define paths for our state files
 DASHBOARD_STATE_FILE = os.path.join('instance', 'dashboard_state.json')
@@ -240,7 +242,7 @@ def refresh_torrents():
 
         # Make the TMDB client initialization conditional on the API key's existence
         tmdb_api_key = current_app.config.get('TMDB_API_KEY')
-        tmdb_client = TheMovieDBClient() if tmdb_api_key else None
+        tmdb_client = get_tmdb_client() if tmdb_api_key else None
         if not tmdb_client:
             current_app.logger.warning("TMDB_API_KEY not set. Skipping enrichment and status checks.")
 
@@ -594,6 +596,11 @@ def proxy_request():
         current_app.logger.error(f"Proxy request to {url} failed: {e}")
         return jsonify({"error": f"Failed to fetch URL: {e}"}), 502
 
+@dashboard_bp.route('/dashboard/api/refresh-progress')
+def refresh_progress():
+    """Returns the progress of the scheduled refresh enrichment stage."""
+    return jsonify(get_refresh_progress())
+
 @dashboard_bp.route('/dashboard/api/refresh-statuses')
 def refresh_statuses():
     """
@@ -610,7 +617,7 @@ def refresh_statuses():
 
         # Get the TMDB client
         tmdb_api_key = current_app.config.get('TMDB_API_KEY')
-        tmdb_client = TheMovieDBClient() if tmdb_api_key else None
+        tmdb_client = get_tmdb_client() if tmdb_api_key else None
         if not tmdb_client:
             current_app.logger.warning("TMDB_API_KEY not set. Skipping status refresh.")
             # Return the unmodified list if TMDB isn't available
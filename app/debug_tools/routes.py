@@ -3,6 +3,11 @@ import os
 from flask import Blueprint, render_template, request, flash, current_app, redirect, url_for, jsonify
 from app.auth import login_required
 from app.utils.mapping_manager import add_or_update_torrent_in_map
+from app.utils.http_client import get_http_stats
+from app.utils.single_flight import get_single_flight_stats
+from app.utils.metadata_cache import get_metadata_cache_stats
+from app.utils.trailer_finder import get_youtube_quota_status
+from app.utils.plex_mirror import get_plex_mirror_stats
 from pathlib import Path
 
 debug_tools_bp = Blueprint(
@@ -66,3 +71,33 @@ def run_staging_simulation():
         flash(f"Erreur de simulation : {e}", "danger")
 
     return redirect(url_for('debug_tools.staging_simulator_page'))
+
+@debug_tools_bp.route('/http_stats')
+@login_required
+def http_stats():
+    """Compteurs et histogrammes de latence des sessions HTTP partagées, par hôte."""
+    return jsonify(get_http_stats())
+
+@debug_tools_bp.route('/single_flight_stats')
+@login_required
+def single_flight_stats():
+    """Appels amont reçus, réellement exécutés et coalescés (single-flight), par service."""
+    return jsonify(get_single_flight_stats())
+
+@debug_tools_bp.route('/metadata_cache_stats')
+@login_required
+def metadata_cache_stats():
+    """Hits, misses et réponses négatives du cache disque TMDb/TVDB, par endpoint."""
+    return jsonify(get_metadata_cache_stats())
+
+@debug_tools_bp.route('/youtube_quota')
+@login_required
+def youtube_quota():
+    """Unités de quota YouTube consommées aujourd'hui (heure du Pacifique) et restantes."""
+    return jsonify(get_youtube_quota_status())
+
+@debug_tools_bp.route('/plex_mirror')
+@login_required
+def plex_mirror_stats():
+    """Sections du miroir Plex local : nombre d'éléments et dernière synchronisation."""
+    return jsonify(get_plex_mirror_stats())
@@ -3,13 +3,12 @@
 # Commentaire pour forcer la relecture du fichier
 
 import os
-import time
+import json
 from app.auth import login_required
 from flask import (render_template, current_app, flash, abort, url_for,
-                   redirect, request, session, jsonify, current_app)
+                   redirect, request, session, jsonify, current_app, Response, stream_with_context)
 from datetime import datetime, timedelta
 import pytz
-from plexapi.server import PlexServer
 from plexapi.exceptions import NotFound, Unauthorized, BadRequest
 import logging
 
@@ -20,10 +19,12 @@ logger = logging.getLogger(__name__)
 from . import plex_editor_bp
 
 # Importer les fonctions utilitaires Plex depuis le nouveau module
-from app.utils.plex_client import get_main_plex_account_object, get_plex_admin_server, get_user_specific_plex_server
+from app.utils.plex_client import (get_main_plex_account_object, get_plex_admin_server, get_user_specific_plex_server,
+                                   get_user_specific_plex_server_from_id, get_plex_account_users, invalidate_plex_handles)
 
 # Importer les utils spécifiques à plex_editor
-from .utils import cleanup_parent_directory_recursively, get_media_filepath, _is_dry_run_mode
+from .utils import (cleanup_parent_directory_recursively, get_media_filepath, _is_dry_run_mode, fetch_plex_trailer_urls,
+                    fetch_show_sizes, fetch_show_episode_index)
 # Importer les utils globaux/partagés
 from app.utils.arr_client import (
     get_radarr_tag_id, get_radarr_movie_by_guid, update_radarr_movie,
@@ -34,17 +35,18 @@ from app.utils.arr_client import (
     search_sonarr_series_by_title_and_year
 )
 from app.utils.trailer_finder import find_plex_trailer, get_videos_details
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 from app.utils.tvdb_client import CustomTVDBClient
-from app.utils.cache_manager import SimpleCache, get_pending_lock, remove_pending_lock
+from app.utils.cache_manager import SimpleCache, get_all_pending_locks, remove_pending_lock
 from app.utils import trailer_manager # Import du nouveau manager
 from app.utils.ai_client import get_metadata_from_ai, list_available_models # Import du nouveau client IA
 from app.agent.services import _search_and_score_trailers
-from thefuzz import fuzz
 
 from app.utils.move_manager import move_manager
 from app.utils.arr_client import get_sonarr_root_folders, get_radarr_root_folders, move_sonarr_series, move_radarr_movie, get_arr_command_status, radarr_post_command
 from app.utils.bulk_move_manager import bulk_move_manager # Import du nouveau manager
+from app.utils.plex_facet_index import get_library_facets, invalidate_library_facets
+from app.utils.plex_mirror import query_items, find_rating_keys_by_guid, get_mirrored_library_keys
 
 # --- Routes du Blueprint ---
 
@@ -58,8 +60,12 @@ def sync_history_page():
 @plex_editor_bp.route('/run_sync_test', methods=['POST'])
 @login_required
 def run_sync_test():
-    """Exécute le script de test de synchronisation de l'historique fantôme."""
-    from app.utils.archive_manager import add_archived_media
+    """
+    Exécute la synchronisation de l'historique fantôme. Avec 'Accept: application/x-ndjson',
+    la progression est renvoyée au fil de l'eau (un événement JSON par ligne) ; sinon le
+    résumé est affiché via flash après redirection.
+    """
+    from app.utils.history_sync import iter_history_sync
     user_id = request.form.get('user_id')
     if not user_id:
         flash("Veuillez sélectionner un utilisateur.", "danger")
@@ -72,7 +78,7 @@ def run_sync_test():
             if str(main_account.id) == user_id:
                 user_title = main_account.title
             else:
-                user_account = next((u for u in main_account.users() if str(u.id) == user_id), None)
+                user_account = next((u for u in get_plex_account_users() if str(u.id) == user_id), None)
                 if user_account:
                     user_title = user_account.title
 
@@ -81,187 +87,25 @@ def run_sync_test():
             flash(f"Impossible de se connecter au serveur Plex pour l'utilisateur '{user_title}'.", "danger")
             return redirect(url_for('plex_editor.sync_history_page'))
 
-        flash(f"Scan de l'historique Plex complet pour '{user_title}' en cours... Cela peut prendre plusieurs minutes.", "info")
-
-        tmdb_client = TheMovieDBClient()
-        tvdb_client = CustomTVDBClient()
-
-        # --- NOUVEAU : Charger les archives existantes pour éviter les doublons ---
-        from app.utils.archive_manager import load_archive_data
-        archive_data = load_archive_data()
-        # Créer un set de tuples (titre, année) pour une recherche rapide et insensible à la casse
-        existing_archives = {
-            (media_info.get('title', '').lower(), str(media_info.get('year', '')))
-            for media_info in archive_data.values()
-            if media_info.get('title') and media_info.get('year')
-        }
-        current_app.logger.info(f"{len(existing_archives)} média(s) déjà archivé(s) chargé(s).")
-        # --- FIN DU NOUVEAU BLOC ---
-
-        history = user_plex.history() # La limite maxresults=2000 a été supprimée pour un scan complet
-
-        media_cache = {}
-        last_viewed_dates = {}
-        plex_item_exists_cache = {}
-
-        # --- COMPTEURS (LIMITES SUPPRIMÉES) ---
-        processed_movies = set()
-        processed_shows = set()
-        # MOVIE_LIMIT = 5 # Désactivé
-        # SHOW_LIMIT = 5 # Désactivé
-        archived_count = 0
-        successfully_archived_titles = [] # NOUVEAU : Pour le résumé final
-        # limit_reached = False # Désactivé
+        events = iter_history_sync(user_id, user_plex, resume=request.form.get('restart') != '1')
 
-        for entry in history:
-            source_item = None
-            try:
-                source_item = entry.source()
-            except NotFound:
-                pass
-
-            if source_item is not None:
-                continue
-
-            year = getattr(entry, 'originallyAvailableAt', None)
-            if year:
-                year = year.year
-
-            unique_key, title, entry_media_type = None, None, None
-            if entry.type == 'movie':
-                title = getattr(entry, 'title', None)
-                if title and year:
-                    unique_key = f"movie_{title}_{year}"
-                    entry_media_type = 'movie'
-            elif entry.type == 'episode':
-                title = getattr(entry, 'grandparentTitle', None)
-                if title:
-                    unique_key = f"show_{title}"
-                    entry_media_type = 'show'
-
-            if not unique_key:
-                continue
-
-            # --- NOUVEAU : Ignorer si le média est déjà dans les archives ---
-            if title and year:
-                if (title.lower(), str(year)) in existing_archives:
-                    current_app.logger.debug(f"Média '{title} ({year})' déjà archivé. Ignoré.")
-                    continue
-            # --- FIN DU NOUVEAU BLOC ---
-
-            # --- VÉRIFICATION DE LIMITE (DÉSACTIVÉE) ---
-            # if entry_media_type == 'movie' and unique_key not in processed_movies and len(processed_movies) >= MOVIE_LIMIT:
-            #     continue
-            # if entry_media_type == 'show' and unique_key not in processed_shows and len(processed_shows) >= SHOW_LIMIT:
-            #     continue
-            # if len(processed_movies) >= MOVIE_LIMIT and len(processed_shows) >= SHOW_LIMIT:
-            #     limit_reached = True
-            #     if unique_key not in processed_movies and unique_key not in processed_shows:
-            #         continue
-
-            if title not in plex_item_exists_cache:
-                plex_search_results = user_plex.search(title)
-                exists = any(hasattr(item, 'title') and item.title.lower() == title.lower() for item in plex_search_results)
-                plex_item_exists_cache[title] = exists
-
-            if plex_item_exists_cache[title]:
-                current_app.logger.info(f"Le média '{title}' existe toujours dans Plex. Ignoré.")
-                continue
-
-            entry_viewed_at = getattr(entry, 'viewedAt', None)
-            if entry_viewed_at:
-                current_latest = last_viewed_dates.get(unique_key)
-                if not current_latest or entry_viewed_at.isoformat() > current_latest:
-                    last_viewed_dates[unique_key] = entry_viewed_at.isoformat()
-
-            if unique_key not in media_cache:
-                # --- AJOUT DU RALENTISSEMENT ---
-                # On fait une pause uniquement quand on s'apprête à chercher un NOUVEL item
-                # sur les API externes pour éviter de les surcharger.
-                time.sleep(0.5)
-
-                media_type, external_id, extra_data = None, None, {}
-                if entry.type == 'movie':
-                    search_results = tmdb_client.search_movie(title)
-                    filtered_results = [m for m in search_results if m.get('year') == str(year)]
-                    if filtered_results:
-                        media_type = 'movie'
-                        external_id = filtered_results[0].get('id')
-                elif entry.type == 'episode':
-                    search_results = tvdb_client.search_and_translate_series(title)
-                    best_match = None
-                    if search_results:
-                        if len(search_results) == 1:
-                            best_match = search_results[0]
-                        else:
-                            SIMILARITY_THRESHOLD = 85
-                            highly_similar_results = [r for r in search_results if fuzz.ratio(title.lower(), r.get('name', '').lower()) > SIMILARITY_THRESHOLD]
-                            if highly_similar_results:
-                                min_year_diff = float('inf')
-                                for result in highly_similar_results:
-                                    try:
-                                        result_year = int(result.get('year', 0))
-                                        if result_year > 0 and year is not None:
-                                            diff = abs(result_year - year)
-                                            if diff < min_year_diff:
-                                                min_year_diff = diff
-                                                best_match = result
-                                    except (ValueError, TypeError): continue
-                                if not best_match: best_match = highly_similar_results[0]
-                    if best_match:
-                        media_type = 'show'
-                        external_id = best_match.get('tvdb_id')
-                        total_episode_counts = tvdb_client.get_season_episode_counts(external_id)
-                        extra_data['total_episode_counts'] = total_episode_counts
-                        current_app.logger.info(f"Match TVDB pour '{title}' -> ID: {external_id}, Counts: {total_episode_counts}")
-
-                media_cache[unique_key] = (media_type, external_id, extra_data)
-
-            media_type, external_id, extra_data = media_cache.get(unique_key, (None, None, {}))
-
-            if media_type and external_id:
-                if media_type == 'movie':
-                    processed_movies.add(unique_key)
-                elif media_type == 'show':
-                    processed_shows.add(unique_key)
-
-                season_number = episode_number = None
-                if entry.type == 'episode':
-                    season_number = getattr(entry, 'parentIndex', None)
-                    episode_number = getattr(entry, 'index', None)
-
-                success, message = add_archived_media(
-                    media_type=media_type,
-                    external_id=external_id,
-                    user_id=user_id,
-                    season_number=season_number,
-                    episode_number=episode_number,
-                    total_episode_counts=extra_data.get('total_episode_counts'),
-                    last_viewed_at=last_viewed_dates.get(unique_key)
-                )
-
-                if success:
-                    # NOUVEAU : On ajoute le titre à la liste pour le résumé final au lieu de flasher immédiatement
-                    if title not in successfully_archived_titles:
-                        successfully_archived_titles.append(title)
-                    archived_count += 1 # On incrémente toujours le compteur global
-                elif not success:
-                     current_app.logger.info(f"Info/Échec archivage fantôme pour {unique_key}: {message}")
-
-        # Le message de limite a été supprimé car les limites sont désactivées.
+        if 'application/x-ndjson' in request.headers.get('Accept', ''):
+            def stream():
+                try:
+                    for event in events:
+                        yield json.dumps(event, ensure_ascii=False) + '\n'
+                except Exception as e:
+                    current_app.logger.error(f"Erreur majeure lors du test de synchronisation: {e}", exc_info=True)
+                    yield json.dumps({'event': 'error', 'message': str(e)}, ensure_ascii=False) + '\n'
+            return Response(stream_with_context(stream()), mimetype='application/x-ndjson')
 
-        # --- NOUVEAU : Message de résumé final ---
-        if not successfully_archived_titles:
+        summary = next(event for event in events if event['event'] == 'done')
+        if not summary['archived_titles']:
             flash("Scan terminé. Aucun nouvel item fantôme n'a été trouvé à archiver.", "info")
         else:
-            # On affiche un résumé pour éviter de surcharger les cookies de session.
-            num_titles = len(successfully_archived_titles)
-            summary_message = f"Scan terminé. {num_titles} nouveau(x) média(s) fantôme(s) ont été archivés avec succès."
-            # On peut optionnellement lister quelques titres si on le souhaite, mais gardons-le simple pour l'instant.
-            # Exemple: titles_preview = ", ".join(successfully_archived_titles[:5])
-            # summary_message += f" Exemples : {titles_preview}..."
-            flash(summary_message, "success")
-
+            flash(f"Scan terminé. {summary['archived_titles']} nouveau(x) média(s) fantôme(s) ont été archivés avec succès.", "success")
+        if summary['failed']:
+            flash(f"{summary['failed']} média(s) n'ont pas pu être résolus : relancez la synchronisation pour les reprendre.", "warning")
         return redirect(url_for('plex_editor.sync_history_page'))
 
     except Exception as e:
@@ -473,7 +317,7 @@ def get_plex_users():
         users_list.append({'id': str(main_plex_account.id), 'text': main_title})
 
         # Ajouter les utilisateurs gérés
-        for user in main_plex_account.users():
+        for user in get_plex_account_users():
             managed_title = user.title or f"Géré (ID: {user.id})" # Utiliser user.title comme source principale
             users_list.append({'id': str(user.id), 'text': managed_title})
 
@@ -499,28 +343,18 @@ def get_user_libraries(user_id):
             current_app.logger.error("API get_user_libraries: Impossible de récupérer le compte Plex principal.")
             return jsonify({'error': "Impossible de récupérer le compte Plex principal."}), 500
 
-        target_plex_server = None
-
         if str(main_plex_account.id) == user_id:
             # L'utilisateur est l'admin/compte principal
-            target_plex_server = PlexServer(plex_url, admin_token)
             current_app.logger.info(f"API get_user_libraries: Accès aux bibliothèques pour l'admin (ID: {user_id}).")
         else:
-            # L'utilisateur est un utilisateur géré, il faut emprunter son identité
-            admin_plex_server_for_setup = PlexServer(plex_url, admin_token) # Nécessaire pour machineIdentifier
-            user_to_impersonate = next((u for u in main_plex_account.users() if str(u.id) == user_id), None)
-
-            if user_to_impersonate:
-                try:
-                    managed_user_token = user_to_impersonate.get_token(admin_plex_server_for_setup.machineIdentifier)
-                    target_plex_server = PlexServer(plex_url, managed_user_token)
-                    current_app.logger.info(f"API get_user_libraries: Accès aux bibliothèques pour l'utilisateur géré '{user_to_impersonate.title}' (ID: {user_id}).")
-                except Exception as e_impersonate:
-                    current_app.logger.error(f"API get_user_libraries: Échec de l'emprunt d'identité pour {user_to_impersonate.title} (ID: {user_id}): {e_impersonate}", exc_info=True)
-                    return jsonify({'error': f"Impossible d'emprunter l'identité de l'utilisateur {user_id}."}), 500
-            else:
+            # L'utilisateur est un utilisateur géré, il faut emprunter son identité (jeton et connexion en cache)
+            user_to_impersonate = next((u for u in get_plex_account_users() if str(u.id) == user_id), None)
+            if not user_to_impersonate:
                 current_app.logger.warning(f"API get_user_libraries: Utilisateur géré avec ID {user_id} non trouvé.")
                 return jsonify({'error': f"Utilisateur avec ID {user_id} non trouvé."}), 404
+            current_app.logger.info(f"API get_user_libraries: Accès aux bibliothèques pour l'utilisateur géré '{user_to_impersonate.title}' (ID: {user_id}).")
+
+        target_plex_server = get_user_specific_plex_server_from_id(user_id)
 
         if not target_plex_server:
             # Ce cas ne devrait pas être atteint si la logique ci-dessus est correcte, mais c'est une sécurité.
@@ -549,6 +383,7 @@ def get_user_libraries(user_id):
 
     except Unauthorized:
         current_app.logger.error(f"API get_user_libraries: Autorisation refusée pour l'utilisateur {user_id}. Token invalide ?", exc_info=True)
+        invalidate_plex_handles(user_id)
         return jsonify({'error': "Autorisation refusée par le serveur Plex."}), 401
     except NotFound:
         current_app.logger.warning(f"API get_user_libraries: Ressource non trouvée pour l'utilisateur {user_id} (ex: bibliothèques).", exc_info=True)
@@ -557,9 +392,12 @@ def get_user_libraries(user_id):
         current_app.logger.error(f"Erreur API lors de la récupération des bibliothèques pour l'utilisateur {user_id} : {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
-@plex_editor_bp.route('/api/genres', methods=['POST'])
-@login_required
-def get_genres_for_libraries():
+def _facet_options_response(facet):
+    """
+    Options d'un filtre (genres, collections, résolutions, studios) pour les bibliothèques
+    demandées, servies par l'index de facettes en mémoire. Avec "withCounts": true,
+    renvoie [{'value', 'count'}] au lieu de la simple liste triée.
+    """
     data = request.json
     user_id = data.get('userId')
     library_keys = data.get('libraryKeys', [])
@@ -568,103 +406,38 @@ def get_genres_for_libraries():
         return jsonify(error="User ID and library keys are required."), 400
 
     try:
-        user_plex = get_user_specific_plex_server_from_id(user_id)
-        if not user_plex:
+        facets = get_library_facets(user_id, library_keys, lambda: get_user_specific_plex_server_from_id(user_id))
+        if facets is None:
             return jsonify(error="Plex user not found."), 404
 
-        all_genres = set()
-        for key in library_keys:
-            library = user_plex.library.sectionByID(int(key))
-            # The .genres() method does not exist on a library.
-            # We must iterate through items to find all genres.
-            for item in library.all():
-                if hasattr(item, 'genres'):
-                    for genre in item.genres:
-                        all_genres.add(genre.tag)
-
-        return jsonify(sorted(list(all_genres)))
+        values = facets[facet]
+        if data.get('withCounts'):
+            return jsonify([{'value': value, 'count': values[value]} for value in sorted(values)])
+        return jsonify(sorted(values))
 
     except Exception as e:
-        current_app.logger.error(f"Erreur API /api/genres: {e}", exc_info=True)
+        current_app.logger.error(f"Erreur API /api/{facet}: {e}", exc_info=True)
         return jsonify(error=str(e)), 500
-        
+
+@plex_editor_bp.route('/api/genres', methods=['POST'])
+@login_required
+def get_genres_for_libraries():
+    return _facet_options_response('genres')
+
 @plex_editor_bp.route('/api/collections', methods=['POST'])
 @login_required
 def get_collections_for_libraries():
-    data = request.json
-    user_id = data.get('userId')
-    library_keys = data.get('libraryKeys', [])
-
-    if not user_id or not library_keys:
-        return jsonify(error="User ID and library keys are required."), 400
-
-    try:
-        user_plex = get_user_specific_plex_server_from_id(user_id)
-        if not user_plex:
-            return jsonify(error="Plex user not found."), 404
-
-        all_collections = set()
-        for key in library_keys:
-            library = user_plex.library.sectionByID(int(key))
-            all_collections.update([collection.title for collection in library.collections()])
-        return jsonify(sorted(list(all_collections)))
-    except Exception as e:
-        current_app.logger.error(f"Erreur API /api/collections: {e}", exc_info=True)
-        return jsonify(error=str(e)), 500
+    return _facet_options_response('collections')
 
 @plex_editor_bp.route('/api/resolutions', methods=['POST'])
 @login_required
 def get_resolutions_for_libraries():
-    data = request.json
-    user_id = data.get('userId')
-    library_keys = data.get('libraryKeys', [])
-
-    if not user_id or not library_keys:
-        return jsonify(error="User ID and library keys are required."), 400
-
-    try:
-        user_plex = get_user_specific_plex_server_from_id(user_id)
-        if not user_plex:
-            return jsonify(error="Plex user not found."), 404
-
-        all_resolutions = set()
-        for key in library_keys:
-            library = user_plex.library.sectionByID(int(key))
-            for item in library.all():
-                if hasattr(item, 'media') and item.media:
-                    for media in item.media:
-                        if hasattr(media, 'videoResolution') and media.videoResolution:
-                            all_resolutions.add(media.videoResolution)
-        return jsonify(sorted(list(all_resolutions)))
-    except Exception as e:
-        current_app.logger.error(f"Erreur API /api/resolutions: {e}", exc_info=True)
-        return jsonify(error=str(e)), 500
+    return _facet_options_response('resolutions')
 
 @plex_editor_bp.route('/api/studios', methods=['POST'])
 @login_required
 def get_studios_for_libraries():
-    data = request.json
-    user_id = data.get('userId')
-    library_keys = data.get('libraryKeys', [])
-
-    if not user_id or not library_keys:
-        return jsonify(error="User ID and library keys are required."), 400
-
-    try:
-        user_plex = get_user_specific_plex_server_from_id(user_id)
-        if not user_plex:
-            return jsonify(error="Plex user not found."), 404
-
-        all_studios = set()
-        for key in library_keys:
-            library = user_plex.library.sectionByID(int(key))
-            for item in library.all():
-                if hasattr(item, 'studio') and item.studio:
-                    all_studios.add(item.studio)
-        return jsonify(sorted(list(all_studios)))
-    except Exception as e:
-        current_app.logger.error(f"Erreur API /api/studios: {e}", exc_info=True)
-        return jsonify(error=str(e)), 500
+    return _facet_options_response('studios')
 
 @plex_editor_bp.route('/api/scan_libraries', methods=['POST'])
 @login_required
@@ -688,6 +461,7 @@ def scan_libraries():
             # On trouve la bibliothèque sur le serveur admin
             library = plex_server.library.sectionByID(int(key))
             library.update() # On lance le scan avec les droits admin
+            invalidate_library_facets(key)
             scanned_libs.append(library.title)
 
         return jsonify({'success': True, 'message': f'Scan lancé pour : {", ".join(scanned_libs)}'})
@@ -743,36 +517,12 @@ def _parse_main_external_id(guids, media_type):
                     continue
     return None, None
 
-def get_user_specific_plex_server_from_id(user_id):
-    """
-    Helper function to get a PlexServer instance for a specific user ID,
-    handling impersonation. Returns None on failure.
-    """
-    # On a besoin de l'accès admin pour trouver d'autres utilisateurs
-    admin_server = get_plex_admin_server()
-    if not admin_server:
-        current_app.logger.error("Helper get_user_specific_plex_server_from_id: Impossible d'obtenir la connexion admin.")
-        return None
-
-    main_account = get_main_plex_account_object()
-    if not main_account:
-        current_app.logger.error("Helper get_user_specific_plex_server_from_id: Impossible de récupérer le compte principal.")
-        return None
-
-    # Cas 1: L'utilisateur est l'admin
-    if str(main_account.id) == user_id:
-        return admin_server
-
-    # Cas 2: L'utilisateur est un utilisateur géré
-    user_to_impersonate = next((u for u in main_account.users() if str(u.id) == user_id), None)
-    if user_to_impersonate:
-        token = user_to_impersonate.get_token(admin_server.machineIdentifier)
-        plex_url = current_app.config.get('PLEX_URL')
-        return PlexServer(plex_url, token)
-
-    # Si l'ID n'a pas été trouvé
-    current_app.logger.warning(f"Helper get_user_specific_plex_server_from_id: Utilisateur avec ID '{user_id}' non trouvé.")
-    return None
+def _fetch_plex_items(plex_server, rating_keys, chunk_size=200):
+    """Charge des éléments Plex par ratingKey (/library/metadata/1,2,3), par lots pour borner l'URL."""
+    items = []
+    for start in range(0, len(rating_keys), chunk_size):
+        items.extend(plex_server.fetchItems(rating_keys[start:start + chunk_size]))
+    return items
 
 @plex_editor_bp.route('/api/media_items', methods=['POST'])
 @login_required
@@ -880,8 +630,21 @@ def get_media_items():
                             elif operator == 'eq': search_args['userRating'] = rating_value
                         except (ValueError, TypeError): pass
 
-                # Logique de recherche par titre unifiée
-                if title_filter:
+                # Recherche par titre : résolue dans le miroir local quand les autres filtres le permettent,
+                # puis un seul appel Plex pour charger les objets vus par l'utilisateur
+                mirrored_items = None
+                if title_filter and set(search_args) <= {'year'}:
+                    mirrored_matches = query_items([lib_key], title=title_filter, year=search_args.get('year'))
+                    if mirrored_matches is not None:
+                        try:
+                            mirrored_items = _fetch_plex_items(target_plex_server, [row['rating_key'] for row in mirrored_matches])
+                        except Exception as e_mirror:
+                            current_app.logger.warning(f"Miroir Plex: chargement des éléments impossible ({e_mirror}), recherche en direct.")
+                if mirrored_items is not None:
+                    for item in mirrored_items:
+                        all_plex_items[item.ratingKey] = item
+                # Logique de recherche par titre unifiée (en direct)
+                elif title_filter:
                     search_title = library.search(title__icontains=title_filter, **search_args)
                     search_original = library.search(originalTitle__icontains=title_filter, **search_args)
 
@@ -903,6 +666,7 @@ def get_media_items():
                 current_app.logger.error(f"Erreur accès bibliothèque {lib_key}: {e_lib}", exc_info=True)
 
         # --- NOUVELLE ÉTAPE 3.5: FINALISATION DES VERROUS EN ATTENTE (VERSION DÉFINITIVE) ---
+        all_pending_locks = get_all_pending_locks() # Une seule lecture du fichier
         for item in all_plex_items.values():
             if not hasattr(item, 'guids'):
                 continue
@@ -924,7 +688,7 @@ def get_media_items():
             pending_lock = None
             matched_id = None
             for ext_id in plex_external_ids:
-                pending_lock = get_pending_lock(ext_id)
+                pending_lock = all_pending_locks.get(str(ext_id))
                 if pending_lock:
                     matched_id = ext_id
                     break
@@ -971,6 +735,7 @@ def get_media_items():
 
             # Supprimer le verrou en attente.
             remove_pending_lock(matched_id)
+            all_pending_locks.pop(str(matched_id), None)
             current_app.logger.info(f"FINALIZATION: Success for '{item.title}'. Pending lock for {matched_id} removed.")
 
         # --- 4. LA DÉCISION : Chercher dans les archives ou à l'extérieur ? ---
@@ -985,17 +750,15 @@ def get_media_items():
 
             # --- NOUVEAU : Enrichir les résultats archivés avec le statut de la bande-annonce ---
             if archived_results:
+                # Une seule passe sur la base pour toutes les lignes
+                trailer_statuses = trailer_manager.get_trailer_statuses(
+                    (item.get('media_type'), str(item['external_id']) if item.get('external_id') else None)
+                    for item in archived_results
+                )
                 for item in archived_results:
-                    item['trailer_status'] = 'NONE'  # Default
-                    media_type = item.get('media_type')
-                    external_id = item.get('external_id')
-
-                    if media_type and external_id:
-                        # Le trailer manager attend 'tv' ou 'movie'
-                        item['trailer_status'] = trailer_manager.get_trailer_status(
-                            media_type=media_type,
-                            external_id=str(external_id)  # Assurer que c'est une string
-                        )
+                    external_id = str(item['external_id']) if item.get('external_id') else None
+                    # Le trailer manager attend 'tv' ou 'movie'
+                    item['trailer_status'] = trailer_statuses[(item.get('media_type'), external_id)]
                     # Les autres champs nécessaires (title, year, external_id) sont déjà dans l'objet 'item'
                     # On s'assure que le media_type est compatible pour le template
                     item['media_type_for_trailer'] = item.get('media_type')
@@ -1005,7 +768,7 @@ def get_media_items():
             if not archived_results:
                 current_app.logger.info(f"No results in Plex or Archive for '{title_filter}'. Searching externally.")
 
-                tmdb_client = TheMovieDBClient()
+                tmdb_client = get_tmdb_client()
                 tvdb_client = CustomTVDBClient()
 
                 # Recherche Films (TMDb)
@@ -1083,8 +846,7 @@ def get_media_items():
             else:
                 for item in items_after_python_filter:
                     if item.type == 'show':
-                        # Recalculer les attributs ici car ils ne sont pas sur l'objet de base
-                        item.reload() # Assure que les comptes sont à jour
+                        # leafCount/viewedLeafCount sont déjà fournis par la recherche de bibliothèque
                         is_watched = item.leafCount > 0 and item.viewedLeafCount == item.leafCount
                         is_unwatched = item.leafCount > 0 and item.viewedLeafCount == 0
                         is_in_progress = item.leafCount > 0 and item.viewedLeafCount > 0 and not is_watched
@@ -1097,13 +859,13 @@ def get_media_items():
                            (status_filter == 'unwatched' and not item.isWatched):
                             final_filtered_list.append(item)
 
-            for item in final_filtered_list:
-                item.library_name = item.librarySectionTitle
-                item.title_sort = getattr(item, 'titleSort', None)
-                item.original_title = getattr(item, 'originalTitle', None)
-                thumb_path = getattr(item, 'thumb', None)
-                item.poster_url = target_plex_server.url(thumb_path, includeToken=True) if thumb_path else None
+            # --- Enrichissement groupé : un nombre constant de requêtes au lieu de plusieurs par ligne ---
+            # Radarr/Sonarr sont servis par l'instantané du catalogue (une liste complète chacun),
+            # la base des bandes-annonces est lue une fois, et Plex est interrogé en lot
+            # (extras des items, épisodes des seules séries affichées, par bibliothèque).
 
+            # Première passe : identifiants externes, nécessaires à la lecture groupée des bandes-annonces
+            for item in final_filtered_list:
                 # Enrichissement avec l'ID externe pour la recherche de bande-annonce
                 if item.type == 'movie':
                     radarr_movie = None
@@ -1128,18 +890,41 @@ def get_media_items():
                 # Correction du type pour correspondre à l'API du trailer_manager ('movie' ou 'tv')
                 item.media_type_for_trailer = 'tv' if item.type == 'show' else 'movie'
 
+            trailer_statuses = trailer_manager.get_trailer_statuses(
+                (item.media_type_for_trailer, item.external_id) for item in final_filtered_list
+            )
+            plex_trailer_urls = fetch_plex_trailer_urls(target_plex_server, [item.ratingKey for item in final_filtered_list])
+            show_keys_by_section = {}
+            for item in final_filtered_list:
+                if item.type == 'show':
+                    show_keys_by_section.setdefault(item.librarySectionID, []).append(item.ratingKey)
+            show_sizes = fetch_show_sizes(target_plex_server, show_keys_by_section)
+            cached_series_statuses = series_status_cache.get_many(
+                [item.ratingKey for item in final_filtered_list if item.type == 'show']
+            )
+            new_series_statuses = {}
+
+            for item in final_filtered_list:
+                item.library_name = item.librarySectionTitle
+                item.title_sort = getattr(item, 'titleSort', None)
+                item.original_title = getattr(item, 'originalTitle', None)
+                thumb_path = getattr(item, 'thumb', None)
+                item.poster_url = target_plex_server.url(thumb_path, includeToken=True) if thumb_path else None
 
                 if item.type == 'movie':
                     item.file_path = getattr(item.media[0].parts[0], 'file', None) if item.media and item.media[0].parts else None
                     item.total_size = item.media[0].parts[0].size if hasattr(item, 'media') and item.media and item.media[0].parts else 0
                 elif item.type == 'show':
                     item.file_path = item.locations[0] if item.locations else None
-                    item.total_size = sum(getattr(part, 'size', 0) for ep in item.episodes() for part in (ep.media[0].parts if ep.media and ep.media[0].parts else []))
+                    if item.ratingKey in show_sizes:
+                        item.total_size = show_sizes[item.ratingKey]
+                    else:
+                        item.total_size = sum(getattr(part, 'size', 0) for ep in item.episodes() for part in (ep.media[0].parts if ep.media and ep.media[0].parts else []))
                     item.viewed_episodes = item.viewedLeafCount
                     item.total_episodes = item.leafCount
 
                     cache_key = item.ratingKey
-                    cached_data = series_status_cache.get(cache_key)
+                    cached_data = cached_series_statuses.get(cache_key)
 
                     if cached_data:
                         item.is_incomplete = cached_data.get('is_incomplete', False)
@@ -1151,44 +936,43 @@ def get_media_items():
                             is_incomplete_status = False
                             production_status = None
 
-                            sonarr_series = get_sonarr_series_by_guid(next((g.id for g in item.guids if 'tvdb' in g.id), None))
-                            if sonarr_series:
-                                full_sonarr_series = get_sonarr_series_by_id(sonarr_series['id'])
-                                if full_sonarr_series:
-                                    # Calcul affiné basé sur les saisons surveillées
-                                    monitored_file_count = 0
-                                    monitored_total_count = 0
-
-                                    for season in full_sonarr_series.get('seasons', []):
-                                        if season.get('monitored'):
-                                            s_stats = season.get('statistics', {})
-                                            monitored_file_count += s_stats.get('episodeFileCount', 0)
-                                            monitored_total_count += s_stats.get('episodeCount', 0)
-
-                                    # On soustrait les futurs épisodes globaux du total surveillé
-                                    # (Hypothèse: les futurs épisodes sont généralement dans les saisons surveillées)
-                                    stats = full_sonarr_series.get('statistics', {})
-                                    future_count = stats.get('futureEpisodeCount', 0)
-                                    estimated_monitored_aired = monitored_total_count - future_count
-
-                                    if monitored_file_count < estimated_monitored_aired:
-                                        is_incomplete_status = True
-
-                                    sonarr_status = full_sonarr_series.get('status')
-                                    if sonarr_status == 'continuing':
-                                        production_status = 'En Production'
-                                    elif sonarr_status == 'ended':
-                                        production_status = 'Terminée'
-                                    elif sonarr_status == 'upcoming':
-                                        production_status = 'À venir'
+                            # La liste des séries Sonarr contient déjà les saisons et leurs statistiques
+                            full_sonarr_series = get_sonarr_series_by_guid(next((g.id for g in item.guids if 'tvdb' in g.id), None))
+                            if full_sonarr_series:
+                                # Calcul affiné basé sur les saisons surveillées
+                                monitored_file_count = 0
+                                monitored_total_count = 0
+
+                                for season in full_sonarr_series.get('seasons', []):
+                                    if season.get('monitored'):
+                                        s_stats = season.get('statistics', {})
+                                        monitored_file_count += s_stats.get('episodeFileCount', 0)
+                                        monitored_total_count += s_stats.get('episodeCount', 0)
+
+                                # On soustrait les futurs épisodes globaux du total surveillé
+                                # (Hypothèse: les futurs épisodes sont généralement dans les saisons surveillées)
+                                stats = full_sonarr_series.get('statistics', {})
+                                future_count = stats.get('futureEpisodeCount', 0)
+                                estimated_monitored_aired = monitored_total_count - future_count
+
+                                if monitored_file_count < estimated_monitored_aired:
+                                    is_incomplete_status = True
+
+                                sonarr_status = full_sonarr_series.get('status')
+                                if sonarr_status == 'continuing':
+                                    production_status = 'En Production'
+                                elif sonarr_status == 'ended':
+                                    production_status = 'Terminée'
+                                elif sonarr_status == 'upcoming':
+                                    production_status = 'À venir'
 
                             item.is_incomplete = is_incomplete_status
                             item.production_status = production_status
 
-                            series_status_cache.set(cache_key, {
+                            new_series_statuses[cache_key] = {
                                 'is_incomplete': item.is_incomplete,
                                 'production_status': item.production_status
-                            })
+                            }
                         except Exception as e_sonarr:
                             current_app.logger.warning(f"Impossible de vérifier l'état Sonarr pour '{item.title}': {e_sonarr}")
 
@@ -1200,15 +984,13 @@ def get_media_items():
                 else:
                     item.total_size_display = "0 B"
 
-                item.plex_trailer_url = find_plex_trailer(item, target_plex_server)
+                if item.ratingKey in plex_trailer_urls:
+                    item.plex_trailer_url = plex_trailer_urls[item.ratingKey]
+                else:
+                    item.plex_trailer_url = find_plex_trailer(item, target_plex_server)
 
                 # Récupération du statut détaillé du trailer
-                item.trailer_status = 'NONE' # Default
-                if item.external_id:
-                    item.trailer_status = trailer_manager.get_trailer_status(
-                        media_type=item.media_type_for_trailer,
-                        external_id=item.external_id
-                    )
+                item.trailer_status = trailer_statuses[(item.media_type_for_trailer, item.external_id)]
 
                 # Enrichissement avec le type de média depuis le mapping
                 item.media_type_from_mapping = None # Sera 'sonarr' ou 'radarr'
@@ -1242,6 +1024,8 @@ def get_media_items():
 
                 items_to_render.append(item)
 
+            series_status_cache.set_many(new_series_statuses)
+
         items_to_render.sort(key=lambda x: getattr(x, 'titleSort', x.title).lower())
 
         return render_template(
@@ -1350,18 +1134,15 @@ def toggle_watched_status_api(rating_key): # Nom de fonction unique
         user_context_description = ""
 
         if str(main_plex_account.id) == user_id:
-            user_plex_server = PlexServer(plex_url, admin_token)
             user_context_description = f"admin (ID: {user_id})"
         else:
-            admin_plex_server_for_token = PlexServer(plex_url, admin_token) # Pour machineIdentifier
-            user_to_impersonate = next((u for u in main_plex_account.users() if str(u.id) == user_id), None)
+            user_to_impersonate = next((u for u in get_plex_account_users() if str(u.id) == user_id), None)
             if user_to_impersonate:
-                managed_user_token = user_to_impersonate.get_token(admin_plex_server_for_token.machineIdentifier)
-                user_plex_server = PlexServer(plex_url, managed_user_token)
                 user_context_description = f"utilisateur géré '{user_to_impersonate.title}' (ID: {user_id})"
             else:
                 current_app.logger.warning(f"API toggle_watched: Utilisateur {user_id} non trouvé pour impersonnalisation.")
                 return jsonify({'status': 'error', 'message': f'Utilisateur {user_id} non trouvé.'}), 404
+        user_plex_server = get_user_specific_plex_server_from_id(user_id)
 
         if not user_plex_server:
             # Devrait être couvert par la logique ci-dessus, mais par sécurité.
@@ -1398,6 +1179,7 @@ def toggle_watched_status_api(rating_key): # Nom de fonction unique
         return jsonify({'status': 'error', 'message': 'Média non trouvé.'}), 404
     except Unauthorized:
         current_app.logger.error(f"API toggle_watched: Non autorisé pour média {rating_key} (contexte {user_context_description}).")
+        invalidate_plex_handles(user_id)
         return jsonify({'status': 'error', 'message': 'Action non autorisée par le serveur Plex.'}), 401
     except Exception as e:
         current_app.logger.error(f"API toggle_watched: Erreur pour média {rating_key} (contexte {user_context_description}): {e}", exc_info=True)
@@ -1560,6 +1342,19 @@ def find_ready_to_watch_shows_in_library(library_name):
         user_plex_server = get_user_specific_plex_server()
         if not user_plex_server: return []
 
+        # Miroir local : les guids tvdb candidats donnent directement les ratingKeys à charger
+        mirrored_library_keys = get_mirrored_library_keys(library_name)
+        if mirrored_library_keys:
+            matches = find_rating_keys_by_guid([f"tvdb://{tvdb_id}" for tvdb_id in candidate_tvdb_ids],
+                                               library_keys=mirrored_library_keys)
+            rating_keys = sorted({key for keys in matches.values() for key in keys})
+            # L'état de lecture est celui de l'utilisateur : vérifié sur ses propres objets
+            ready_to_watch_shows = [show for show in _fetch_plex_items(user_plex_server, rating_keys)
+                                    if show.type == 'show' and show.viewedLeafCount == 0]
+            ready_to_watch_shows.sort(key=lambda s: s.titleSort.lower())
+            flash(f"{len(ready_to_watch_shows)} série(s) prête(s) à être commencée(s) trouvée(s) !", "success")
+            return ready_to_watch_shows
+
         library = user_plex_server.library.section(library_name)
         if library.type != 'show': return []
 
@@ -1850,7 +1645,9 @@ def delete_item(rating_key):
     deduced_base_paths_guards = [] # Initialiser comme liste
 
     try:
-        plex_server = PlexServer(plex_url, admin_token)
+        plex_server = get_plex_admin_server()
+        if not plex_server:
+            raise ConnectionError("Connexion admin au serveur Plex impossible.")
 
         # --- RÉCUPÉRATION DYNAMIQUE DES RACINES ET GARDE-FOUS ---
         try:
@@ -1913,6 +1710,7 @@ def delete_item(rating_key):
         current_app.logger.warning(f"NotFound lors de la suppression de ratingKey: {rating_key}")
     except Unauthorized:
         flash("Autorisation refusée. Le token Plex admin pourrait ne pas avoir les droits.", "danger")
+        invalidate_plex_handles()
         current_app.logger.error(f"Unauthorized lors de la suppression de ratingKey: {rating_key}")
     except BadRequest:
         flash(f"Requête incorrecte pour la suppression (ratingKey {rating_key}). Ne peut peut-être pas être supprimé.", "danger")
@@ -1953,7 +1751,9 @@ def bulk_delete_items():
     deduced_base_paths_guards = []
 
     try:
-        plex_server = PlexServer(plex_url, admin_token)
+        plex_server = get_plex_admin_server()
+        if not plex_server:
+            raise ConnectionError("Connexion admin au serveur Plex impossible.")
         current_app.logger.info(f"Suppression groupée: {len(selected_rating_keys)} items par '{session.get('plex_user_title', 'Inconnu')}'. Clés: {selected_rating_keys}")
 
         # --- RÉCUPÉRATION DYNAMIQUE DES RACINES ET GARDE-FOUS (une fois pour le lot) ---
@@ -2036,6 +1836,7 @@ def bulk_delete_items():
         return jsonify({'status': status, 'message': message.strip()})
 
     except Unauthorized:
+        invalidate_plex_handles()
         return jsonify({'status': 'error', 'message': "Autorisation refusée (token admin)."}), 401
     except Exception as e_bulk:
         current_app.logger.error(f"Erreur majeure suppression groupée: {e_bulk}", exc_info=True)
@@ -2562,16 +2363,11 @@ def get_series_details_for_management(rating_key):
         # --- BLOC DE CONNEXION PLEX (Logique existante) ---
         admin_plex_server_for_token = get_plex_admin_server()
         if not admin_plex_server_for_token: return ('<div class="alert alert-danger">Erreur: Connexion admin.</div>', 500)
-        main_account = admin_plex_server_for_token.myPlexAccount()
-        user_plex_server = None
-        plex_url = current_app.config.get('PLEX_URL')
-        if str(main_account.id) == user_id: user_plex_server = admin_plex_server_for_token
-        else:
-            user_to_impersonate = next((u for u in main_account.users() if str(u.id) == user_id), None)
-            if user_to_impersonate:
-                token = user_to_impersonate.get_token(admin_plex_server_for_token.machineIdentifier)
-                user_plex_server = PlexServer(plex_url, token)
-            else: return (f'<div class="alert alert-danger">Erreur: Utilisateur {user_id} non trouvé.</div>', 404)
+        main_account = get_main_plex_account_object()
+        if not main_account: return ('<div class="alert alert-danger">Erreur: Compte Plex principal.</div>', 500)
+        if str(main_account.id) != user_id and not any(str(u.id) == user_id for u in get_plex_account_users()):
+            return (f'<div class="alert alert-danger">Erreur: Utilisateur {user_id} non trouvé.</div>', 404)
+        user_plex_server = get_user_specific_plex_server_from_id(user_id)
         if not user_plex_server: return ('<div class="alert alert-danger">Erreur: Connexion Plex utilisateur.</div>', 500)
 
         series = user_plex_server.fetchItem(rating_key)
@@ -2586,31 +2382,33 @@ def get_series_details_for_management(rating_key):
             sonarr_series_info = search_sonarr_series_by_title_and_year(series.title, series.year)
 
         # --- DÉBUT DE LA NOUVELLE LOGIQUE MÉTIER ---
+        # Tous les épisodes Plex en une requête, indexés par (saison, épisode)
+        plex_seasons, plex_episodes = fetch_show_episode_index(user_plex_server, series.ratingKey)
+
         if not sonarr_series_info:
             # Gérer le cas où la série n'est pas du tout dans Sonarr (mode dégradé)
             current_app.logger.error(f"Impossible de trouver '{series.title}' dans Sonarr, même avec la recherche par titre. Affichage en mode dégradé (Plex uniquement).")
             seasons_list = []
             total_series_size = 0
             viewed_seasons_count = 0
-            for plex_season in series.seasons():
-                if plex_season.isWatched: viewed_seasons_count += 1
+            for season_number, plex_season in sorted(plex_seasons.items()):
+                if plex_season['isWatched']: viewed_seasons_count += 1
                 episodes_list_for_season = []
                 total_season_size = 0
-                for plex_episode in plex_season.episodes():
-                    size_bytes = getattr(plex_episode.media[0].parts[0], 'size', 0) if plex_episode.media and plex_episode.media[0].parts else 0
-                    total_season_size += size_bytes
+                for (_, episode_number), plex_episode in sorted((key, ep) for key, ep in plex_episodes.items() if key[0] == season_number):
+                    total_season_size += plex_episode['size']
                     episodes_list_for_season.append({
-                        'title': plex_episode.title, 'episodeNumber': plex_episode.index,
+                        'title': plex_episode['title'], 'episodeNumber': episode_number,
                         'isMonitored_sonarr': False, 'sonarr_episodeId': None,
                         'sonarr_episodeFileId': 0, 'hasFileInSonarr': False,
-                        'isPresentInPlex': True, 'ratingKey': plex_episode.ratingKey,
-                        'isWatched': plex_episode.isWatched, 'size_on_disk': size_bytes,
+                        'isPresentInPlex': True, 'ratingKey': plex_episode['ratingKey'],
+                        'isWatched': plex_episode['isWatched'], 'size_on_disk': plex_episode['size'],
                     })
                 total_series_size += total_season_size
                 seasons_list.append({
-                    'title': f"Saison {plex_season.seasonNumber}" if plex_season.seasonNumber > 0 else "Specials",
-                    'ratingKey': plex_season.ratingKey, 'seasonNumber': plex_season.seasonNumber,
-                    'total_episodes': plex_season.leafCount, 'viewed_episodes': plex_season.viewedLeafCount,
+                    'title': f"Saison {season_number}" if season_number > 0 else "Specials",
+                    'ratingKey': plex_season['ratingKey'], 'seasonNumber': season_number,
+                    'total_episodes': plex_season['leafCount'], 'viewed_episodes': plex_season['viewedLeafCount'],
                     'is_monitored_season': False, 'total_size_on_disk': total_season_size,
                     'episodes': episodes_list_for_season
                 })
@@ -2625,7 +2423,7 @@ def get_series_details_for_management(rating_key):
         else:
             sonarr_series_id_val = sonarr_series_info.get('id')
             sonarr_series_full_details = get_sonarr_series_by_id(sonarr_series_id_val)
-            all_sonarr_episodes = get_sonarr_episodes_by_series_id(sonarr_series_id_val)
+            all_sonarr_episodes = get_sonarr_episodes_by_series_id(sonarr_series_id_val) or []
             is_monitored_global_status = sonarr_series_full_details.get('monitored', False)
 
             # Calcul des métadonnées pour notre algorithme
@@ -2650,32 +2448,34 @@ def get_series_details_for_management(rating_key):
 
             seasons_list = []
             total_series_size = 0; viewed_seasons_count = 0
+            # Épisodes Sonarr regroupés par saison en une passe, triés par numéro
+            sonarr_episodes_by_season = {}
+            for ep in sorted(all_sonarr_episodes, key=lambda x: x.get('episodeNumber', 0)):
+                sonarr_episodes_by_season.setdefault(ep.get('seasonNumber'), []).append(ep)
+
             for sonarr_season_info in sonarr_series_full_details.get('seasons', []):
                 season_number = sonarr_season_info.get('seasonNumber')
-                plex_season = next((s for s in series.seasons() if s.seasonNumber == season_number), None)
-                plex_episodes_map = {ep.index: ep for ep in plex_season.episodes()} if plex_season else {}
-                if plex_season and plex_season.isWatched: viewed_seasons_count += 1
+                plex_season = plex_seasons.get(season_number)
+                if plex_season and plex_season['isWatched']: viewed_seasons_count += 1
 
                 episodes_list_for_season = []
                 total_season_size = 0
 
-                episodes_for_this_season_from_sonarr = sorted([ep for ep in all_sonarr_episodes if ep.get('seasonNumber') == season_number], key=lambda x: x.get('episodeNumber', 0))
-
-                for sonarr_episode_data in episodes_for_this_season_from_sonarr:
+                for sonarr_episode_data in sonarr_episodes_by_season.get(season_number, []):
                     episode_number = sonarr_episode_data.get('episodeNumber')
-                    plex_episode = plex_episodes_map.get(episode_number)
+                    plex_episode = plex_episodes.get((season_number, episode_number))
                     is_present_in_plex = plex_episode is not None
 
                     episode_dict = {
                         'title': sonarr_episode_data.get('title', 'Titre inconnu'), 'episodeNumber': episode_number,
                         'isMonitored_sonarr': sonarr_episode_data.get('monitored', False), 'sonarr_episodeId': sonarr_episode_data.get('id'),
                         'sonarr_episodeFileId': sonarr_episode_data.get('episodeFileId', 0),
-                        'isPresentInPlex': is_present_in_plex, 'ratingKey': plex_episode.ratingKey if is_present_in_plex else None,
-                        'isWatched': plex_episode.isWatched if is_present_in_plex else False
+                        'isPresentInPlex': is_present_in_plex, 'ratingKey': plex_episode['ratingKey'] if is_present_in_plex else None,
+                        'isWatched': plex_episode['isWatched'] if is_present_in_plex else False
                     }
 
                     if is_present_in_plex:
-                        size_bytes = getattr(plex_episode.media[0].parts[0], 'size', 0) if plex_episode.media and plex_episode.media[0].parts else 0
+                        size_bytes = plex_episode['size']
                         total_season_size += size_bytes
                         episode_dict['size_on_disk'] = size_bytes
                     else:
@@ -2710,9 +2510,9 @@ def get_series_details_for_management(rating_key):
                 total_series_size += total_season_size
                 seasons_list.append({
                     'title': f"Saison {season_number}" if season_number > 0 else "Specials",
-                    'ratingKey': plex_season.ratingKey if plex_season else f"sonarr-season-{season_number}", 'seasonNumber': season_number,
+                    'ratingKey': plex_season['ratingKey'] if plex_season else f"sonarr-season-{season_number}", 'seasonNumber': season_number,
                     'total_episodes': total_episode_count,
-                    'viewed_episodes': plex_season.viewedLeafCount if plex_season else 0,
+                    'viewed_episodes': plex_season['viewedLeafCount'] if plex_season else 0,
                     'is_monitored_season': sonarr_season_info.get('monitored', False), 'total_size_on_disk': total_season_size,
                     'episodes': episodes_list_for_season,
                     'file_count': file_count
@@ -3252,7 +3052,7 @@ def metadata_search():
     results = []
     try:
         if target_provider == 'tmdb':
-            tmdb_client = TheMovieDBClient()
+            tmdb_client = get_tmdb_client()
             raw_results = []
 
             # TMDB supporte les deux types
@@ -3472,7 +3272,7 @@ def metadata_apply():
                 current_app.logger.info(f"Injection manuelle de données pour {rating_key}: {manual_data}")
                 details = manual_data
             elif provider == 'tmdb' and external_id:
-                tmdb_client = TheMovieDBClient()
+                tmdb_client = get_tmdb_client()
                 is_show = item.type == 'show'
 
                 if is_show:
@@ -3679,7 +3479,7 @@ def metadata_apply():
             search_year = None
 
             if provider == 'tmdb':
-                client = TheMovieDBClient()
+                client = get_tmdb_client()
                 info = client.get_movie_details(external_id)
                 if info:
                     search_title = info.get('title')
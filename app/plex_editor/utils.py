@@ -200,4 +200,110 @@ def get_media_filepath(item):
         current_app.logger.warning(f"Chemin de fichier non trouvé pour l'item: {getattr(item, 'title', item.ratingKey)}")
     except Exception as e:
         current_app.logger.error(f"Erreur lors de la récupération du chemin du fichier pour {getattr(item, 'title', item.ratingKey)}: {e}", exc_info=True)
-    return None
\ No newline at end of file
+    return None
+# --- Récupération groupée pour les listes de médias (/api/media_items) ---
+PLEX_METADATA_BATCH_SIZE = 100
+PLEX_EPISODE_PAGE_SIZE = 1000
+
+def fetch_plex_trailer_urls(plex_server, rating_keys):
+    """
+    Récupère en lot (includeExtras=1) l'URL de la bande-annonce Plex de plusieurs items.
+    Retourne {ratingKey: url ou None}. Les items dont la réponse ne contient pas de
+    bloc 'Extras' sont absents du résultat : l'appelant se rabat alors sur find_plex_trailer().
+    """
+    trailer_urls = {}
+    keys = [str(key) for key in rating_keys]
+    for start in range(0, len(keys), PLEX_METADATA_BATCH_SIZE):
+        chunk = keys[start:start + PLEX_METADATA_BATCH_SIZE]
+        try:
+            data = plex_server.query(f"/library/metadata/{','.join(chunk)}", params={'includeExtras': 1})
+        except Exception as e:
+            current_app.logger.warning(f"Récupération groupée des extras Plex impossible ({len(chunk)} items): {e}")
+            continue
+        if data is None:
+            continue
+        for elem in data:
+            rating_key = elem.attrib.get('ratingKey')
+            extras = elem.find('Extras')
+            if rating_key is None or extras is None:
+                continue
+            trailer_url = None
+            for extra in extras:
+                if extra.attrib.get('subtype') != 'trailer':
+                    continue
+                part = extra.find('Media/Part')
+                if part is not None and part.attrib.get('key'):
+                    trailer_url = plex_server.url(part.attrib['key'], includeToken=True)
+                    break
+            trailer_urls[int(rating_key)] = trailer_url
+    return trailer_urls
+
+def fetch_show_sizes(plex_server, show_keys_by_section):
+    """
+    Calcule la taille totale (octets) des séries affichées en un nombre constant de
+    requêtes : la liste des épisodes de chaque bibliothèque, filtrée sur ces séries
+    (show.id, par lots de PLEX_METADATA_BATCH_SIZE) et lue par pages, au lieu d'un
+    appel show.episodes() par série. Comme avant, seule la première version (Media)
+    de chaque épisode est comptée.
+    Prend {librarySectionID: [ratingKey des séries]} et retourne {ratingKey: taille}.
+    Les séries d'un lot en erreur sont absentes du résultat.
+    """
+    sizes = {}
+    for section_id, show_keys in show_keys_by_section.items():
+        keys = list(dict.fromkeys(int(key) for key in show_keys))
+        for batch_start in range(0, len(keys), PLEX_METADATA_BATCH_SIZE):
+            batch_sizes = {key: 0 for key in keys[batch_start:batch_start + PLEX_METADATA_BATCH_SIZE]}
+            params = {'type': 4, 'show.id': ','.join(str(key) for key in batch_sizes)}
+            start = 0
+            try:
+                while True:
+                    headers = {'X-Plex-Container-Start': str(start), 'X-Plex-Container-Size': str(PLEX_EPISODE_PAGE_SIZE)}
+                    data = plex_server.query(f"/library/sections/{section_id}/all", headers=headers, params=params)
+                    episodes = data.findall('Video') if data is not None else []
+                    for episode in episodes:
+                        show_key = episode.attrib.get('grandparentRatingKey')
+                        media = episode.find('Media')
+                        if show_key is None or media is None or int(show_key) not in batch_sizes:
+                            continue
+                        batch_sizes[int(show_key)] += sum(int(part.attrib.get('size') or 0) for part in media.findall('Part'))
+                    total = int(data.attrib.get('totalSize') or data.attrib.get('size') or 0) if data is not None else 0
+                    start += PLEX_EPISODE_PAGE_SIZE
+                    if not episodes or start >= total:
+                        break
+            except Exception as e:
+                current_app.logger.warning(f"Calcul groupé des tailles impossible pour la bibliothèque {section_id}: {e}")
+                continue
+            sizes.update(batch_sizes)
+    return sizes
+
+def fetch_show_episode_index(plex_server, show_rating_key):
+    """
+    Lit tous les épisodes d'une série en une requête (/allLeaves) au lieu d'un appel
+    season.episodes() par saison. Retourne (saisons, épisodes) :
+      - saisons : {numéro: {'ratingKey', 'leafCount', 'viewedLeafCount', 'isWatched'}} ;
+      - épisodes : {(saison, épisode): {'ratingKey', 'title', 'isWatched', 'size'}}.
+    """
+    seasons, episodes = {}, {}
+    data = plex_server.query(f"/library/metadata/{show_rating_key}/allLeaves")
+    for elem in (data.findall('Video') if data is not None else []):
+        season_number = elem.attrib.get('parentIndex')
+        episode_number = elem.attrib.get('index')
+        if season_number is None or episode_number is None:
+            continue
+        season_number, episode_number = int(season_number), int(episode_number)
+        is_watched = int(elem.attrib.get('viewCount') or 0) > 0
+        season = seasons.setdefault(season_number, {'ratingKey': int(elem.attrib['parentRatingKey']),
+                                                    'leafCount': 0, 'viewedLeafCount': 0})
+        season['leafCount'] += 1
+        season['viewedLeafCount'] += int(is_watched)
+        # Taille du premier fichier, comme media[0].parts[0] côté plexapi
+        part = elem.find('Media/Part')
+        episodes[(season_number, episode_number)] = {
+            'ratingKey': int(elem.attrib['ratingKey']),
+            'title': elem.attrib.get('title'),
+            'isWatched': is_watched,
+            'size': int(part.attrib.get('size') or 0) if part is not None else 0,
+        }
+    for season in seasons.values():
+        season['isWatched'] = season['viewedLeafCount'] == season['leafCount']
+    return seasons, episodes
@@ -10,7 +10,7 @@ from app.utils.arr_client import parse_media_name
 from app.utils.prowlarr_client import search_prowlarr
 from app.utils.config_manager import load_search_categories, load_filter_options
 from app.utils.release_parser import parse_release_data
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 from app.utils.tvdb_client import CustomTVDBClient
 
 # 1. Définition du Blueprint (seul code global avec les imports "sûrs")
@@ -49,11 +49,12 @@ def media_search():
     try:
         results = []
         if media_type_search == 'movie':
-            client = TheMovieDBClient()
+            client = get_tmdb_client()
             search_results = client.search_movie(query, lang='fr-FR')
+            trailer_statuses = trailer_manager.get_trailer_statuses(('movie', item.get('id')) for item in search_results)
             for item in search_results:
                 external_id = item.get('id')
-                trailer_status = trailer_manager.get_trailer_status('movie', external_id) if external_id else 'NONE'
+                trailer_status = trailer_statuses[('movie', external_id)]
                 media_details = media_info_manager.get_media_details('movie', external_id) if external_id else {}
                 archived_info = find_archived_media_by_id('movie', external_id) if external_id else None
                 results.append({
@@ -70,9 +71,10 @@ def media_search():
         elif media_type_search == 'tv':
             client = CustomTVDBClient()
             search_results = client.search_and_translate_series(query, lang='fra')
+            trailer_statuses = trailer_manager.get_trailer_statuses(('tv', item.get('tvdb_id')) for item in search_results)
             for item in search_results:
                 external_id = item.get('tvdb_id')
-                trailer_status = trailer_manager.get_trailer_status('tv', external_id) if external_id else 'NONE'
+                trailer_status = trailer_statuses[('tv', external_id)]
                 media_details = media_info_manager.get_media_details('tv', external_id) if external_id else {}
                 archived_info = find_archived_media_by_id('show', external_id) if external_id else None
                 results.append({
@@ -245,10 +247,10 @@ def api_search_lookup():
 
     # Enrichir les résultats avec le statut du trailer
     from app.utils import trailer_manager # Import local
-    for item in final_results:
-        item_media_type = 'tv' if item.get('tvdbId') else 'movie'
-        external_id = item.get('tvdbId') or item.get('tmdbId')
-        item['trailer_status'] = trailer_manager.get_trailer_status(item_media_type, external_id) if external_id else 'NONE'
+    trailer_keys = [('tv' if item.get('tvdbId') else 'movie', item.get('tvdbId') or item.get('tmdbId')) for item in final_results]
+    trailer_statuses = trailer_manager.get_trailer_statuses(trailer_keys)
+    for item, trailer_key in zip(final_results, trailer_keys):
+        item['trailer_status'] = trailer_statuses[trailer_key]
 
     if render_as_html:
         return render_template(
@@ -267,7 +269,7 @@ def api_search_lookup():
 @search_ui_bp.route('/api/enrich/details', methods=['POST'])
 def enrich_details():
     from app.utils.tvdb_client import CustomTVDBClient
-    from app.utils.tmdb_client import TheMovieDBClient
+    from app.utils.tmdb_client import get_tmdb_client
     from flask import current_app
 
     data = request.get_json()
@@ -298,7 +300,7 @@ def enrich_details():
             return jsonify(formatted_details)
 
         elif media_type == 'movie':
-            client = TheMovieDBClient()
+            client = get_tmdb_client()
             details = client.get_movie_details(media_id, lang='fr-FR')
             if not details: return jsonify({'error': 'Film non trouvé'}), 404
 
@@ -764,8 +766,8 @@ def add_to_arr():
                 return jsonify({'success': False, 'message': f"Échec de l'ajout de la série '{title}' à Sonarr."})
 
         elif media_type == 'movie':
-            from app.utils.tmdb_client import TheMovieDBClient
-            tmdb_client = TheMovieDBClient()
+            from app.utils.tmdb_client import get_tmdb_client
+            tmdb_client = get_tmdb_client()
             movie_details = tmdb_client.get_movie_details(media_id)
             if not movie_details:
                 return jsonify({'success': False, 'message': f"Impossible de trouver les détails pour le film TMDB ID: {media_id}"}), 404
@@ -853,7 +855,7 @@ def add_media_direct():
 
         elif media_type == 'movie':
             # Récupérer le titre canonique depuis TMDB
-            client = TheMovieDBClient()
+            client = get_tmdb_client()
             movie_details = client.get_movie_details(external_id, lang='fr-FR')
             item_title = movie_details.get('title') if movie_details else 'Titre inconnu'
 
@@ -26,10 +26,11 @@ import paramiko
 from threading import Thread
 # --- Imports spécifiques à l'application MediaManagerSuite ---
 from app.auth import internal_api_required
-from app.utils import staging_processor, sftp_scanner
+from app.utils import staging_processor, sftp_scanner, sftp_transfer, sftp_pool
+from app.utils import http_client
 from app.utils.arr_client import search_sonarr_by_title, search_radarr_by_title
 from app.utils.tvdb_client import CustomTVDBClient
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 
 # Client rTorrent
 from app.utils.rtorrent_client import (
@@ -43,7 +44,7 @@ from app.utils.rtorrent_client import (
 )
 
 # Clients Sonarr/Radarr (pour l'ajout de nouveaux médias)
-from app.utils.arr_client import add_new_series_to_sonarr, add_new_movie_to_radarr
+from app.utils.arr_client import add_new_series_to_sonarr, add_new_movie_to_radarr, record_arr_catalog_change
 
 # Gestionnaire de la map des torrents (NOUVELLE FAÇON D'IMPORTER)
 # Ceci suppose que le fichier app/utils/mapping_manager.py contient le NOUVEAU code que je vous ai fourni.
@@ -260,7 +261,7 @@ def _make_arr_request(method, api_endpoint, api_key, params=None, json_data=None
         if json_data:
             logger.debug(f"Avec le corps JSON : {json_data}")
 
-        response = requests.request(method, api_endpoint, headers=headers, params=params, json=json_data, timeout=30)
+        response = http_client.request('seedbox_arr', method, api_endpoint, headers=headers, params=params, json=json_data, timeout=30)
 
         # --- CHANGEMENT 1 : LOGGING DÉTAILLÉ DE LA RÉPONSE BRUTE ---
         # C'est la ligne la plus importante. Elle nous montrera la vérité.
@@ -1087,60 +1088,16 @@ def sftp_delete_recursive(sftp_client, remote_path_posix, current_logger):
         return False
 # NOUVELLE FONCTION HELPER (adaptée de ton script)
 def _download_sftp_item_recursive_local(sftp_client, remote_item_path_str, local_item_path_obj, current_logger):
-    """Télécharge un fichier ou un dossier (récursivement) via SFTP."""
+    """Télécharge un fichier ou un dossier (récursivement) via SFTP, avec reprise sur les fichiers .part."""
     current_logger.debug(f"SFTP Recursive Download: Tentative pour distant='{remote_item_path_str}', local='{local_item_path_obj}'")
     try:
-        item_stat = sftp_client.stat(remote_item_path_str)
-    except FileNotFoundError:
-        current_logger.error(f"SFTP Erreur: Élément distant {remote_item_path_str} non trouvé.")
-        return False
+        transport = sftp_client.get_channel().get_transport()
+        results = sftp_transfer.download_items(
+            [(remote_item_path_str, remote_item_path_str, str(local_item_path_obj))], transport, logger=current_logger
+        )
+        return results.get(remote_item_path_str, False)
     except Exception as e:
-        current_logger.error(f"SFTP Erreur lors de stat sur {remote_item_path_str}: {e}")
-        return False
-
-    if stat.S_ISREG(item_stat.st_mode):
-        current_logger.info(f"Téléchargement du fichier: {remote_item_path_str} -> {local_item_path_obj}")
-        try:
-            local_item_path_obj.parent.mkdir(parents=True, exist_ok=True)
-            sftp_client.get(remote_item_path_str, str(local_item_path_obj))
-            return True
-        except Exception as e:
-            current_logger.error(f"SFTP Erreur lors du get sur {remote_item_path_str}: {e}")
-            if local_item_path_obj.exists(): # Nettoyer le fichier partiel
-                try: local_item_path_obj.unlink()
-                except: pass
-            return False
-    elif stat.S_ISDIR(item_stat.st_mode):
-        current_logger.info(f"Téléchargement du dossier: {remote_item_path_str} -> {local_item_path_obj}")
-        try:
-            local_item_path_obj.mkdir(parents=True, exist_ok=True)
-        except Exception as e_mkdir:
-            current_logger.error(f"Impossible de créer le dossier local {local_item_path_obj}: {e_mkdir}")
-            return False
-
-        all_success = True
-        try:
-            for item_name in sftp_client.listdir(remote_item_path_str):
-                if item_name in [".", ".."]: continue
-
-                # Construire les chemins en s'assurant que remote_item_path_str est traité comme un dossier
-                current_remote_dir_posix = Path(remote_item_path_str).as_posix()
-                if not current_remote_dir_posix.endswith('/'):
-                    current_remote_dir_posix += '/'
-
-                next_remote_item_path_str = current_remote_dir_posix + item_name
-                next_local_item_path_obj = local_item_path_obj / item_name
-
-                if not _download_sftp_item_recursive_local(sftp_client, next_remote_item_path_str, next_local_item_path_obj, current_logger):
-                    all_success = False
-                    # On pourrait décider d'arrêter ici ou de continuer avec les autres fichiers du dossier
-                    # Pour l'instant, on continue mais on marque comme échec partiel/total
-        except Exception as e:
-            current_logger.error(f"SFTP Erreur lors de listdir sur {remote_item_path_str} ou DL sous-élément: {e}")
-            all_success = False
-        return all_success
-    else:
-        current_logger.warning(f"Type d'élément inconnu pour {remote_item_path_str}, non téléchargé.")
+        current_logger.error(f"SFTP Erreur lors du téléchargement de {remote_item_path_str}: {e}")
         return False
 
 # NOUVELLE FONCTION HELPER (adaptée de ton script)
@@ -1861,7 +1818,7 @@ def search_tmdb_enriched():
         results_to_enrich = initial_results[:5]
         enriched_results = []
 
-        tmdb_client = TheMovieDBClient()
+        tmdb_client = get_tmdb_client()
         for movie in results_to_enrich:
             tmdb_id = movie.get('tmdbId')
             if tmdb_id:
@@ -2237,10 +2194,7 @@ def remote_seedbox_view(app_type_target):
     error_message_display_template = None
 
     try:
-        transport = paramiko.Transport((sftp_host, int(sftp_port)))
-        transport.set_keepalive(60)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp_client = paramiko.SFTPClient.from_transport(transport)
+        sftp_client, transport = sftp_pool.acquire_sftp()
         logger.info(f"SFTP (remote_seedbox_view): Connecté à {sftp_host}.")
 
         remote_items_tree_data = sftp_build_remote_file_tree(
@@ -2260,8 +2214,7 @@ def remote_seedbox_view(app_type_target):
         logger.error(f"SFTP (remote_seedbox_view): Erreur de connexion ou autre: {e_conn}", exc_info=True)
         error_message_display_template = f"Erreur de connexion SFTP: {e_conn}"
     finally:
-        if sftp_client: sftp_client.close()
-        if transport: transport.close()
+        sftp_pool.release_sftp(sftp_client, transport)
         logger.debug("SFTP (remote_seedbox_view): Connexion fermée.")
 
     if error_message_display_template and not remote_items_tree_data: # Si erreur et pas d'items
@@ -2306,10 +2259,7 @@ def manual_sftp_download_action():
     local_destination_for_item_pathobj = local_staging_dir_pathobj / item_basename
 
     try:
-        transport = paramiko.Transport((sftp_host, int(sftp_port)))
-        transport.set_keepalive(60)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp_client = paramiko.SFTPClient.from_transport(transport)
+        sftp_client, transport = sftp_pool.acquire_sftp()
         logger.info(f"SFTP (manual download): Connecté à {sftp_host}.")
 
         logger.info(f"SFTP (manual download): Appel de _download_sftp_item_recursive_local pour '{remote_path_to_download_posix}' vers '{local_destination_for_item_pathobj}'")
@@ -2404,8 +2354,7 @@ def manual_sftp_download_action():
         logger.error(f"SFTP (manual download): Erreur générale SFTP: {e_sftp}", exc_info=True)
         return jsonify({"success": False, "error": f"Erreur SFTP: {type(e_sftp).__name__} - {e_sftp}"}), 500
     finally:
-        if sftp_client: sftp_client.close()
-        if transport: transport.close()
+        sftp_pool.release_sftp(sftp_client, transport)
         logger.debug("SFTP (manual download): Connexion fermée.")
 
 # FIN DE LA FONCTION manual_sftp_download_action
@@ -2460,10 +2409,7 @@ def sftp_retrieve_and_process_action():
     sftp_client = None; transport = None; success_download = False
     try:
         current_app.logger.debug(f"SFTP R&P: Connexion à {sftp_host}:{sftp_port} avec utilisateur {sftp_user}")
-        transport = paramiko.Transport((sftp_host, int(sftp_port)))
-        transport.set_keepalive(60)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp_client = paramiko.SFTPClient.from_transport(transport)
+        sftp_client, transport = sftp_pool.acquire_sftp()
         current_app.logger.info(f"SFTP R&P: Connecté à {sftp_host}. Téléchargement de '{remote_path_posix}'.")
 
         success_download = _download_sftp_item_recursive_local(sftp_client, remote_path_posix, local_staged_item_path_obj, current_app.logger) # Pass logger
@@ -2544,8 +2490,7 @@ def sftp_retrieve_and_process_action():
         current_app.logger.error(f"SFTP R&P: Erreur SFTP ('{remote_path_posix}'): {e_sftp_outer}", exc_info=True)
         return jsonify({"success": False, "error": f"Erreur SFTP lors du téléchargement: {e_sftp_outer}"}), 500
     finally:
-        if sftp_client: sftp_client.close()
-        if transport: transport.close()
+        sftp_pool.release_sftp(sftp_client, transport)
         current_app.logger.debug("SFTP R&P: Connexion SFTP fermée.")
 
     # --- Étape 2: Traitement de l'item téléchargé ---
@@ -2678,10 +2623,7 @@ def sftp_delete_items_action():
     failed_items_details = []
 
     try:
-        transport = paramiko.Transport((sftp_host, int(sftp_port)))
-        transport.set_keepalive(60)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp_client = paramiko.SFTPClient.from_transport(transport)
+        sftp_client, transport = sftp_pool.acquire_sftp()
         logger.info(f"SFTP (delete items): Connecté à {sftp_host}.")
 
         for remote_path_posix in selected_paths_to_delete:
@@ -2714,8 +2656,7 @@ def sftp_delete_items_action():
         logger.error(f"SFTP (delete items): Erreur générale SFTP: {e_sftp}", exc_info=True)
         return jsonify({"success": False, "error": f"Erreur SFTP lors de la suppression: {e_sftp}"}), 500
     finally:
-        if sftp_client: sftp_client.close()
-        if transport: transport.close()
+        sftp_pool.release_sftp(sftp_client, transport)
         logger.debug("SFTP (delete items): Connexion fermée.")
 # ------------------------------------------------------------------------------
 # FONCTION trigger_sonarr_import
@@ -3027,6 +2968,7 @@ def rtorrent_add_torrent_action():
 
         actual_target_id = added_media_data.get("id")
         logger.info(f"RTORRENT_ADD_ACTION: Média '{title_for_add}' ajouté à {app_type.capitalize()} avec ID interne: {actual_target_id}")
+        record_arr_catalog_change(app_type, added_media_data)
     # Si ce n'était pas un nouveau média, actual_target_id a été défini à partir de target_id_existing_str
 
     if actual_target_id is None: # Sécurité : on doit avoir un ID cible à ce stade
@@ -3290,20 +3232,25 @@ def rtorrent_batch_action():
         if not sftp:
             return jsonify({'status': 'error', 'message': 'Connexion SFTP échouée.'}), 500
         try:
+            items_with_folders = []
             for h in hashes:
                 item = torrent_map_manager.get_torrent_by_hash(h)
                 if item:
-                    folder_name = item.get('folder_name', item['release_name'])
-                    if staging_processor._rapatriate_item(item, sftp, folder_name):
-                        torrent_map_manager.update_torrent_status_in_map(h, 'in_staging', 'Rapatrié manuellement via action groupée.')
-                        success_count += 1
-                    else:
-                        fail_count += 1
+                    item['torrent_hash'] = h
+                    items_with_folders.append((item, item.get('folder_name', item['release_name'])))
+                else:
+                    fail_count += 1
+            # Rapatriement parallèle de toute la sélection sur le même transport
+            results = staging_processor._rapatriate_items(items_with_folders, transport) if items_with_folders else {}
+            for item, _ in items_with_folders:
+                h = item['torrent_hash']
+                if results.get(h):
+                    torrent_map_manager.update_torrent_status_in_map(h, 'in_staging', 'Rapatrié manuellement via action groupée.')
+                    success_count += 1
                 else:
                     fail_count += 1
         finally:
-            if transport:
-                transport.close()
+            sftp_pool.release_sftp(sftp, transport)
     # --- Action "Réessayer le rapatriement" ---
     elif action == 'retry_repatriation':
         for h in hashes:
@@ -3607,21 +3554,15 @@ def _run_automated_processing_cycle():
         transport = None
         download_success = False
         try:
-            transport = paramiko.Transport((sftp_config['host'], sftp_config['port']))
-            transport.set_keepalive(60)
-            transport.connect(username=sftp_config['user'], password=sftp_config['password'])
-            sftp_client = paramiko.SFTPClient.from_transport(transport)
+            sftp_client, transport = sftp_pool.acquire_sftp()
             current_app.logger.info(f"Automatisation: Connecté à SFTP pour télécharger '{torrent_name_rtorrent}'.")
             download_success = _download_sftp_item_recursive_local(sftp_client, remote_full_path_to_download, local_staged_item_path_abs, current_app.logger)
         except Exception as e_sftp:
             current_app.logger.error(f"Automatisation: Erreur SFTP lors du téléchargement de '{remote_full_path_to_download}': {e_sftp}", exc_info=True)
             errors_count += 1
-            if sftp_client: sftp_client.close() # Fermer en cas d'erreur avant le finally
-            if transport: transport.close()    # Fermer en cas d'erreur avant le finally
             continue
         finally:
-            if sftp_client: sftp_client.close()
-            if transport: transport.close()
+            sftp_pool.release_sftp(sftp_client, transport)
 
         if not download_success:
             current_app.logger.error(f"Automatisation: Échec du téléchargement SFTP de '{remote_full_path_to_download}'. Passage au suivant.")
@@ -4166,8 +4107,7 @@ def repatriate_to_staging():
             return jsonify({'status': 'error', 'message': 'Échec du rapatriement.'}), 500
 
     finally:
-        if transport:
-            transport.close()
+        sftp_pool.release_sftp(sftp, transport)
 
 
 @seedbox_ui_bp.route('/problematic-association/delete/<string:torrent_hash>', methods=['POST'])
@@ -4235,37 +4175,31 @@ def sftp_batch_download_action():
 
     try:
         logger.debug(f"SFTP Batch Download: Connexion à {sftp_host}:{sftp_port}")
-        transport = paramiko.Transport((sftp_host, sftp_port))
-        transport.set_keepalive(60)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp_client = paramiko.SFTPClient.from_transport(transport)
+        sftp_client, transport = sftp_pool.acquire_sftp()
         logger.info(f"SFTP Batch Download: Connecté à {sftp_host}.")
 
+        # Tous les items sont transférés en parallèle (plusieurs canaux sur ce transport, reprise sur .part)
+        transfer_jobs = [
+            (remote_path_posix, remote_path_posix, str(local_staging_dir_pathobj / Path(remote_path_posix).name))
+            for remote_path_posix in remote_paths_to_download
+        ]
+        transfer_results = sftp_transfer.download_items(transfer_jobs, transport, logger=logger)
+
         for remote_path_posix in remote_paths_to_download:
             item_basename_on_seedbox = Path(remote_path_posix).name
             local_destination_for_item_pathobj = local_staging_dir_pathobj / item_basename_on_seedbox
 
-            logger.info(f"SFTP Batch Download: Tentative de téléchargement de '{remote_path_posix}' vers '{local_destination_for_item_pathobj}'")
-
-            # Réutiliser votre helper de téléchargement SFTP
-            # _download_sftp_item_recursive_local(sftp_client, remote_path_posix, local_destination_for_item_pathobj, logger_instance)
-            # Assurez-vous que _download_sftp_item_recursive_local est défini ou importé correctement.
-            # Si elle est définie dans le même fichier, pas besoin d'import.
-            if _download_sftp_item_recursive_local(sftp_client, remote_path_posix, local_destination_for_item_pathobj, logger):
+            if transfer_results.get(remote_path_posix):
                 logger.info(f"SFTP Batch Download: Succès du téléchargement de '{item_basename_on_seedbox}'.")
                 successful_downloads_count += 1
                 downloaded_item_names_for_mms_processing.append(item_basename_on_seedbox)
             else:
                 logger.error(f"SFTP Batch Download: Échec du téléchargement de '{item_basename_on_seedbox}' depuis '{remote_path_posix}'.")
                 failed_downloads_count += 1
-                # Nettoyer un téléchargement partiel si nécessaire (votre helper le fait peut-être déjà)
-                if local_destination_for_item_pathobj.exists():
-                    if local_destination_for_item_pathobj.is_dir() and not any(local_destination_for_item_pathobj.iterdir()):
-                        try: shutil.rmtree(local_destination_for_item_pathobj)
-                        except Exception as e_rm: logger.warning(f"SFTP Batch Download: Échec nettoyage partiel dossier {local_destination_for_item_pathobj}: {e_rm}")
-                    elif local_destination_for_item_pathobj.is_file() and local_destination_for_item_pathobj.stat().st_size == 0:
-                        try: local_destination_for_item_pathobj.unlink()
-                        except Exception as e_rm: logger.warning(f"SFTP Batch Download: Échec nettoyage partiel fichier {local_destination_for_item_pathobj}: {e_rm}")
+                # Les fichiers .part sont conservés pour la reprise ; on ne retire qu'un dossier resté vide
+                if local_destination_for_item_pathobj.is_dir() and not any(local_destination_for_item_pathobj.iterdir()):
+                    try: shutil.rmtree(local_destination_for_item_pathobj)
+                    except Exception as e_rm: logger.warning(f"SFTP Batch Download: Échec nettoyage partiel dossier {local_destination_for_item_pathobj}: {e_rm}")
 
     except paramiko.ssh_exception.AuthenticationException as e_auth:
         logger.error(f"SFTP Batch Download: Erreur d'authentification SFTP: {e_auth}")
@@ -4274,8 +4208,7 @@ def sftp_batch_download_action():
         logger.error(f"SFTP Batch Download: Erreur de connexion SFTP ou autre: {e_sftp_connect}", exc_info=True)
         return jsonify({"success": False, "error": f"Erreur SFTP: {str(e_sftp_connect)}"}), 500
     finally:
-        if sftp_client: sftp_client.close()
-        if transport: transport.close()
+        sftp_pool.release_sftp(sftp_client, transport)
         logger.debug("SFTP Batch Download: Connexion SFTP fermée.")
 
     # --- APRÈS LA BOUCLE DE TÉLÉCHARGEMENT, NOTIFIER MMS POUR CHAQUE ITEM TÉLÉCHARGÉ ---
@@ -4579,10 +4512,7 @@ def sftp_add_and_import_arr_item_action():
     success_download = False
     try:
         logger.debug(f"SFTP Add&Import: Connexion SFTP à {sftp_host}:{sftp_port} pour '{remote_path_posix}'")
-        transport = paramiko.Transport((sftp_host, sftp_port))
-        transport.set_keepalive(60)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp_client = paramiko.SFTPClient.from_transport(transport)
+        sftp_client, transport = sftp_pool.acquire_sftp()
 
         success_download = _download_sftp_item_recursive_local(sftp_client, remote_path_posix, local_staged_item_path_obj, logger)
 
@@ -4624,8 +4554,7 @@ def sftp_add_and_import_arr_item_action():
         logger.error(f"SFTP Add&Import: Erreur SFTP: {e_sftp}", exc_info=True)
         return jsonify({"success": False, "error": f"Erreur SFTP: {e_sftp}"}), 500
     finally:
-        if sftp_client: sftp_client.close()
-        if transport: transport.close()
+        sftp_pool.release_sftp(sftp_client, transport)
 
     # --- Étape 3: Import MMS ---
     if success_download:
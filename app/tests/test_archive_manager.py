@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import archive_manager
+
+
+class TestArchiveIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, 'archive_database.json')
+        database = {f'movie_{i}': {'media_type': 'movie', 'external_id': i, 'title': f'Film {i}'} for i in range(5000)}
+        database['movie_194'] = {'media_type': 'movie', 'external_id': 194, 'title': "Le Fabuleux Destin d'Amélie Poulain"}
+        database['tv_1'] = {'media_type': 'tv', 'external_id': 1, 'title': 'Amélie et les autres'}
+        database['tv_2'] = {'media_type': 'tv', 'external_id': 2, 'title': None}
+        self._write_disk(database)
+        self.app = Flask(__name__)
+        self.app.config['ARCHIVE_DATABASE_FILE'] = self.db_file
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        archive_manager._indexes.clear()
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def _write_disk(self, database):
+        with open(self.db_file, 'w', encoding='utf-8') as f:
+            json.dump(database, f, ensure_ascii=False)
+
+    def test_title_search_folds_accents_and_keeps_database_order(self):
+        results = archive_manager.find_archived_media_by_title('  AMELIE ')
+        self.assertEqual([r['external_id'] for r in results], [194, 1])
+        self.assertEqual([r['external_id'] for r in archive_manager.find_archived_media_by_title('ilm 499')],
+                         [499, 4990, 4991, 4992, 4993, 4994, 4995, 4996, 4997, 4998, 4999])
+        self.assertEqual(len(archive_manager.find_archived_media_by_title('é')), 2)
+
+    def test_lookups_read_the_file_once_and_return_copies(self):
+        with patch.object(archive_manager._ArchiveIndex, '_read_file_locked', autospec=True,
+                          side_effect=archive_manager._ArchiveIndex._read_file_locked) as mock_read:
+            for i in range(1000):
+                archive_manager.find_archived_media_by_id('movie', i)
+                archive_manager.is_media_archived(f'movie_{i}')
+            entry = archive_manager.get_archived_media_by_id('tv_1')
+            entry['title'] = 'changed'
+
+        self.assertEqual(mock_read.call_count, 1)
+        self.assertEqual(archive_manager.get_archived_media_by_id('tv_1')['title'], 'Amélie et les autres')
+        self.assertIsNone(archive_manager.find_archived_media_by_id('show', 999))
+
+    def test_index_follows_writes_and_external_changes(self):
+        archive_manager._put_entry('movie_194', {'media_type': 'movie', 'external_id': 194, 'title': 'Delicatessen'})
+        self.assertEqual(archive_manager.find_archived_media_by_title('amelie poulain'), [])
+        self.assertEqual(archive_manager.find_archived_media_by_title('delicat')[0]['external_id'], 194)
+        with open(self.db_file, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['movie_194']['title'], 'Delicatessen')
+
+        self._write_disk({'tv_9': {'media_type': 'tv', 'external_id': 9, 'title': 'Dark'}})
+        os.utime(self.db_file, ns=(1, 1))
+        archive_manager._get_index()[0]._last_check = 0.0
+        self.assertTrue(archive_manager.is_media_archived('tv_9'))
+        self.assertEqual(archive_manager.find_archived_media_by_title('film'), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
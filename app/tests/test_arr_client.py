@@ -13,6 +13,7 @@ class TestArrClient(unittest.TestCase):
         self.app.config['SONARR_URL'] = 'http://sonarr.test'
         self.app_context = self.app.app_context()
         self.app_context.push()
+        arr_client.invalidate_arr_catalogs()
 
     def tearDown(self):
         self.app_context.pop()
@@ -77,6 +78,43 @@ class TestArrClient(unittest.TestCase):
         ]
         self.assertFalse(arr_client.check_radarr_movie_exists("Test Movie", 2021))
 
+    @patch('app.utils.arr_client._radarr_api_request')
+    def test_radarr_catalog_lookups_share_one_fetch(self, mock_api_request):
+        mock_api_request.return_value = [
+            {"id": 1, "title": "Test Movie", "year": 2021, "tmdbId": 100, "imdbId": "tt0100"},
+            {"id": 2, "title": "Other: Movie!", "year": 2020, "tmdbId": 200, "imdbId": "tt0200"},
+        ]
+        self.assertEqual(arr_client.get_radarr_movie_by_guid('tmdb://100')['id'], 1)
+        self.assertEqual(arr_client.get_radarr_movie_by_guid('imdb://tt0200')['id'], 2)
+        self.assertIsNone(arr_client.get_radarr_movie_by_guid('tmdb://999'))
+        self.assertEqual(arr_client.find_radarr_movie_by_title('test movie')['id'], 1)
+        self.assertFalse(arr_client.check_radarr_movie_exists("Other Movie", 2020))
+        mock_api_request.assert_called_once_with('GET', 'movie')
+
+    @patch('app.utils.arr_client._radarr_api_request')
+    def test_radarr_catalog_upserts_updated_movie(self, mock_api_request):
+        mock_api_request.side_effect = [
+            [{"id": 1, "title": "Test Movie", "tmdbId": 100, "monitored": True}],
+            {"id": 1, "title": "Renamed Movie", "tmdbId": 100, "monitored": False},
+        ]
+        movie = arr_client.get_radarr_movie_by_guid('tmdb:100')
+        movie['title'] = "Renamed Movie"
+        arr_client.update_radarr_movie(movie)
+
+        self.assertFalse(arr_client.get_radarr_movie_by_guid('tmdb:100')['monitored'])
+        self.assertEqual(arr_client.find_radarr_movie_by_title('Renamed Movie')['id'], 1)
+        self.assertEqual(mock_api_request.call_count, 2)
+
+    @patch('app.utils.arr_client._sonarr_api_request')
+    def test_sonarr_catalog_matches_title_slug(self, mock_api_request):
+        mock_api_request.side_effect = [
+            [{"id": 7, "title": "The Show (US)", "titleSlug": "the-show", "tvdbId": 555}],
+            [{"seriesId": 7, "seasonNumber": 1, "episodeNumber": 1, "hasFile": True, "episodeFileId": 10, "monitored": True, "episodeFile": {"path": "/path/to/file", "size": 1000}}],
+        ]
+        self.assertTrue(arr_client.check_sonarr_episode_exists("The Show", 1, 1))
+        self.assertEqual(arr_client.get_sonarr_series_by_guid('tvdb://555')['id'], 7)
+        self.assertEqual(mock_api_request.call_count, 2)
+
     @patch('app.utils.arr_client._sonarr_api_request')
     def test_sonarr_update_episode_monitoring_success(self, mock_api_request):
         # Mock the GET request to return a sample episode object
@@ -106,5 +144,21 @@ class TestArrClient(unittest.TestCase):
         self.assertFalse(result)
         mock_api_request.assert_called_once_with("GET", "episode/5")
 
+    @patch('app.utils.arr_client._sonarr_api_request')
+    def test_queue_snapshot_fetches_all_pages_once(self, mock_api_request):
+        pages = {
+            1: {'totalRecords': 4, 'records': [{'downloadId': 'AAA', 'title': 'One'}, {'downloadId': 'BBB', 'title': 'Two'}]},
+            2: {'totalRecords': 4, 'records': [{'downloadId': 'CCC', 'title': 'Three'}, {'downloadId': 'ccc', 'title': 'Four'}]},
+        }
+        mock_api_request.side_effect = lambda method, endpoint, params=None: pages[params['page']]
+
+        snapshot = arr_client.get_arr_queue_snapshot()
+        found = arr_client.find_in_arr_queue_by_hash('sonarr', 'ccc', snapshot)
+        missing = arr_client.find_in_arr_queue_by_hash('sonarr', 'ddd', snapshot)
+
+        self.assertEqual(found['title'], 'Three')
+        self.assertIsNone(missing)
+        self.assertEqual(mock_api_request.call_count, 2)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,112 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import dashboard_scheduler
+
+
+class TestConcurrentDashboardEnrichment(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(DASHBOARD_ENRICH_WORKERS=6, DASHBOARD_TMDB_CONCURRENCY=2,
+                               DASHBOARD_TMDB_RATE_PER_SECOND=0, DASHBOARD_ARR_CONCURRENCY=3)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.archived = set()
+        patcher = patch('app.utils.dashboard_scheduler.is_media_archived', side_effect=lambda key: key in self.archived)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_unchanged_torrents_skip_enrichment_and_tmdb_concurrency_is_bounded(self):
+        active = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        instances_by_thread = {}
+
+        class FakeTMDb:
+            def get_movie_details(self, tmdb_id):
+                with lock:
+                    instances_by_thread.setdefault(threading.get_ident(), set()).add(self)
+                    active['now'] += 1
+                    active['max'] = max(active['max'], active['now'])
+                time.sleep(0.01)
+                with lock:
+                    active['now'] -= 1
+                return {'overview': f'overview {tmdb_id}', 'poster': None}
+
+        torrents = [{'title': f'Movie {i} 2024 1080p', 'type': 'movie', 'tmdbId': i} for i in range(1, 13)]
+
+        with patch('app.utils.dashboard_scheduler.get_media_statuses', return_value={'summary': 'NOT_MANAGED'}) as mock_statuses, \
+             patch('app.utils.dashboard_scheduler.get_arr_catalog_revision', return_value=None), \
+             patch('app.utils.dashboard_scheduler.parse_release_data', return_value={'title': 'Movie'}):
+            shared_client = FakeTMDb()
+            first = dashboard_scheduler._enrich_torrents_concurrently(torrents, shared_client)
+            first_run_instances = {ident: set(clients) for ident, clients in instances_by_thread.items()}
+            torrents[0]['title'] = 'Movie 0 2024 2160p'
+            second = dashboard_scheduler._enrich_torrents_concurrently(torrents, FakeTMDb())
+
+        self.assertEqual(first['enriched'], 12)
+        self.assertEqual(second['enriched'], 1)
+        self.assertLessEqual(active['max'], 2)
+        # Chaque worker utilise un seul client, le sien : ni l'instance fournie ni celle d'un autre worker
+        self.assertTrue(all(len(clients) == 1 for clients in first_run_instances.values()))
+        instances = [client for clients in first_run_instances.values() for client in clients]
+        self.assertNotIn(shared_client, instances)
+        self.assertEqual(len(set(map(id, instances))), len(first_run_instances))
+        self.assertEqual(second['statuses'], 1)
+        self.assertEqual(mock_statuses.call_count, 13)
+        self.assertEqual(torrents[5]['overview'], 'overview 6')
+        progress = dashboard_scheduler.get_refresh_progress()
+        self.assertFalse(progress['running'])
+        self.assertEqual(progress['done'], 12)
+
+    def test_statuses_recomputed_only_on_arr_revision_change_or_full_rescan(self):
+        torrents = [{'title': f'Show {i} S01E01 1080p', 'type': 'tv', 'tvdbId': 100 + i,
+                     'parsed_data': {'season': 1, 'episode': 1}, 'enrichment_fingerprint': None}
+                    for i in range(4)]
+        for torrent in torrents:
+            torrent['enrichment_fingerprint'] = dashboard_scheduler._enrichment_fingerprint(torrent)
+        revisions = {100 + i: 'rev-a' for i in range(4)}
+
+        with patch('app.utils.dashboard_scheduler.get_media_statuses', return_value={'summary': 'MISSING'}) as mock_statuses, \
+             patch('app.utils.dashboard_scheduler.get_arr_catalog_revision',
+                   side_effect=lambda arr_type, field, value: revisions.get(value)):
+            first = dashboard_scheduler._enrich_torrents_concurrently(torrents, None)
+            unchanged = dashboard_scheduler._enrich_torrents_concurrently(torrents, None)
+            revisions[102] = 'rev-b'
+            changed = dashboard_scheduler._enrich_torrents_concurrently(torrents, None)
+            full = dashboard_scheduler._enrich_torrents_concurrently(torrents, None, full_rescan=True)
+
+        self.assertEqual((first['enriched'], first['statuses']), (0, 4))
+        self.assertEqual(unchanged['statuses'], 0)
+        self.assertEqual(changed['statuses'], 1)
+        self.assertEqual(full['statuses'], 4)
+        self.assertEqual(mock_statuses.call_count, 9)
+
+    def test_statuses_recomputed_when_archive_state_flips(self):
+        torrents = [{'title': f'Movie {i} 2024 1080p', 'type': 'movie', 'tmdbId': 200 + i,
+                     'parsed_data': {'title': 'Movie'}} for i in range(3)]
+        for torrent in torrents:
+            torrent['enrichment_fingerprint'] = dashboard_scheduler._enrichment_fingerprint(torrent)
+
+        with patch('app.utils.dashboard_scheduler.get_media_statuses', return_value={'summary': 'NOT_MANAGED'}), \
+             patch('app.utils.dashboard_scheduler.get_arr_catalog_revision', return_value=None):
+            dashboard_scheduler._enrich_torrents_concurrently(torrents, None)
+            self.archived.add('movie_201')
+            archived = dashboard_scheduler._enrich_torrents_concurrently(torrents, None)
+            self.archived.clear()
+            unarchived = dashboard_scheduler._enrich_torrents_concurrently(torrents, None)
+
+        self.assertEqual(archived['statuses'], 1)
+        self.assertEqual(unarchived['statuses'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
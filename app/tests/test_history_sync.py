@@ -0,0 +1,143 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from xml.etree import ElementTree
+
+from flask import Flask
+from plexapi.exceptions import NotFound
+
+from app.utils import history_sync
+
+HISTORY = [
+    # Film encore présent dans Plex : écarté par la vérification groupée
+    '<Video type="movie" ratingKey="1" title="Présent" originallyAvailableAt="2001-01-01" viewedAt="1700000000"/>',
+    '<Video type="movie" ratingKey="2" title="Fantôme" originallyAvailableAt="2005-05-05" viewedAt="1700000500"/>',
+    '<Video type="movie" ratingKey="2" title="Fantôme" originallyAvailableAt="2005-05-05" viewedAt="1600000000"/>',
+    '<Video type="episode" ratingKey="3" grandparentTitle="Dark" originallyAvailableAt="2017-12-01" parentIndex="1" index="1" viewedAt="1650000000"/>',
+    '<Video type="episode" ratingKey="4" grandparentTitle="Dark" originallyAvailableAt="2017-12-01" parentIndex="1" index="2" viewedAt="1660000000"/>',
+    '<Video type="episode" ratingKey="4" grandparentTitle="Dark" originallyAvailableAt="2017-12-01" parentIndex="1" index="2" viewedAt="1550000000"/>',
+    '<Video type="movie" ratingKey="5" title="Déjà archivé" originallyAvailableAt="1999-01-01" viewedAt="1500000000"/>',
+]
+
+
+class TestHistorySync(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.checkpoint_file = os.path.join(self.temp_dir.name, 'history_sync_checkpoint.json')
+        self.app = Flask(__name__)
+        self.app.config.update(HISTORY_SYNC_CHECKPOINT_FILE=self.checkpoint_file, HISTORY_SYNC_WORKERS=3,
+                               HISTORY_SYNC_RATE_PER_SECOND=0)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.plex = MagicMock()
+        self.plex.query.side_effect = self._query
+        self.plex.search.return_value = [SimpleNamespace(title='Autre chose')]
+        self.tmdb = MagicMock()
+        self.tmdb.search_movie.return_value = [{'id': 42, 'year': '2005'}]
+        self.tvdb = MagicMock()
+        self.tvdb.search_and_translate_series.return_value = [{'tvdb_id': 7, 'name': 'Dark', 'year': '2017'}]
+        self.tvdb.get_season_episode_counts.return_value = {1: 10}
+        self.archived_calls = []
+
+        patches = [
+            patch('app.utils.history_sync.get_tmdb_client', return_value=self.tmdb),
+            patch('app.utils.history_sync.CustomTVDBClient', return_value=self.tvdb),
+            patch('app.utils.history_sync.load_archive_data',
+                  return_value={'movie_9': {'title': 'Déjà Archivé', 'year': 1999}}),
+            patch('app.utils.history_sync.add_archived_media', side_effect=self._add_archived_media),
+            patch.object(history_sync, 'HISTORY_PAGE_SIZE', 3),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def _query(self, key, headers=None, params=None):
+        if key.startswith('/library/metadata/'):
+            keys = key.rsplit('/', 1)[1].split(',')
+            if '1' not in keys:
+                raise NotFound('404')
+            return ElementTree.fromstring('<MediaContainer><Video ratingKey="1"/></MediaContainer>')
+        start, size = int(headers['X-Plex-Container-Start']), int(headers['X-Plex-Container-Size'])
+        page = ''.join(HISTORY[start:start + size])
+        return ElementTree.fromstring(f'<MediaContainer totalSize="{len(HISTORY)}">{page}</MediaContainer>')
+
+    def _add_archived_media(self, **kwargs):
+        self.archived_calls.append((kwargs['media_type'], kwargs['external_id'], kwargs['season_number'],
+                                    kwargs['episode_number'], kwargs['last_viewed_at']))
+        return True, 'ok'
+
+    def _saved_checkpoint(self):
+        if not os.path.exists(self.checkpoint_file):
+            return None
+        with open(self.checkpoint_file, encoding='utf-8') as f:
+            return json.load(f).get('1')
+
+    def _run(self, resume=True):
+        return list(history_sync.iter_history_sync('1', self.plex, resume=resume))
+
+    def test_history_is_paged_deduplicated_then_resolved_once_per_title(self):
+        events = self._run()
+
+        pages = [event for event in events if event['event'] == 'page']
+        self.assertEqual([page['page'] for page in pages], [1, 2, 3])
+        summary = events[-1]
+        self.assertEqual(summary['event'], 'done')
+        self.assertEqual((summary['entries'], summary['ghost_entries'], summary['unique_titles']), (7, 5, 2))
+        self.assertEqual((summary['archived_titles'], summary['archived_entries'], summary['failed']), (2, 3, 0))
+
+        self.tmdb.search_movie.assert_called_once_with('Fantôme')
+        self.tvdb.search_and_translate_series.assert_called_once_with('Dark')
+        self.assertEqual(self.plex.search.call_count, 2)
+        self.assertCountEqual(self.archived_calls, [
+            ('movie', 42, None, None, datetime.fromtimestamp(1700000500).isoformat()),
+            ('show', 7, 1, 1, datetime.fromtimestamp(1660000000).isoformat()),
+            ('show', 7, 1, 2, datetime.fromtimestamp(1660000000).isoformat()),
+        ])
+        # Passage complet : pas de point de reprise
+        self.assertIsNone(self._saved_checkpoint())
+
+    def test_interrupted_sync_resumes_from_checkpoint(self):
+        self.tvdb.search_and_translate_series.side_effect = Exception('TVDB indisponible')
+        summary = self._run()[-1]
+        self.assertEqual(summary['failed'], 1)
+
+        self.assertEqual(self._saved_checkpoint()['archived'], ['movie_Fantôme_2005'])
+
+        self.tvdb.search_and_translate_series.side_effect = None
+        self.archived_calls = []
+        summary = self._run()[-1]
+
+        self.assertEqual((summary['failed'], summary['archived_titles']), (0, 1))
+        self.tmdb.search_movie.assert_called_once()
+        self.assertEqual({call[0] for call in self.archived_calls}, {'show'})
+        self.assertIsNone(self._saved_checkpoint())
+
+        # Recommencer depuis le début ignore le point de reprise
+        self.archived_calls = []
+        self._run(resume=False)
+        self.assertEqual(self.tmdb.search_movie.call_count, 2)
+
+    def test_token_bucket_limits_the_rate(self):
+        bucket = history_sync._TokenBucket(rate=50, burst=1)
+        with patch('app.utils.history_sync.time.sleep') as mock_sleep:
+            bucket.acquire()
+            bucket._tokens = 0
+            bucket._last = history_sync.time.monotonic()
+            with patch('app.utils.history_sync.time.monotonic', side_effect=[bucket._last, bucket._last + 0.02]):
+                bucket.acquire()
+        mock_sleep.assert_called_once()
+        self.assertAlmostEqual(mock_sleep.call_args[0][0], 0.02, places=3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from datetime import timedelta
+from unittest.mock import MagicMock
+
+from app.utils import http_client
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        http_client.reset_http_clients()
+
+    def tearDown(self):
+        http_client.reset_http_clients()
+
+    def test_session_is_shared_per_service(self):
+        radarr = http_client.get_session('radarr')
+        self.assertIs(radarr, http_client.get_session('radarr'))
+        self.assertIsNot(radarr, http_client.get_session('sonarr'))
+        adapter = radarr.get_adapter('https://radarr.local')
+        self.assertEqual(adapter._pool_maxsize, http_client.DEFAULT_POOL_MAXSIZE)
+
+    def test_digest_auth_is_reused(self):
+        auth = http_client.get_digest_auth('user', 'secret')
+        self.assertIs(auth, http_client.get_digest_auth('user', 'secret'))
+        self.assertIsNone(http_client.get_digest_auth('user', None))
+
+    def test_response_hook_records_host_stats(self):
+        for elapsed_ms, status in ((30, 200), (700, 200), (9000, 500)):
+            response = MagicMock(url='https://radarr.local/api/v3/movie', status_code=status,
+                                 elapsed=timedelta(milliseconds=elapsed_ms))
+            http_client._record_response(response)
+
+        stats = http_client.get_http_stats()['hosts']['radarr.local']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['errors'], 1)
+        self.assertEqual(stats['histogram']['<=50ms'], 1)
+        self.assertEqual(stats['histogram']['<=1000ms'], 1)
+        self.assertEqual(stats['histogram']['>5000ms'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from flask import Flask
+
+from app.utils import backup_manager, mapping_manager
+
+
+class TestMappingManagerSqliteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.json_path = os.path.join(self.tmp_dir, 'pending_torrents_map.json')
+        self.app = Flask(__name__, instance_path=self.tmp_dir)
+        self.app.config['PENDING_TORRENTS_MAP_FILE'] = self.json_path
+        self.app.config['TORRENT_MAP_DB_FILE'] = os.path.join(self.tmp_dir, 'torrent_map.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        mapping_manager.close_torrent_map_connections()
+        self.app_context.pop()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_legacy_json_is_imported_once(self):
+        with open(self.json_path, 'w', encoding='utf-8') as f:
+            json.dump({'HASH1': {'release_name': 'Show.S01E01', 'status': 'pending_download', 'label': 'sonarr'}}, f)
+
+        self.assertEqual(mapping_manager.get_torrent_by_hash('HASH1')['label'], 'sonarr')
+        self.assertEqual(mapping_manager.find_torrent_by_release_name('Show.S01E01.torrent')[0], 'HASH1')
+
+        # Un retrait ne doit pas être annulé par un nouvel import du JSON
+        mapping_manager.remove_torrent_from_map('HASH1')
+        mapping_manager.close_torrent_map_connections()
+        self.assertEqual(mapping_manager.get_all_torrents_in_map(), {})
+
+    def test_upsert_keeps_optional_fields_and_updates_status(self):
+        mapping_manager.add_or_update_torrent_in_map('Movie.2024', 'HASH2', 'pending_download', '/remote/Movie.2024',
+                                                     app_type='radarr', target_id=42)
+        mapping_manager.add_or_update_torrent_in_map('Movie.2024', 'HASH2', 'pending_staging', '/remote/Movie.2024')
+
+        entry = mapping_manager.get_torrent_by_hash('HASH2')
+        self.assertEqual(entry['status'], 'pending_staging')
+        self.assertEqual(entry['target_id'], 42)
+        self.assertEqual(entry['folder_name'], 'Movie.2024')
+
+        self.assertTrue(mapping_manager.update_torrent_status_in_map('HASH2', 'in_staging', 'Rapatrié'))
+        self.assertFalse(mapping_manager.update_torrent_status_in_map('UNKNOWN', 'in_staging'))
+        self.assertEqual(mapping_manager.get_torrent_by_hash('HASH2')['status_message'], 'Rapatrié')
+
+    def test_batch_update_skips_unknown_hashes(self):
+        for torrent_hash in ('A', 'B'):
+            mapping_manager.add_or_update_torrent_in_map(f'Release.{torrent_hash}', torrent_hash, 'pending_download', f'/remote/{torrent_hash}')
+
+        updated = mapping_manager.update_torrents_in_map({
+            'A': {'status': 'pending_staging'},
+            'B': {'status': 'pending_staging'},
+            'C': {'status': 'pending_staging'},
+        })
+
+        self.assertEqual(updated, {'A', 'B'})
+        self.assertEqual(list(mapping_manager.load_torrent_map()), ['A', 'B'])
+        self.assertEqual(mapping_manager.get_all_torrent_hashes(), {'A', 'B'})
+        self.assertEqual(mapping_manager.get_torrent_by_hash('B')['status'], 'pending_staging')
+
+    def test_backup_includes_database_and_restore_reloads_it(self):
+        mapping_manager.add_or_update_torrent_in_map('Show.S01', 'HASH1', 'pending_download', '/remote/Show.S01')
+        backup_path = backup_manager.create_backup()
+        with zipfile.ZipFile(backup_path) as zipf:
+            self.assertIn(backup_manager.TORRENT_MAP_DB_ARCNAME, zipf.namelist())
+
+        mapping_manager.remove_torrent_from_map('HASH1')
+        mapping_manager.add_or_update_torrent_in_map('Movie.2024', 'HASH9', 'pending_download', '/remote/Movie.2024')
+        self.assertTrue(backup_manager.restore_backup(os.path.basename(backup_path))[0])
+        self.assertEqual(mapping_manager.get_all_torrent_hashes(), {'HASH1'})
+
+        # Ancienne sauvegarde (JSON seul) : le JSON restauré est réimporté malgré l'import déjà fait
+        legacy_path = os.path.join(backup_manager.get_backup_dir(), 'backup-legacy.zip')
+        with zipfile.ZipFile(legacy_path, 'w') as zipf:
+            zipf.writestr('pending_torrents_map.json', json.dumps({'HASH7': {'release_name': 'Old', 'status': 'completed'}}))
+        self.assertTrue(backup_manager.restore_backup('backup-legacy.zip')[0])
+        self.assertEqual(mapping_manager.get_all_torrent_hashes(), {'HASH7'})
+
+
+if __name__ == '__main__':
+    unittest.main()
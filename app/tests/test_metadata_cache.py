@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from app.utils import metadata_cache
+from app.utils.tvdb_client import CustomTVDBClient
+
+
+class TestMetadataCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['METADATA_CACHE_DB_FILE'] = os.path.join(self.temp_dir.name, 'metadata_cache.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        metadata_cache.reset_metadata_cache_stats()
+        with patch('app.utils.tvdb_client.TVDB'):
+            self.client = CustomTVDBClient()
+        self.client.client = MagicMock()
+
+    def tearDown(self):
+        metadata_cache.close_metadata_cache_connections()
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def test_episode_counts_are_served_from_cache_with_int_keys(self):
+        self.client.client.get_series_episodes.return_value = {
+            'episodes': [{'seasonNumber': 1}, {'seasonNumber': 1}, {'seasonNumber': 2}]}
+
+        first = self.client.get_season_episode_counts(42)
+        second = self.client.get_season_episode_counts(42)
+
+        self.assertEqual(first, {1: 2, 2: 1})
+        self.assertEqual(second, {1: 2, 2: 1})
+        self.client.client.get_series_episodes.assert_called_once()
+        stats = metadata_cache.get_metadata_cache_stats()['endpoints']['tvdb.season_episode_counts']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_not_found_is_cached_negatively_but_errors_are_not(self):
+        self.client.client.get_series.return_value = None
+        self.assertIsNone(self.client.get_series_details_by_id(7))
+        self.assertIsNone(self.client.get_series_details_by_id(7))
+        self.assertEqual(self.client.client.get_series.call_count, 1)
+        self.assertEqual(metadata_cache.get_metadata_cache_stats()['endpoints']['tvdb.series_details']['negative_hits'], 1)
+
+        self.client.client.get_series.side_effect = RuntimeError('boom')
+        self.assertIsNone(self.client.get_series_details_by_id(8))
+        self.client.client.get_series.side_effect = None
+        self.client.client.get_series.return_value = {'id': 8, 'name': 'Show', 'year': '2020', 'overview': '', 'image': ''}
+        self.client.client.get_series_translation.return_value = None
+        self.assertEqual(self.client.get_series_details_by_id(8)['name'], 'Show')
+
+    def test_expired_entries_are_refetched(self):
+        self.app.config['METADATA_CACHE_TTL_MEDIUM_HOURS'] = 0
+        self.client.client.search.return_value = [{'tvdb_id': 1}]
+
+        self.client.search_series('Dark')
+        self.client.search_series('Dark')
+
+        self.assertEqual(self.client.client.search.call_count, 2)
+
+    def test_search_and_translate_reuses_search_translations_and_cache(self):
+        self.client.client.search.return_value = [
+            {'tvdb_id': 1, 'name': 'Dark', 'primary_language': 'deu', 'translations': {'deu': 'Dark', 'fra': 'Dark FR'},
+             'overviews': {'fra': 'Synopsis FR'}},
+            {'tvdb_id': 2, 'name': 'Darker'},
+            {'tvdb_id': 3, 'name': 'Darkest'},
+        ]
+        self.client.client.get_series.side_effect = lambda tvdb_id: {'id': tvdb_id, 'name': f'Original {tvdb_id}'}
+        self.client.client.get_series_translation.side_effect = lambda tvdb_id, lang: {'name': f'Nom {tvdb_id}', 'overview': ''}
+
+        results = self.client.search_and_translate_series('Dark')
+        metadata_cache.invalidate('tvdb', 'search_and_translate_series')
+        self.client.search_and_translate_series('Dark')
+
+        self.assertEqual([r['name'] for r in results], ['Dark FR', 'Nom 2', 'Nom 3'])
+        self.assertEqual([r['original_name'] for r in results], ['Dark', 'Original 2', 'Original 3'])
+        self.assertEqual(results[0]['overview'], 'Synopsis FR')
+        # Détails et traductions des résultats 2 et 3 : un seul appel chacun malgré les deux recherches
+        self.assertEqual(self.client.client.get_series.call_count, 2)
+        self.assertEqual(self.client.client.get_series_translation.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from plexapi.exceptions import Unauthorized
+
+from app.utils import plex_client
+
+
+class TestPlexHandleCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(PLEX_URL='http://plex:32400', PLEX_TOKEN='admin-token')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        plex_client.invalidate_plex_handles()
+
+        self.managed_user = MagicMock(id=2, title='Enfant')
+        self.managed_user.get_token.return_value = 'user-token'
+        self.account = MagicMock(id=1)
+        self.account.users.return_value = [self.managed_user]
+        self.servers = []
+
+        def _make_server(url, token):
+            server = MagicMock(token=token, machineIdentifier='machine')
+            server.myPlexAccount.return_value = self.account
+            self.servers.append(server)
+            return server
+
+        patcher = patch('app.utils.plex_client.PlexServer', side_effect=_make_server)
+        self.mock_plex_server = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        plex_client.invalidate_plex_handles()
+        self.app_context.pop()
+
+    def test_handles_and_tokens_are_reused_across_requests(self):
+        for _ in range(5):
+            admin = plex_client.get_plex_admin_server()
+            user_server = plex_client.get_user_specific_plex_server_from_id('2')
+            self.assertIs(plex_client.get_user_specific_plex_server_from_id('1'), admin)
+            self.assertEqual(plex_client.get_main_plex_account_object(), self.account)
+
+        self.assertEqual(user_server.token, 'user-token')
+        self.assertEqual(self.mock_plex_server.call_count, 2)
+        self.account.users.assert_called_once()
+        self.managed_user.get_token.assert_called_once_with('machine')
+        self.assertIsNone(plex_client.get_user_specific_plex_server_from_id('99'))
+
+    def test_auth_error_and_config_change_drop_cached_handles(self):
+        plex_client.get_user_specific_plex_server_from_id('2')
+        self.managed_user.get_token.side_effect = [Unauthorized('revoked'), 'new-token']
+        plex_client.invalidate_plex_handles('2')
+
+        self.assertIsNone(plex_client.get_user_specific_plex_server_from_id('2'))
+        self.assertEqual(plex_client.get_user_specific_plex_server_from_id('2').token, 'new-token')
+
+        self.app.config['PLEX_TOKEN'] = 'rotated-token'
+        self.assertEqual(plex_client.get_plex_admin_server().token, 'rotated-token')
+
+    def test_slow_factory_only_blocks_its_own_entry(self):
+        release = threading.Event()
+        started = threading.Event()
+        calls = []
+
+        def _slow_factory():
+            calls.append('slow')
+            started.set()
+            release.wait(5)
+            return 'slow-value'
+
+        def _worker():
+            with self.app.app_context():
+                results.append(plex_client._handle_cache.get('slow', _slow_factory))
+
+        results = []
+        threads = [threading.Thread(target=_worker) for _ in range(2)]
+        threads[0].start()
+        self.assertTrue(started.wait(5))
+        threads[1].start()
+
+        # Une autre entrée est servie pendant que l'appel lent est en cours
+        self.assertEqual(plex_client._handle_cache.get('fast', lambda: 'fast-value'), 'fast-value')
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, ['slow-value', 'slow-value'])
+        self.assertEqual(calls, ['slow'])
+
+
+if __name__ == '__main__':
+    unittest.main()
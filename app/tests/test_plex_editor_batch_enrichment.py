@@ -0,0 +1,88 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from xml.etree import ElementTree
+from flask import Flask
+
+from app.plex_editor.utils import fetch_plex_trailer_urls, fetch_show_sizes, fetch_show_episode_index
+
+
+class TestPlexEditorBatchEnrichment(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.plex_server = MagicMock()
+        self.plex_server.url.side_effect = lambda key, includeToken=False: f"http://plex{key}?token=x"
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_fetch_plex_trailer_urls_reads_extras_in_one_request(self):
+        self.plex_server.query.return_value = ElementTree.fromstring("""
+            <MediaContainer>
+                <Video ratingKey="1"><Extras size="2">
+                    <Video subtype="behindTheScenes"><Media><Part key="/bts.mp4"/></Media></Video>
+                    <Video subtype="trailer"><Media><Part key="/trailer1.mp4"/></Media></Video>
+                </Extras></Video>
+                <Directory ratingKey="2"><Extras size="0"/></Directory>
+                <Video ratingKey="3"/>
+            </MediaContainer>""")
+
+        urls = fetch_plex_trailer_urls(self.plex_server, [1, 2, 3])
+
+        self.assertEqual(urls, {1: "http://plex/trailer1.mp4?token=x", 2: None})
+        self.plex_server.query.assert_called_once_with("/library/metadata/1,2,3", params={'includeExtras': 1})
+
+    def test_fetch_show_sizes_filters_section_episodes_by_shown_shows(self):
+        self.plex_server.query.return_value = ElementTree.fromstring("""
+            <MediaContainer size="3" totalSize="3">
+                <Video grandparentRatingKey="10"><Media><Part size="100"/><Part size="50"/></Media>
+                    <Media><Part size="4000"/></Media></Video>
+                <Video grandparentRatingKey="10"><Media><Part size="25"/></Media></Video>
+                <Video grandparentRatingKey="99"><Media><Part size="1000"/></Media></Video>
+            </MediaContainer>""")
+
+        sizes = fetch_show_sizes(self.plex_server, {5: [10, 11, 10]})
+
+        # Seule la première version de chaque épisode compte, comme ep.media[0].parts
+        self.assertEqual(sizes, {10: 175, 11: 0})
+        self.plex_server.query.assert_called_once()
+        self.assertEqual(self.plex_server.query.call_args.kwargs['params'], {'type': 4, 'show.id': '10,11'})
+
+    def test_fetch_show_sizes_batches_show_keys(self):
+        self.plex_server.query.return_value = ElementTree.fromstring('<MediaContainer size="0" totalSize="0"/>')
+        with patch('app.plex_editor.utils.PLEX_METADATA_BATCH_SIZE', 2):
+            sizes = fetch_show_sizes(self.plex_server, {5: [1, 2, 3], 6: [4]})
+        self.assertEqual(sizes, {1: 0, 2: 0, 3: 0, 4: 0})
+        self.assertEqual(self.plex_server.query.call_count, 3)
+
+    def test_fetch_show_sizes_skips_failed_library(self):
+        self.plex_server.query.side_effect = Exception("boom")
+        self.assertEqual(fetch_show_sizes(self.plex_server, {5: [10]}), {})
+
+    def test_fetch_show_episode_index_reads_all_seasons_in_one_request(self):
+        self.plex_server.query.return_value = ElementTree.fromstring("""
+            <MediaContainer size="4">
+                <Video ratingKey="101" parentRatingKey="11" parentIndex="1" index="1" title="Pilot" viewCount="2">
+                    <Media><Part size="700"/><Part size="5"/></Media></Video>
+                <Video ratingKey="102" parentRatingKey="11" parentIndex="1" index="2" title="Deux" viewCount="1">
+                    <Media><Part size="300"/></Media></Video>
+                <Video ratingKey="201" parentRatingKey="12" parentIndex="2" index="1" title="Retour"/>
+                <Video ratingKey="999" parentRatingKey="12" parentIndex="2" title="Sans numéro"/>
+            </MediaContainer>""")
+
+        seasons, episodes = fetch_show_episode_index(self.plex_server, 10)
+
+        self.plex_server.query.assert_called_once_with("/library/metadata/10/allLeaves")
+        self.assertEqual(seasons, {
+            1: {'ratingKey': 11, 'leafCount': 2, 'viewedLeafCount': 2, 'isWatched': True},
+            2: {'ratingKey': 12, 'leafCount': 1, 'viewedLeafCount': 0, 'isWatched': False},
+        })
+        self.assertEqual(episodes[(1, 1)], {'ratingKey': 101, 'title': 'Pilot', 'isWatched': True, 'size': 700})
+        self.assertEqual(episodes[(2, 1)], {'ratingKey': 201, 'title': 'Retour', 'isWatched': False, 'size': 0})
+        self.assertEqual(len(episodes), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
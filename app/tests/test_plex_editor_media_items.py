@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import MagicMock, patch
+from xml.etree import ElementTree
+
+from flask import Flask
+from plexapi.video import Movie, Show
+
+from app.plex_editor import plex_editor_bp
+
+MOVIE_XML = """
+<Video ratingKey="1" key="/library/metadata/1" type="movie" title="The Matrix" titleSort="Matrix" year="1999"
+       librarySectionID="1" librarySectionTitle="Films" thumb="/library/metadata/1/thumb" viewCount="1">
+    <Media><Part file="/films/The Matrix.mkv" size="100"/></Media>
+    <Guid id="imdb://tt0133093"/><Guid id="tmdb://603"/>
+</Video>"""
+
+SHOW_XML = """
+<Directory ratingKey="10" key="/library/metadata/10/children" type="show" title="Dark" titleSort="Dark" year="2017"
+           librarySectionID="1" librarySectionTitle="Films" leafCount="2" viewedLeafCount="1" childCount="1">
+    <Guid id="tvdb://334824"/><Location path="/series/Dark"/>
+</Directory>"""
+
+
+class TestGetMediaItemsRoute(unittest.TestCase):
+    """La route est exercée avec de vrais objets plexapi (aucun attribut pré-rempli)."""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        self.app.register_blueprint(plex_editor_bp)
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as flask_session:
+            flask_session['logged_in'] = True
+
+        server = MagicMock()
+        server.url.side_effect = lambda key, includeToken=False: f"http://plex{key}"
+        items = []
+        for cls, xml in ((Movie, MOVIE_XML), (Show, SHOW_XML)):
+            item = cls(server, ElementTree.fromstring(xml), initpath='/library/sections/1/all')
+            item._autoReload = False
+            items.append(item)
+        server.library.sectionByID.return_value.search.return_value = items
+
+        self.rendered = {}
+        self.trailer_keys = []
+
+        def _trailer_statuses(keys):
+            keys = list(keys)
+            self.trailer_keys.extend(keys)
+            return {key: 'NONE' for key in keys}
+
+        def _render(template, **context):
+            self.rendered.update(context)
+            return 'ok'
+
+        series_cache = MagicMock()
+        series_cache.get_many.return_value = {}
+        patches = [
+            patch('app.plex_editor.routes.get_user_specific_plex_server_from_id', return_value=server),
+            patch('app.plex_editor.routes.SimpleCache', return_value=series_cache),
+            patch('app.utils.plex_mapping_manager.get_plex_mappings', return_value={}),
+            patch('app.plex_editor.routes.get_all_pending_locks', return_value={}),
+            patch('app.plex_editor.routes.get_radarr_movie_by_guid', return_value=None),
+            patch('app.plex_editor.routes.get_sonarr_series_by_guid', return_value=None),
+            patch('app.plex_editor.routes.trailer_manager.get_trailer_statuses', side_effect=_trailer_statuses),
+            patch('app.plex_editor.routes.fetch_plex_trailer_urls', return_value={1: None, 10: None}),
+            patch('app.plex_editor.routes.fetch_show_sizes', return_value={10: 2048}),
+            patch('app.plex_editor.routes.render_template', side_effect=_render),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_listing_resolves_external_ids_before_bulk_trailer_lookup(self):
+        response = self.client.post('/plex/api/media_items', json={'userId': '1', 'libraryKeys': ['1']})
+
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+        self.assertCountEqual(self.trailer_keys, [('movie', '603'), ('tv', '334824')])
+        items = {item.ratingKey: item for item in self.rendered['items']}
+        self.assertEqual(items[1].trailer_status, 'NONE')
+        self.assertEqual(items[1].total_size, 100)
+        self.assertEqual(items[10].total_size_display, '2.00 KB')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from app.utils import plex_facet_index
+
+
+def _movie(rating_key, genres=(), resolution=None, studio=None):
+    return SimpleNamespace(
+        ratingKey=rating_key,
+        genres=[SimpleNamespace(tag=genre) for genre in genres],
+        media=[SimpleNamespace(videoResolution=resolution)] if resolution else [],
+        studio=studio,
+    )
+
+
+class TestPlexFacetIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['PLEX_FACET_CHECK_INTERVAL_SECONDS'] = 0
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        plex_facet_index._indexes.clear()
+
+        self.section = MagicMock(title='Films', updatedAt=1, totalSize=2)
+        self.section.all.return_value = [_movie(1, ('Drame', 'Action'), '1080', 'A24'),
+                                         _movie(2, ('Action',), '4k', None)]
+        self.section.collections.return_value = [SimpleNamespace(title='Marvel', childCount=3)]
+        self.server = MagicMock()
+        self.server.library.sectionByID.return_value = self.section
+        self.server_factory = MagicMock(return_value=self.server)
+
+    def tearDown(self):
+        plex_facet_index._indexes.clear()
+        self.app_context.pop()
+
+    def test_facets_are_built_once_then_served_from_memory(self):
+        facets = plex_facet_index.get_library_facets('1', ['5'], self.server_factory)
+        self.assertEqual(facets['genres'], {'Action': 2, 'Drame': 1})
+        self.assertEqual(facets['resolutions'], {'1080': 1, '4k': 1})
+        self.assertEqual(facets['studios'], {'A24': 1})
+        self.assertEqual(facets['collections'], {'Marvel': 3})
+
+        self.app.config['PLEX_FACET_CHECK_INTERVAL_SECONDS'] = 3600
+        for _ in range(100):
+            self.assertEqual(plex_facet_index.get_library_facets('1', ['5'], self.server_factory), facets)
+        self.server_factory.assert_called_once()
+        self.section.all.assert_called_once()
+
+    def test_changed_items_are_applied_incrementally(self):
+        plex_facet_index.get_library_facets('1', ['5'], self.server_factory)
+        self.section.updatedAt = 2
+        self.section.totalSize = 3
+        self.section.search.return_value = [_movie(2, ('Comédie',), '4k'), _movie(3, ('Action',), '720')]
+
+        facets = plex_facet_index.get_library_facets('1', ['5'], self.server_factory)
+
+        self.assertEqual(facets['genres'], {'Action': 2, 'Drame': 1, 'Comédie': 1})
+        self.assertEqual(facets['resolutions'], {'1080': 1, '4k': 1, '720': 1})
+        self.section.all.assert_called_once()
+
+    def test_deletions_trigger_a_full_rebuild(self):
+        plex_facet_index.get_library_facets('1', ['5'], self.server_factory)
+        self.section.updatedAt = 2
+        self.section.totalSize = 1
+        self.section.search.return_value = []
+        self.section.all.return_value = [_movie(2, ('Action',), '4k')]
+
+        facets = plex_facet_index.get_library_facets('1', ['5'], self.server_factory)
+
+        self.assertEqual(facets['genres'], {'Action': 1})
+        self.assertEqual(self.section.all.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from flask import Flask
+
+from app.utils import plex_mirror
+
+
+def _movie(rating_key, title, year=2001, guids=(), title_sort=None, original_title=None, view_count=0, size=100):
+    return SimpleNamespace(
+        ratingKey=rating_key, type='movie', title=title, titleSort=title_sort or title, originalTitle=original_title,
+        year=year, guids=[SimpleNamespace(id=guid) for guid in guids], addedAt=datetime(2024, 1, rating_key),
+        updatedAt=datetime(2024, 1, rating_key), lastViewedAt=None, viewCount=view_count,
+        media=[SimpleNamespace(parts=[SimpleNamespace(file=f'/films/{title}.mkv', size=size)])],
+    )
+
+
+def _show(rating_key, title, guids=(), leaf_count=10, viewed_leaf_count=0):
+    return SimpleNamespace(
+        ratingKey=rating_key, type='show', title=title, titleSort=title, originalTitle=None, year=2010,
+        guids=[SimpleNamespace(id=guid) for guid in guids], addedAt=datetime(2024, 2, 1), updatedAt=datetime(2024, 2, 1),
+        lastViewedAt=None, viewCount=0, leafCount=leaf_count, viewedLeafCount=viewed_leaf_count,
+        locations=[f'/series/{title}'],
+    )
+
+
+class TestPlexMirror(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['PLEX_MIRROR_DB_FILE'] = os.path.join(self.temp_dir.name, 'plex_mirror.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.movies = MagicMock(key=1, type='movie', title='Films', locations=['/films'],
+                                updatedAt=datetime(2024, 3, 1), totalSize=3)
+        self.movies.title = 'Films'
+        self.movies.all.return_value = [
+            _movie(1, 'The Matrix', 1999, ('imdb://tt0133093', 'tmdb://603'), title_sort='Matrix'),
+            _movie(2, "Le Fabuleux Destin d'Amélie Poulain", 2001, ('tmdb://194',), original_title='Amélie'),
+            _movie(3, '100% Pur', 2005, view_count=2),
+        ]
+        self.movies.search.return_value = []
+        self.shows = MagicMock(key=2, type='show', locations=['/series'], updatedAt=datetime(2024, 3, 1), totalSize=1)
+        self.shows.title = 'Séries'
+        self.shows.all.return_value = [_show(10, 'Dark', ('tvdb://334824',))]
+        self.shows.search.return_value = []
+        music = MagicMock(type='artist')
+        self.server = MagicMock()
+        self.server.library.sections.return_value = [self.movies, self.shows, music]
+
+    def tearDown(self):
+        for connection in getattr(plex_mirror._thread_local, 'connections', {}).values():
+            connection.close()
+        plex_mirror._thread_local.connections = {}
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def test_sync_then_local_queries(self):
+        self.assertIsNone(plex_mirror.query_items(['1'], title='matrix'))
+        self.assertEqual(plex_mirror.sync_plex_mirror(self.server), {'Films': 'full', 'Séries': 'full'})
+
+        self.assertEqual([item['rating_key'] for item in plex_mirror.query_items(['1'], title='AMELIE')], [2])
+        self.assertEqual([item['rating_key'] for item in plex_mirror.query_items(['1'], title='the matrix')], [1])
+        self.assertEqual([item['rating_key'] for item in plex_mirror.query_items(['1'], title='100%')], [3])
+        self.assertEqual(plex_mirror.query_items(['1'], title='matrix', year=2000), [])
+        self.assertEqual([item['rating_key'] for item in plex_mirror.query_items(['1'])], [3, 2, 1])
+        self.assertIsNone(plex_mirror.query_items(['1', '99'], title='matrix'))
+
+        matrix = plex_mirror.query_items(['1'], title='matrix')[0]
+        self.assertEqual((matrix['title'], matrix['year'], matrix['guids']), ('The Matrix', 1999, ['imdb://tt0133093', 'tmdb://603']))
+        self.assertEqual(plex_mirror.find_rating_keys_by_guid(['tvdb://334824', 'tmdb://603', 'tvdb://1']),
+                         {'tvdb://334824': [10], 'tmdb://603': [1]})
+        self.assertEqual(plex_mirror.find_rating_keys_by_guid(['tvdb://334824'], library_keys=['1']), {})
+        self.assertEqual(plex_mirror.get_mirrored_library_keys('Séries'), ['2'])
+        self.assertEqual(plex_mirror.get_mirrored_libraries()[0]['locations'], ['/films'])
+
+    def test_incremental_sync_reads_only_changed_items(self):
+        plex_mirror.sync_plex_mirror(self.server)
+        self.movies.updatedAt = datetime(2024, 3, 2)
+        self.movies.totalSize = 4
+        renamed = _movie(2, 'Amélie', 2001, ('tmdb://194', 'imdb://tt0211915'))
+        added = _movie(4, 'Delicatessen', 1991, ('tmdb://892',))
+        renamed_show = _show(10, 'Dark (2017)', ('tvdb://334824',))
+        self.shows.updatedAt = datetime(2024, 3, 2)
+        self.movies.search.side_effect = lambda filters: [renamed, added]
+        self.shows.search.side_effect = lambda filters: [renamed_show]
+
+        self.assertEqual(plex_mirror.sync_plex_mirror(self.server), {'Films': 'incremental', 'Séries': 'incremental'})
+
+        self.assertEqual(self.movies.all.call_count, 1)
+        self.assertEqual([call.kwargs['filters'].keys() for call in self.movies.search.call_args_list],
+                         [{'updatedAt>>': None}.keys()])
+        self.assertEqual(plex_mirror.query_items(['1'], title='destin'), [])
+        self.assertEqual(plex_mirror.find_rating_keys_by_guid(['imdb://tt0211915', 'tmdb://892']),
+                         {'imdb://tt0211915': [2], 'tmdb://892': [4]})
+        self.assertEqual(plex_mirror.query_items(['2'])[0]['title'], 'Dark (2017)')
+
+    def test_deletions_trigger_a_full_rebuild(self):
+        plex_mirror.sync_plex_mirror(self.server)
+        self.movies.updatedAt = datetime(2024, 3, 2)
+        self.movies.totalSize = 2
+        self.movies.all.return_value = self.movies.all.return_value[:2]
+        self.server.library.sections.return_value = [self.movies]
+
+        self.assertEqual(plex_mirror.sync_plex_mirror(self.server), {'Films': 'full'})
+
+        self.assertEqual([item['rating_key'] for item in plex_mirror.query_items(['1'])], [2, 1])
+        self.assertEqual(plex_mirror.get_mirrored_library_keys('Séries'), [])
+        self.assertEqual(plex_mirror.find_rating_keys_by_guid(['tvdb://334824']), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
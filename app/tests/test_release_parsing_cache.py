@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import arr_client, release_parser
+
+
+class TestReleaseParsingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['RELEASE_PARSE_CACHE_FILE'] = os.path.join(self.temp_dir.name, 'release_parse_cache.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        release_parser.clear_release_parse_cache()
+        arr_client._parse_media_name_cached.cache_clear()
+
+    def tearDown(self):
+        release_parser.clear_release_parse_cache()
+        connection = getattr(release_parser._store_local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            release_parser._store_local.connection = None
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def test_parse_release_data_is_memoized_and_returns_copies(self):
+        name = 'The.Last.of.Us.S01E01.MULTi.1080p.WEB.H264-FW'
+        with patch('app.utils.release_parser.guessit', wraps=release_parser.guessit) as mock_guessit:
+            first = release_parser.parse_release_data(name)
+            first['season'] = 99
+            second = release_parser.parse_release_data(name)
+
+        self.assertEqual(mock_guessit.call_count, 1)
+        self.assertEqual(second['season'], 1)
+        self.assertTrue(second['is_episode'])
+
+    def test_parse_release_data_reads_persistent_cache_after_restart(self):
+        name = 'Dune.Part.Two.2024.MULTi.2160p.UHD.BluRay.x265-QTZ'
+        expected = release_parser.parse_release_data(name)
+        release_parser.clear_release_parse_cache()
+
+        with patch('app.utils.release_parser.guessit') as mock_guessit:
+            self.assertEqual(release_parser.parse_release_data(name), expected)
+        mock_guessit.assert_not_called()
+
+    def test_parse_media_name_returns_independent_copies(self):
+        first = arr_client.parse_media_name('Oppenheimer.2023.FRENCH.1080p.WEB.H264-FUNKY')
+        first['title'] = 'changed'
+        second = arr_client.parse_media_name('Oppenheimer.2023.FRENCH.1080p.WEB.H264-FUNKY')
+
+        self.assertEqual(second['title'], 'Oppenheimer')
+        self.assertEqual(arr_client._parse_media_name_cached.cache_info().hits, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import rtorrent_client
+
+
+def _full_row(torrent_hash, bytes_done, complete, message='', size=100, label='sonarr'):
+    return [torrent_hash, f'name-{torrent_hash}', f'/data/{torrent_hash}', label, size,
+            bytes_done, 0, 0, 0, 0, 1, 1, complete, size - bytes_done, message, 1700000000]
+
+
+class FakeRtorrent:
+    """Simule rTorrent : d.multicall2 (complet ou étroit) et system.multicall."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, method_name, params):
+        self.calls.append(method_name)
+        if method_name == 'd.multicall2':
+            fields = params[2:]
+            index = {field: i for i, field in enumerate(rtorrent_client._TORRENT_FIELDS)}
+            return [[row[index[field]] for field in fields] for row in self.rows.values()], None
+        if method_name == 'system.multicall':
+            results = []
+            for call in params[0]:
+                row = self.rows.get(call['params'][0])
+                field_index = rtorrent_client._TORRENT_FIELDS.index(call['methodName'] + '=')
+                results.append([row[field_index]] if row else {'faultCode': -501})
+            return results, None
+        if method_name == 'load.start':
+            return 0, None
+        raise AssertionError(method_name)
+
+
+class TestTorrentStateCache(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['RTORRENT_API_URL'] = 'https://seedbox/rpc'
+        self.app.config['RTORRENT_STATE_FULL_RESYNC_SECONDS'] = 3600
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        rtorrent_client._torrent_state_cache.reset()
+        self.fake = FakeRtorrent({'A': _full_row('A', 50, 0), 'B': _full_row('B', 100, 1)})
+        self.patcher = patch('app.utils.rtorrent_client._send_xmlrpc_request', side_effect=self.fake)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        rtorrent_client._torrent_state_cache.reset()
+        self.app_context.pop()
+
+    def test_delta_poll_refetches_only_changed_rows_and_emits_events(self):
+        events = []
+        for event in (rtorrent_client.TORRENT_EVENT_COMPLETED, rtorrent_client.TORRENT_EVENT_REMOVED,
+                      rtorrent_client.TORRENT_EVENT_ERRORED):
+            rtorrent_client.subscribe_torrent_events(event, lambda t, e=event: events.append((e, t['hash'])))
+
+        torrents, error = rtorrent_client.list_torrents()
+        self.assertIsNone(error)
+        self.assertEqual([t['hash'] for t in torrents], ['A', 'B'])
+
+        # Aucun changement : seul l'appel étroit est émis
+        self.fake.calls.clear()
+        rtorrent_client.list_torrents()
+        self.assertEqual(self.fake.calls, ['d.multicall2'])
+        self.assertEqual(events, [])
+
+        self.fake.rows['A'] = _full_row('A', 100, 1)
+        self.fake.rows['C'] = _full_row('C', 10, 0, message='Tracker: timeout')
+        del self.fake.rows['B']
+        self.fake.calls.clear()
+        torrents, _ = rtorrent_client.list_torrents()
+
+        self.assertEqual(self.fake.calls, ['d.multicall2', 'system.multicall'])
+        self.assertEqual([t['hash'] for t in torrents], ['A', 'C'])
+        self.assertTrue(torrents[0]['is_complete'])
+        self.assertEqual(torrents[1]['status_text'], 'Error')
+        self.assertCountEqual(events, [('completed', 'A'), ('errored', 'C'), ('removed', 'B')])
+
+    def test_label_change_is_detected_and_add_forces_full_sync(self):
+        rtorrent_client.list_torrents()
+
+        # Signatures identiques entre synchro complète et delta : rien n'est relu
+        self.fake.calls.clear()
+        rtorrent_client.list_torrents()
+        self.assertEqual(self.fake.calls, ['d.multicall2'])
+
+        self.fake.rows['B'] = _full_row('B', 100, 1, label='radarr')
+        self.fake.calls.clear()
+        torrents, _ = rtorrent_client.list_torrents()
+        self.assertEqual(self.fake.calls, ['d.multicall2', 'system.multicall'])
+        self.assertEqual(torrents[1]['label'], 'radarr')
+
+        self.assertTrue(rtorrent_client.add_magnet('magnet:?xt=urn:btih:C', label='sonarr')[0])
+        self.assertTrue(rtorrent_client._torrent_state_cache._needs_full_sync())
+
+    def test_get_completed_torrents_uses_cache(self):
+        rtorrent_client.list_torrents()
+        completed = rtorrent_client.get_completed_torrents()
+        self.assertEqual([t['hash'] for t in completed], ['B'])
+        self.assertEqual(self.fake.calls.count('system.multicall'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
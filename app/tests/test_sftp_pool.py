@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from app.utils import sftp_pool
+
+
+class TestSftpPool(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(SEEDBOX_SFTP_HOST='seedbox', SEEDBOX_SFTP_PORT=22, SEEDBOX_SFTP_USER='user',
+                               SEEDBOX_SFTP_PASSWORD='secret', SFTP_POOL_MAX_SIZE=2, SFTP_POOL_MAX_IDLE_SECONDS=300)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.transports = []
+
+        def _new_transport(*args, **kwargs):
+            transport = MagicMock()
+            transport.is_active.return_value = True
+            self.transports.append(transport)
+            return transport
+
+        self.patcher_transport = patch('app.utils.sftp_pool.paramiko.Transport', side_effect=_new_transport)
+        self.patcher_transport.start()
+        self.patcher_client = patch('app.utils.sftp_pool.paramiko.SFTPClient.from_transport', side_effect=lambda t: MagicMock())
+        self.patcher_client.start()
+
+    def tearDown(self):
+        self.patcher_transport.stop()
+        self.patcher_client.stop()
+        sftp_pool.close_sftp_pools()
+        self.app_context.pop()
+
+    def test_sequential_sessions_reuse_one_handshake(self):
+        for _ in range(30):
+            with sftp_pool.sftp_session() as (sftp_client, transport):
+                self.assertIs(transport, self.transports[0])
+        self.assertEqual(len(self.transports), 1)
+        self.transports[0].connect.assert_called_once_with(username='user', password='secret')
+
+    def test_dead_transport_is_replaced_and_size_is_bounded(self):
+        sftp_a, transport_a = sftp_pool.acquire_sftp()
+        sftp_b, transport_b = sftp_pool.acquire_sftp()
+        with self.assertRaises(sftp_pool.SftpPoolTimeout):
+            sftp_pool.acquire_sftp(timeout=0)
+
+        sftp_pool.release_sftp(sftp_a, transport_a)
+        sftp_pool.release_sftp(sftp_b, transport_b)
+        transport_a.is_active.return_value = False
+        transport_b.is_active.return_value = False
+
+        _, transport_c = sftp_pool.acquire_sftp()
+        self.assertNotIn(transport_c, (transport_a, transport_b))
+        transport_a.close.assert_called()
+        self.assertEqual(sftp_pool.get_sftp_pool_stats()['user@seedbox:22'], {'idle': 0, 'in_use': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import io
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from app.utils import sftp_transfer
+
+
+class FakeSFTPClient:
+    """Client SFTP minimal servant une arborescence en mémoire {chemin: bytes | None (dossier)}."""
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.opened = []
+        self.handles = []
+
+    def get_channel(self):
+        return MagicMock()
+
+    def stat(self, path):
+        if path not in self.tree:
+            raise FileNotFoundError(path)
+        content = self.tree[path]
+        if content is None:
+            return SimpleNamespace(st_mode=stat.S_IFDIR, st_size=0)
+        return SimpleNamespace(st_mode=stat.S_IFREG, st_size=len(content))
+
+    def listdir_attr(self, path):
+        prefix = path.rstrip('/') + '/'
+        entries = []
+        for child, content in self.tree.items():
+            if child.startswith(prefix) and '/' not in child[len(prefix):]:
+                attr = self.stat(child)
+                entries.append(SimpleNamespace(filename=child[len(prefix):], st_mode=attr.st_mode, st_size=attr.st_size))
+        return entries
+
+    def open(self, path, mode):
+        self.opened.append(path)
+        handle = io.BytesIO(self.tree[path])
+        handle.prefetch = MagicMock()
+        self.handles.append(handle)
+        return handle
+
+    def close(self):
+        pass
+
+
+class TestSftpTransfer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_download_file_resumes_from_part_offset(self):
+        payload = b'0123456789' * 1000
+        client = FakeSFTPClient({'/remote/file.mkv': payload})
+        local_path = os.path.join(self.tmp_dir, 'file.mkv')
+        with open(local_path + sftp_transfer.PART_SUFFIX, 'wb') as f:
+            f.write(payload[:4000])
+
+        self.assertTrue(sftp_transfer.download_file(client, '/remote/file.mkv', local_path, len(payload)))
+
+        with open(local_path, 'rb') as f:
+            self.assertEqual(f.read(), payload)
+        self.assertFalse(os.path.exists(local_path + sftp_transfer.PART_SUFFIX))
+        # Un second appel ne retransfère pas un fichier déjà complet
+        self.assertFalse(sftp_transfer.download_file(client, '/remote/file.mkv', local_path, len(payload)))
+
+    def test_prefetch_window_is_bounded_and_skipped_when_rate_limited(self):
+        payload = b'x' * 5000
+        client = FakeSFTPClient({'/remote/a.mkv': payload, '/remote/b.mkv': payload})
+
+        sftp_transfer.download_file(client, '/remote/a.mkv', os.path.join(self.tmp_dir, 'a.mkv'), len(payload))
+        client.handles[0].prefetch.assert_called_once_with(
+            len(payload), max_concurrent_requests=sftp_transfer.PREFETCH_MAX_REQUESTS)
+        self.assertLessEqual(sftp_transfer.PREFETCH_MAX_REQUESTS * 32768, 4 * sftp_transfer.READ_CHUNK_SIZE)
+
+        limiter = MagicMock()
+        sftp_transfer.download_file(client, '/remote/b.mkv', os.path.join(self.tmp_dir, 'b.mkv'), len(payload),
+                                    limiter=limiter)
+        client.handles[1].prefetch.assert_not_called()
+        self.assertEqual(sum(call.args[0] for call in limiter.consume.call_args_list), len(payload))
+
+    def test_download_items_expands_directories_and_reports_per_item(self):
+        tree = {
+            '/remote/Show.S01': None,
+            '/remote/Show.S01/E01.mkv': b'a' * 300,
+            '/remote/Show.S01/Subs': None,
+            '/remote/Show.S01/Subs/E01.srt': b'b' * 20,
+            '/remote/Movie.mkv': b'c' * 500,
+        }
+        client = FakeSFTPClient(tree)
+        transport = MagicMock()
+        transport.is_active.return_value = True
+
+        with patch('app.utils.sftp_transfer.paramiko.SFTPClient.from_transport', return_value=client):
+            results = sftp_transfer.download_items([
+                ('show', '/remote/Show.S01', os.path.join(self.tmp_dir, 'Show.S01')),
+                ('movie', '/remote/Movie.mkv', os.path.join(self.tmp_dir, 'Movie.mkv')),
+                ('missing', '/remote/Nope', os.path.join(self.tmp_dir, 'Nope')),
+            ], transport, workers=3)
+
+        self.assertEqual(results, {'show': True, 'movie': True, 'missing': False})
+        self.assertEqual(os.path.getsize(os.path.join(self.tmp_dir, 'Show.S01', 'Subs', 'E01.srt')), 20)
+        self.assertEqual(os.path.getsize(os.path.join(self.tmp_dir, 'Movie.mkv')), 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import threading
+import time
+import unittest
+
+from app.utils import single_flight
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def setUp(self):
+        single_flight.reset_single_flight_stats()
+
+    def _run_concurrently(self, count, target):
+        results = [None] * count
+        errors = []
+
+        def runner(index):
+            try:
+                results[index] = target()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=runner, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+    def test_concurrent_identical_calls_share_one_execution(self):
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'records': [1, 2, 3]}
+
+        results, errors = self._run_concurrently(5, lambda: single_flight.do('sonarr', ('series', ()), fetch))
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {'records': [1, 2, 3]} for result in results))
+        results[0]['records'].append(4)
+        self.assertEqual(results[1]['records'], [1, 2, 3])
+        stats = single_flight.get_single_flight_stats()['sonarr']
+        self.assertEqual((stats['calls'], stats['executed'], stats['coalesced']), (5, 1, 4))
+
+    def test_errors_are_shared_and_next_call_runs_again(self):
+        def failing():
+            time.sleep(0.05)
+            raise ValueError('upstream down')
+
+        _, errors = self._run_concurrently(3, lambda: single_flight.do('tvdb', 'key', failing))
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(single_flight.do('tvdb', 'key', lambda: 'ok'), 'ok')
+
+    def test_coalesce_decorator_keys_on_arguments(self):
+        class Client:
+            def __init__(self):
+                self.calls = 0
+
+            @single_flight.coalesce('tmdb')
+            def details(self, tmdb_id, lang='fr-FR'):
+                self.calls += 1
+                time.sleep(0.05)
+                return {'id': tmdb_id, 'lang': lang}
+
+        client = Client()
+        results, _ = self._run_concurrently(4, lambda: client.details(10, lang='fr-FR'))
+        other = client.details(11)
+
+        self.assertEqual(client.calls, 2)
+        self.assertEqual(results[3], {'id': 10, 'lang': 'fr-FR'})
+        self.assertEqual(other['id'], 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
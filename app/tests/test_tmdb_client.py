@@ -0,0 +1,71 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from app.utils import tmdb_client
+
+
+def _fake_response(payload, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = payload
+    response.reason = 'Not Found' if status_code == 404 else 'OK'
+    return response
+
+
+class TestSharedTMDbClient(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['TMDB_API_KEY'] = 'key'
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_shared_client_is_reused_until_api_key_changes(self):
+        client = tmdb_client.get_tmdb_client()
+        self.assertIs(tmdb_client.get_tmdb_client(), client)
+        self.app.config['TMDB_API_KEY'] = 'other-key'
+        self.assertIsNot(tmdb_client.get_tmdb_client(), client)
+
+    @patch('app.utils.tmdb_client.http_client.request')
+    def test_concurrent_calls_keep_their_own_language(self, mock_request):
+        def fake_request(service, method, url, params=None, timeout=None):
+            time.sleep(0.01)
+            return _fake_response({'id': 1, 'title': f"Title {params['language']}", 'release_date': '2024-01-02'})
+        mock_request.side_effect = fake_request
+        client = tmdb_client.get_tmdb_client()
+        results = {}
+
+        def worker(lang):
+            with self.app.app_context():
+                results[lang] = client.get_movie_details(1, lang=lang)['title']
+
+        threads = [threading.Thread(target=worker, args=(lang,)) for lang in ('fr-FR', 'en-US', 'de-DE', 'es-ES')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {lang: f"Title {lang}" for lang in ('fr-FR', 'en-US', 'de-DE', 'es-ES')})
+
+    @patch('app.utils.tmdb_client.http_client.request')
+    def test_series_details_fetch_external_ids_in_one_call(self, mock_request):
+        mock_request.return_value = _fake_response({
+            'id': 5, 'name': 'Show', 'first_air_date': '2019-05-01', 'status': 'Ended',
+            'number_of_seasons': 2, 'number_of_episodes': 16, 'external_ids': {'tvdb_id': 42}})
+
+        details = tmdb_client.get_tmdb_client().get_series_details(5)
+
+        self.assertEqual((details['tvdb_id'], details['year']), (42, '2019'))
+        mock_request.assert_called_once()
+        self.assertEqual(mock_request.call_args.kwargs['params']['append_to_response'], 'external_ids')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+
+from app.utils import metadata_cache, trailer_finder
+
+
+def _search_response(*video_ids):
+    return {
+        'items': [{
+            'id': {'videoId': video_id},
+            'snippet': {'title': f'Trailer {video_id}', 'channelTitle': 'Chaîne',
+                        'thumbnails': {'high': {'url': f'https://img/{video_id}.jpg'}}},
+        } for video_id in video_ids],
+        'nextPageToken': 'NEXT',
+    }
+
+
+class TestTrailerFinder(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['METADATA_CACHE_DB_FILE'] = os.path.join(self.temp_dir.name, 'metadata_cache.db')
+        self.app.config['YOUTUBE_DAILY_QUOTA'] = 1000
+        self.app.config['YOUTUBE_QUOTA_INTERACTIVE_RESERVE'] = 300
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.youtube = MagicMock()
+        patcher = patch('app.utils.trailer_finder._get_youtube_service', return_value=self.youtube)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        metadata_cache.close_metadata_cache_connections()
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def test_search_is_cached_by_query_and_charged_once(self):
+        self.youtube.search.return_value.list.return_value.execute.return_value = _search_response('a', 'b')
+
+        first = trailer_finder.find_youtube_trailer('Dune bande annonce', 'KEY', max_results=10)
+        second = trailer_finder.find_youtube_trailer('Dune bande annonce', 'KEY', max_results=10)
+
+        self.assertEqual([r['videoId'] for r in first['results']], ['a', 'b'])
+        self.assertEqual(second, first)
+        self.youtube.search.return_value.list.assert_called_once()
+        self.assertEqual(trailer_finder.get_youtube_quota_status()['used'], trailer_finder.SEARCH_QUOTA_COST)
+
+    def test_background_search_is_deferred_before_interactive_reserve(self):
+        self.youtube.search.return_value.list.return_value.execute.return_value = _search_response('a')
+        metadata_cache.add_quota_usage('youtube', trailer_finder._quota_period(), 650)
+
+        deferred = trailer_finder.find_youtube_trailer('Alien', 'KEY', background=True)
+        interactive = trailer_finder.find_youtube_trailer('Alien', 'KEY')
+
+        self.assertTrue(deferred['quota_exceeded'])
+        self.assertEqual(deferred['results'], [])
+        self.assertEqual(len(interactive['results']), 1)
+        self.youtube.search.return_value.list.assert_called_once()
+
+    def test_video_details_only_fetch_unknown_ids(self):
+        videos_list = self.youtube.videos.return_value.list
+        videos_list.return_value.execute.return_value = {'items': [{'id': 'a', 'snippet': {}}]}
+        trailer_finder.get_videos_details(['a', 'gone'], 'KEY')
+
+        videos_list.return_value.execute.return_value = {'items': [{'id': 'c', 'snippet': {}}]}
+        details = trailer_finder.get_videos_details(['a', 'gone', 'c'], 'KEY')
+
+        self.assertEqual(set(details), {'a', 'c'})
+        self.assertEqual(videos_list.call_args_list[-1].kwargs['id'], 'c')
+        self.assertEqual(trailer_finder.get_youtube_quota_status()['used'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
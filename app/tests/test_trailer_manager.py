@@ -0,0 +1,82 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import trailer_manager
+
+
+class TestTrailerStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, 'trailer_database.json')
+        with open(self.db_file, 'w', encoding='utf-8') as f:
+            json.dump({'movie_1': {'is_locked': True, 'locked_video_data': {'videoId': 'abc'}},
+                       'movie_2': {'search_results': [{'videoId': 'def'}]}}, f)
+        self.app = Flask(__name__)
+        self.app.config.update(TRAILER_DATABASE_FILE=self.db_file, TRAILER_DB_FLUSH_DELAY_SECONDS=60)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        trailer_manager.flush_trailer_database()
+        trailer_manager._stores.clear()
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def _read_disk(self):
+        with open(self.db_file, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_status_lookups_read_the_file_once(self):
+        with patch.object(trailer_manager._TrailerStore, '_read_file', autospec=True,
+                          side_effect=trailer_manager._TrailerStore._read_file) as mock_read:
+            statuses = [trailer_manager.get_trailer_status('movie', i % 3) for i in range(500)]
+
+        self.assertEqual(mock_read.call_count, 1)
+        self.assertEqual(statuses[:3], ['NONE', 'LOCKED', 'UNLOCKED'])
+
+    def test_writes_are_coalesced_into_one_atomic_save(self):
+        with patch('app.utils.trailer_manager.os.replace', wraps=os.replace) as mock_replace:
+            for i in range(3, 6):
+                trailer_manager.lock_trailer('movie', i, {'videoId': f'v{i}', 'title': 'Trailer'})
+            trailer_manager.unlock_trailer('movie', 1)
+            self.assertEqual(len(self._read_disk()), 2)  # Rien n'est encore écrit
+            trailer_manager.flush_trailer_database()
+
+        self.assertEqual(mock_replace.call_count, 1)
+        on_disk = self._read_disk()
+        self.assertEqual(len(on_disk), 5)
+        self.assertFalse(on_disk['movie_1']['is_locked'])
+        self.assertEqual(trailer_manager.get_locked_trailer_video_id('movie', 4), 'v4')
+
+    def test_external_changes_are_reloaded_and_merged_with_pending_writes(self):
+        trailer_manager.get_trailer_status('movie', 1)
+        trailer_manager.lock_trailer('movie', 7, {'videoId': 'v7', 'title': 'Trailer'})
+
+        external = self._read_disk()
+        external['tv_9'] = {'is_locked': True, 'locked_video_data': {'videoId': 'x'}}
+        with open(self.db_file, 'w', encoding='utf-8') as f:
+            json.dump(external, f)
+        os.utime(self.db_file, ns=(1, 1))
+        store, _ = trailer_manager._get_store()
+        store._last_check = 0
+
+        self.assertEqual(trailer_manager.get_trailer_status('tv', 9), 'LOCKED')
+        self.assertEqual(trailer_manager.get_trailer_status('movie', 7), 'LOCKED')
+        trailer_manager.flush_trailer_database()
+        self.assertEqual(set(self._read_disk()), {'movie_1', 'movie_2', 'movie_7', 'tv_9'})
+
+    def test_bulk_statuses_resolve_all_pairs(self):
+        statuses = trailer_manager.get_trailer_statuses([('movie', '1'), ('movie', '2'), ('tv', '3'), ('movie', None)])
+
+        self.assertEqual(statuses, {('movie', '1'): 'LOCKED', ('movie', '2'): 'UNLOCKED',
+                                    ('tv', '3'): 'NONE', ('movie', None): 'NONE'})
+
+
+if __name__ == '__main__':
+    unittest.main()
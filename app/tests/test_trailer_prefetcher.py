@@ -0,0 +1,75 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import trailer_manager, trailer_prefetcher
+
+MOVIES = [
+    {'id': 1, 'tmdbId': 100, 'title': 'Old Movie', 'year': 2001, 'added': '2020-01-01T00:00:00Z'},
+    {'id': 2, 'tmdbId': 200, 'title': 'Locked Movie', 'year': 2010, 'added': '2024-06-01T00:00:00Z'},
+    {'id': 3, 'tmdbId': 300, 'title': 'New Movie', 'year': 2024, 'added': '2024-09-01T00:00:00Z'},
+]
+SERIES = [{'id': 7, 'tvdbId': 700, 'title': 'New Show', 'year': 2023, 'added': '2024-08-01T00:00:00Z'}]
+
+
+class TestTrailerPrefetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.temp_dir.name, 'trailer_database.json')
+        with open(self.db_file, 'w', encoding='utf-8') as f:
+            json.dump({'movie_200': {'is_locked': True, 'locked_video_data': {'videoId': 'abc'}}}, f)
+        self.app = Flask(__name__)
+        self.app.config.update(TRAILER_DATABASE_FILE=self.db_file, TRAILER_DB_FLUSH_DELAY_SECONDS=60,
+                               YOUTUBE_API_KEY='KEY', METADATA_CACHE_DB_FILE='')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.used = 0
+        patches = [
+            patch('app.utils.trailer_prefetcher.get_arr_catalog_records',
+                  side_effect=lambda arr_type: MOVIES if arr_type == 'radarr' else SERIES),
+            patch('app.utils.trailer_prefetcher.get_youtube_quota_status', side_effect=lambda: {'used': self.used}),
+            patch('app.utils.trailer_prefetcher.quota_allows', return_value=True),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        trailer_manager.flush_trailer_database()
+        trailer_manager._stores.clear()
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def _search(self, title, year, media_type, background=False):
+        self.searched.append((title, media_type, background))
+        self.used += 301
+        if title == 'New Show':
+            return {'success': False, 'error': 'Aucun résultat'}
+        return {'success': True, 'results': [{'videoId': f'{title}-vid', 'score': 10}]}
+
+    def test_prefetch_newest_first_within_budget(self):
+        self.searched = []
+        with patch('app.agent.services._search_and_score_trailers', side_effect=self._search):
+            summary = trailer_prefetcher.prefetch_missing_trailers(quota_budget=700)
+
+        self.assertEqual(self.searched, [('New Movie', 'movie', True), ('New Show', 'show', True)])
+        self.assertEqual(summary['stopped_by'], 'budget')
+        self.assertEqual((summary['prefetched'], summary['empty']), (1, 1))
+        info = trailer_manager.get_trailer_info('movie', 300, title='New Movie')
+        self.assertEqual(info['results'][0]['videoId'], 'New Movie-vid')
+        self.assertEqual(trailer_manager.get_trailer_status('tv', 700), 'NONE')
+
+        # Tentative infructueuse récente : la série n'est pas recherchée de nouveau
+        self.searched = []
+        with patch('app.agent.services._search_and_score_trailers', side_effect=self._search):
+            trailer_prefetcher.prefetch_missing_trailers(quota_budget=700)
+        self.assertEqual(self.searched, [('Old Movie', 'movie', True)])
+
+
+if __name__ == '__main__':
+    unittest.main()
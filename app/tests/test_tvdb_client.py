@@ -0,0 +1,122 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.utils import metadata_cache
+from app.utils.tvdb_client import CustomTVDBClient
+
+
+class FakeTVDB:
+    """Remplace tvdb_v4_official.TVDB : réponses fixes et journal des appels (thread-safe)."""
+
+    def __init__(self, search_results, series=None, translations=None, failing_translations=()):
+        self.search_results = search_results
+        self.series = series or {}
+        self.translations = translations or {}
+        self.failing_translations = set(failing_translations)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, *call):
+        with self._lock:
+            self.calls.append(call)
+
+    def calls_to(self, name):
+        return [call[1:] for call in self.calls if call[0] == name]
+
+    def search(self, **kwargs):
+        self._record('search', kwargs['query'])
+        return self.search_results
+
+    def get_series(self, tvdb_id):
+        self._record('get_series', tvdb_id)
+        return self.series.get(tvdb_id)
+
+    def get_series_translation(self, tvdb_id, lang):
+        self._record('get_series_translation', tvdb_id, lang)
+        if tvdb_id in self.failing_translations:
+            raise RuntimeError('TVDB indisponible')
+        if (tvdb_id, lang) not in self.translations:
+            raise ValueError('NotFoundException')
+        return self.translations[(tvdb_id, lang)]
+
+
+class TestSearchAndTranslateSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.app = Flask(__name__)
+        self.app.config['METADATA_CACHE_DB_FILE'] = os.path.join(self.temp_dir.name, 'metadata_cache.db')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        metadata_cache.reset_metadata_cache_stats()
+        with patch('app.utils.tvdb_client.TVDB'):
+            self.tvdb = CustomTVDBClient()
+
+    def tearDown(self):
+        metadata_cache.close_metadata_cache_connections()
+        self.app_context.pop()
+        self.temp_dir.cleanup()
+
+    def test_translations_from_search_payload_are_reused(self):
+        self.tvdb.client = FakeTVDB([
+            {'tvdb_id': 1, 'name': 'Dark', 'primary_language': 'deu', 'year': '2017',
+             'translations': {'deu': 'Dark', 'fra': 'Dark FR'}, 'overviews': {'fra': 'Synopsis FR'}},
+        ])
+
+        results = self.tvdb.search_and_translate_series('Dark')
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual((results[0]['name'], results[0]['original_name'], results[0]['overview']),
+                         ('Dark FR', 'Dark', 'Synopsis FR'))
+        # Tout est déjà dans la réponse de recherche : aucun appel de détail ni de traduction
+        self.assertEqual(self.tvdb.client.calls, [('search', 'Dark')])
+
+    def test_missing_translation_falls_back_to_get_series_translation(self):
+        self.tvdb.client = FakeTVDB(
+            [{'tvdb_id': 2, 'name': 'Darker', 'overview': 'Overview EN'},
+             {'tvdb_id': 3, 'name': 'Darkest', 'overview': 'Overview EN'}],
+            series={2: {'id': 2, 'name': 'Original 2'}, 3: {'id': 3, 'name': 'Original 3'}},
+            translations={(2, 'fra'): {'name': 'Nom 2', 'overview': 'Synopsis 2'}},
+        )
+
+        results = self.tvdb.search_and_translate_series('Dark')
+
+        self.assertEqual([r['name'] for r in results], ['Nom 2', 'Darkest'])
+        self.assertEqual([r['original_name'] for r in results], ['Original 2', 'Original 3'])
+        self.assertEqual([r['overview'] for r in results], ['Synopsis 2', 'Overview EN'])
+        self.assertCountEqual(self.tvdb.client.calls_to('get_series_translation'), [(2, 'fra'), (3, 'fra')])
+
+        # Résultat complet (l'absence de traduction n'est pas une erreur) : servi par le cache ensuite
+        self.tvdb.search_and_translate_series('Dark')
+        self.assertEqual(len(self.tvdb.client.calls_to('search')), 1)
+
+    def test_partial_result_is_not_cached_when_one_hit_fails(self):
+        self.tvdb.client = FakeTVDB(
+            [{'tvdb_id': 4, 'name': 'Ok'}, {'tvdb_id': 5, 'name': 'Broken'}],
+            series={4: {'id': 4, 'name': 'Original 4'}, 5: {'id': 5, 'name': 'Original 5'}},
+            translations={(4, 'fra'): {'name': 'Nom 4', 'overview': ''}},
+            failing_translations={5},
+        )
+
+        results = self.tvdb.search_and_translate_series('Dark')
+
+        self.assertEqual([r['name'] for r in results], ['Nom 4', 'Broken'])
+
+        self.tvdb.client.failing_translations.clear()
+        self.tvdb.client.translations[(5, 'fra')] = {'name': 'Nom 5', 'overview': ''}
+        results = self.tvdb.search_and_translate_series('Dark')
+
+        # La recherche est rejouée ; seule la traduction en erreur est redemandée
+        self.assertEqual([r['name'] for r in results], ['Nom 4', 'Nom 5'])
+        self.assertEqual(len(self.tvdb.client.calls_to('search')), 2)
+        self.assertEqual(self.tvdb.client.calls_to('get_series_translation').count((4, 'fra')), 1)
+        self.assertEqual(self.tvdb.client.calls_to('get_series_translation').count((5, 'fra')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
+import copy
 import json
 import os
 import logging
+import threading
+import time
+import unicodedata
 from filelock import FileLock, Timeout
 from flask import current_app
 from datetime import datetime
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 from app.utils.tvdb_client import CustomTVDBClient
 
 # Logger pour ce module
@@ -29,42 +33,198 @@ def _get_db_path_and_logger():
         os.makedirs(db_dir)
     return path, logger
 
-def _load_database():
-    """Charge la base de données JSON avec un verrouillage de fichier."""
+# --- INDEX EN MÉMOIRE ---
+# La base est chargée une fois par processus puis servie depuis la mémoire ; le
+# mtime/taille du fichier est vérifié au plus une fois par seconde pour recharger
+# les modifications d'un autre processus. Les titres sont indexés par trigrammes
+# (après suppression des accents et de la casse) : une recherche ne vérifie que
+# les entrées contenant tous les trigrammes de la requête.
+
+_MTIME_CHECK_INTERVAL_SECONDS = 1.0
+_NGRAM_SIZE = 3
+
+
+def _fold(text):
+    """Minuscules sans accents : 'Amélie' -> 'amelie'."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def _ngrams(folded_text):
+    return {folded_text[i:i + _NGRAM_SIZE] for i in range(len(folded_text) - _NGRAM_SIZE + 1)}
+
+
+class _ArchiveIndex:
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock_file = db_file + ".lock"
+        self._lock = threading.RLock()
+        self._data = None
+        self._file_signature = None
+        self._last_check = 0.0
+        self._reset_index()
+
+    def _reset_index(self):
+        self._order = {}
+        self._next_position = 0
+        self._folded_titles = {}
+        self._by_ngram = {}
+
+    def _signature(self):
+        try:
+            stat_result = os.stat(self.db_file)
+            return (stat_result.st_mtime_ns, stat_result.st_size)
+        except FileNotFoundError:
+            return None
+
+    # --- Index des titres ---
+
+    def _index_entry(self, key, entry):
+        if key not in self._order:
+            self._order[key] = self._next_position
+            self._next_position += 1
+        title = entry.get('title') if isinstance(entry, dict) else None
+        if not title:
+            return
+        folded = _fold(str(title))
+        self._folded_titles[key] = folded
+        for ngram in _ngrams(folded):
+            self._by_ngram.setdefault(ngram, set()).add(key)
+
+    def _unindex_entry(self, key):
+        folded = self._folded_titles.pop(key, None)
+        if folded is None:
+            return
+        for ngram in _ngrams(folded):
+            keys = self._by_ngram.get(ngram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_ngram[ngram]
+
+    def _rebuild(self, data):
+        self._data = data
+        self._reset_index()
+        for key, entry in data.items():
+            self._index_entry(key, entry)
+
+    # --- Lecture / écriture du fichier (verrou fichier tenu par l'appelant) ---
+
+    def _read_file_locked(self, logger):
+        if not os.path.exists(self.db_file):
+            return {}
+        with open(self.db_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return json.loads(content) if content else {}
+
+    def _write_file_locked(self):
+        tmp_file = f"{self.db_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._data, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, self.db_file)
+        self._file_signature = self._signature()
+
+    def _refresh_locked(self, logger):
+        if self._data is None or self._signature() != self._file_signature:
+            self._rebuild(self._read_file_locked(logger))
+            self._file_signature = self._signature()
+
+    def data(self, logger):
+        """Dictionnaire en mémoire (lecture seule), rechargé si le fichier a changé."""
+        with self._lock:
+            now = time.monotonic()
+            if self._data is not None and now - self._last_check < _MTIME_CHECK_INTERVAL_SECONDS:
+                return self._data
+            self._last_check = now
+            if self._data is None or self._signature() != self._file_signature:
+                try:
+                    with FileLock(self.lock_file, timeout=10):
+                        self._refresh_locked(logger)
+                except (Timeout, json.JSONDecodeError) as e:
+                    logger.error(f"Erreur lors du chargement de {self.db_file}: {e}")
+                    if self._data is None:
+                        return {}
+            return self._data
+
+    def put(self, key, entry, logger):
+        """Écrit une entrée : relit le fichier s'il a changé, applique, puis sauvegarde (atomique)."""
+        with self._lock, FileLock(self.lock_file, timeout=10):
+            self._refresh_locked(logger)
+            self._unindex_entry(key)
+            self._data[key] = entry
+            self._index_entry(key, entry)
+            self._write_file_locked()
+
+    def replace_all(self, data, logger):
+        with self._lock, FileLock(self.lock_file, timeout=10):
+            self._rebuild(data)
+            self._write_file_locked()
+
+    # --- Recherches ---
+
+    def search_title(self, query, logger):
+        """Clés dont le titre contient la requête (sans accents ni casse), dans l'ordre de la base."""
+        with self._lock:
+            self.data(logger)
+            folded_query = _fold(query.strip())
+            query_ngrams = _ngrams(folded_query)
+            if query_ngrams:
+                postings = sorted((self._by_ngram.get(ngram, set()) for ngram in query_ngrams), key=len)
+                candidates = set(postings[0]).intersection(*postings[1:])
+            else:
+                # Requête de moins de 3 caractères : parcours des titres déjà normalisés
+                candidates = self._folded_titles.keys()
+            matches = [key for key in candidates if folded_query in self._folded_titles[key]]
+            matches.sort(key=self._order.__getitem__)
+            return [self._data[key] for key in matches]
+
+
+_indexes_lock = threading.Lock()
+_indexes = {}
+
+
+def _get_index():
     db_file, logger = _get_db_path_and_logger()
-    lock_file = db_file + ".lock"
-    lock = FileLock(lock_file, timeout=10)
+    with _indexes_lock:
+        index = _indexes.get(db_file)
+        if index is None:
+            index = _indexes[db_file] = _ArchiveIndex(db_file)
+    return index, logger
+
+def _load_database():
+    """Base d'archives en mémoire (vue partagée : ne pas la modifier, passer par _put_entry)."""
+    index, logger = _get_index()
+    return index.data(logger)
+
+def _get_entry(db_key):
+    """Copie modifiable de l'entrée, ou None si absente."""
+    entry = _load_database().get(db_key)
+    return copy.deepcopy(entry) if entry is not None else None
+
+def _put_entry(db_key, entry):
+    index, logger = _get_index()
     try:
-        with lock:
-            if not os.path.exists(db_file):
-                return {}
-            with open(db_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                return json.loads(content) if content else {}
-    except (Timeout, json.JSONDecodeError) as e:
-        logger.error(f"Erreur lors du chargement de {db_file}: {e}")
-        return {}
+        index.put(db_key, entry, logger)
+    except Timeout:
+        logger.error(f"Timeout lors de la sauvegarde de {index.db_file}.")
     except Exception as e:
-        logger.error(f"Erreur inattendue lors du chargement de {db_file}: {e}", exc_info=True)
+        logger.error(f"Erreur inattendue lors de la sauvegarde de {index.db_file}: {e}", exc_info=True)
         raise
 
 def _save_database(data):
-    """Sauvegarde la base de données JSON avec un verrouillage de fichier."""
-    db_file, logger = _get_db_path_and_logger()
-    lock_file = db_file + ".lock"
-    lock = FileLock(lock_file, timeout=10)
+    """Remplace toute la base (migration) et reconstruit l'index."""
+    index, logger = _get_index()
     try:
-        with lock:
-            with open(db_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+        index.replace_all(data, logger)
     except Timeout:
-        logger.error(f"Timeout lors de la sauvegarde de {db_file}.")
+        logger.error(f"Timeout lors de la sauvegarde de {index.db_file}.")
     except Exception as e:
-        logger.error(f"Erreur inattendue lors de la sauvegarde de {db_file}: {e}", exc_info=True)
+        logger.error(f"Erreur inattendue lors de la sauvegarde de {index.db_file}: {e}", exc_info=True)
         raise
 
 def load_archive_data():
-    """Charge et retourne la base de données d'archives complète."""
+    """Retourne la base de données d'archives complète (lecture seule, servie depuis la mémoire)."""
     return _load_database()
 
 def _get_key(media_type, external_id):
@@ -88,12 +248,13 @@ def add_archived_media(media_type, external_id, user_id, rating_key=None, season
         return False, "Données manquantes : media_type, external_id et user_id sont requis."
 
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
-    is_new_entry = db_key not in database
-    entry = database.get(db_key, {
-        'media_type': 'tv' if media_type == 'show' else media_type,
-        'external_id': external_id, 'archive_history': []
-    })
+    entry = _get_entry(db_key)
+    is_new_entry = entry is None
+    if is_new_entry:
+        entry = {
+            'media_type': 'tv' if media_type == 'show' else media_type,
+            'external_id': external_id, 'archive_history': []
+        }
 
     # Mise à jour des métadonnées si c'est une nouvelle entrée ou si elles sont incomplètes
     needs_metadata_update = not all(entry.get(k) for k in ['title', 'year', 'poster_url', 'summary'])
@@ -111,7 +272,7 @@ def add_archived_media(media_type, external_id, user_id, rating_key=None, season
                 logger.warning(f"Impossible de récupérer les détails TVDB pour {external_id}: {e}")
         elif media_type == 'movie':
             try:
-                movie_details = TheMovieDBClient().get_movie_details(external_id)
+                movie_details = get_tmdb_client().get_movie_details(external_id)
                 if movie_details:
                     fresh_metadata = {
                         'title': movie_details.get('title'),
@@ -211,8 +372,7 @@ def add_archived_media(media_type, external_id, user_id, rating_key=None, season
     else:
         entry['archive_history'].append(history_entry)
 
-    database[db_key] = entry
-    _save_database(database)
+    _put_entry(db_key, entry)
 
     return True, f"Média '{entry.get('title', db_key)}' archivé/mis à jour."
 
@@ -221,30 +381,25 @@ def find_archived_media_by_id(media_type, external_id):
     """
     Récupère un média archivé par son type et son ID externe.
     """
-    db_key = _get_key(media_type, external_id)
-    database = _load_database()
-    return database.get(db_key)
+    return _get_entry(_get_key(media_type, external_id))
 
 def get_archived_media_by_id(archive_id):
     """
     Récupère un média archivé directement par sa clé de base de données (ex: 'tv_12345').
     """
-    database = _load_database()
-    return database.get(archive_id)
+    return _get_entry(archive_id)
+
+def is_media_archived(archive_id):
+    """Test d'appartenance léger (sans copie de l'entrée), pour les vérifications en boucle."""
+    return archive_id in _load_database()
 
 def find_archived_media_by_title(title):
     """
-    Recherche des médias archivés dont le titre correspond (insensible à la casse).
+    Recherche des médias archivés dont le titre contient la requête
+    (insensible à la casse et aux accents), via l'index de trigrammes.
     """
-    database = _load_database()
-    results = []
-    normalized_title = title.strip().lower()
-
-    for key, entry in database.items():
-        if entry.get('title') and normalized_title in entry['title'].lower():
-            results.append(entry)
-
-    return results
+    index, logger = _get_index()
+    return [copy.deepcopy(entry) for entry in index.search_title(title, logger)]
 
 def migrate_database_keys():
     """
@@ -1,10 +1,17 @@
 import os
 import time
+import copy
+import bisect
+import functools
+import threading
+import hashlib
+import json
 import requests
 from flask import current_app
 import re
 import logging
 from datetime import datetime, timezone
+from app.utils import http_client, single_flight
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -13,33 +20,45 @@ logger = logging.getLogger(__name__)
 # --- UTILITY FUNCTIONS ---
 # ==============================================================================
 
+# Patterns compilés une seule fois au chargement du module
+# Regex patterns for TV shows
+_TV_PATTERNS = (
+    # Patterns for multi-season packs (integrale/complete) should have high priority
+    re.compile(r"^(?P<title>.+?)(?:[._\s](?P<year>(?:19|20)\d{2}))?[._\s](?:iNTEGRALE|COMPLETE)", re.IGNORECASE),
+    # More specific patterns first
+    re.compile(r"^(?P<title>.+?)[._\s](?P<year>(?:19|20)\d{2})[._\s]S(?P<season>\d{1,2})[._\s]?[E.]?(?P<episode>\d{1,3})", re.IGNORECASE), # Title.Year.S01.E01
+    re.compile(r"^(?P<title>.+?)[._\s]S(?P<season>\d{1,2})[._\s]?[E.]?(?P<episode>\d{1,3})[._\s](?P<year>(?:19|20)\d{2})", re.IGNORECASE), # Title.S01.E01.Year
+    re.compile(r"^(?P<title>.+?)[._\s]Season[._\s]?(?P<season>\d{1,2})[._\s]?Episode[._\s]?(?P<episode>\d{1,3})", re.IGNORECASE), # Title.Season.01.Episode.01
+    re.compile(r"^(?P<title>.+?)[._\s]?(?P<season>\d{1,2})x(?P<episode>\d{1,3})", re.IGNORECASE), # Title.1x01
+    # Generic SxxExx
+    re.compile(r"^(?P<title>.+?)[._\s]S(?P<season>\d{1,2})[._\s]?[E.]?(?P<episode>\d{1,3})", re.IGNORECASE),
+    # Season pack
+    re.compile(r"^(?P<title>.+?)(?:[._\s](?P<year>(?:19|20)\d{2}))?(?:[._\s]+(?:DOC|SUBPACK|SEASON|VOL|DISC|DISQUE|PART))?[._\s]*S(?P<season>\d{1,2})(?![E\d])", re.IGNORECASE),
+)
+
+# Regex patterns for movies
+_MOVIE_PATTERNS = (
+    re.compile(r"^(?P<title>.+?)[ ._]\((?P<year>(?:19|20)\d{2})\)", re.IGNORECASE), # Movie Title (YYYY)
+    re.compile(r"^(?P<title>.+?)[ ._](?P<year>(?:19|20)\d{2})[ ._](?!S\d{2}E\d{2})", re.IGNORECASE), # Movie.Title.YYYY (ensure not a TV show year)
+    re.compile(r"^(?P<title>.+?)[ ._\[(](?P<year>(?:19|20)\d{2})[\])].*$", re.IGNORECASE), # More flexible movie year, removed lookbehind
+)
+
+_SEPARATORS_RE = re.compile(r'[\._]')
+_MULTI_SPACES_RE = re.compile(r'\s{2,}')
+_COMMON_TAGS_RE = re.compile(r'(1080p|720p|4K|WEB-DL|WEBRip|BluRay|x264|x265|AAC|DTS|HDRip|HDTV|XviD|DivX).*$', re.IGNORECASE)
+
+PARSE_CACHE_SIZE = 8192
+
 def parse_media_name(item_name: str) -> dict:
     """
     Parses a media item name to determine if it's a TV show or a movie and extracts details.
+    Results are memoized per name (bounded LRU); each call gets its own copy.
     """
-    logger.debug(f"parse_media_name: Called with item_name='{item_name}'")
-    # Regex patterns for TV shows
-    tv_patterns = [
-        # Patterns for multi-season packs (integrale/complete) should have high priority
-        re.compile(r"^(?P<title>.+?)(?:[._\s](?P<year>(?:19|20)\d{2}))?[._\s](?:iNTEGRALE|COMPLETE)", re.IGNORECASE),
-        # More specific patterns first
-        re.compile(r"^(?P<title>.+?)[._\s](?P<year>(?:19|20)\d{2})[._\s]S(?P<season>\d{1,2})[._\s]?[E.]?(?P<episode>\d{1,3})", re.IGNORECASE), # Title.Year.S01.E01
-        re.compile(r"^(?P<title>.+?)[._\s]S(?P<season>\d{1,2})[._\s]?[E.]?(?P<episode>\d{1,3})[._\s](?P<year>(?:19|20)\d{2})", re.IGNORECASE), # Title.S01.E01.Year
-        re.compile(r"^(?P<title>.+?)[._\s]Season[._\s]?(?P<season>\d{1,2})[._\s]?Episode[._\s]?(?P<episode>\d{1,3})", re.IGNORECASE), # Title.Season.01.Episode.01
-        re.compile(r"^(?P<title>.+?)[._\s]?(?P<season>\d{1,2})x(?P<episode>\d{1,3})", re.IGNORECASE), # Title.1x01
-        # Generic SxxExx
-        re.compile(r"^(?P<title>.+?)[._\s]S(?P<season>\d{1,2})[._\s]?[E.]?(?P<episode>\d{1,3})", re.IGNORECASE),
-        # Season pack
-        re.compile(r"^(?P<title>.+?)(?:[._\s](?P<year>(?:19|20)\d{2}))?(?:[._\s]+(?:DOC|SUBPACK|SEASON|VOL|DISC|DISQUE|PART))?[._\s]*S(?P<season>\d{1,2})(?![E\d])", re.IGNORECASE),
-    ]
-
-    # Regex patterns for movies
-    movie_patterns = [
-        re.compile(r"^(?P<title>.+?)[ ._]\((?P<year>(?:19|20)\d{2})\)", re.IGNORECASE), # Movie Title (YYYY)
-        re.compile(r"^(?P<title>.+?)[ ._](?P<year>(?:19|20)\d{2})[ ._](?!S\d{2}E\d{2})", re.IGNORECASE), # Movie.Title.YYYY (ensure not a TV show year)
-        re.compile(r"^(?P<title>.+?)[ ._\[(](?P<year>(?:19|20)\d{2})[\])].*$", re.IGNORECASE), # More flexible movie year, removed lookbehind
-    ]
+    return dict(_parse_media_name_cached(item_name))
 
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_media_name_cached(item_name: str) -> dict:
+    logger.debug(f"parse_media_name: Called with item_name='{item_name}'")
     result = {
         "type": "unknown",
         "title": None,
@@ -50,7 +69,7 @@ def parse_media_name(item_name: str) -> dict:
     }
 
     # Check for TV show patterns first
-    for pattern in tv_patterns:
+    for pattern in _TV_PATTERNS:
         match = pattern.match(item_name)
         if match:
             data = match.groupdict()
@@ -64,7 +83,7 @@ def parse_media_name(item_name: str) -> dict:
             return result
 
     # Check for movie patterns if not identified as TV show
-    for pattern in movie_patterns:
+    for pattern in _MOVIE_PATTERNS:
         match = pattern.match(item_name)
         if match:
             data = match.groupdict()
@@ -88,16 +107,229 @@ def parse_media_name(item_name: str) -> dict:
     logger.info(f"Could not determine type for: {item_name}, returning as 'unknown'")
     # Attempt to clean title even if unknown type
     base_name, _ = os.path.splitext(item_name)
-    cleaned_title = re.sub(r'[\._]', ' ', base_name) # Replace dots/underscores with spaces
-    cleaned_title = re.sub(r'\s{2,}', ' ', cleaned_title).strip() # Remove multiple spaces
+    cleaned_title = _SEPARATORS_RE.sub(' ', base_name) # Replace dots/underscores with spaces
+    cleaned_title = _MULTI_SPACES_RE.sub(' ', cleaned_title).strip() # Remove multiple spaces
     # Try to remove common tags like 1080p, WEB-DL etc. for a cleaner unknown title
-    common_tags_pattern = r'(1080p|720p|4K|WEB-DL|WEBRip|BluRay|x264|x265|AAC|DTS|HDRip|HDTV|XviD|DivX).*$'
-    cleaned_title = re.sub(common_tags_pattern, '', cleaned_title, flags=re.IGNORECASE).strip()
+    cleaned_title = _COMMON_TAGS_RE.sub('', cleaned_title).strip()
     result["title"] = cleaned_title if cleaned_title else base_name
 
     logger.debug(f"parse_media_name: Returning: {result}")
     return result
 
+# ==============================================================================
+# --- CATALOG SNAPSHOT (RADARR MOVIES / SONARR SERIES) ---
+# ==============================================================================
+
+def _normalize_title(title):
+    """Normalizes a title for lookups: punctuation removed, lowercased."""
+    return re.sub(r'[^\w\s]', '', title or '').lower()
+
+class _ArrCatalog:
+    """
+    Process-wide, indexed snapshot of the Radarr movie list or Sonarr series list.
+
+    The full list is fetched once and indexed by internal id, external ids,
+    normalized title and titleSlug. It is refreshed when the TTL
+    (ARR_CATALOG_TTL_SECONDS) expires or when the configured URL/API key change,
+    and single records are upserted whenever an add/update/move goes through
+    this module, so lookups no longer download the whole library.
+    """
+
+    ID_FIELDS = ('tmdbId', 'imdbId', 'tvdbId')
+
+    def __init__(self, name, fetch_all, source, revision_fields=()):
+        self.name = name
+        self._fetch_all = fetch_all
+        self._source = source
+        self.revision_fields = revision_fields
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._records = {}
+        self._positions = {}
+        self._next_position = 0
+        self._by_field = {field: {} for field in self.ID_FIELDS}
+        self._by_title = {}
+        self._by_slug = {}
+        self._loaded_at = None
+        self._loaded_source = None
+
+    # --- Index maintenance ---
+
+    def _index_keys(self, record):
+        keys = []
+        for field in self.ID_FIELDS:
+            if record.get(field):
+                keys.append((self._by_field[field], str(record[field])))
+        keys.append((self._by_title, _normalize_title(record.get('title', ''))))
+        if record.get('titleSlug'):
+            keys.append((self._by_slug, record['titleSlug'].lower()))
+        return keys
+
+    def _add_to_indexes(self, record):
+        # Buckets stay ordered like the API list so "first match" semantics are kept.
+        for index, key in self._index_keys(record):
+            bisect.insort(index.setdefault(key, []), record, key=lambda r: self._positions[r['id']])
+
+    def _remove_from_indexes(self, record):
+        for index, key in self._index_keys(record):
+            bucket = index.get(key)
+            if not bucket:
+                continue
+            bucket[:] = [r for r in bucket if r is not record]
+            if not bucket:
+                del index[key]
+
+    def _store(self, record):
+        record_id = record['id']
+        previous = self._records.get(record_id)
+        if previous is not None:
+            self._remove_from_indexes(previous)
+        else:
+            self._positions[record_id] = self._next_position
+            self._next_position += 1
+        self._records[record_id] = record
+        self._add_to_indexes(record)
+
+    # --- Refresh ---
+
+    def _is_fresh(self, source):
+        if self._loaded_at is None or self._loaded_source != source:
+            return False
+        ttl = current_app.config.get('ARR_CATALOG_TTL_SECONDS', 300)
+        return (time.monotonic() - self._loaded_at) < ttl
+
+    def ensure_loaded(self, force_refresh=False):
+        """Makes sure the snapshot is loaded and fresh. Returns False if it is unavailable."""
+        with self._lock:
+            source = self._source()
+            if not force_refresh and self._is_fresh(source):
+                return True
+
+            records = self._fetch_all()
+            if not isinstance(records, list):
+                if self._loaded_at is not None and self._loaded_source == source:
+                    logger.warning(f"{self.name} catalog: refresh failed, serving the previous snapshot.")
+                    return True
+                logger.error(f"{self.name} catalog: could not fetch the library list.")
+                return False
+
+            self._reset()
+            for record in records:
+                if isinstance(record, dict) and record.get('id') is not None:
+                    self._store(record)
+            self._loaded_at = time.monotonic()
+            self._loaded_source = source
+            logger.info(f"{self.name} catalog: snapshot refreshed ({len(self._records)} items).")
+            return True
+
+    def upsert(self, record):
+        """Inserts or replaces a single record without refetching the whole list."""
+        if not isinstance(record, dict) or record.get('id') is None:
+            return
+        with self._lock:
+            if self._loaded_at is None:
+                return # Nothing cached yet, the next lookup will fetch everything.
+            self._store(copy.deepcopy(record))
+
+    def remove(self, record_id):
+        with self._lock:
+            record = self._records.pop(record_id, None)
+            if record is not None:
+                self._remove_from_indexes(record)
+                self._positions.pop(record_id, None)
+
+    def invalidate(self):
+        with self._lock:
+            self._reset()
+
+    # --- Lookups (records returned here are shared: copy before mutating) ---
+
+    def is_empty(self):
+        return not self._records
+
+    def get_by_id(self, record_id):
+        return self._records.get(record_id)
+
+    def get_by_field(self, field, value):
+        bucket = self._by_field[field].get(str(value))
+        return bucket[0] if bucket else None
+
+    def find_by_title(self, title):
+        return list(self._by_title.get(_normalize_title(title), []))
+
+    def get_by_slug(self, slug):
+        bucket = self._by_slug.get((slug or '').lower())
+        return bucket[0] if bucket else None
+
+    def position(self, record):
+        return self._positions.get(record['id'])
+
+    def records(self):
+        return list(self._records.values())
+
+    def revision(self, record):
+        """Content token of the fields that drive media statuses (files, monitoring, statistics)."""
+        payload = {field: record.get(field) for field in self.revision_fields}
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+_radarr_catalog = _ArrCatalog(
+    'Radarr',
+    lambda: _radarr_api_request('GET', 'movie'),
+    lambda: (current_app.config.get('RADARR_URL'), current_app.config.get('RADARR_API_KEY')),
+    revision_fields=('monitored', 'hasFile', 'movieFileId', 'sizeOnDisk'),
+)
+_sonarr_catalog = _ArrCatalog(
+    'Sonarr',
+    lambda: _sonarr_api_request('GET', 'series'),
+    lambda: (current_app.config.get('SONARR_URL'), current_app.config.get('SONARR_API_KEY')),
+    revision_fields=('monitored', 'seasonCount', 'statistics', 'seasons'),
+)
+
+def _get_arr_catalog(arr_type):
+    if arr_type == 'radarr':
+        return _radarr_catalog
+    if arr_type == 'sonarr':
+        return _sonarr_catalog
+    raise ValueError(f"Unknown arr_type '{arr_type}'.")
+
+def record_arr_catalog_change(arr_type, record):
+    """
+    Updates the catalog snapshot with a movie/series object returned by Radarr/Sonarr.
+    To be called by code that adds or edits media without going through this module.
+    """
+    _get_arr_catalog(arr_type).upsert(record)
+
+def get_arr_catalog_revision(arr_type, field, value):
+    """
+    Returns a short token that changes whenever the Radarr movie / Sonarr series
+    matching field=value changes in a way that affects its status (file obtained,
+    monitoring, episode statistics). None if the media is not in the library.
+    """
+    catalog = _get_arr_catalog(arr_type)
+    if value is None or not catalog.ensure_loaded():
+        return None
+    with catalog._lock:
+        record = catalog.get_by_field(field, value)
+        return catalog.revision(record) if record else None
+
+def get_arr_catalog_records(arr_type):
+    """
+    Returns every movie (radarr) or series (sonarr) of the catalog snapshot, or []
+    if it is unavailable. Records are shared with the snapshot: copy before mutating.
+    """
+    catalog = _get_arr_catalog(arr_type)
+    if not catalog.ensure_loaded():
+        return []
+    with catalog._lock:
+        return catalog.records()
+
+def invalidate_arr_catalogs():
+    """Drops both catalog snapshots; the next lookup fetches the full lists again."""
+    _radarr_catalog.invalidate()
+    _sonarr_catalog.invalidate()
+
 # ==============================================================================
 # --- RADARR CLIENT FUNCTIONS ---
 # ==============================================================================
@@ -127,13 +359,19 @@ def _radarr_api_request(method, endpoint, params=None, json_data=None):
     headers = {'X-Api-Key': config.get('RADARR_API_KEY')}
     url = f"{config.get('RADARR_URL', '').rstrip('/')}/api/v3/{endpoint.lstrip('/')}"
 
-    try:
-        response = requests.request(method, url, headers=headers, params=params, json=json_data, timeout=20)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"Radarr API request failed: {e}")
-        return None
+    def _call():
+        try:
+            response = http_client.request('radarr', method, url, headers=headers, params=params, json=json_data, timeout=20)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            current_app.logger.error(f"Radarr API request failed: {e}")
+            return None
+
+    # Les GET identiques simultanés (plusieurs onglets, scheduler) partagent un seul appel
+    if method.upper() == 'GET':
+        return single_flight.do('radarr', (url, single_flight.make_key(params)), _call)
+    return _call()
 
 def get_radarr_tag_id(tag_label):
     """Finds a tag by its label in Radarr and returns its ID. Creates it if not found."""
@@ -174,26 +412,22 @@ def get_radarr_movie_by_guid(plex_guid):
         current_app.logger.error(f"Could not parse ID from Radarr GUID: {plex_guid}")
         return None
 
-    movies = _radarr_api_request('GET', 'movie')
-    if movies:
-        # --- START DEBUG LOGGING ---
-        if id_key == 'tmdbId':
-            all_tmdb_ids = [m.get('tmdbId') for m in movies if m.get('tmdbId')]
-            current_app.logger.info(f"DEBUG: Searching for tmdbId: {id_value}")
-            current_app.logger.info(f"DEBUG: All tmdbIds found in Radarr: {all_tmdb_ids}")
-        # --- END DEBUG LOGGING ---
-        for movie in movies:
-            if movie.get(id_key) and str(movie.get(id_key)) == str(id_value):
-                return movie
-    return None
+    if not _radarr_catalog.ensure_loaded():
+        return None
+    movie = _radarr_catalog.get_by_field(id_key, id_value)
+    return copy.deepcopy(movie) if movie else None
 
 def get_radarr_movie_by_id(movie_id):
     """Fetches a single movie from Radarr by its internal ID."""
-    return _radarr_api_request('GET', f'movie/{movie_id}')
+    movie = _radarr_api_request('GET', f'movie/{movie_id}')
+    _radarr_catalog.upsert(movie)
+    return movie
 
 def update_radarr_movie(movie_data):
     """Updates a movie in Radarr using its full data object."""
-    return _radarr_api_request('PUT', f"movie/{movie_data['id']}", json_data=movie_data)
+    response = _radarr_api_request('PUT', f"movie/{movie_data['id']}", json_data=movie_data)
+    _radarr_catalog.upsert(response)
+    return response
 
 def search_radarr_by_title(title):
     """Searches for movies in Radarr by title using the lookup endpoint."""
@@ -207,18 +441,17 @@ def find_radarr_movie_by_title(title, retries=3, delay=5):
     attempt = 0
     while attempt < retries:
         try:
-            all_movies = _radarr_api_request('GET', 'movie')
-            if not all_movies:
+            if not _radarr_catalog.ensure_loaded(force_refresh=attempt > 0) or _radarr_catalog.is_empty():
                 attempt += 1
                 if attempt < retries:
                     current_app.logger.info(f"Radarr: Tentative {attempt}/{retries} - La liste des films est vide, nouvelle tentative dans {delay}s...")
                     time.sleep(delay)
                 continue
 
-            for movie in all_movies:
+            for movie in _radarr_catalog.find_by_title(title):
                 if movie.get('title', '').lower() == title.lower():
                     current_app.logger.info(f"Radarr: Found matching movie '{title}' in library (ID: {movie.get('id')}).")
-                    return movie
+                    return copy.deepcopy(movie)
 
             current_app.logger.warning(f"Radarr: Movie '{title}' not found in library after full scan.")
             return None # Exit after successful scan
@@ -238,28 +471,19 @@ def check_radarr_movie_exists(movie_title: str, movie_year: int = None) -> bool:
     """
     logger.debug(f"check_radarr_movie_exists: Called with title='{movie_title}', year={movie_year}")
     logger.info(f"Radarr: Checking if movie exists: {movie_title} ({movie_year})")
-    # Fetch all movies from Radarr. This is simpler than 'lookup' for existing movies.
-    # In a very large library, this could be slow. Consider optimizations if performance issues arise.
-    logger.debug("check_radarr_movie_exists: About to call _radarr_api_request('GET', 'movie')")
-    all_movies = _radarr_api_request('GET', 'movie')
-    logger.debug(f"check_radarr_movie_exists: _radarr_api_request('GET', 'movie') returned (first 50 chars): {str(all_movies)[:50] if all_movies else 'None'}")
-    if not all_movies:
+    # Movies are looked up in the catalog snapshot (normalized title index).
+    if not _radarr_catalog.ensure_loaded() or _radarr_catalog.is_empty():
         logger.error("Radarr: Failed to fetch movie list from Radarr.")
         logger.debug(f"check_radarr_movie_exists: Returning {False}")
         return False
 
     found_movies = []
-    for movie in all_movies:
-        # Basic title match (case-insensitive, remove common punctuation)
-        cleaned_api_title = re.sub(r'[^\w\s]', '', movie.get('title', '')).lower()
-        cleaned_search_title = re.sub(r'[^\w\s]', '', movie_title).lower()
-
-        if cleaned_search_title == cleaned_api_title:
-            if movie_year:
-                if movie.get('year') == movie_year:
-                    found_movies.append(movie)
-            else:
+    for movie in _radarr_catalog.find_by_title(movie_title):
+        if movie_year:
+            if movie.get('year') == movie_year:
                 found_movies.append(movie)
+        else:
+            found_movies.append(movie)
 
     if not found_movies:
         logger.info(f"Radarr: Movie '{movie_title}' ({movie_year if movie_year else 'Any Year'}) not found.")
@@ -347,16 +571,22 @@ def _sonarr_api_request(method, endpoint, params=None, json_data=None):
     headers = {'X-Api-Key': config.get('SONARR_API_KEY')}
     url = f"{config.get('SONARR_URL', '').rstrip('/')}/api/v3/{endpoint.lstrip('/')}"
 
-    try:
-        response = requests.request(method, url, headers=headers, params=params, json=json_data, timeout=20)
-        response.raise_for_status()
-        # Some Sonarr responses (like DELETE) have no JSON body but are successes (200 OK)
-        if response.status_code == 200 and not response.text:
-             return {"status": "success"}
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        current_app.logger.error(f"Sonarr API request failed: {e}")
-        return None
+    def _call():
+        try:
+            response = http_client.request('sonarr', method, url, headers=headers, params=params, json=json_data, timeout=20)
+            response.raise_for_status()
+            # Some Sonarr responses (like DELETE) have no JSON body but are successes (200 OK)
+            if response.status_code == 200 and not response.text:
+                 return {"status": "success"}
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            current_app.logger.error(f"Sonarr API request failed: {e}")
+            return None
+
+    # Les GET identiques simultanés (plusieurs onglets, scheduler) partagent un seul appel
+    if method.upper() == 'GET':
+        return single_flight.do('sonarr', (url, single_flight.make_key(params)), _call)
+    return _call()
 
 def get_sonarr_tag_id(tag_label):
     """Finds a tag by its label in Sonarr and returns its ID. Creates it if not found."""
@@ -396,16 +626,16 @@ def get_sonarr_series_by_guid(plex_guid):
         current_app.logger.error(f"Could not parse ID from Sonarr GUID: {plex_guid}")
         return None
 
-    all_series = _sonarr_api_request('GET', 'series')
-    if all_series:
-        for series in all_series:
-            if series.get(id_key) and str(series.get(id_key)) == str(id_value):
-                return series
-    return None
+    if not _sonarr_catalog.ensure_loaded():
+        return None
+    series = _sonarr_catalog.get_by_field(id_key, id_value)
+    return copy.deepcopy(series) if series else None
 
 def get_sonarr_series_by_id(series_id):
     """Fetches a single series from Sonarr by its internal ID."""
-    return _sonarr_api_request('GET', f'series/{series_id}')
+    series = _sonarr_api_request('GET', f'series/{series_id}')
+    _sonarr_catalog.upsert(series)
+    return series
 
 def get_sonarr_series_details_by_tvdbid(tvdb_id):
     """
@@ -415,15 +645,10 @@ def get_sonarr_series_details_by_tvdbid(tvdb_id):
     if not tvdb_id:
         return None
 
-    # This is inefficient but aligns with the existing get_sonarr_series_by_guid.
-    # A better approach would be to use Sonarr's lookup endpoint if available.
-    all_series = _sonarr_api_request('GET', 'series')
     series_details = None
-    if all_series:
-        for series in all_series:
-            if series.get('tvdbId') and str(series.get('tvdbId')) == str(tvdb_id):
-                series_details = series
-                break
+    if _sonarr_catalog.ensure_loaded():
+        series = _sonarr_catalog.get_by_field('tvdbId', tvdb_id)
+        series_details = copy.deepcopy(series) if series else None
 
     if not series_details:
         current_app.logger.info(f"Sonarr: Series with TVDB ID {tvdb_id} not found in library.")
@@ -444,7 +669,9 @@ def get_sonarr_series_details_by_tvdbid(tvdb_id):
 def update_sonarr_series(series_data):
     """Updates a series in Sonarr using its full data object."""
     # Sonarr's PUT endpoint for a single series includes the ID in the URL.
-    return _sonarr_api_request('PUT', f"series/{series_data['id']}", json_data=series_data)
+    response = _sonarr_api_request('PUT', f"series/{series_data['id']}", json_data=series_data)
+    _sonarr_catalog.upsert(response)
+    return response
 
 def get_sonarr_episode_files(series_id):
     """Gets a list of all episode files for a given series ID."""
@@ -465,19 +692,11 @@ def search_sonarr_series_by_title_and_year(title, year=None):
     This function searches within series already present in Sonarr.
     """
     logger.info(f"Sonarr: Searching library for title='{title}', year={year}")
-    all_series = get_all_sonarr_series()
-    if not all_series:
+    if not _sonarr_catalog.ensure_loaded() or _sonarr_catalog.is_empty():
         logger.error("Sonarr: Could not get series list for title search.")
         return None
 
-    # Normalize search title for robust matching
-    normalized_search_title = re.sub(r'[^\w\s]', '', title).lower()
-
-    possible_matches = []
-    for series in all_series:
-        normalized_api_title = re.sub(r'[^\w\s]', '', series.get('title', '')).lower()
-        if normalized_api_title == normalized_search_title:
-            possible_matches.append(series)
+    possible_matches = [copy.deepcopy(series) for series in _sonarr_catalog.find_by_title(title)]
 
     if not possible_matches:
         logger.warning(f"Sonarr: No library match found for title '{title}'.")
@@ -517,18 +736,17 @@ def find_sonarr_series_by_title(title, retries=3, delay=5):
     attempt = 0
     while attempt < retries:
         try:
-            all_series = get_all_sonarr_series()
-            if not all_series:
+            if not _sonarr_catalog.ensure_loaded(force_refresh=attempt > 0) or _sonarr_catalog.is_empty():
                 attempt += 1
                 if attempt < retries:
                     current_app.logger.info(f"Sonarr: Tentative {attempt}/{retries} - La liste des séries est vide, nouvelle tentative dans {delay}s...")
                     time.sleep(delay)
                 continue
 
-            for series in all_series:
+            for series in _sonarr_catalog.find_by_title(title):
                 if series.get('title', '').lower() == title.lower():
                     current_app.logger.info(f"Sonarr: Found matching series '{title}' in library (ID: {series.get('id')}).")
-                    return series
+                    return copy.deepcopy(series)
 
             # If loop completes, series is not found
             current_app.logger.warning(f"Sonarr: Series '{title}' not found in library after full scan.")
@@ -646,18 +864,12 @@ def check_sonarr_episode_exists(series_title: str, season_number: int, episode_n
         # Absence = All episodes of the season are missing files.
         # This logic is complex. For now, a simplified check: does the series exist and is the season monitored?
         # A simple proxy for "do we want this season pack?"
-        all_series = get_all_sonarr_series()
-        if not all_series:
+        if not _sonarr_catalog.ensure_loaded() or _sonarr_catalog.is_empty():
             logger.error(f"Sonarr: Could not get series list for season pack check of '{series_title}'.")
             return False # Cannot determine, assume absent to allow download.
 
-        found_series = None
-        normalized_search_title = re.sub(r'[^\w\s]', '', series_title).lower()
-        for series in all_series:
-            normalized_api_title = re.sub(r'[^\w\s]', '', series.get('title', '')).lower()
-            if normalized_api_title == normalized_search_title:
-                found_series = series
-                break
+        title_matches = _sonarr_catalog.find_by_title(series_title)
+        found_series = title_matches[0] if title_matches else None
         
         if not found_series:
             logger.info(f"Sonarr: Series '{series_title}' not in Sonarr. Guardrail considers season ABSENT.")
@@ -683,30 +895,18 @@ def check_sonarr_episode_exists(series_title: str, season_number: int, episode_n
     # Le reste du code de la fonction (pour les épisodes individuels) est inchangé
     logger.info(f"Sonarr: Checking if episode exists: {series_title} S{season_number:02d}E{episode_number:02d}")
 
-    logger.debug("check_sonarr_episode_exists: About to call get_all_sonarr_series()")
-    all_series = get_all_sonarr_series()
-    logger.debug(f"check_sonarr_episode_exists: get_all_sonarr_series() returned (first 50 chars): {str(all_series)[:50] if all_series else 'None'}")
-    if not all_series:
+    if not _sonarr_catalog.ensure_loaded() or _sonarr_catalog.is_empty():
         logger.error(f"Sonarr: Could not retrieve series list to find '{series_title}'.")
         logger.debug(f"check_sonarr_episode_exists: Returning {False}")
         return False
 
-    found_series = None
-    # Normalize search title: lowercase and remove punctuation/special chars for robust matching.
-    normalized_search_title = re.sub(r'[^\w\s]', '', series_title).lower()
-
-    for series in all_series:
-        # Normalize API title similarly
-        normalized_api_title = re.sub(r'[^\w\s]', '', series.get('title', '')).lower()
-        if normalized_api_title == normalized_search_title:
-            found_series = series
-            break
-        # Fallback to checking titleSlug if direct title match fails
-        normalized_api_titleslug = series.get('titleSlug', '').lower()
-        if normalized_api_titleslug == normalized_search_title.replace(" ", "-"): # titleSlug uses dashes
-            found_series = series
-            logger.info(f"Sonarr: Matched '{series_title}' using titleSlug: '{series.get('title')}' (ID: {series.get('id')})")
-            break
+    # Normalized title match, with titleSlug (dashes) as fallback; the first one in library order wins.
+    title_matches = _sonarr_catalog.find_by_title(series_title)
+    found_series = title_matches[0] if title_matches else None
+    slug_match = _sonarr_catalog.get_by_slug(_normalize_title(series_title).replace(" ", "-"))
+    if slug_match and (found_series is None or _sonarr_catalog.position(slug_match) < _sonarr_catalog.position(found_series)):
+        found_series = slug_match
+        logger.info(f"Sonarr: Matched '{series_title}' using titleSlug: '{found_series.get('title')}' (ID: {found_series.get('id')})")
 
 
     if not found_series:
@@ -830,6 +1030,7 @@ def add_new_series_to_sonarr(tvdb_id: int, title: str, quality_profile_id: int,
 
     if response_data and isinstance(response_data, dict) and response_data.get("id"):
         logger.info(f"SONARR_CLIENT: Series '{title}' added successfully. Sonarr ID: {response_data.get('id')}")
+        _sonarr_catalog.upsert(response_data)
         return response_data # Return the full series object from Sonarr
     else:
         error_details = "Unknown error or invalid response from Sonarr."
@@ -874,6 +1075,7 @@ def add_new_movie_to_radarr(tmdb_id: int, title: str, quality_profile_id: int, r
 
     if response_data and isinstance(response_data, dict) and response_data.get("id"):
         logger.info(f"RADARR_CLIENT: Movie '{title}' added successfully. Radarr ID: {response_data.get('id')}")
+        _radarr_catalog.upsert(response_data)
         return response_data # Return the full movie object from Radarr
     else:
         error_details = "Unknown error or invalid response from Radarr."
@@ -1292,37 +1494,81 @@ def radarr_post_command(payload):
     """Posts a command to Radarr."""
     return _radarr_api_request('POST', 'command', json_data=payload)
 
-def find_in_arr_queue_by_hash(arr_type, torrent_hash):
+QUEUE_PAGE_SIZE = 200
+
+def _fetch_all_queue_records(arr_type):
+    """
+    Fetches every page of the Sonarr/Radarr queue.
+    Returns the list of records, or None if a page could not be fetched.
+    """
+    api_request = _sonarr_api_request if arr_type == 'sonarr' else _radarr_api_request
+    records = []
+    page = 1
+    while True:
+        queue_response = api_request('GET', 'queue', params={'page': page, 'pageSize': QUEUE_PAGE_SIZE})
+        if not queue_response or 'records' not in queue_response:
+            return None
+        page_records = queue_response['records'] or []
+        records.extend(page_records)
+        total_records = queue_response.get('totalRecords', len(records))
+        if not page_records or len(records) >= total_records:
+            return records
+        page += 1
+
+class _ArrQueueSnapshot:
+    """
+    Per-cycle view of the Sonarr and Radarr queues: each queue is fetched (all
+    pages) on first use only, then looked up by uppercase downloadId.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+
+    def _index(self, arr_type):
+        with self._lock:
+            if arr_type not in self._indexes:
+                records = _fetch_all_queue_records(arr_type)
+                if records is None:
+                    logger.error(f"Failed to fetch queue from {arr_type}.")
+                    self._indexes[arr_type] = None
+                else:
+                    logger.info(f"Queue snapshot: {len(records)} record(s) loaded from {arr_type}.")
+                    # A season pack has one record per episode: keep the first, as the old linear scan did
+                    index = {}
+                    for record in records:
+                        if record.get('downloadId'):
+                            index.setdefault(record['downloadId'].upper(), record)
+                    self._indexes[arr_type] = index
+            return self._indexes[arr_type]
+
+    def find(self, arr_type, torrent_hash):
+        index = self._index(arr_type)
+        if index is None:
+            return None
+        return index.get((torrent_hash or '').upper())
+
+def get_arr_queue_snapshot():
+    """Returns a new, lazily loaded queue snapshot to share across one processing cycle."""
+    return _ArrQueueSnapshot()
+
+def find_in_arr_queue_by_hash(arr_type, torrent_hash, queue_snapshot=None):
     """
     Finds an item in the Sonarr or Radarr queue by its torrent hash.
     The 'downloadId' in the *Arr queue should correspond to the torrent hash.
+    Pass the cycle's queue_snapshot to avoid downloading the queue for every hash.
     """
     logger.info(f"Searching {arr_type} queue for hash: {torrent_hash}")
-    queue = None
-    if arr_type == 'sonarr':
-        queue_response = _sonarr_api_request('GET', 'queue')
-        if queue_response and 'records' in queue_response:
-            queue = queue_response['records']
-    elif arr_type == 'radarr':
-        queue_response = _radarr_api_request('GET', 'queue')
-        if queue_response and 'records' in queue_response:
-            queue = queue_response['records']
-    else:
+    if arr_type not in ('sonarr', 'radarr'):
         logger.error(f"Unknown arr_type '{arr_type}' for queue search.")
         return None
 
-    if queue is None:
-        logger.error(f"Failed to fetch queue from {arr_type}.")
-        return None
-
-    for item in queue:
-        # The downloadId in Sonarr/Radarr should be the uppercase torrent hash
-        if item.get('downloadId', '').upper() == torrent_hash.upper():
-            logger.info(f"Found item in {arr_type} queue with hash {torrent_hash}: {item.get('title')}")
-            return item
-
-    logger.info(f"No item found in {arr_type} queue with hash {torrent_hash}.")
-    return None
+    item = (queue_snapshot or get_arr_queue_snapshot()).find(arr_type, torrent_hash)
+    if item:
+        logger.info(f"Found item in {arr_type} queue with hash {torrent_hash}: {item.get('title')}")
+    else:
+        logger.info(f"No item found in {arr_type} queue with hash {torrent_hash}.")
+    return item
 
 def sonarr_trigger_import(download_id):
     """Triggers an import in Sonarr for a specific downloadId (torrent hash)."""
@@ -1361,6 +1607,7 @@ def move_sonarr_series(series_id, new_root_folder_path):
 
     if response and response.get('id'):
         logger.info(f"Sonarr: Déplacement pour la série ID {series_id_int} accepté. L'opération se poursuit en arrière-plan.")
+        _sonarr_catalog.upsert(response)
         return True, None
 
     error_msg = "Échec de l'initiation du déplacement via l'édition de la série."
@@ -1423,6 +1670,7 @@ def move_radarr_movie(movie_id, new_root_folder_path):
 
     if response and response.get('id'):
         logger.info(f"Radarr: Move request for movie ID {movie_id_int} accepted. The operation will proceed in the background.")
+        _radarr_catalog.upsert(response)
         return True, None
 
     error_msg = "Échec de l'initiation du déplacement via l'API Radarr."
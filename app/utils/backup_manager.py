@@ -1,13 +1,21 @@
 # app/utils/backup_manager.py
 
 import os
+import shutil
+import tempfile
 import zipfile
 import logging
 from datetime import datetime
 from flask import current_app
 
+from app.utils import mapping_manager
+
 logger = logging.getLogger(__name__)
 
+# Instantané SQLite du torrent map, rangé à part dans l'archive : il n'est jamais
+# extrait tel quel par-dessus la base en WAL, mais rechargé via l'API backup.
+TORRENT_MAP_DB_ARCNAME = 'sqlite/torrent_map.db'
+
 def get_backup_dir():
     """Retourne le chemin du dossier des sauvegardes et le crée s'il n'existe pas."""
     backup_dir = os.path.join(current_app.instance_path, 'backups')
@@ -16,7 +24,8 @@ def get_backup_dir():
 
 def create_backup():
     """
-    Crée une archive ZIP de tous les fichiers .json du dossier 'instance'.
+    Crée une archive ZIP de tous les fichiers .json du dossier 'instance',
+    plus un instantané de la base SQLite du torrent map.
     Retourne le chemin du fichier de sauvegarde créé ou None en cas d'erreur.
     """
     try:
@@ -41,6 +50,16 @@ def create_backup():
                         arcname = os.path.relpath(file_path, instance_path)
                         zipf.write(file_path, arcname)
 
+            snapshot_dir = tempfile.mkdtemp()
+            try:
+                snapshot_path = mapping_manager.backup_torrent_map_db(os.path.join(snapshot_dir, 'torrent_map.db'))
+                zipf.write(snapshot_path, TORRENT_MAP_DB_ARCNAME)
+                json_files_found = True
+            except Exception as e:
+                logger.warning(f"Instantané de la base du torrent map impossible, sauvegarde JSON seule : {e}")
+            finally:
+                shutil.rmtree(snapshot_dir, ignore_errors=True)
+
         if not json_files_found:
             logger.warning("Aucun fichier .json n'a été trouvé dans le dossier 'instance' pour la sauvegarde.")
             os.remove(backup_filepath) # On supprime l'archive vide
@@ -104,7 +123,7 @@ def get_backups():
 def restore_backup(filename):
     """
     Restaure les fichiers d'une archive de sauvegarde spécifique
-    dans le dossier 'instance'.
+    dans le dossier 'instance', puis recharge la base du torrent map.
     """
     try:
         backup_dir = get_backup_dir()
@@ -115,8 +134,19 @@ def restore_backup(filename):
             return False, f"Le fichier de sauvegarde '{filename}' n'existe pas."
 
         with zipfile.ZipFile(filepath, 'r') as zipf:
+            names = zipf.namelist()
             # La restauration se fait dans le dossier 'instance'
-            zipf.extractall(current_app.instance_path)
+            zipf.extractall(current_app.instance_path, members=[n for n in names if n != TORRENT_MAP_DB_ARCNAME])
+
+            if TORRENT_MAP_DB_ARCNAME in names:
+                snapshot_dir = tempfile.mkdtemp()
+                try:
+                    mapping_manager.restore_torrent_map_db(zipf.extract(TORRENT_MAP_DB_ARCNAME, snapshot_dir))
+                finally:
+                    shutil.rmtree(snapshot_dir, ignore_errors=True)
+            elif _legacy_map_arcname() in names:
+                # Ancienne sauvegarde sans base : on réimporte le JSON restauré
+                mapping_manager.restore_torrent_map_db()
 
         logger.info(f"Sauvegarde '{filename}' restaurée avec succès.")
         return True, f"Sauvegarde '{filename}' restaurée avec succès."
@@ -124,6 +154,13 @@ def restore_backup(filename):
         logger.error(f"Erreur lors de la restauration de la sauvegarde '{filename}': {e}", exc_info=True)
         return False, f"Erreur lors de la restauration : {e}"
 
+def _legacy_map_arcname():
+    """Chemin (relatif à 'instance') du JSON historique du torrent map dans une archive."""
+    map_file = current_app.config.get('PENDING_TORRENTS_MAP_FILE')
+    if not map_file:
+        return None
+    return os.path.relpath(os.path.abspath(map_file), current_app.instance_path).replace(os.sep, '/')
+
 def delete_backup(filename):
     """
     Supprime un fichier de sauvegarde spécifique.
@@ -28,8 +28,14 @@ class SimpleCache:
 
     def get(self, key):
         data = self._load_cache()
-        entry = data.get(str(key))
+        return self._entry_value(data.get(str(key)))
 
+    def get_many(self, keys):
+        """Comme get(), mais pour plusieurs clés avec une seule lecture du fichier."""
+        data = self._load_cache()
+        return {key: self._entry_value(data.get(str(key))) for key in keys}
+
+    def _entry_value(self, entry):
         if not entry:
             return None
 
@@ -47,12 +53,20 @@ class SimpleCache:
             return None
 
     def set(self, key, value):
+        self.set_many({key: value})
+
+    def set_many(self, values):
+        """Écrit plusieurs entrées en une seule réécriture du fichier."""
+        if not values:
+            return
         with FileLock(self.lock_path, timeout=5):
             data = self._load_cache()
-            data[str(key)] = {
-                'value': value,
-                'timestamp': datetime.now().isoformat()
-            }
+            timestamp = datetime.now().isoformat()
+            for key, value in values.items():
+                data[str(key)] = {
+                    'value': value,
+                    'timestamp': timestamp
+                }
             try:
                 with open(self.cache_path, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=4)
@@ -103,6 +117,10 @@ def get_pending_lock(media_id):
     pending_locks = _load_json_file(PENDING_LOCKS_FILE)
     return pending_locks.get(str(media_id))
 
+def get_all_pending_locks():
+    """Récupère tous les verrous en attente en une seule lecture."""
+    return _load_json_file(PENDING_LOCKS_FILE)
+
 def remove_pending_lock(media_id):
     """Supprime un verrou en attente une fois qu'il a été traité."""
     pending_locks = _load_json_file(PENDING_LOCKS_FILE)
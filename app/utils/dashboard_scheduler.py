@@ -1,15 +1,23 @@
 # app/utils/dashboard_scheduler.py
 
+import copy
 import json
 import os
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime, timezone
 import re
 from flask import current_app
 
 from app.utils.prowlarr_client import get_latest_from_prowlarr, get_prowlarr_applications
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 from app.utils.status_manager import get_media_statuses
 from app.utils.release_parser import parse_release_data
+from app.utils.arr_client import get_arr_catalog_revision
+from app.utils.archive_manager import is_media_archived
 
 DASHBOARD_STATE_FILE = os.path.join('instance', 'dashboard_state.json')
 DASHBOARD_TORRENTS_FILE = os.path.join('instance', 'dashboard_torrents.json')
@@ -75,12 +83,198 @@ def get_dashboard_categories():
         current_app.logger.error(f"Could not read or parse instance/search_settings.json: {e}")
         return []
 
-def scheduled_dashboard_refresh():
+# --- ENRICHISSEMENT CONCURRENT ---
+# Version de la logique d'enrichissement : l'incrémenter force un ré-enrichissement complet.
+ENRICHMENT_VERSION = 1
+
+_refresh_progress_lock = threading.Lock()
+_refresh_progress = {'running': False, 'total': 0, 'done': 0, 'enriched': 0, 'statuses': 0, 'failed': 0, 'started_at': None}
+
+
+def _update_refresh_progress(**fields):
+    with _refresh_progress_lock:
+        _refresh_progress.update(fields)
+
+
+def get_refresh_progress():
+    """Avancement de l'étape d'enrichissement du dernier refresh (ou de celui en cours)."""
+    with _refresh_progress_lock:
+        return dict(_refresh_progress)
+
+
+class _UpstreamLimiter:
+    """Borne la concurrence (sémaphore) et le débit (appels/seconde) vers un service amont."""
+
+    def __init__(self, max_concurrent, max_per_second=0):
+        self._semaphore = threading.BoundedSemaphore(max(1, max_concurrent))
+        self._interval = 1.0 / max_per_second if max_per_second and max_per_second > 0 else 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    @contextmanager
+    def slot(self):
+        with self._semaphore:
+            if self._interval:
+                with self._lock:
+                    now = time.monotonic()
+                    wait = self._next_slot - now
+                    self._next_slot = max(now, self._next_slot) + self._interval
+                if wait > 0:
+                    time.sleep(wait)
+            yield
+
+
+class _LimitedClient:
+    """Proxy : chaque méthode du client enveloppé passe par le limiteur donné."""
+
+    def __init__(self, client, limiter):
+        self._client = client
+        self._limiter = limiter
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def _limited(*args, **kwargs):
+            with self._limiter.slot():
+                return attr(*args, **kwargs)
+        return _limited
+
+
+def _enrichment_fingerprint(torrent):
+    """Empreinte des entrées de l'enrichissement TMDb/guessit (titre et type)."""
+    payload = json.dumps([ENRICHMENT_VERSION, torrent.get('title'), torrent.get('type')])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _status_fingerprint(torrent):
+    """
+    Empreinte des entrées du calcul de statut : identifiants, données parsées et
+    révision de la série Sonarr / du film Radarr correspondant dans le catalogue
+    arr, et présence du média dans l'archive Plex. Elle change dès que le
+    catalogue signale une modification du média ou qu'il est (dés)archivé.
+    """
+    media_type = torrent.get('type')
+    if media_type == 'tv':
+        arr_revision = get_arr_catalog_revision('sonarr', 'tvdbId', torrent.get('tvdbId')) if torrent.get('tvdbId') else None
+        archive_id = f"tv_{torrent['tvdbId']}" if torrent.get('tvdbId') else None
+    else:
+        arr_revision = get_arr_catalog_revision('radarr', 'tmdbId', torrent.get('tmdbId')) if torrent.get('tmdbId') else None
+        archive_id = f"movie_{torrent['tmdbId']}" if media_type == 'movie' and torrent.get('tmdbId') else None
+    is_archived = is_media_archived(archive_id) if archive_id else False
+    payload = json.dumps([torrent.get('tmdbId'), torrent.get('tvdbId'), media_type,
+                          torrent.get('parsed_data'), arr_revision, is_archived], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _refresh_torrent(torrent, tmdb_client, limiters, full_rescan=False):
+    """
+    Enrichit le torrent si ses entrées ont changé, puis recalcule ses statuts si
+    leur empreinte a changé (ou si full_rescan). Retourne (enrichi, statuts_recalculés).
+    """
+    enriched = False
+    fingerprint = _enrichment_fingerprint(torrent)
+    if torrent.get('enrichment_fingerprint') != fingerprint or not torrent.get('parsed_data'):
+        _enrich_torrent_details(torrent, tmdb_client)
+        torrent['parsed_data'] = parse_release_data(torrent['title'])
+        torrent['enrichment_fingerprint'] = fingerprint
+        enriched = True
+
+    status_fingerprint = _status_fingerprint(torrent)
+    if not (full_rescan or enriched) and torrent.get('statuses') and torrent.get('status_fingerprint') == status_fingerprint:
+        return enriched, False
+
+    limiter = limiters['sonarr'] if torrent.get('type') == 'tv' else limiters['radarr']
+    with limiter.slot():
+        torrent['statuses'] = get_media_statuses(
+            title=torrent.get('title'),
+            tmdb_id=torrent.get('tmdbId'),
+            tvdb_id=torrent.get('tvdbId'),
+            media_type=torrent.get('type'),
+            parsed_data=torrent['parsed_data']
+        )
+    torrent['status_fingerprint'] = status_fingerprint
+    return enriched, True
+
+
+def _enrich_torrents_concurrently(torrents, tmdb_client, full_rescan=False):
+    """
+    Étape 4 du refresh : enrichissement et statuts sur un pool de threads borné
+    (DASHBOARD_ENRICH_WORKERS), avec limites de concurrence et de débit par service
+    amont. Les torrents dont l'empreinte d'enrichissement n'a pas changé ne refont
+    pas d'appels TMDb, et leurs statuts ne sont recalculés que si l'empreinte de
+    statut a changé (sauf full_rescan). Retourne les compteurs de l'exécution.
+    """
+    app = current_app._get_current_object()
+    config = app.config
+    workers = max(1, int(config.get('DASHBOARD_ENRICH_WORKERS', 8)))
+    arr_concurrency = int(config.get('DASHBOARD_ARR_CONCURRENCY', 4))
+    limiters = {
+        'tmdb': _UpstreamLimiter(int(config.get('DASHBOARD_TMDB_CONCURRENCY', 4)),
+                                 float(config.get('DASHBOARD_TMDB_RATE_PER_SECOND', 20))),
+        'sonarr': _UpstreamLimiter(arr_concurrency),
+        'radarr': _UpstreamLimiter(arr_concurrency),
+    }
+    # Un client TMDb par thread du pool : aucun état d'instance n'est partagé entre
+    # les workers, quel que soit le client fourni. Seul le limiteur est commun.
+    worker_clients = threading.local()
+
+    def _worker_tmdb_client():
+        if tmdb_client is None:
+            return None
+        client = getattr(worker_clients, 'client', None)
+        if client is None:
+            client = worker_clients.client = _LimitedClient(copy.copy(tmdb_client), limiters['tmdb'])
+        return client
+
+    total = len(torrents)
+    counters = {'total': total, 'done': 0, 'enriched': 0, 'statuses': 0, 'failed': 0}
+    _update_refresh_progress(running=True, started_at=datetime.now(timezone.utc).isoformat(), **counters)
+    progress_step = max(1, total // 10)
+    started = time.monotonic()
+
+    def _task(torrent):
+        with app.app_context():
+            return _refresh_torrent(torrent, _worker_tmdb_client(), limiters, full_rescan)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dashboard-enrich') as executor:
+            futures = {executor.submit(_task, torrent): torrent for torrent in torrents}
+            for future in as_completed(futures):
+                counters['done'] += 1
+                try:
+                    enriched, status_recomputed = future.result()
+                    counters['enriched'] += int(enriched)
+                    counters['statuses'] += int(status_recomputed)
+                except Exception as e:
+                    counters['failed'] += 1
+                    current_app.logger.warning(f"Scheduler: Enrichment failed for '{futures[future].get('title')}': {e}")
+                if counters['done'] % progress_step == 0 or counters['done'] == total:
+                    _update_refresh_progress(**counters)
+                    current_app.logger.info(
+                        f"Scheduler: Enrichment progress {counters['done']}/{total} "
+                        f"({counters['enriched']} enriched, {counters['statuses']} statuses recomputed, {counters['failed']} failed)."
+                    )
+    finally:
+        _update_refresh_progress(running=False, **counters)
+
+    current_app.logger.info(
+        f"Scheduler: Enrichment stage done in {time.monotonic() - started:.1f}s with {workers} workers. "
+        f"{counters['enriched']} enriched, {counters['statuses']} statuses recomputed, {counters['failed']} failed "
+        f"(full rescan: {full_rescan})."
+    )
+    return counters
+
+
+def scheduled_dashboard_refresh(full_rescan=False):
     """
     This function is designed to be called by the APScheduler.
     It fetches new torrents from Prowlarr and adds them to the existing list
     without altering the 'is_new' status of old torrents.
-    It also refreshes the statuses of all torrents.
+    Statuses are only recomputed for torrents whose status fingerprint changed
+    (new release, new enrichment or a change of the matching Sonarr/Radarr entry),
+    unless full_rescan is True.
     """
     current_app.logger.info("Scheduler: Starting scheduled dashboard refresh job.")
     try:
@@ -134,7 +328,7 @@ def scheduled_dashboard_refresh():
 
         # --- Prepare for enrichment ---
         tmdb_api_key = current_app.config.get('TMDB_API_KEY')
-        tmdb_client = TheMovieDBClient() if tmdb_api_key else None
+        tmdb_client = get_tmdb_client() if tmdb_api_key else None
         if not tmdb_client:
             current_app.logger.warning("Scheduler: TMDB_API_KEY not set. Status checks will be skipped.")
 
@@ -217,18 +411,8 @@ def scheduled_dashboard_refresh():
                      raw_info = next((t for t in raw_torrents_from_prowlarr if (_normalize_torrent(t) or {}).get('guid') == torrent.get('guid')), None)
                      torrent['type'] = _determine_media_type(raw_info, sonarr_cat_ids, radarr_cat_ids) if raw_info else 'movie'
 
-                _enrich_torrent_details(torrent, tmdb_client)
-
-                if 'parsed_data' not in torrent or not torrent['parsed_data']:
-                    torrent['parsed_data'] = parse_release_data(torrent['title'])
-
-                torrent['statuses'] = get_media_statuses(
-                    title=torrent.get('title'),
-                    tmdb_id=torrent.get('tmdbId'),
-                    tvdb_id=torrent.get('tvdbId'),
-                    media_type=torrent.get('type'),
-                    parsed_data=torrent['parsed_data']
-                )
+            # Enrichissement + statuts sur un pool de threads borné (voir _enrich_torrents_concurrently)
+            _enrich_torrents_concurrently(list(existing_torrents_map.values()), tmdb_client, full_rescan=full_rescan)
 
         # Step 5: Sort and save
         final_torrents = list(existing_torrents_map.values())
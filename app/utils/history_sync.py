@@ -0,0 +1,394 @@
+# app/utils/history_sync.py
+"""
+Synchronisation de l'historique « fantôme » de Plex vers la base d'archives.
+
+L'historique de visionnage d'un utilisateur est lu par pages ; dans chaque page,
+les entrées dont l'élément existe encore dans Plex sont écartées par lots (une
+requête /library/metadata par lot au lieu d'un entry.source() par entrée). Les
+entrées restantes sont regroupées par média (film : titre + année, série : titre)
+avant toute recherche : chaque média unique n'est résolu qu'une fois (présence
+dans Plex, puis TMDb/TVDB) sur un pool de threads borné, le débit vers TMDb/TVDB
+étant limité par un seau à jetons. La durée dépend ainsi du nombre de titres
+uniques, plus de la longueur de l'historique.
+
+iter_history_sync() produit des événements de progression (dict) transmis au
+navigateur au fil de l'eau. Un point de reprise par utilisateur retient les médias
+déjà résolus et archivés : une synchronisation interrompue repart de là, et le
+point de reprise est effacé quand un passage se termine sans erreur.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from filelock import FileLock, Timeout
+from flask import current_app
+from plexapi.exceptions import NotFound
+from thefuzz import fuzz
+
+from app.utils.archive_manager import add_archived_media, load_archive_data
+from app.utils.tmdb_client import get_tmdb_client
+from app.utils.tvdb_client import CustomTVDBClient
+
+HISTORY_PAGE_SIZE = 500
+PLEX_METADATA_BATCH_SIZE = 100
+DEFAULT_WORKERS = 4
+DEFAULT_RATE_PER_SECOND = 4
+SIMILARITY_THRESHOLD = 85
+# Le point de reprise est écrit toutes les N résolutions (et à l'interruption)
+CHECKPOINT_SAVE_EVERY = 20
+
+
+class _TokenBucket:
+    """Seau à jetons : `rate` appels par seconde en régime établi, rafales de `burst` appels."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# --- LECTURE DE L'HISTORIQUE ---
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_history_entry(elem):
+    attrib = elem.attrib
+    viewed_at = _int_or_none(attrib.get('viewedAt'))
+    return {
+        'type': attrib.get('type'),
+        'rating_key': attrib.get('ratingKey'),
+        'title': attrib.get('title'),
+        'show_title': attrib.get('grandparentTitle'),
+        # originallyAvailableAt = 'AAAA-MM-JJ'
+        'year': _int_or_none((attrib.get('originallyAvailableAt') or '')[:4]),
+        'viewed_at': datetime.fromtimestamp(viewed_at).isoformat() if viewed_at else None,
+        'season_number': _int_or_none(attrib.get('parentIndex')),
+        'episode_number': _int_or_none(attrib.get('index')),
+    }
+
+
+def _iter_history_pages(plex_server, page_size=None):
+    """Historique de visionnage (du plus récent au plus ancien), page par page."""
+    page_size = page_size or HISTORY_PAGE_SIZE
+    start = 0
+    while True:
+        headers = {'X-Plex-Container-Start': str(start), 'X-Plex-Container-Size': str(page_size)}
+        data = plex_server.query('/status/sessions/history/all', headers=headers, params={'sort': 'viewedAt:desc'})
+        elems = list(data) if data is not None else []
+        if elems:
+            yield [_parse_history_entry(elem) for elem in elems]
+        total = _int_or_none(data.attrib.get('totalSize')) if data is not None else None
+        start += page_size
+        if len(elems) < page_size or (total is not None and start >= total):
+            break
+
+
+def _existing_rating_keys(plex_server, rating_keys):
+    """ratingKeys (str) encore présents dans Plex, vérifiés par lots."""
+    existing = set()
+    keys = sorted({str(key) for key in rating_keys if key})
+    for start in range(0, len(keys), PLEX_METADATA_BATCH_SIZE):
+        chunk = keys[start:start + PLEX_METADATA_BATCH_SIZE]
+        try:
+            data = plex_server.query(f"/library/metadata/{','.join(chunk)}")
+        except NotFound:
+            continue  # Aucun élément du lot n'existe plus
+        for elem in (data if data is not None else []):
+            if elem.attrib.get('ratingKey'):
+                existing.add(elem.attrib['ratingKey'])
+    return existing
+
+
+def _group_key(entry):
+    """(clé unique, titre, type) du média d'une entrée, ou (None, None, None)."""
+    if entry['type'] == 'movie' and entry['title'] and entry['year']:
+        return f"movie_{entry['title']}_{entry['year']}", entry['title'], 'movie'
+    if entry['type'] == 'episode' and entry['show_title']:
+        return f"show_{entry['show_title']}", entry['show_title'], 'show'
+    return None, None, None
+
+
+# --- RÉSOLUTION D'UN MÉDIA UNIQUE ---
+
+def _best_tvdb_match(title, year, search_results):
+    if not search_results:
+        return None
+    if len(search_results) == 1:
+        return search_results[0]
+    highly_similar_results = [r for r in search_results if fuzz.ratio(title.lower(), r.get('name', '').lower()) > SIMILARITY_THRESHOLD]
+    if not highly_similar_results:
+        return None
+    best_match, min_year_diff = None, float('inf')
+    for result in highly_similar_results:
+        try:
+            result_year = int(result.get('year', 0))
+        except (ValueError, TypeError):
+            continue
+        if result_year > 0 and year is not None and abs(result_year - year) < min_year_diff:
+            min_year_diff = abs(result_year - year)
+            best_match = result
+    return best_match or highly_similar_results[0]
+
+
+def _resolve_group(group, plex_title_exists, tmdb_client, tvdb_client, limiter):
+    """
+    Résout un média : 'in_plex' s'il existe encore sous ce titre, sinon
+    [media_type, external_id, extra_data] ou None si TMDb/TVDB ne le trouvent pas.
+    """
+    title, year = group['title'], group['year']
+    if plex_title_exists(title):
+        return 'in_plex'
+
+    if group['media_type'] == 'movie':
+        limiter.acquire()
+        search_results = tmdb_client.search_movie(title)
+        filtered_results = [m for m in search_results if m.get('year') == str(year)]
+        return ['movie', filtered_results[0].get('id'), {}] if filtered_results else None
+
+    limiter.acquire()
+    best_match = _best_tvdb_match(title, year, tvdb_client.search_and_translate_series(title))
+    if not best_match:
+        return None
+    external_id = best_match.get('tvdb_id')
+    limiter.acquire()
+    total_episode_counts = tvdb_client.get_season_episode_counts(external_id)
+    current_app.logger.info(f"Match TVDB pour '{title}' -> ID: {external_id}, Counts: {total_episode_counts}")
+    return ['show', external_id, {'total_episode_counts': total_episode_counts}]
+
+
+def _archive_group(user_id, group, resolution):
+    """Archive les visionnages d'un média résolu. Retourne le nombre d'ajouts."""
+    media_type, external_id, extra_data = resolution
+    episodes = sorted(group['episodes'], key=lambda ep: (ep[0] if ep[0] is not None else -1, ep[1] if ep[1] is not None else -1))
+    archived = 0
+    for season_number, episode_number in episodes:
+        success, message = add_archived_media(
+            media_type=media_type,
+            external_id=external_id,
+            user_id=user_id,
+            season_number=season_number,
+            episode_number=episode_number,
+            total_episode_counts=extra_data.get('total_episode_counts'),
+            last_viewed_at=group['last_viewed_at']
+        )
+        if success:
+            archived += 1
+        else:
+            current_app.logger.info(f"Info/Échec archivage fantôme pour {group['key']}: {message}")
+    return archived
+
+
+# --- POINT DE REPRISE ---
+
+def _checkpoint_file():
+    return current_app.config.get('HISTORY_SYNC_CHECKPOINT_FILE') or None
+
+
+def _read_checkpoints_locked(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        current_app.logger.warning(f"Point de reprise illisible ({path}): {e}. Ignoré.")
+        return {}
+
+
+def _load_checkpoint(user_id):
+    path = _checkpoint_file()
+    checkpoint = {'resolved': {}, 'archived': set()}
+    if not path:
+        return checkpoint
+    try:
+        with FileLock(f"{path}.lock", timeout=10):
+            saved = _read_checkpoints_locked(path).get(str(user_id)) or {}
+    except Timeout:
+        current_app.logger.error(f"Impossible d'acquérir le verrou pour {path}. Synchronisation sans reprise.")
+        return checkpoint
+    for key, resolution in (saved.get('resolved') or {}).items():
+        # JSON convertit les numéros de saison en chaînes
+        if isinstance(resolution, list) and resolution[2].get('total_episode_counts'):
+            resolution[2]['total_episode_counts'] = {int(season): count for season, count in resolution[2]['total_episode_counts'].items()}
+        checkpoint['resolved'][key] = resolution
+    checkpoint['archived'] = set(saved.get('archived') or [])
+    return checkpoint
+
+
+def _save_checkpoint(user_id, checkpoint):
+    """Écrit (ou efface si checkpoint est None) le point de reprise de l'utilisateur."""
+    path = _checkpoint_file()
+    if not path:
+        return
+    try:
+        with FileLock(f"{path}.lock", timeout=10):
+            checkpoints = _read_checkpoints_locked(path)
+            if checkpoint is None:
+                if str(user_id) not in checkpoints:
+                    return
+                checkpoints.pop(str(user_id))
+            else:
+                checkpoints[str(user_id)] = {'resolved': checkpoint['resolved'], 'archived': sorted(checkpoint['archived']),
+                                             'updated_at': datetime.utcnow().isoformat()}
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(checkpoints, f, ensure_ascii=False)
+            os.replace(tmp_file, path)
+    except Timeout:
+        current_app.logger.error(f"Impossible d'acquérir le verrou pour {path} pour sauvegarder le point de reprise.")
+
+
+# --- SYNCHRONISATION ---
+
+def iter_history_sync(user_id, user_plex, resume=True):
+    """
+    Synchronise l'historique fantôme de l'utilisateur et produit des événements :
+      {'event': 'start', 'resumed'}            au démarrage ;
+      {'event': 'page', 'page', 'entries', 'ghost_entries', 'unique_titles'}  après chaque page lue ;
+      {'event': 'progress', 'done', 'total', 'title', 'status'}  après chaque média résolu ;
+      {'event': 'done', ...résumé}            à la fin.
+    """
+    app = current_app._get_current_object()
+    logger = current_app.logger
+    workers = max(1, int(app.config.get('HISTORY_SYNC_WORKERS', DEFAULT_WORKERS)))
+    limiter = _TokenBucket(float(app.config.get('HISTORY_SYNC_RATE_PER_SECOND', DEFAULT_RATE_PER_SECOND)))
+    tmdb_client = get_tmdb_client()
+    tvdb_client = CustomTVDBClient()
+
+    if resume:
+        checkpoint = _load_checkpoint(user_id)
+    else:
+        _save_checkpoint(user_id, None)
+        checkpoint = {'resolved': {}, 'archived': set()}
+    yield {'event': 'start', 'resumed': bool(checkpoint['resolved'])}
+
+    # Médias déjà archivés : (titre en minuscules, année), écartés avant toute recherche
+    existing_archives = {
+        (media_info.get('title', '').lower(), str(media_info.get('year', '')))
+        for media_info in load_archive_data().values()
+        if media_info.get('title') and media_info.get('year')
+    }
+    logger.info(f"{len(existing_archives)} média(s) déjà archivé(s) chargé(s).")
+
+    # Présence dans Plex par titre, partagée entre les threads
+    title_exists_cache, title_exists_lock = {}, threading.Lock()
+
+    def plex_title_exists(title):
+        with title_exists_lock:
+            if title in title_exists_cache:
+                return title_exists_cache[title]
+        exists = any(hasattr(item, 'title') and item.title.lower() == title.lower() for item in user_plex.search(title))
+        with title_exists_lock:
+            title_exists_cache[title] = exists
+        return exists
+
+    def task(group):
+        with app.app_context():
+            return _resolve_group(group, plex_title_exists, tmdb_client, tvdb_client, limiter)
+
+    summary = {'entries': 0, 'ghost_entries': 0, 'unique_titles': 0, 'resolved': 0, 'in_plex': 0,
+               'not_found': 0, 'failed': 0, 'archived_titles': 0, 'archived_entries': 0}
+    groups = {}
+    futures = {}
+    completed = False
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='history-sync')
+    try:
+        # --- 1. Lecture paginée, dédoublonnage, lancement des résolutions au fil de l'eau ---
+        for page_number, page in enumerate(_iter_history_pages(user_plex), 1):
+            summary['entries'] += len(page)
+            still_in_plex = _existing_rating_keys(user_plex, (entry['rating_key'] for entry in page))
+            for entry in page:
+                if entry['rating_key'] and entry['rating_key'] in still_in_plex:
+                    continue
+                key, title, media_type = _group_key(entry)
+                if not key:
+                    continue
+                if entry['year'] and (title.lower(), str(entry['year'])) in existing_archives:
+                    continue
+                summary['ghost_entries'] += 1
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = {'key': key, 'title': title, 'media_type': media_type, 'year': entry['year'],
+                                           'last_viewed_at': None, 'episodes': set()}
+                    if key not in checkpoint['archived'] and key not in checkpoint['resolved']:
+                        futures[executor.submit(task, group)] = key
+                if entry['viewed_at'] and (not group['last_viewed_at'] or entry['viewed_at'] > group['last_viewed_at']):
+                    group['last_viewed_at'] = entry['viewed_at']
+                group['episodes'].add((entry['season_number'], entry['episode_number']) if media_type == 'show' else (None, None))
+            summary['unique_titles'] = len(groups)
+            yield {'event': 'page', 'page': page_number, 'entries': summary['entries'],
+                   'ghost_entries': summary['ghost_entries'], 'unique_titles': len(groups)}
+
+        # --- 2. Archivage, dans l'ordre où les résolutions aboutissent ---
+        def outcomes():
+            # Médias résolus lors d'un passage interrompu : pas de nouvelle recherche
+            for key, resolution in checkpoint['resolved'].items():
+                if key in groups and key not in checkpoint['archived']:
+                    yield key, resolution, None
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result(), None
+                except Exception as e:
+                    yield futures[future], None, e
+
+        total = sum(1 for key in groups if key not in checkpoint['archived'])
+        done = 0
+        for key, resolution, error in outcomes():
+            group = groups[key]
+            done += 1
+            if error is not None:
+                summary['failed'] += 1
+                status = 'failed'
+                logger.warning(f"Synchronisation de l'historique: échec de la résolution de '{group['title']}': {error}")
+            else:
+                checkpoint['resolved'][key] = resolution
+                if resolution == 'in_plex':
+                    summary['in_plex'] += 1
+                    status = 'in_plex'
+                    logger.info(f"Le média '{group['title']}' existe toujours dans Plex. Ignoré.")
+                elif resolution is None:
+                    summary['not_found'] += 1
+                    status = 'not_found'
+                else:
+                    summary['resolved'] += 1
+                    archived = _archive_group(user_id, group, resolution)
+                    summary['archived_entries'] += archived
+                    summary['archived_titles'] += int(archived > 0)
+                    status = 'archived' if archived else 'already_archived'
+                checkpoint['archived'].add(key)
+            if done % CHECKPOINT_SAVE_EVERY == 0:
+                _save_checkpoint(user_id, checkpoint)
+            yield {'event': 'progress', 'done': done, 'total': total, 'title': group['title'], 'status': status}
+        completed = True
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        # Passage complet et sans échec : plus rien à reprendre
+        _save_checkpoint(user_id, None if completed and not summary['failed'] else checkpoint)
+
+    logger.info(f"Synchronisation de l'historique terminée pour {user_id}: {summary}")
+    yield {'event': 'done', **summary}
@@ -0,0 +1,133 @@
+# app/utils/http_client.py
+"""
+Couche HTTP partagée : une `requests.Session` par service amont (radarr, sonarr,
+prowlarr, rtorrent...) avec pool de connexions keep-alive, instances de
+HTTPDigestAuth réutilisées (le nonce est conservé, plus d'aller-retour 401 à
+chaque appel) et statistiques par hôte (compteurs + histogramme de latence).
+"""
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPDigestAuth
+from flask import current_app, has_app_context
+
+DEFAULT_POOL_CONNECTIONS = 4
+DEFAULT_POOL_MAXSIZE = 16
+
+# Bornes supérieures (en ms) des buckets de l'histogramme de latence.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000)
+
+_lock = threading.Lock()
+_sessions = {}
+_digest_auths = {}
+_host_stats = {}
+
+
+def _pool_settings():
+    if has_app_context():
+        config = current_app.config
+        return (int(config.get('HTTP_POOL_CONNECTIONS', DEFAULT_POOL_CONNECTIONS)),
+                int(config.get('HTTP_POOL_MAXSIZE', DEFAULT_POOL_MAXSIZE)))
+    return DEFAULT_POOL_CONNECTIONS, DEFAULT_POOL_MAXSIZE
+
+
+def _bucket_label(elapsed_ms):
+    for bound in LATENCY_BUCKETS_MS:
+        if elapsed_ms <= bound:
+            return f"<={bound}ms"
+    return f">{LATENCY_BUCKETS_MS[-1]}ms"
+
+
+_BUCKET_LABELS = [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+
+
+def _record_response(response, *args, **kwargs):
+    """Hook `response` : alimente les compteurs et l'histogramme de l'hôte."""
+    host = urlsplit(response.url).netloc or 'unknown'
+    elapsed_ms = response.elapsed.total_seconds() * 1000.0 if response.elapsed else 0.0
+    with _lock:
+        stats = _host_stats.setdefault(host, {
+            'requests': 0,
+            'errors': 0,
+            'total_ms': 0.0,
+            'max_ms': 0.0,
+            'histogram': {label: 0 for label in _BUCKET_LABELS},
+        })
+        stats['requests'] += 1
+        if response.status_code >= 400:
+            stats['errors'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['histogram'][_bucket_label(elapsed_ms)] += 1
+    return response
+
+
+def _build_session():
+    pool_connections, pool_maxsize = _pool_settings()
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.hooks['response'].append(_record_response)
+    return session
+
+
+def get_session(service):
+    """Retourne la session partagée (keep-alive, pool) associée au service."""
+    session = _sessions.get(service)
+    if session is not None:
+        return session
+    with _lock:
+        session = _sessions.get(service)
+        if session is None:
+            session = _build_session()
+            _sessions[service] = session
+        return session
+
+
+def get_digest_auth(user, password):
+    """
+    Retourne une instance HTTPDigestAuth partagée pour ce couple d'identifiants.
+    HTTPDigestAuth garde le dernier nonce (par thread) : les requêtes suivantes
+    envoient directement l'en-tête Authorization au lieu d'essuyer un 401.
+    """
+    if not user or not password:
+        return None
+    key = (user, password)
+    with _lock:
+        auth = _digest_auths.get(key)
+        if auth is None:
+            auth = HTTPDigestAuth(user, password)
+            _digest_auths[key] = auth
+        return auth
+
+
+def request(service, method, url, **kwargs):
+    """Équivalent de `requests.request` passant par la session du service."""
+    return get_session(service).request(method, url, **kwargs)
+
+
+def get_http_stats():
+    """Instantané des statistiques par hôte (latence moyenne incluse)."""
+    with _lock:
+        snapshot = {}
+        for host, stats in _host_stats.items():
+            entry = dict(stats)
+            entry['histogram'] = dict(stats['histogram'])
+            entry['avg_ms'] = round(stats['total_ms'] / stats['requests'], 2) if stats['requests'] else 0.0
+            entry['total_ms'] = round(stats['total_ms'], 2)
+            entry['max_ms'] = round(stats['max_ms'], 2)
+            snapshot[host] = entry
+        return {'services': sorted(_sessions.keys()), 'hosts': snapshot}
+
+
+def reset_http_clients():
+    """Ferme les sessions et remet les statistiques à zéro (config modifiée, tests)."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+        _digest_auths.clear()
+        _host_stats.clear()
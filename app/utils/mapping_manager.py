@@ -2,6 +2,9 @@
 import json
 import os
 import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
 from filelock import FileLock, Timeout
 from flask import current_app # current_app sera utilisé pour obtenir la config et le logger
 from datetime import datetime
@@ -41,53 +44,171 @@ def _get_map_file_path_and_logger():
             raise
     return path, logger
 
-def load_torrent_map():
-    """Loads the torrent map from the JSON file with file locking."""
+# --- STOCKAGE SQLITE (WAL) ---
+# Le map vit dans une base SQLite : une ligne par hash, colonnes indexées pour les
+# recherches (status, release_name, folder_name) et l'entrée complète en JSON dans
+# `data`. Chaque écriture ne touche que sa ligne au lieu de réécrire tout le fichier.
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS torrents (
+    hash TEXT PRIMARY KEY,
+    release_name TEXT,
+    status TEXT,
+    folder_name TEXT,
+    updated_at TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_torrents_status ON torrents(status);
+CREATE INDEX IF NOT EXISTS idx_torrents_release_name ON torrents(release_name);
+CREATE INDEX IF NOT EXISTS idx_torrents_folder_name ON torrents(folder_name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_thread_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_db_paths = set()
+
+
+def _get_db_path(map_file, logger):
+    """Chemin de la base SQLite : TORRENT_MAP_DB_FILE, sinon dérivé du fichier JSON historique."""
+    try:
+        db_path = current_app.config.get('TORRENT_MAP_DB_FILE')
+    except RuntimeError:
+        db_path = os.getenv('MMS_TORRENT_MAP_DB_FILE_FALLBACK')
+    if not db_path:
+        db_path = os.path.splitext(map_file)[0] + '.db'
+    db_dir = os.path.dirname(db_path)
+    if db_dir and not os.path.exists(db_dir):
+        os.makedirs(db_dir, exist_ok=True)
+        logger.info(f"Created directory for torrent map database: {db_dir}")
+    return db_path
+
+
+@contextmanager
+def _transaction(conn):
+    """Transaction d'écriture explicite (BEGIN IMMEDIATE) : commit ou rollback."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
+
+
+def _row_values(torrent_hash, data):
+    return (
+        torrent_hash,
+        data.get('release_name'),
+        data.get('status'),
+        data.get('folder_name'),
+        data.get('updated_at'),
+        json.dumps(data, ensure_ascii=False),
+    )
+
+
+def _upsert_rows(conn, entries):
+    conn.executemany(
+        """
+        INSERT INTO torrents (hash, release_name, status, folder_name, updated_at, data)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(hash) DO UPDATE SET
+            release_name = excluded.release_name,
+            status = excluded.status,
+            folder_name = excluded.folder_name,
+            updated_at = excluded.updated_at,
+            data = excluded.data
+        """,
+        [_row_values(torrent_hash, data) for torrent_hash, data in entries.items()]
+    )
+
+
+def _fetch_entry(conn, torrent_hash):
+    row = conn.execute("SELECT data FROM torrents WHERE hash = ?", (torrent_hash,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _import_legacy_json_map(conn, map_file, logger):
+    """Import unique du fichier pending_torrents_map.json existant (le fichier est conservé)."""
+    with _transaction(conn):
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_import_done'").fetchone():
+            return
+        imported = 0
+        if os.path.exists(map_file):
+            try:
+                with open(map_file, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                data = json.loads(content) if content.strip() else {}
+                if isinstance(data, dict):
+                    _upsert_rows(conn, {h: d for h, d in data.items() if isinstance(d, dict)})
+                    imported = len(data)
+                else:
+                    logger.warning(f"Content of {map_file} is not a dictionary. Nothing imported.")
+            except (json.JSONDecodeError, IOError) as e:
+                logger.error(f"Could not import legacy torrent map {map_file}: {e}")
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_import_done', ?)", (datetime.utcnow().isoformat(),))
+    if imported:
+        logger.info(f"Imported {imported} torrent(s) from legacy map {map_file} into SQLite store.")
+
+
+def _get_connection():
+    """Connexion SQLite propre au thread courant (une par base), initialisée au premier accès."""
     map_file, logger = _get_map_file_path_and_logger()
-    lock_file = map_file + ".lock"
-    lock = FileLock(lock_file, timeout=10)
+    db_path = _get_db_path(map_file, logger)
+
+    connections = getattr(_thread_local, 'connections', None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+    conn = connections.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        connections[db_path] = conn
+
+    if db_path not in _initialized_db_paths:
+        with _init_lock:
+            if db_path not in _initialized_db_paths:
+                conn.executescript(_SCHEMA)
+                _import_legacy_json_map(conn, map_file, logger)
+                _initialized_db_paths.add(db_path)
+    return conn, logger
+
+
+def close_torrent_map_connections():
+    """Ferme les connexions SQLite ouvertes par le thread courant."""
+    connections = getattr(_thread_local, 'connections', None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+    with _init_lock:
+        _initialized_db_paths.clear()
+
 
+def load_torrent_map():
+    """Returns the whole torrent map as a dict {hash: data}, in insertion order."""
+    conn, logger = _get_connection()
     try:
-        with lock:
-            if not os.path.exists(map_file):
-                return {}
-            with open(map_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if not content.strip(): # Fichier vide ou seulement des espaces blancs
-                    logger.info(f"Torrent map file {map_file} is empty. Returning empty map.")
-                    return {}
-                try:
-                    data = json.loads(content)
-                    if not isinstance(data, dict):
-                        logger.warning(f"Content of {map_file} is not a dictionary. Returning empty map.")
-                        return {}
-                    return data
-                except json.JSONDecodeError:
-                    logger.error(f"Error decoding JSON from {map_file}. Returning empty map.")
-                    return {}
-    except Timeout:
-        logger.error(f"Could not acquire lock for {map_file} within timeout period.")
-        raise # Relancer pour que l'appelant puisse gérer
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while loading torrent map {map_file}: {e}")
+        rows = conn.execute("SELECT hash, data FROM torrents ORDER BY rowid").fetchall()
+    except sqlite3.Error as e:
+        logger.error(f"An unexpected error occurred while loading torrent map: {e}")
         raise
+    return {torrent_hash: json.loads(data) for torrent_hash, data in rows}
 
 def save_torrent_map(data):
-    """Saves the torrent map to the JSON file with file locking."""
-    map_file, logger = _get_map_file_path_and_logger()
-    lock_file = map_file + ".lock"
-    lock = FileLock(lock_file, timeout=10)
-
+    """Replaces the whole torrent map with `data` in a single transaction."""
+    conn, logger = _get_connection()
     try:
-        with lock:
-            with open(map_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            logger.debug(f"Torrent map saved to {map_file}")
-    except Timeout:
-        logger.error(f"Could not acquire lock for {map_file} to save. Data not saved.")
-        raise
-    except Exception as e:
-        logger.error(f"An unexpected error occurred while saving torrent map to {map_file}: {e}")
+        with _transaction(conn):
+            conn.execute("DELETE FROM torrents")
+            _upsert_rows(conn, data)
+        logger.debug(f"Torrent map saved ({len(data)} entries).")
+    except sqlite3.Error as e:
+        logger.error(f"An unexpected error occurred while saving torrent map: {e}")
         raise
 
 def add_or_update_torrent_in_map(release_name, torrent_hash, status, seedbox_download_path, folder_name=None, app_type=None, target_id=None, label=None, original_torrent_name=None):
@@ -95,46 +216,73 @@ def add_or_update_torrent_in_map(release_name, torrent_hash, status, seedbox_dow
     Fonction unique et centralisée pour ajouter ou mettre à jour un torrent.
     N'écrase les champs optionnels que s'ils sont fournis.
     """
-    torrents = load_torrent_map()
-    torrent_data = torrents.get(torrent_hash, {})
-
-    # Champs obligatoires ou toujours mis à jour
-    torrent_data.update({
-        "release_name": release_name,
-        "torrent_hash": torrent_hash,
-        "status": status,
-        "seedbox_download_path": seedbox_download_path,
-        "folder_name": folder_name if folder_name else os.path.basename(seedbox_download_path),
-        "updated_at": datetime.utcnow().isoformat()
-    })
-
-    # Champs optionnels : on ne les met à jour que s'ils sont explicitement fournis
-    if app_type is not None:
-        torrent_data["app_type"] = app_type
-    if target_id is not None:
-        torrent_data["target_id"] = target_id
-    if label is not None:
-        torrent_data["label"] = label
-    if original_torrent_name is not None:
-        torrent_data["original_torrent_name"] = original_torrent_name
-
-    # Initialiser les champs s'ils n'existent pas
-    if "added_at" not in torrent_data:
-        torrent_data["added_at"] = datetime.utcnow().isoformat()
-    # S'assurer que les champs optionnels ont une valeur par défaut si l'entrée est nouvelle
-    torrent_data.setdefault("app_type", "unknown")
-    torrent_data.setdefault("target_id", "unknown")
-    torrent_data.setdefault("label", "unknown")
-    torrent_data.setdefault("original_torrent_name", "N/A")
-
-    torrents[torrent_hash] = torrent_data
-    save_torrent_map(torrents)
+    conn, _ = _get_connection()
+    with _transaction(conn):
+        torrent_data = _fetch_entry(conn, torrent_hash) or {}
+
+        # Champs obligatoires ou toujours mis à jour
+        torrent_data.update({
+            "release_name": release_name,
+            "torrent_hash": torrent_hash,
+            "status": status,
+            "seedbox_download_path": seedbox_download_path,
+            "folder_name": folder_name if folder_name else os.path.basename(seedbox_download_path),
+            "updated_at": datetime.utcnow().isoformat()
+        })
+
+        # Champs optionnels : on ne les met à jour que s'ils sont explicitement fournis
+        if app_type is not None:
+            torrent_data["app_type"] = app_type
+        if target_id is not None:
+            torrent_data["target_id"] = target_id
+        if label is not None:
+            torrent_data["label"] = label
+        if original_torrent_name is not None:
+            torrent_data["original_torrent_name"] = original_torrent_name
+
+        # Initialiser les champs s'ils n'existent pas
+        if "added_at" not in torrent_data:
+            torrent_data["added_at"] = datetime.utcnow().isoformat()
+        # S'assurer que les champs optionnels ont une valeur par défaut si l'entrée est nouvelle
+        torrent_data.setdefault("app_type", "unknown")
+        torrent_data.setdefault("target_id", "unknown")
+        torrent_data.setdefault("label", "unknown")
+        torrent_data.setdefault("original_torrent_name", "N/A")
+
+        _upsert_rows(conn, {torrent_hash: torrent_data})
+
+def update_torrents_in_map(updates):
+    """
+    Mise à jour groupée : `updates` est un dict {hash: {champ: valeur}} fusionné dans
+    les entrées existantes, en une seule transaction. Les hashes inconnus sont ignorés.
+    Retourne l'ensemble des hashes effectivement mis à jour.
+    """
+    conn, logger = _get_connection()
+    if not updates:
+        return set()
+    now = datetime.utcnow().isoformat()
+    updated = {}
+    try:
+        with _transaction(conn):
+            for torrent_hash, fields in updates.items():
+                entry = _fetch_entry(conn, torrent_hash)
+                if entry is None:
+                    logger.warning(f"Torrent {torrent_hash} not found in map for batch update.")
+                    continue
+                entry.update(fields)
+                entry['updated_at'] = now
+                updated[torrent_hash] = entry
+            _upsert_rows(conn, updated)
+    except sqlite3.Error as e:
+        logger.error(f"Failed to apply batch update to torrent map: {e}")
+        return set()
+    logger.info(f"Batch update applied to {len(updated)} torrent(s) in map.")
+    return set(updated)
 
 def get_torrent_by_hash(torrent_hash):
     """Retrieves a torrent entry by its torrent_hash."""
-    _, logger = _get_map_file_path_and_logger()
-    torrents = load_torrent_map()
-    association = torrents.get(torrent_hash)
+    conn, logger = _get_connection()
+    association = _fetch_entry(conn, torrent_hash)
     if association:
         logger.debug(f"Association found for torrent_hash '{torrent_hash}'.")
     else:
@@ -148,62 +296,62 @@ def find_torrent_by_release_name(item_name_in_staging):
     (which should match the 'release_name' stored in the map).
     Returns a tuple (torrent_hash, data_dict) or (None, None).
     """
-    _, logger = _get_map_file_path_and_logger()
-    torrents = load_torrent_map()
+    conn, logger = _get_connection()
 
     # item_name_in_staging ne devrait pas avoir .torrent, mais au cas où, on s'assure
     if item_name_in_staging.lower().endswith(".torrent"):
         item_name_in_staging = item_name_in_staging[:-len(".torrent")]
 
     logger.debug(f"Searching for torrent by release_name: '{item_name_in_staging}'")
-    for torrent_hash, data in torrents.items():
-        # La 'release_name' stockée ne devrait pas non plus avoir .torrent
-        stored_release_name = data.get("release_name", "")
-        if stored_release_name == item_name_in_staging:
-            logger.info(f"Found torrent_hash '{torrent_hash}' for release_name '{item_name_in_staging}'.")
-            return torrent_hash, data
+    row = conn.execute(
+        "SELECT hash, data FROM torrents WHERE release_name = ? ORDER BY rowid LIMIT 1",
+        (item_name_in_staging,)
+    ).fetchone()
+    if row:
+        logger.info(f"Found torrent_hash '{row[0]}' for release_name '{item_name_in_staging}'.")
+        return row[0], json.loads(row[1])
     logger.info(f"No torrent found for release_name '{item_name_in_staging}'.")
     return None, None
 
 def update_torrent_status_in_map(torrent_hash, new_status, status_message=None):
     """Met à jour le statut et le message d'un torrent sans perdre les autres données."""
-    _, logger = _get_map_file_path_and_logger()
-    torrents = load_torrent_map()
-    if torrent_hash in torrents:
-        # On modifie uniquement les champs nécessaires
-        torrents[torrent_hash]['status'] = new_status
-        torrents[torrent_hash]['updated_at'] = datetime.utcnow().isoformat()
-        if status_message:
-            torrents[torrent_hash]['status_message'] = status_message
+    conn, logger = _get_connection()
+    try:
+        with _transaction(conn):
+            entry = _fetch_entry(conn, torrent_hash)
+            if entry is not None:
+                # On modifie uniquement les champs nécessaires
+                entry['status'] = new_status
+                entry['updated_at'] = datetime.utcnow().isoformat()
+                if status_message:
+                    entry['status_message'] = status_message
+                _upsert_rows(conn, {torrent_hash: entry})
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save torrent map after updating status for {torrent_hash}: {e}")
+        return False
 
-        try:
-            save_torrent_map(torrents)
-            logger.info(f"Updated status for torrent {torrent_hash} to '{new_status}'.")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to save torrent map after updating status for {torrent_hash}: {e}")
-            return False
-    else:
+    if entry is None:
         logger.warning(f"Torrent {torrent_hash} not found in map for status update to '{new_status}'.")
         return False
+    logger.info(f"Updated status for torrent {torrent_hash} to '{new_status}'.")
+    return True
 
 def remove_torrent_from_map(torrent_hash):
     """Removes a torrent entry from the map."""
-    _, logger = _get_map_file_path_and_logger()
-    torrents = load_torrent_map()
-    if torrent_hash in torrents:
-        del torrents[torrent_hash]
-        try:
-            save_torrent_map(torrents)
-            logger.info(f"Removed torrent {torrent_hash} from map.")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to save torrent map after removing {torrent_hash}: {e}")
-            return False
-    else:
-        logger.warning(f"Torrent {torrent_hash} not found in map for removal.")
+    conn, logger = _get_connection()
+    try:
+        with _transaction(conn):
+            deleted = conn.execute("DELETE FROM torrents WHERE hash = ?", (torrent_hash,)).rowcount
+    except sqlite3.Error as e:
+        logger.error(f"Failed to save torrent map after removing {torrent_hash}: {e}")
         return False
 
+    if deleted:
+        logger.info(f"Removed torrent {torrent_hash} from map.")
+        return True
+    logger.warning(f"Torrent {torrent_hash} not found in map for removal.")
+    return False
+
 def get_all_torrents_in_map():
     """Retrieves all torrent entries from the map."""
     _, logger = _get_map_file_path_and_logger()
@@ -212,10 +360,45 @@ def get_all_torrents_in_map():
 
 def get_all_torrent_hashes():
     """Retrieves a set of all known torrent hashes from the map."""
-    _, logger = _get_map_file_path_and_logger()
+    conn, logger = _get_connection()
     logger.debug("Loading all torrent hashes from map.")
-    torrents = load_torrent_map()
-    return set(torrents.keys())
+    return {row[0] for row in conn.execute("SELECT hash FROM torrents")}
+
+# --- SAUVEGARDE / RESTAURATION ---
+# La base est en WAL : une copie brute du .db peut omettre les pages encore dans le
+# journal. On passe donc par l'API backup de SQLite, qui produit un instantané cohérent.
+
+def backup_torrent_map_db(dest_path):
+    """Écrit un instantané cohérent de la base du torrent map dans `dest_path`."""
+    conn, logger = _get_connection()
+    dest = sqlite3.connect(dest_path)
+    try:
+        conn.backup(dest)
+    finally:
+        dest.close()
+    logger.debug(f"Torrent map database snapshot written to {dest_path}.")
+    return dest_path
+
+def restore_torrent_map_db(snapshot_path=None):
+    """
+    Recharge le torrent map après restauration d'une sauvegarde.
+    Avec un instantané SQLite, il remplace le contenu de la base ; sans instantané
+    (ancienne sauvegarde JSON uniquement), la base est vidée et le JSON restauré réimporté.
+    """
+    conn, logger = _get_connection()
+    if snapshot_path:
+        source = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(conn)
+        finally:
+            source.close()
+        logger.info(f"Torrent map database restored from snapshot {os.path.basename(snapshot_path)}.")
+        return
+    map_file, _ = _get_map_file_path_and_logger()
+    with _transaction(conn):
+        conn.execute("DELETE FROM torrents")
+        conn.execute("DELETE FROM meta WHERE key = 'json_import_done'")
+    _import_legacy_json_map(conn, map_file, logger)
 
 def _get_ignored_torrents_file_path():
     """
@@ -4,7 +4,7 @@ from flask import current_app
 
 from app.utils.arr_client import get_all_sonarr_series, get_all_radarr_movies
 from app.utils.plex_client import get_plex_admin_server, find_plex_media_by_external_id
-from app.utils.tmdb_client import TheMovieDBClient
+from app.utils.tmdb_client import get_tmdb_client
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +18,7 @@ class MediaInfoManager:
     def _init_clients_if_needed(self):
         if self.tmdb_client is None:
             try:
-                self.tmdb_client = TheMovieDBClient()
+                self.tmdb_client = get_tmdb_client()
             except ValueError:
                 logger.warning("Client TMDB non initialisé (clé API manquante).")
         if self.plex_server is None:
@@ -0,0 +1,299 @@
+# app/utils/metadata_cache.py
+"""
+Cache disque (SQLite) des réponses TMDb / TVDB.
+
+Chaque entrée est indexée par (service, endpoint, arguments) — typiquement l'id
+et la langue — et expire selon un palier de durée de vie :
+  - 'long'   : faits quasi immuables (correspondances d'ids, titres originaux) ;
+  - 'medium' : fiches et recherches (synopsis, affiches) ;
+  - 'short'  : données qui bougent (statut de diffusion, nombre d'épisodes).
+Les réponses vides (introuvable, aucun résultat) sont aussi mises en cache, avec
+une durée plus courte (cache négatif). Les appels en erreur ne le sont jamais.
+
+La même base tient aussi le registre de consommation de quota des API limitées
+(YouTube) : unités dépensées par service et par période.
+"""
+import functools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, has_app_context
+
+from app.utils import single_flight
+
+logger = logging.getLogger(__name__)
+
+TIER_LONG = 'long'
+TIER_MEDIUM = 'medium'
+TIER_SHORT = 'short'
+
+# Durées par défaut (heures), surchargées par METADATA_CACHE_TTL_<PALIER>_HOURS
+DEFAULT_TTL_HOURS = {TIER_LONG: 720, TIER_MEDIUM: 24, TIER_SHORT: 6, 'negative': 2}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (
+    service TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    cache_key TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    negative INTEGER NOT NULL DEFAULT 0,
+    data TEXT,
+    PRIMARY KEY (service, endpoint, cache_key)
+);
+CREATE INDEX IF NOT EXISTS idx_metadata_expires_at ON metadata(expires_at);
+CREATE TABLE IF NOT EXISTS quota_usage (
+    service TEXT NOT NULL,
+    period TEXT NOT NULL,
+    units INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (service, period)
+);
+"""
+
+_thread_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def _get_db_path():
+    if not has_app_context():
+        return None
+    return current_app.config.get('METADATA_CACHE_DB_FILE') or None
+
+
+def _ttl_seconds(tier):
+    hours = DEFAULT_TTL_HOURS[tier]
+    if has_app_context():
+        hours = float(current_app.config.get(f'METADATA_CACHE_TTL_{tier.upper()}_HOURS', hours))
+    return hours * 3600
+
+
+def _get_connection():
+    """Connexion SQLite par thread, ou None si le cache est désactivé."""
+    path = _get_db_path()
+    if not path:
+        return None
+    connections = getattr(_thread_local, 'connections', None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+    connection = connections.get(path)
+    if connection is not None:
+        return connection
+
+    with _init_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        if path not in _initialized_paths:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            # Ménage des entrées expirées une fois par processus
+            connection.execute('DELETE FROM metadata WHERE expires_at < ?', (time.time(),))
+            _initialized_paths.add(path)
+    connections[path] = connection
+    return connection
+
+
+def _count(service, endpoint, field):
+    with _stats_lock:
+        stats = _stats.setdefault(f"{service}.{endpoint}", {'hits': 0, 'negative_hits': 0, 'misses': 0, 'stores': 0, 'errors_not_cached': 0})
+        stats[field] += 1
+
+
+def skip_caching():
+    """
+    À appeler depuis une méthode décorée par @cached lorsqu'elle renvoie une valeur
+    de repli suite à une erreur (réseau, 5xx...) : ce résultat ne sera pas mis en cache.
+    """
+    _thread_local.skip = True
+
+
+def call_tracking_skip(func, *args, **kwargs):
+    """
+    Exécute func et retourne (résultat, skipped). Sert aux threads de travail :
+    l'appelant relaie skip_caching() si l'un d'eux a renvoyé une valeur de repli.
+    """
+    previous_skip = getattr(_thread_local, 'skip', False)
+    _thread_local.skip = False
+    try:
+        result = func(*args, **kwargs)
+        return result, _thread_local.skip
+    finally:
+        _thread_local.skip = previous_skip
+
+
+def _is_negative(value):
+    return value is None or value == [] or value == {}
+
+
+def _open_or_none():
+    try:
+        return _get_connection()
+    except sqlite3.Error as e:
+        logger.warning(f"Metadata cache indisponible ({e}).")
+        return None
+
+
+def _lookup_row(connection, service, endpoint, cache_key):
+    try:
+        row = connection.execute(
+            'SELECT expires_at, negative, data FROM metadata WHERE service = ? AND endpoint = ? AND cache_key = ?',
+            (service, endpoint, cache_key)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Metadata cache: lecture impossible ({e}).")
+        return None
+    if row and row[0] > time.time():
+        _count(service, endpoint, 'negative_hits' if row[1] else 'hits')
+        return row
+    _count(service, endpoint, 'misses')
+    return None
+
+
+def _store_row(connection, service, endpoint, cache_key, value, ttl_seconds):
+    negative = _is_negative(value)
+    if negative:
+        ttl_seconds = min(ttl_seconds, _ttl_seconds('negative'))
+    try:
+        connection.execute(
+            'INSERT OR REPLACE INTO metadata (service, endpoint, cache_key, expires_at, negative, data) VALUES (?, ?, ?, ?, ?, ?)',
+            (service, endpoint, cache_key, time.time() + ttl_seconds, int(negative), None if value is None else json.dumps(value)))
+        _count(service, endpoint, 'stores')
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        logger.warning(f"Metadata cache: écriture impossible pour {service}.{endpoint} ({e}).")
+
+
+def lookup(service, endpoint, *key_parts):
+    """
+    Lecture directe (hors décorateur) : retourne (trouvé, valeur) pour la clé
+    construite à partir de key_parts. (False, None) si absent, expiré ou cache désactivé.
+    """
+    connection = _open_or_none()
+    if connection is None:
+        return False, None
+    row = _lookup_row(connection, service, endpoint, json.dumps(single_flight.make_key(*key_parts), default=str))
+    if row is None:
+        return False, None
+    return True, json.loads(row[2]) if row[2] is not None else None
+
+
+def store(service, endpoint, *key_parts, value, tier=TIER_MEDIUM, ttl_hours=None):
+    """
+    Écriture directe (hors décorateur). ttl_hours remplace la durée du palier ;
+    une valeur vide reste bornée par la durée du cache négatif.
+    """
+    connection = _open_or_none()
+    if connection is None:
+        return
+    ttl_seconds = ttl_hours * 3600 if ttl_hours is not None else _ttl_seconds(tier)
+    _store_row(connection, service, endpoint, json.dumps(single_flight.make_key(*key_parts), default=str), value, ttl_seconds)
+
+
+def cached(service, endpoint, tier=TIER_MEDIUM, decode=None):
+    """
+    Décorateur de méthode : sert la réponse depuis le cache disque si elle est
+    encore valide, sinon appelle l'API et stocke le résultat (JSON).
+    `decode` reconstruit le résultat depuis le JSON si besoin (clés entières...).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            connection = _open_or_none()
+            if connection is None:
+                return func(self, *args, **kwargs)
+
+            cache_key = json.dumps(single_flight.make_key(*args, **kwargs), default=str)
+            row = _lookup_row(connection, service, endpoint, cache_key)
+            if row is not None:
+                value = json.loads(row[2]) if row[2] is not None else None
+                return decode(value) if decode and value is not None else value
+
+            previous_skip = getattr(_thread_local, 'skip', False)
+            _thread_local.skip = False
+            try:
+                result = func(self, *args, **kwargs)
+                failed = _thread_local.skip
+            finally:
+                # Un appel imbriqué en échec rend aussi l'appel englobant non cachable
+                _thread_local.skip = previous_skip or _thread_local.skip
+            if failed:
+                _count(service, endpoint, 'errors_not_cached')
+                return result
+
+            _store_row(connection, service, endpoint, cache_key, result, _ttl_seconds(tier))
+            return result
+        return wrapper
+    return decorator
+
+
+def invalidate(service=None, endpoint=None):
+    """Supprime les entrées d'un service / endpoint (toutes si aucun filtre)."""
+    connection = _get_connection()
+    if connection is None:
+        return 0
+    clauses, params = [], []
+    if service:
+        clauses.append('service = ?')
+        params.append(service)
+    if endpoint:
+        clauses.append('endpoint = ?')
+        params.append(endpoint)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    return connection.execute(f'DELETE FROM metadata{where}', params).rowcount
+
+
+def add_quota_usage(service, period, units):
+    """
+    Ajoute des unités consommées au registre de quota (service, période) et
+    retourne le total de la période, ou None si le cache est désactivé.
+    """
+    connection = _open_or_none()
+    if connection is None:
+        return None
+    try:
+        connection.execute(
+            'INSERT INTO quota_usage (service, period, units) VALUES (?, ?, ?) '
+            'ON CONFLICT(service, period) DO UPDATE SET units = units + excluded.units',
+            (service, period, int(units)))
+        return get_quota_usage(service, period)
+    except sqlite3.Error as e:
+        logger.warning(f"Registre de quota: écriture impossible pour {service} ({e}).")
+        return None
+
+
+def get_quota_usage(service, period):
+    """Unités consommées sur la période, ou None si le registre est indisponible."""
+    connection = _open_or_none()
+    if connection is None:
+        return None
+    try:
+        row = connection.execute('SELECT units FROM quota_usage WHERE service = ? AND period = ?',
+                                 (service, period)).fetchone()
+    except sqlite3.Error as e:
+        logger.warning(f"Registre de quota: lecture impossible pour {service} ({e}).")
+        return None
+    return row[0] if row else 0
+
+
+def get_metadata_cache_stats():
+    """Compteurs hits / misses / stockages par endpoint, plus le taux de hit global."""
+    with _stats_lock:
+        snapshot = {endpoint: dict(stats) for endpoint, stats in _stats.items()}
+    hits = sum(s['hits'] + s['negative_hits'] for s in snapshot.values())
+    lookups = hits + sum(s['misses'] for s in snapshot.values())
+    return {'endpoints': snapshot, 'hit_rate': round(hits / lookups, 3) if lookups else None}
+
+
+def reset_metadata_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def close_metadata_cache_connections():
+    """Ferme les connexions du thread courant (tests, arrêt)."""
+    for connection in (getattr(_thread_local, 'connections', None) or {}).values():
+        connection.close()
+    _thread_local.connections = {}
@@ -1,9 +1,133 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
+
 from flask import current_app
+from plexapi.exceptions import Unauthorized
 from plexapi.server import PlexServer
 from plexapi.myplex import MyPlexAccount
 from flask import session
 
+# --- CACHE DES CONNEXIONS PLEX ---
+# Le serveur admin, le compte principal, la liste des utilisateurs gérés, leurs
+# jetons et leurs PlexServer sont conservés pour tout le processus : une route
+# n'a plus à refaire les allers-retours plex.tv (compte, utilisateurs, jeton)
+# ni la connexion initiale du PlexServer. Expiration après PLEX_HANDLE_CACHE_TTL_SECONDS,
+# invalidation immédiate sur erreur d'authentification (invalidate_plex_handles).
+
+DEFAULT_HANDLE_CACHE_TTL_SECONDS = 1800
+
+
+class _PlexHandleCache:
+
+    def __init__(self):
+        self._lock = threading.Lock()  # protège les dictionnaires, jamais tenu pendant un appel Plex
+        self._key_locks = {}  # nom -> verrou : un seul appel amont par entrée
+        self._source = None
+        self._generation = 0
+        self._entries = {}  # nom -> (valeur, expire_à)
+
+    def _cached_locked(self, name, source):
+        if source != self._source:
+            # URL ou jeton admin modifiés : tout ce qui a été obtenu avec l'ancien est caduc
+            self._entries.clear()
+            self._source = source
+            self._generation += 1
+        cached = self._entries.get(name)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached
+        return None
+
+    def get(self, name, factory):
+        """
+        Valeur en cache pour `name`, sinon factory(). L'appel amont se fait sous un
+        verrou propre à `name` : un plex.tv lent ne bloque que les demandes de la même entrée.
+        """
+        config = current_app.config
+        source = (config.get('PLEX_URL'), config.get('PLEX_TOKEN'))
+        ttl = float(config.get('PLEX_HANDLE_CACHE_TTL_SECONDS', DEFAULT_HANDLE_CACHE_TTL_SECONDS))
+        with self._lock:
+            cached = self._cached_locked(name, source)
+            if cached is not None:
+                return cached[0]
+            key_lock = self._key_locks.setdefault(name, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                # Un autre thread a pu remplir l'entrée pendant l'attente
+                cached = self._cached_locked(name, source)
+                if cached is not None:
+                    return cached[0]
+                generation = self._generation
+            value = factory()
+            if ttl > 0:
+                with self._lock:
+                    # Invalidation pendant l'appel : la valeur n'est pas conservée
+                    if generation == self._generation:
+                        self._entries[name] = (value, time.monotonic() + ttl)
+            return value
+
+    def invalidate(self, names=None):
+        with self._lock:
+            self._generation += 1
+            if names is None:
+                self._entries.clear()
+            else:
+                for name in names:
+                    self._entries.pop(name, None)
+
+
+_handle_cache = _PlexHandleCache()
+
+
+def _get_admin_server():
+    """PlexServer admin partagé (lève ValueError si la configuration est absente)."""
+    baseurl = current_app.config.get('PLEX_URL')
+    admin_token = current_app.config.get('PLEX_TOKEN')
+    if not baseurl or not admin_token:
+        raise ValueError("PLEX_URL and PLEX_TOKEN must be configured in .env")
+    return _handle_cache.get('admin_server', lambda: PlexServer(baseurl, admin_token))
+
+
+def _get_main_account():
+    return _handle_cache.get('main_account', lambda: _get_admin_server().myPlexAccount())
+
+
+def get_plex_account_users():
+    """Utilisateurs gérés/partagés du compte principal (liste en cache)."""
+    return _handle_cache.get('users', lambda: list(_get_main_account().users()))
+
+
+def _get_user_server(user_id):
+    """
+    PlexServer agissant au nom de user_id (le serveur admin pour le compte principal).
+    Lève ValueError si l'utilisateur est inconnu.
+    """
+    user_id = str(user_id)
+    if str(_get_main_account().id) == user_id:
+        return _get_admin_server()
+
+    def _connect():
+        user = next((u for u in get_plex_account_users() if str(u.id) == user_id), None)
+        if user is None:
+            raise ValueError(f"User with ID {user_id} not found.")
+        admin_server = _get_admin_server()
+        token = _handle_cache.get(f'token:{user_id}', lambda: user.get_token(admin_server.machineIdentifier))
+        return PlexServer(current_app.config.get('PLEX_URL'), token)
+
+    return _handle_cache.get(f'server:{user_id}', _connect)
+
+
+def invalidate_plex_handles(user_id=None):
+    """
+    Oublie les connexions en cache : celles d'un utilisateur (jeton révoqué), ou
+    toutes si user_id est None. À appeler sur une erreur d'authentification Plex.
+    """
+    if user_id is None:
+        _handle_cache.invalidate()
+    else:
+        _handle_cache.invalidate([f'token:{user_id}', f'server:{user_id}', 'users'])
+
 class PlexClient:
     """
     Client pour interagir avec le serveur Plex, capable d'agir en tant qu'admin
@@ -11,27 +135,16 @@ class PlexClient:
     """
     def __init__(self, user_id=None):
         self.baseurl = current_app.config.get('PLEX_URL')
-        admin_token = current_app.config.get('PLEX_TOKEN')
-        if not self.baseurl or not admin_token:
-            raise ValueError("PLEX_URL and PLEX_TOKEN must be configured in .env")
-
-        self.admin_plex = PlexServer(self.baseurl, admin_token)
+        self.admin_plex = _get_admin_server()
         self.user_plex = None
 
         if user_id:
             try:
-                main_account = self.admin_plex.myPlexAccount()
-                if str(main_account.id) == str(user_id):
-                    self.user_plex = self.admin_plex
-                else:
-                    user_to_impersonate = next((u for u in main_account.users() if str(u.id) == str(user_id)), None)
-                    if user_to_impersonate:
-                        managed_user_token = user_to_impersonate.get_token(self.admin_plex.machineIdentifier)
-                        self.user_plex = PlexServer(self.baseurl, managed_user_token)
-                    else:
-                        raise ValueError(f"User with ID {user_id} not found.")
+                self.user_plex = _get_user_server(user_id)
             except Exception as e:
                 current_app.logger.error(f"PlexClient: Failed to impersonate user {user_id}: {e}")
+                if isinstance(e, Unauthorized):
+                    invalidate_plex_handles(user_id)
                 self.user_plex = self.admin_plex
         else:
             self.user_plex = self.admin_plex
@@ -117,18 +230,24 @@ def get_plex_admin_server():
 def get_main_plex_account_object():
     """Retourne l'objet MyPlexAccount principal."""
     try:
-        admin_server = get_plex_admin_server()
-        return admin_server.myPlexAccount() if admin_server else None
+        return _get_main_account()
     except Exception as e:
         current_app.logger.error(f"Failed to get main Plex account object: {e}")
+        if isinstance(e, Unauthorized):
+            invalidate_plex_handles()
         return None
 
 def get_user_specific_plex_server_from_id(user_id):
-    """Retourne une instance PlexServer pour un user_id spécifique."""
+    """
+    Retourne une instance PlexServer pour un user_id spécifique (connexion en cache),
+    ou None si l'utilisateur est introuvable ou la connexion impossible.
+    """
     try:
-        return PlexClient(user_id=user_id).user_plex
+        return _get_user_server(user_id)
     except Exception as e:
         current_app.logger.error(f"Failed to get user-specific Plex server for user_id {user_id}: {e}")
+        if isinstance(e, Unauthorized):
+            invalidate_plex_handles(user_id)
         return None
 
 def get_user_specific_plex_server():
@@ -0,0 +1,141 @@
+# app/utils/plex_facet_index.py
+"""
+Index des facettes des bibliothèques Plex (genres, résolutions, studios, collections).
+
+Les listes déroulantes du panneau de filtres n'ont besoin que des valeurs
+distinctes : au lieu de parcourir library.all() à chaque ouverture, chaque
+bibliothèque (par utilisateur, les restrictions de partage pouvant différer) est
+indexée une fois en mémoire avec le nombre d'éléments par valeur.
+
+Au plus toutes les PLEX_FACET_CHECK_INTERVAL_SECONDS, l'index est comparé à la
+section (updatedAt + nombre d'éléments). S'ils ont changé, seuls les éléments
+modifiés depuis la dernière synchronisation sont relus ('updatedAt>>'). Si les
+comptes ne concordent plus (suppressions), la bibliothèque est réindexée.
+"""
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+FACETS = ('genres', 'resolutions', 'studios', 'collections')
+DEFAULT_CHECK_INTERVAL_SECONDS = 60
+# Marge sur updatedAt : tolère un léger décalage d'horloge entre MMS et Plex
+_SYNC_MARGIN = timedelta(minutes=5)
+
+
+def _item_facets(item):
+    genres = tuple(sorted({genre.tag for genre in (getattr(item, 'genres', None) or []) if genre.tag}))
+    resolutions = tuple(sorted({media.videoResolution for media in (getattr(item, 'media', None) or [])
+                                if getattr(media, 'videoResolution', None)}))
+    studio = getattr(item, 'studio', None)
+    return {'genres': genres, 'resolutions': resolutions, 'studios': (studio,) if studio else ()}
+
+
+class _LibraryFacets:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items = {}
+        self.counts = {facet: Counter() for facet in FACETS}
+        self.section_updated_at = None
+        self.synced_at = None
+        self.checked_at = 0.0
+
+    def _count(self, facets, delta):
+        for facet, values in facets.items():
+            for value in values:
+                self.counts[facet][value] += delta
+                if self.counts[facet][value] <= 0:
+                    del self.counts[facet][value]
+
+    def upsert(self, item):
+        facets = _item_facets(item)
+        previous = self.items.get(item.ratingKey)
+        if previous is not None:
+            self._count(previous, -1)
+        self.items[item.ratingKey] = facets
+        self._count(facets, +1)
+
+    def rebuild(self, items):
+        self.items = {}
+        self.counts = {facet: Counter() for facet in FACETS}
+        for item in items:
+            self.upsert(item)
+
+    def set_collections(self, collections):
+        self.counts['collections'] = Counter({collection.title: getattr(collection, 'childCount', 0) or 0
+                                              for collection in collections if collection.title})
+
+    def snapshot(self):
+        return {facet: dict(counter) for facet, counter in self.counts.items()}
+
+
+_indexes_lock = threading.Lock()
+_indexes = {}
+
+
+def _get_library_index(user_id, library_key):
+    with _indexes_lock:
+        return _indexes.setdefault((str(user_id), str(library_key)), _LibraryFacets())
+
+
+def _refresh(index, server, library_key):
+    """Synchronise l'index avec la section Plex. Retourne 'unchanged', 'incremental' ou 'full'."""
+    logger = current_app.logger
+    section = server.library.sectionByID(int(library_key))
+    total_size = section.totalSize
+    if index.synced_at is not None and section.updatedAt == index.section_updated_at and total_size == len(index.items):
+        return 'unchanged'
+
+    sync_started = datetime.now()
+    mode = 'full'
+    if index.synced_at is not None:
+        try:
+            for item in section.search(filters={'updatedAt>>': index.synced_at - _SYNC_MARGIN}):
+                index.upsert(item)
+            if len(index.items) == total_size:
+                mode = 'incremental'
+        except Exception as e:
+            logger.warning(f"Facettes Plex: mise à jour incrémentale impossible pour la bibliothèque {library_key} ({e}).")
+    if mode == 'full':
+        index.rebuild(section.all())
+    index.set_collections(section.collections())
+    index.section_updated_at = section.updatedAt
+    index.synced_at = sync_started
+    logger.info(f"Facettes Plex: bibliothèque '{section.title}' indexée ({mode}, {len(index.items)} éléments).")
+    return mode
+
+
+def get_library_facets(user_id, library_keys, server_factory):
+    """
+    Facettes cumulées des bibliothèques demandées : {facette: {valeur: nombre d'éléments}}.
+    server_factory() ne fournit le PlexServer de l'utilisateur que si une
+    bibliothèque doit être (re)vérifiée : sinon la réponse vient de la mémoire.
+    """
+    check_interval = float(current_app.config.get('PLEX_FACET_CHECK_INTERVAL_SECONDS', DEFAULT_CHECK_INTERVAL_SECONDS))
+    server = None
+    merged = {facet: Counter() for facet in FACETS}
+    for library_key in library_keys:
+        index = _get_library_index(user_id, library_key)
+        with index.lock:
+            now = time.monotonic()
+            if index.synced_at is None or now - index.checked_at >= check_interval:
+                if server is None:
+                    server = server_factory()
+                    if server is None:
+                        return None
+                _refresh(index, server, library_key)
+                index.checked_at = now
+            for facet, counts in index.snapshot().items():
+                merged[facet].update(counts)
+    return {facet: dict(counter) for facet, counter in merged.items()}
+
+
+def invalidate_library_facets(library_key=None):
+    """Force une vérification au prochain accès (après un scan ou une modification de métadonnées)."""
+    with _indexes_lock:
+        for (_, key), index in _indexes.items():
+            if library_key is None or key == str(library_key):
+                index.checked_at = 0.0
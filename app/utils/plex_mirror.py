@@ -0,0 +1,347 @@
+# app/utils/plex_mirror.py
+"""
+Miroir local (SQLite) des bibliothèques Plex films et séries.
+
+Pour chaque élément, seules les données d'identification sont conservées :
+ratingKey, section, type, titres, année et guids. Le miroir sert la recherche par
+titre (et année), les correspondances par guid et la liste des sections : ces
+requêtes deviennent locales et indexées, et Plex n'est plus interrogé que pour
+les objets effectivement affichés. La liste principale (tris, filtres de lecture,
+de date, de taille...) et l'état de lecture restent servis par Plex en direct.
+
+La synchronisation (tâche planifiée) est incrémentale : pour chaque section, seuls
+les éléments ajoutés ou modifiés ('updatedAt>>') depuis le dernier passage sont
+relus. Si le nombre d'éléments ne concorde plus (suppressions) ou si la dernière
+reconstruction date de plus de FULL_RESYNC_INTERVAL, la section est reconstruite
+entièrement.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+MIRRORED_SECTION_TYPES = ('movie', 'show')
+FULL_RESYNC_INTERVAL = timedelta(hours=24)
+# Marge sur updatedAt : tolère un léger décalage d'horloge entre MMS et Plex
+_SYNC_MARGIN = timedelta(minutes=5)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS libraries (
+    library_key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    type TEXT NOT NULL,
+    locations TEXT,
+    section_updated_at REAL,
+    total_size INTEGER,
+    synced_at REAL,
+    full_synced_at REAL
+);
+CREATE TABLE IF NOT EXISTS items (
+    rating_key INTEGER PRIMARY KEY,
+    library_key TEXT NOT NULL,
+    type TEXT NOT NULL,
+    title TEXT,
+    title_sort TEXT,
+    original_title TEXT,
+    search_text TEXT,
+    year INTEGER,
+    guids TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_items_library_title_sort ON items(library_key, title_sort);
+CREATE INDEX IF NOT EXISTS idx_items_library_year ON items(library_key, year);
+CREATE TABLE IF NOT EXISTS item_guids (
+    guid TEXT NOT NULL,
+    rating_key INTEGER NOT NULL,
+    PRIMARY KEY (guid, rating_key)
+);
+CREATE INDEX IF NOT EXISTS idx_item_guids_rating_key ON item_guids(rating_key);
+"""
+
+_thread_local = threading.local()
+_init_lock = threading.Lock()
+_initialized_paths = set()
+_sync_lock = threading.Lock()
+
+
+def _fold(text):
+    """Minuscules sans accents : 'Amélie' et 'AMELIE' donnent la même clé."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+def _get_db_path():
+    if not has_app_context():
+        return None
+    return current_app.config.get('PLEX_MIRROR_DB_FILE') or None
+
+
+def _get_connection():
+    """Connexion SQLite par thread, ou None si le miroir est désactivé."""
+    path = _get_db_path()
+    if not path:
+        return None
+    connections = getattr(_thread_local, 'connections', None)
+    if connections is None:
+        connections = _thread_local.connections = {}
+    connection = connections.get(path)
+    if connection is not None:
+        return connection
+
+    with _init_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        if path not in _initialized_paths:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            _initialized_paths.add(path)
+    connections[path] = connection
+    return connection
+
+
+def _open_or_none():
+    try:
+        return _get_connection()
+    except sqlite3.Error as e:
+        logger.warning(f"Miroir Plex indisponible ({e}).")
+        return None
+
+
+def _timestamp(value):
+    return value.timestamp() if isinstance(value, datetime) else None
+
+
+def _item_row(item, library_key):
+    """Colonnes de la table items pour un objet Movie/Show de plexapi."""
+    # Les listes de section contiennent déjà tout le nécessaire : pas de rechargement objet par objet
+    item._autoReload = False
+    guids = [guid.id for guid in (getattr(item, 'guids', None) or []) if getattr(guid, 'id', None)]
+    title = item.title
+    title_sort = getattr(item, 'titleSort', None) or title
+    original_title = getattr(item, 'originalTitle', None)
+    return {
+        'rating_key': int(item.ratingKey),
+        'library_key': str(library_key),
+        'type': item.type,
+        'title': title,
+        'title_sort': title_sort,
+        'original_title': original_title,
+        'search_text': _fold(' | '.join(filter(None, (title, original_title, title_sort)))),
+        'year': getattr(item, 'year', None),
+        'guids': guids,
+    }
+
+
+_ITEM_COLUMNS = ('rating_key', 'library_key', 'type', 'title', 'title_sort', 'original_title', 'search_text', 'year',
+                 'guids')
+
+
+def _upsert_items(connection, rows):
+    rows = list(rows)
+    connection.executemany(
+        f"INSERT OR REPLACE INTO items ({', '.join(_ITEM_COLUMNS)}) VALUES ({', '.join('?' * len(_ITEM_COLUMNS))})",
+        [tuple(json.dumps(row[c]) if c == 'guids' else row[c] for c in _ITEM_COLUMNS) for row in rows])
+    rating_keys = [(row['rating_key'],) for row in rows]
+    connection.executemany('DELETE FROM item_guids WHERE rating_key = ?', rating_keys)
+    connection.executemany('INSERT OR IGNORE INTO item_guids (guid, rating_key) VALUES (?, ?)',
+                           [(guid, row['rating_key']) for row in rows for guid in row['guids']])
+
+
+def _delete_library_items(connection, library_key):
+    connection.execute('DELETE FROM item_guids WHERE rating_key IN (SELECT rating_key FROM items WHERE library_key = ?)',
+                       (library_key,))
+    connection.execute('DELETE FROM items WHERE library_key = ?', (library_key,))
+
+
+def _count_library_items(connection, library_key):
+    return connection.execute('SELECT COUNT(*) FROM items WHERE library_key = ?', (library_key,)).fetchone()[0]
+
+
+def _sync_section(connection, section, full=False):
+    """Synchronise une section. Retourne 'unchanged', 'incremental' ou 'full'."""
+    library_key = str(section.key)
+    state = connection.execute('SELECT * FROM libraries WHERE library_key = ?', (library_key,)).fetchone()
+    now = time.time()
+    total_size = section.totalSize
+    section_updated_at = _timestamp(section.updatedAt)
+
+    mode = 'full'
+    if state is not None and state['synced_at'] and not full \
+            and now - (state['full_synced_at'] or 0) < FULL_RESYNC_INTERVAL.total_seconds():
+        since = datetime.fromtimestamp(state['synced_at']) - _SYNC_MARGIN
+        try:
+            changed = {}
+            if section_updated_at != state['section_updated_at'] or total_size != state['total_size']:
+                for item in section.search(filters={'updatedAt>>': since}):
+                    changed[item.ratingKey] = item
+            connection.execute('BEGIN')
+            try:
+                _upsert_items(connection, (_item_row(item, library_key) for item in changed.values()))
+                connection.execute('COMMIT')
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            if _count_library_items(connection, library_key) == total_size:
+                mode = 'incremental' if changed else 'unchanged'
+        except Exception as e:
+            logger.warning(f"Miroir Plex: mise à jour incrémentale impossible pour '{section.title}' ({e}).")
+
+    if mode == 'full':
+        rows = [_item_row(item, library_key) for item in section.all()]
+        connection.execute('BEGIN')
+        try:
+            _delete_library_items(connection, library_key)
+            _upsert_items(connection, rows)
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    connection.execute(
+        "INSERT OR REPLACE INTO libraries (library_key, title, type, locations, section_updated_at, total_size, "
+        "synced_at, full_synced_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (library_key, section.title, section.type, json.dumps(list(section.locations or [])), section_updated_at,
+         total_size, now, now if mode == 'full' else state['full_synced_at']))
+    return mode
+
+
+def sync_plex_mirror(server=None, full=False):
+    """
+    Synchronise le miroir avec les sections films/séries du serveur (admin par défaut).
+    Retourne {titre de section: 'unchanged' | 'incremental' | 'full' | 'error'}, ou None
+    si le miroir est désactivé ou le serveur indisponible.
+    """
+    connection = _open_or_none()
+    if connection is None:
+        return None
+    if server is None:
+        # Import local : plex_client importe des modules qui n'ont pas besoin du miroir
+        from app.utils.plex_client import get_plex_admin_server
+        server = get_plex_admin_server()
+        if server is None:
+            logger.warning("Miroir Plex: serveur Plex indisponible, synchronisation reportée.")
+            return None
+
+    summary = {}
+    with _sync_lock:
+        sections = [section for section in server.library.sections() if section.type in MIRRORED_SECTION_TYPES]
+        for section in sections:
+            try:
+                summary[section.title] = _sync_section(connection, section, full=full)
+            except Exception as e:
+                logger.error(f"Miroir Plex: échec de synchronisation de '{section.title}': {e}", exc_info=True)
+                summary[section.title] = 'error'
+
+        # Sections supprimées côté Plex
+        current_keys = {str(section.key) for section in sections}
+        for row in connection.execute('SELECT library_key FROM libraries').fetchall():
+            if row['library_key'] not in current_keys:
+                connection.execute('BEGIN')
+                _delete_library_items(connection, row['library_key'])
+                connection.execute('DELETE FROM libraries WHERE library_key = ?', (row['library_key'],))
+                connection.execute('COMMIT')
+    logger.info(f"Miroir Plex synchronisé: {summary}")
+    return summary
+
+
+# --- REQUÊTES LOCALES ---
+
+def get_mirrored_libraries():
+    """Sections synchronisées : [{'key', 'title', 'type', 'locations', 'total_size', 'synced_at'}]."""
+    connection = _open_or_none()
+    if connection is None:
+        return []
+    rows = connection.execute('SELECT * FROM libraries WHERE synced_at IS NOT NULL ORDER BY title').fetchall()
+    return [{'key': row['library_key'], 'title': row['title'], 'type': row['type'],
+             'locations': json.loads(row['locations'] or '[]'), 'total_size': row['total_size'],
+             'synced_at': row['synced_at']} for row in rows]
+
+
+def get_mirrored_library_keys(library_title):
+    """Clés des sections synchronisées portant ce titre (liste vide si aucune)."""
+    return [library['key'] for library in get_mirrored_libraries() if library['title'] == library_title]
+
+
+def _row_to_item(row):
+    item = dict(row)
+    item['guids'] = json.loads(item['guids'] or '[]')
+    item.pop('search_text', None)
+    return item
+
+
+def query_items(library_keys, title=None, year=None):
+    """
+    Éléments du miroir pour les sections données, filtrés localement et triés
+    par titre de tri.
+    title : sous-chaîne du titre, titre original ou titre de tri (sans casse ni accents ;
+    'the matrix' trouve aussi le titre de tri 'Matrix, The').
+    Retourne None si une des sections n'est pas (encore) synchronisée : l'appelant
+    interroge alors Plex en direct.
+    """
+    connection = _open_or_none()
+    if connection is None or not library_keys:
+        return None
+    library_keys = [str(key) for key in library_keys]
+    placeholders = ', '.join('?' * len(library_keys))
+    synced = connection.execute(
+        f'SELECT COUNT(*) FROM libraries WHERE synced_at IS NOT NULL AND library_key IN ({placeholders})',
+        library_keys).fetchone()[0]
+    if synced != len(set(library_keys)):
+        return None
+
+    clauses, params = [f'library_key IN ({placeholders})'], list(library_keys)
+    if title:
+        needles = {_fold(title.strip())}
+        if title.strip().lower().startswith('the '):
+            needles.add(_fold(title.strip()[4:]))
+        escaped = [needle.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') for needle in needles]
+        clauses.append('(' + ' OR '.join("search_text LIKE ? ESCAPE '\\'" for _ in escaped) + ')')
+        params.extend(f'%{needle}%' for needle in escaped)
+    if year is not None:
+        clauses.append('year = ?')
+        params.append(int(year))
+
+    query = f"SELECT * FROM items WHERE {' AND '.join(clauses)} ORDER BY title_sort COLLATE NOCASE"
+    return [_row_to_item(row) for row in connection.execute(query, params).fetchall()]
+
+
+def find_rating_keys_by_guid(guids, library_keys=None):
+    """{guid: [ratingKey, ...]} pour les guids présents dans le miroir ('tvdb://123', 'imdb://tt...')."""
+    connection = _open_or_none()
+    guids = list(dict.fromkeys(guids))
+    if connection is None or not guids:
+        return {}
+    results = {}
+    # Lots de 500 : reste sous la limite de paramètres SQLite
+    for start in range(0, len(guids), 500):
+        chunk = guids[start:start + 500]
+        query = (f"SELECT g.guid, g.rating_key FROM item_guids g JOIN items i ON i.rating_key = g.rating_key "
+                 f"WHERE g.guid IN ({', '.join('?' * len(chunk))})")
+        params = list(chunk)
+        if library_keys is not None:
+            query += f" AND i.library_key IN ({', '.join('?' * len(library_keys))})"
+            params.extend(str(key) for key in library_keys)
+        for row in connection.execute(query, params):
+            results.setdefault(row['guid'], []).append(row['rating_key'])
+    return results
+
+
+def get_plex_mirror_stats():
+    """Nombre d'éléments et date de synchronisation par section, pour le diagnostic."""
+    connection = _open_or_none()
+    if connection is None:
+        return {'enabled': False}
+    libraries = []
+    for library in get_mirrored_libraries():
+        library['items'] = _count_library_items(connection, library['key'])
+        library['synced_at'] = datetime.fromtimestamp(library['synced_at']).isoformat()
+        libraries.append(library)
+    return {'enabled': True, 'libraries': libraries}
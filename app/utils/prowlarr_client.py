@@ -2,6 +2,7 @@ import requests
 from flask import current_app
 import logging
 from datetime import timezone, datetime
+from app.utils import http_client
 
 def _make_prowlarr_request(endpoint, params=None):
     """Makes a request to Prowlarr's internal JSON API."""
@@ -18,7 +19,7 @@ def _make_prowlarr_request(endpoint, params=None):
         request_params.update(params)
 
     try:
-        response = requests.get(url, params=request_params, timeout=30)
+        response = http_client.request('prowlarr', 'GET', url, params=request_params, timeout=30)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -2,7 +2,21 @@
 
 from guessit import guessit
 from unidecode import unidecode # Import de la nouvelle bibliothèque
+import functools
+import json
+import logging
+import os
 import re
+import sqlite3
+import threading
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+# Taille du cache LRU en mémoire (noms de release déjà analysés)
+PARSE_CACHE_SIZE = 8192
+# À incrémenter quand la structure ou la logique du résultat change : invalide le cache disque
+PARSER_VERSION = 1
 
 # --- LISTE DE MOTS-CLÉS COMPLÈTE ---
 # Basée sur les recherches de l'utilisateur. Normalisée (lowercase, sans accents).
@@ -18,11 +32,81 @@ def _normalize_string(text):
     """Helper function to lowercase and remove accents from a string."""
     return unidecode(text).lower()
 
+# --- CACHE DISQUE OPTIONNEL (RELEASE_PARSE_CACHE_FILE) ---
+_store_lock = threading.Lock()
+_store_local = threading.local()
+
+
+def _get_store():
+    """Connexion SQLite (par thread) vers le cache disque, ou None s'il est désactivé."""
+    path = current_app.config.get('RELEASE_PARSE_CACHE_FILE') if has_app_context() else None
+    if not path:
+        return None
+    connection = getattr(_store_local, 'connection', None)
+    if connection is not None and getattr(_store_local, 'path', None) == path:
+        return connection
+    with _store_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        connection = sqlite3.connect(path, timeout=10, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS parsed_releases '
+                           '(release_name TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL)')
+    _store_local.connection, _store_local.path = connection, path
+    return connection
+
+
+def _store_get(release_name):
+    connection = _get_store()
+    if connection is None:
+        return None
+    row = connection.execute('SELECT data FROM parsed_releases WHERE release_name = ? AND version = ?',
+                             (release_name, PARSER_VERSION)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _store_set(release_name, parsed_data):
+    connection = _get_store()
+    if connection is None:
+        return
+    connection.execute('INSERT OR REPLACE INTO parsed_releases (release_name, version, data) VALUES (?, ?, ?)',
+                       (release_name, PARSER_VERSION, json.dumps(parsed_data)))
+
+
+def clear_release_parse_cache():
+    """Vide le cache LRU en mémoire (le cache disque est conservé)."""
+    _parse_release_data_cached.cache_clear()
+
+
 def parse_release_data(release_name):
     """
     Analyse un nom de release avec guessit et le nettoie pour le filtrage.
     Retourne un dictionnaire structuré et fiable.
+    guessit coûte plusieurs ms par nom : les résultats sont mémorisés (LRU, puis
+    cache disque si RELEASE_PARSE_CACHE_FILE est défini). Chaque appel reçoit sa copie.
     """
+    parsed_data = _parse_release_data_cached(release_name)
+    return {key: list(value) if isinstance(value, list) else value for key, value in parsed_data.items()}
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_release_data_cached(release_name):
+    try:
+        stored = _store_get(release_name)
+    except sqlite3.Error as e:
+        logger.warning(f"Release parse cache: lecture impossible ({e}).")
+        stored = None
+    if stored is not None:
+        return stored
+
+    parsed_data = _parse_release_data_uncached(release_name)
+    try:
+        _store_set(release_name, parsed_data)
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        logger.warning(f"Release parse cache: écriture impossible ({e}).")
+    return parsed_data
+
+
+def _parse_release_data_uncached(release_name):
     guess = guessit(release_name)
     title_lower_normalized = _normalize_string(release_name)
 
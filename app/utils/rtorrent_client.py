@@ -1,7 +1,5 @@
 # app/utils/rtorrent_client.py
 import requests
-from requests.auth import HTTPDigestAuth
-import paramiko
 from pathlib import Path
 import stat
 from flask import current_app
@@ -9,6 +7,8 @@ import json
 import time
 import xmlrpc.client
 import logging
+import threading
+from app.utils import http_client, sftp_pool
 # import base64 # For xmlrpc.client.Binary later
 
 def _send_xmlrpc_request(method_name, params):
@@ -23,7 +23,7 @@ def _send_xmlrpc_request(method_name, params):
         current_app.logger.error("RTORRENT_API_URL is not configured for XML-RPC.")
         return None, "ruTorrent API URL not configured."
 
-    auth = HTTPDigestAuth(user, password) if user and password else None
+    auth = http_client.get_digest_auth(user, password)
 
     try:
         # Ensure params is a tuple for dumps.
@@ -57,7 +57,7 @@ def _send_xmlrpc_request(method_name, params):
         current_app.logger.info(f"XML-RPC Request Body for {method_name} (first 500 bytes, DEBUG for full): {xml_body[:500]}")
 
     try:
-        response = requests.post(api_url, data=xml_body.encode('UTF-8'), headers=headers, auth=auth, verify=ssl_verify, timeout=30)
+        response = http_client.request('rtorrent', 'POST', api_url, data=xml_body.encode('UTF-8'), headers=headers, auth=auth, verify=ssl_verify, timeout=30)
 
         current_app.logger.debug(f"XML-RPC Response Status for {method_name}: {response.status_code}")
         current_app.logger.debug(f"XML-RPC Response Headers for {method_name}: {response.headers}")
@@ -142,7 +142,7 @@ def _make_httprpc_request(method='POST', params=None, data=None, files=None, tim
     if not api_url:
         current_app.logger.error("RTORRENT_API_URL is not configured.")
         return None, "ruTorrent API URL not configured."
-    auth = HTTPDigestAuth(user, password) if user and password else None
+    auth = http_client.get_digest_auth(user, password)
     headers = {
         'Accept': 'application/json',
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/97.0.4692.71 Safari/537.36'
@@ -151,7 +151,7 @@ def _make_httprpc_request(method='POST', params=None, data=None, files=None, tim
         requests.packages.urllib3.disable_warnings(requests.packages.urllib3.exceptions.InsecureRequestWarning)
     try:
         current_app.logger.debug(f"Making httprpc request to {api_url}: Method={method}, Auth=Digest, SSLVerify={ssl_verify}, UserAgent='{headers['User-Agent']}', Params={params}, Data={data}, Files={bool(files)}")
-        response = requests.request(method, api_url, params=params, data=data, files=files, auth=auth, verify=ssl_verify, timeout=timeout, headers=headers)
+        response = http_client.request('rtorrent', method, api_url, params=params, data=data, files=files, auth=auth, verify=ssl_verify, timeout=timeout, headers=headers)
         current_app.logger.debug(f"httprpc response status: {response.status_code}, content type: {response.headers.get('Content-Type')}")
         if response.status_code == 401:
             current_app.logger.error(f"httprpc authentication failed (401) even with Digest Auth for URL: {api_url}.")
@@ -192,15 +192,99 @@ def _make_httprpc_request(method='POST', params=None, data=None, files=None, tim
         return None, f"An unexpected error occurred: {str(e_generic)}"
 
 # list_torrents is now reimplemented using XML-RPC
-def list_torrents():
+# Champs complets d'une ligne de la vue torrents (ordre = ordre de _TORRENT_FIELD_KEYS)
+_TORRENT_FIELDS = [
+    "d.hash=", "d.name=", "d.base_path=", "d.custom1=", "d.size_bytes=",
+    "d.bytes_done=", "d.up.total=", "d.down.rate=", "d.up.rate=",
+    "d.ratio=", "d.is_open=", "d.is_active=", "d.complete=",
+    "d.left_bytes=", "d.message=", "d.load_date="
+]
+_TORRENT_FIELD_KEYS = [
+    'hash', 'name', 'base_path', 'label', 'size_bytes', 'downloaded_bytes',
+    'uploaded_bytes', 'down_rate_bytes_sec', 'up_rate_bytes_sec', 'ratio',
+    'is_open', 'is_active', 'is_complete_rt', 'left_bytes', 'rtorrent_message',
+    'load_date'
+]
+# Vue étroite utilisée pour détecter les changements entre deux synchronisations complètes
+# (nom, label et taille inclus : un renommage ou un changement de label doit être vu)
+_TORRENT_DELTA_FIELDS = [
+    "d.hash=", "d.name=", "d.custom1=", "d.size_bytes=", "d.bytes_done=",
+    "d.complete=", "d.message=", "d.is_open=", "d.is_active="
+]
+_TORRENT_DELTA_INDEXES = [_TORRENT_FIELDS.index(field) for field in _TORRENT_DELTA_FIELDS]
+
+
+def _raw_signature(delta_values):
+    """Signature d'un torrent : valeurs brutes des _TORRENT_DELTA_FIELDS (hors hash)."""
+    return tuple(delta_values[1:])
+
+
+def _full_row_signature(torrent_data_list):
+    """Même signature, extraite d'une ligne complète (liste de _TORRENT_FIELDS)."""
+    return _raw_signature([torrent_data_list[i] for i in _TORRENT_DELTA_INDEXES])
+
+
+def _parse_torrent_row(torrent_data_list):
+    """Convertit une ligne brute (liste de _TORRENT_FIELDS) en dict simplifié."""
+    data = dict(zip(_TORRENT_FIELD_KEYS, torrent_data_list))
+
+    size_b = int(data.get('size_bytes', 0))
+    done_b = int(data.get('downloaded_bytes', 0))
+
+    progress_percent = 0
+    if size_b > 0:
+        progress_percent = round((done_b / size_b) * 100, 2)
+    elif int(data.get('is_complete_rt', 0)) == 1:
+        progress_percent = 100.0
+
+    status_text = "Unknown"
+    rt_message = data.get('rtorrent_message', '')
+    is_open_val = int(data.get('is_open', 0))
+    is_active_val = int(data.get('is_active', 0))
+    is_complete_val = int(data.get('is_complete_rt', 0))
+    left_bytes_val = int(data.get('left_bytes', -1))
+    if left_bytes_val == 0 and size_b > 0:
+        is_complete_val = 1
+
+    if rt_message and rt_message.strip():
+        status_text = "Error"
+    elif is_open_val == 0:
+        status_text = "Stopped"
+    elif is_active_val == 0:
+        status_text = "Paused"
+    elif is_complete_val == 1:
+        status_text = "Seeding"
+    else:
+        status_text = "Downloading"
+
+    return {
+        'hash': str(data.get('hash', '')),
+        'name': str(data.get('name', '')),
+        'size_bytes': size_b,
+        'progress_percent': progress_percent,
+        'downloaded_bytes': done_b,
+        'uploaded_bytes': int(data.get('uploaded_bytes', 0)),
+        'ratio': round(int(data.get('ratio', 0)) / 1000.0, 3),
+        'up_rate_bytes_sec': int(data.get('up_rate_bytes_sec', 0)),
+        'down_rate_bytes_sec': int(data.get('down_rate_bytes_sec', 0)),
+        'label': str(data.get('label', '')),
+        'base_path': str(data.get('base_path', '')),
+        'status_text': status_text,
+        'is_active': bool(is_active_val and is_open_val),
+        'is_complete': bool(is_complete_val),
+        'is_paused': bool(is_open_val and not is_active_val),
+        'rtorrent_message': rt_message,
+        'load_date': int(data.get('load_date', 0))
+    }
+
+
+def _fetch_all_torrent_rows():
+    """
+    Appel d.multicall2 complet (16 champs par torrent).
+    Retourne (liste de (ligne simplifiée, signature brute), erreur).
+    """
     current_app.logger.info("Listing torrents via XML-RPC d.multicall2.")
-    fields = [
-        "d.hash=", "d.name=", "d.base_path=", "d.custom1=", "d.size_bytes=",
-        "d.bytes_done=", "d.up.total=", "d.down.rate=", "d.up.rate=",
-        "d.ratio=", "d.is_open=", "d.is_active=", "d.complete=",
-        "d.left_bytes=", "d.message=", "d.load_date="
-    ]
-    params_for_xmlrpc = ["", ""] + fields
+    params_for_xmlrpc = ["", ""] + _TORRENT_FIELDS
 
     raw_torrents_data, error = _send_xmlrpc_request(method_name="d.multicall2", params=params_for_xmlrpc)
 
@@ -213,70 +297,13 @@ def list_torrents():
         return None, "Unexpected data structure from rTorrent for torrent list (XML-RPC)."
 
     simplified_torrents = []
-    field_keys = [
-        'hash', 'name', 'base_path', 'label', 'size_bytes', 'downloaded_bytes',
-        'uploaded_bytes', 'down_rate_bytes_sec', 'up_rate_bytes_sec', 'ratio',
-        'is_open', 'is_active', 'is_complete_rt', 'left_bytes', 'rtorrent_message',
-        'load_date'
-    ]
-
     for torrent_data_list in raw_torrents_data:
-        if not isinstance(torrent_data_list, list) or len(torrent_data_list) != len(fields):
-            current_app.logger.warning(f"Skipping torrent entry due to mismatched data length. Expected {len(fields)}, got {len(torrent_data_list)}. Data: {torrent_data_list}")
+        if not isinstance(torrent_data_list, list) or len(torrent_data_list) != len(_TORRENT_FIELDS):
+            current_app.logger.warning(f"Skipping torrent entry due to mismatched data length. Expected {len(_TORRENT_FIELDS)}, got {len(torrent_data_list)}. Data: {torrent_data_list}")
             continue
 
         try:
-            data = dict(zip(field_keys, torrent_data_list))
-
-            size_b = int(data.get('size_bytes', 0))
-            done_b = int(data.get('downloaded_bytes', 0))
-
-            progress_percent = 0
-            if size_b > 0:
-                progress_percent = round((done_b / size_b) * 100, 2)
-            elif int(data.get('is_complete_rt', 0)) == 1:
-                progress_percent = 100.0
-
-            status_text = "Unknown"
-            rt_message = data.get('rtorrent_message', '')
-            is_open_val = int(data.get('is_open', 0))
-            is_active_val = int(data.get('is_active', 0))
-            is_complete_val = int(data.get('is_complete_rt', 0))
-            left_bytes_val = int(data.get('left_bytes', -1))
-            if left_bytes_val == 0 and size_b > 0:
-                is_complete_val = 1
-
-            if rt_message and rt_message.strip():
-                status_text = "Error"
-            elif is_open_val == 0:
-                status_text = "Stopped"
-            elif is_active_val == 0:
-                status_text = "Paused"
-            elif is_complete_val == 1:
-                status_text = "Seeding"
-            else:
-                status_text = "Downloading"
-
-            torrent_info = {
-                'hash': str(data.get('hash', '')),
-                'name': str(data.get('name', '')),
-                'size_bytes': size_b,
-                'progress_percent': progress_percent,
-                'downloaded_bytes': done_b,
-                'uploaded_bytes': int(data.get('uploaded_bytes', 0)),
-                'ratio': round(int(data.get('ratio', 0)) / 1000.0, 3),
-                'up_rate_bytes_sec': int(data.get('up_rate_bytes_sec', 0)),
-                'down_rate_bytes_sec': int(data.get('down_rate_bytes_sec', 0)),
-                'label': str(data.get('label', '')),
-                'base_path': str(data.get('base_path', '')),
-                'status_text': status_text,
-                'is_active': bool(is_active_val and is_open_val),
-                'is_complete': bool(is_complete_val),
-                'is_paused': bool(is_open_val and not is_active_val),
-                'rtorrent_message': rt_message,
-                'load_date': int(data.get('load_date', 0))
-            }
-            simplified_torrents.append(torrent_info)
+            simplified_torrents.append((_parse_torrent_row(torrent_data_list), _full_row_signature(torrent_data_list)))
         except Exception as e:
             current_app.logger.error(f"Error parsing torrent data entry: {torrent_data_list}. Error: {e}", exc_info=True)
             continue
@@ -285,6 +312,210 @@ def list_torrents():
     return simplified_torrents, None
 
 
+def _fetch_torrent_rows_by_hash(hashes):
+    """
+    Récupère les lignes complètes des seuls torrents indiqués, en un unique
+    system.multicall. Les hashes disparus entre-temps (faute XML-RPC) sont omis.
+    Retourne (liste de (ligne simplifiée, signature brute), erreur).
+    """
+    calls = [
+        {'methodName': field.rstrip('='), 'params': [torrent_hash]}
+        for torrent_hash in hashes for field in _TORRENT_FIELDS
+    ]
+    results, error = _send_xmlrpc_request(method_name="system.multicall", params=[calls])
+    if error:
+        return None, error
+    if not isinstance(results, list) or len(results) != len(calls):
+        return None, "Unexpected data structure from rTorrent for system.multicall."
+
+    rows = []
+    width = len(_TORRENT_FIELDS)
+    for index, torrent_hash in enumerate(hashes):
+        chunk = results[index * width:(index + 1) * width]
+        if any(not isinstance(value, list) or not value for value in chunk):
+            current_app.logger.debug(f"rTorrent state cache: torrent {torrent_hash} vanished during partial refresh.")
+            continue
+        try:
+            values = [value[0] for value in chunk]
+            rows.append((_parse_torrent_row(values), _full_row_signature(values)))
+        except Exception as e:
+            current_app.logger.error(f"Error parsing torrent data for {torrent_hash}: {e}", exc_info=True)
+    return rows, None
+
+
+# --- CACHE D'ÉTAT DES TORRENTS (SYNCHRONISATION INCRÉMENTALE) ---
+TORRENT_EVENT_COMPLETED = 'completed'
+TORRENT_EVENT_REMOVED = 'removed'
+TORRENT_EVENT_ERRORED = 'errored'
+
+
+class _TorrentStateCache:
+    """
+    Vue en mémoire des torrents rTorrent indexée par hash.
+
+    Une synchronisation complète (16 champs) n'a lieu qu'au premier appel puis
+    toutes les RTORRENT_STATE_FULL_RESYNC_SECONDS (débits, ratio). Entre deux, un
+    d.multicall2 étroit (_TORRENT_DELTA_FIELDS) détecte les torrents modifiés,
+    nouveaux ou supprimés, et seules leurs lignes complètes sont relues. Les deux
+    synchronisations comparent les mêmes valeurs brutes rTorrent. Les transitions
+    sont publiées aux abonnés.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._listeners_lock = threading.Lock()
+        self._rows = {}
+        self._signatures = {}
+        self._loaded_at = None
+        self._source = None
+        self._listeners = {
+            TORRENT_EVENT_COMPLETED: [],
+            TORRENT_EVENT_REMOVED: [],
+            TORRENT_EVENT_ERRORED: [],
+        }
+
+    def subscribe(self, event, callback):
+        if event not in self._listeners:
+            raise ValueError(f"Unknown torrent event '{event}'.")
+        with self._listeners_lock:
+            self._listeners[event].append(callback)
+
+    def unsubscribe(self, event, callback):
+        with self._listeners_lock:
+            if callback in self._listeners.get(event, []):
+                self._listeners[event].remove(callback)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def reset(self):
+        with self._lock:
+            self._rows = {}
+            self._signatures = {}
+            self._loaded_at = None
+            self._source = None
+
+    def _needs_full_sync(self):
+        source = current_app.config.get('RTORRENT_API_URL')
+        resync_seconds = current_app.config.get('RTORRENT_STATE_FULL_RESYNC_SECONDS', 60)
+        return (self._loaded_at is None or source != self._source
+                or time.monotonic() - self._loaded_at >= resync_seconds)
+
+    def _apply_rows(self, rows, removed_hashes, emit):
+        """Met à jour l'état et retourne la liste des événements (event, torrent) à publier."""
+        events = []
+        for row in rows:
+            previous = self._rows.get(row['hash'])
+            if emit:
+                was_complete = previous['is_complete'] if previous else False
+                had_error = bool((previous or {}).get('rtorrent_message', '').strip())
+                if row['is_complete'] and not was_complete:
+                    events.append((TORRENT_EVENT_COMPLETED, row))
+                if row['rtorrent_message'].strip() and not had_error:
+                    events.append((TORRENT_EVENT_ERRORED, row))
+            self._rows[row['hash']] = row
+        for torrent_hash in removed_hashes:
+            removed = self._rows.pop(torrent_hash, None)
+            self._signatures.pop(torrent_hash, None)
+            if emit and removed is not None:
+                events.append((TORRENT_EVENT_REMOVED, removed))
+        return events
+
+    def _full_sync(self):
+        signed_rows, error = _fetch_all_torrent_rows()
+        if error:
+            return error, []
+        rows = [row for row, _ in signed_rows]
+        emit = self._loaded_at is not None or bool(self._rows)
+        removed = set(self._rows) - {row['hash'] for row in rows}
+        events = self._apply_rows(rows, removed, emit)
+        # L'ordre de la vue rTorrent est conservé
+        self._rows = {row['hash']: self._rows[row['hash']] for row in rows}
+        self._signatures = {row['hash']: signature for row, signature in signed_rows}
+        self._loaded_at = time.monotonic()
+        self._source = current_app.config.get('RTORRENT_API_URL')
+        return None, events
+
+    def _delta_sync(self):
+        raw, error = _send_xmlrpc_request(method_name="d.multicall2", params=["", ""] + _TORRENT_DELTA_FIELDS)
+        if error or not isinstance(raw, list):
+            current_app.logger.warning(f"rTorrent state cache: delta poll failed ({error}). Falling back to full sync.")
+            return self._full_sync()
+
+        current = {}
+        for values in raw:
+            if isinstance(values, list) and len(values) == len(_TORRENT_DELTA_FIELDS):
+                current[str(values[0])] = _raw_signature(values)
+        changed = [h for h, sig in current.items() if self._signatures.get(h) != sig]
+        removed = set(self._rows) - set(current)
+
+        if len(changed) > max(10, len(current) // 2):
+            return self._full_sync()
+
+        signed_rows = []
+        if changed:
+            signed_rows, error = _fetch_torrent_rows_by_hash(changed)
+            if error:
+                current_app.logger.warning(f"rTorrent state cache: partial refresh failed ({error}). Falling back to full sync.")
+                return self._full_sync()
+        events = self._apply_rows([row for row, _ in signed_rows], removed, emit=True)
+        for row, signature in signed_rows:
+            self._signatures[row['hash']] = signature
+        # Réordonne selon la vue rTorrent (les nouveaux torrents prennent leur place)
+        self._rows = {h: self._rows[h] for h in current if h in self._rows}
+        current_app.logger.debug(f"rTorrent state cache: {len(changed)} changed, {len(removed)} removed out of {len(current)} torrent(s).")
+        return None, events
+
+    def _publish(self, events):
+        with self._listeners_lock:
+            listeners = {event: list(callbacks) for event, callbacks in self._listeners.items()}
+        for event, torrent in events:
+            for callback in listeners.get(event, []):
+                try:
+                    callback(dict(torrent))
+                except Exception as e:
+                    current_app.logger.error(f"rTorrent state cache: listener for '{event}' failed: {e}", exc_info=True)
+
+    def list(self):
+        with self._lock:
+            if self._needs_full_sync():
+                error, events = self._full_sync()
+            else:
+                error, events = self._delta_sync()
+            if error:
+                return None, error
+            snapshot = [dict(row) for row in self._rows.values()]
+        self._publish(events)
+        return snapshot, None
+
+
+_torrent_state_cache = _TorrentStateCache()
+
+
+def subscribe_torrent_events(event, callback):
+    """
+    Abonne `callback(torrent_dict)` à un événement du cache d'état :
+    TORRENT_EVENT_COMPLETED, TORRENT_EVENT_REMOVED ou TORRENT_EVENT_ERRORED.
+    Les événements sont publiés lors des appels à list_torrents().
+    """
+    _torrent_state_cache.subscribe(event, callback)
+
+
+def unsubscribe_torrent_events(event, callback):
+    _torrent_state_cache.unsubscribe(event, callback)
+
+
+def invalidate_torrent_state_cache():
+    """Force une synchronisation complète au prochain list_torrents()."""
+    _torrent_state_cache.invalidate()
+
+
+def list_torrents():
+    """Liste des torrents (dicts simplifiés), servie par le cache d'état incrémental."""
+    return _torrent_state_cache.list()
+
+
 def get_torrent_files(torrent_hash):
     """
     Retrieves the list of files for a given torrent hash using f.multicall.
@@ -368,6 +599,7 @@ def add_magnet(magnet_link, label=None, download_dir=None):
 
     # For load.start, rTorrent typically returns 0 on success.
     if result == 0:
+        invalidate_torrent_state_cache()
         current_app.logger.info(f"Magnet link '{magnet_link[:100]}...' successfully added via XML-RPC method '{method_name}'. Result: {result}")
         return True, "Magnet link added successfully via XML-RPC."
     else:
@@ -413,6 +645,7 @@ def add_torrent_file(file_content_bytes, filename, label=None, download_dir=None
 
     # For load.raw_start, rTorrent also typically returns 0 on success.
     if result == 0:
+        invalidate_torrent_state_cache()
         current_app.logger.info(f"Torrent file '{filename}' successfully added via XML-RPC method '{method_name}'. Result: {result}")
         return True, "Torrent file added successfully via XML-RPC."
     else:
@@ -467,6 +700,7 @@ def add_magnet_and_get_hash_robustly(magnet_link, label=None, destination_path=N
             params_for_load.append(f"d.custom1.set={label}")
             
         _send_xmlrpc_request("load.start", params_for_load)
+        invalidate_torrent_state_cache()
         time.sleep(2) # Laisser à rTorrent le temps de traiter le magnet
 
         max_retries, retry_delay = 20, 2
@@ -509,6 +743,7 @@ def add_torrent_data_and_get_hash_robustly(torrent_content_bytes, filename_for_r
             params_for_load_raw.append(f"d.custom1.set={label}")
 
         _send_xmlrpc_request("load.raw_start", params_for_load_raw)
+        invalidate_torrent_state_cache()
         time.sleep(2)
 
         max_retries, retry_delay = 20, 2
@@ -684,16 +919,9 @@ def delete_torrent(torrent_hash, delete_data=False):
 
         logger.info(f"Reliably constructed data path: {data_path}")
 
-        sftp_host = current_app.config.get('SEEDBOX_SFTP_HOST')
-        sftp_port = int(current_app.config.get('SEEDBOX_SFTP_PORT', 22))
-        sftp_user = current_app.config.get('SEEDBOX_SFTP_USER')
-        sftp_password = current_app.config.get('SEEDBOX_SFTP_PASSWORD')
-
-        transport = None
+        sftp, transport = None, None
         try:
-            transport = paramiko.Transport((sftp_host, sftp_port))
-            transport.connect(username=sftp_user, password=sftp_password)
-            sftp = paramiko.SFTPClient.from_transport(transport)
+            sftp, transport = sftp_pool.acquire_sftp()
 
             # On doit traduire le chemin rTorrent en chemin SFTP
             from app.seedbox_ui.routes import _translate_rtorrent_path_to_sftp_path
@@ -711,7 +939,7 @@ def delete_torrent(torrent_hash, delete_data=False):
             return False, f"Failed to delete data via SFTP: {e}"
         finally:
             if transport:
-                transport.close()
+                sftp_pool.release_sftp(sftp, transport)
 
         result, error_erase = _send_xmlrpc_request("d.erase", [torrent_hash])
         if error_erase:
@@ -0,0 +1,199 @@
+# app/utils/sftp_pool.py
+"""
+Pool de sessions SSH/SFTP partagé par tout le processus.
+
+Les transports paramiko authentifiés sont conservés entre deux utilisations
+(keepalive actif) et prêtés aux appelants : un cycle qui traite 30 torrents ne
+fait qu'une poignée de main SSH au lieu de 30. Chaque emprunt ouvre un simple
+canal SFTP sur le transport, refermé au retour. Les transports morts sont
+écartés à l'emprunt, ceux inactifs depuis trop longtemps sont fermés.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import paramiko
+from flask import current_app
+
+DEFAULT_MAX_SIZE = 4
+DEFAULT_MAX_IDLE_SECONDS = 300
+DEFAULT_KEEPALIVE_SECONDS = 30
+DEFAULT_ACQUIRE_TIMEOUT_SECONDS = 60
+
+
+class SftpPoolTimeout(Exception):
+    """Aucun transport n'a pu être obtenu dans le délai imparti."""
+
+
+class _TransportPool:
+
+    def __init__(self, host, port, user, password):
+        self.host, self.port, self.user, self.password = host, port, user, password
+        self._cond = threading.Condition()
+        self._idle = []  # [(transport, last_used)]
+        self._in_use = set()
+
+    def _open_transport(self, keepalive):
+        transport = paramiko.Transport((self.host, self.port))
+        try:
+            transport.set_keepalive(keepalive)
+            transport.connect(username=self.user, password=self.password)
+        except Exception:
+            transport.close()
+            raise
+        return transport
+
+    def _evict_idle(self, max_idle):
+        now = time.monotonic()
+        kept = []
+        for transport, last_used in self._idle:
+            if not transport.is_active() or now - last_used > max_idle:
+                transport.close()
+            else:
+                kept.append((transport, last_used))
+        self._idle = kept
+
+    def acquire(self, max_size, max_idle, keepalive, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._evict_idle(max_idle)
+                if self._idle:
+                    transport, _ = self._idle.pop()
+                    self._in_use.add(transport)
+                    return transport
+                if len(self._in_use) < max_size:
+                    # Réserve la place avant la connexion (faite hors verrou)
+                    placeholder = object()
+                    self._in_use.add(placeholder)
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SftpPoolTimeout(f"Aucune session SFTP disponible vers {self.host} après {timeout}s.")
+                self._cond.wait(remaining)
+
+        try:
+            transport = self._open_transport(keepalive)
+        except Exception:
+            with self._cond:
+                self._in_use.discard(placeholder)
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._in_use.discard(placeholder)
+            self._in_use.add(transport)
+        return transport
+
+    def release(self, transport, discard=False):
+        with self._cond:
+            self._in_use.discard(transport)
+            if discard or not transport.is_active():
+                transport.close()
+            else:
+                self._idle.append((transport, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for transport, _ in self._idle:
+                transport.close()
+            self._idle = []
+
+    def stats(self):
+        with self._cond:
+            return {'idle': len(self._idle), 'in_use': len(self._in_use)}
+
+
+_pools_lock = threading.Lock()
+_pools = {}
+_owners = {}
+
+
+def _pool_settings():
+    config = current_app.config
+    return (int(config.get('SFTP_POOL_MAX_SIZE', DEFAULT_MAX_SIZE)),
+            int(config.get('SFTP_POOL_MAX_IDLE_SECONDS', DEFAULT_MAX_IDLE_SECONDS)),
+            int(config.get('SFTP_POOL_KEEPALIVE_SECONDS', DEFAULT_KEEPALIVE_SECONDS)))
+
+
+def _get_pool():
+    config = current_app.config
+    key = (config.get('SEEDBOX_SFTP_HOST'), int(config.get('SEEDBOX_SFTP_PORT') or 22),
+           config.get('SEEDBOX_SFTP_USER'), config.get('SEEDBOX_SFTP_PASSWORD'))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # Identifiants modifiés : les sessions des anciens pools ne servent plus
+            for stale in _pools.values():
+                stale.close_all()
+            _pools.clear()
+            pool = _pools[key] = _TransportPool(*key)
+        return pool
+
+
+def acquire_sftp(timeout=DEFAULT_ACQUIRE_TIMEOUT_SECONDS):
+    """
+    Emprunte un transport au pool et ouvre un canal SFTP dessus.
+    Retourne (sftp_client, transport). Les erreurs de connexion/authentification
+    paramiko sont propagées telles quelles. À rendre avec release_sftp().
+    """
+    max_size, max_idle, keepalive = _pool_settings()
+    pool = _get_pool()
+    for attempt in range(2):
+        transport = pool.acquire(max_size, max_idle, keepalive, timeout)
+        try:
+            sftp_client = paramiko.SFTPClient.from_transport(transport)
+        except Exception:
+            # Transport mort malgré is_active() (coupure réseau) : on le jette et on réessaie une fois
+            pool.release(transport, discard=True)
+            if attempt:
+                raise
+            continue
+        with _pools_lock:
+            _owners[transport] = pool
+        return sftp_client, transport
+
+
+def release_sftp(sftp_client, transport, discard=False):
+    """Ferme le canal SFTP et rend le transport au pool (fermé s'il est mort ou si discard)."""
+    if sftp_client is not None:
+        try:
+            sftp_client.close()
+        except Exception:
+            discard = True
+    if transport is None:
+        return
+    with _pools_lock:
+        pool = _owners.pop(transport, None)
+    if pool is None:
+        transport.close()
+    else:
+        pool.release(transport, discard=discard)
+
+
+@contextmanager
+def sftp_session():
+    """Context manager : `with sftp_session() as (sftp_client, transport): ...`"""
+    sftp_client, transport = acquire_sftp()
+    failed = False
+    try:
+        yield sftp_client, transport
+    except Exception:
+        failed = not transport.is_active()
+        raise
+    finally:
+        release_sftp(sftp_client, transport, discard=failed)
+
+
+def get_sftp_pool_stats():
+    with _pools_lock:
+        return {f"{pool.user}@{pool.host}:{pool.port}": pool.stats() for pool in _pools.values()}
+
+
+def close_sftp_pools():
+    """Ferme toutes les sessions inactives (arrêt de l'application, tests)."""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
+        _owners.clear()
@@ -26,6 +26,8 @@ def scan_and_map_torrents():
         label_sonarr = current_app.config.get('RTORRENT_LABEL_SONARR', 'sonarr')
         label_radarr = current_app.config.get('RTORRENT_LABEL_RADARR', 'radarr')
         final_statuses = {'completed_auto', 'completed_manual', 'processed_manual'}
+        # Transitions de statut collectées pendant le scan, écrites en une seule transaction
+        pending_status_updates = {}
 
         for torrent in completed_torrents:
             torrent_hash = torrent.get('hash')
@@ -69,7 +71,7 @@ def scan_and_map_torrents():
                 # Le reste de la fonction continue comme avant...
                 if entry.get('status') == 'pending_download':
                     logger.info(f"Scanner: Torrent connu '{release_name}' est complet. Passage à 'pending_staging'.")
-                    mapping_manager.update_torrent_status_in_map(torrent_hash, 'pending_staging')
+                    pending_status_updates[torrent_hash] = {'status': 'pending_staging'}
                 continue
 
             # Si on arrive ici, le torrent est NOUVEAU pour nous.
@@ -120,6 +122,9 @@ def scan_and_map_torrents():
             else:
                 logger.warning(f"Scanner: Le torrent '{release_name}' a un label inconnu ('{torrent_label}') et n'est pas dans le map. Il sera ignoré.")
 
+        if pending_status_updates:
+            mapping_manager.update_torrents_in_map(pending_status_updates)
+
     except Exception as e:
         logger.error(f"rTorrent Scanner Error: {e}", exc_info=True)
     finally:
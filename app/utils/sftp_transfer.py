@@ -0,0 +1,217 @@
+# app/utils/sftp_transfer.py
+"""
+Moteur de rapatriement SFTP.
+
+Plusieurs canaux SFTP sont ouverts sur un même transport SSH (multiplexage) et
+se partagent une file de fichiers. Chaque fichier est lu en mode pipeliné
+(`prefetch` à fenêtre bornée), écrit dans un `.part` local puis renommé une fois la taille
+vérifiée : un transfert interrompu reprend à l'offset du `.part` au lieu de
+repartir de zéro. Le débit peut être limité par item (lecture sans prefetch
+dans ce cas, pour que la limite s'applique au réseau).
+"""
+import os
+import queue
+import stat
+import threading
+import time
+import logging
+
+import paramiko
+from flask import current_app, has_app_context
+
+PART_SUFFIX = '.part'
+READ_CHUNK_SIZE = 1024 * 1024
+# Requêtes SFTP en vol pendant le prefetch (32 Ko chacune) : borne la mémoire
+# au lieu de demander tout le fichier d'un coup.
+PREFETCH_MAX_REQUESTS = 64
+DEFAULT_WORKERS = 4
+DEFAULT_RETRIES = 2
+CHANNEL_TIMEOUT_SECONDS = 600
+
+module_logger = logging.getLogger(__name__)
+
+
+class _RateLimiter:
+    """Seau à jetons partagé par les fichiers d'un même item."""
+
+    def __init__(self, bytes_per_second):
+        self.rate = float(bytes_per_second)
+        self._lock = threading.Lock()
+        self._allowance = self.rate
+        self._last = time.monotonic()
+
+    def consume(self, nbytes):
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate)
+            self._last = now
+            self._allowance -= nbytes
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _transfer_settings():
+    if has_app_context():
+        config = current_app.config
+        return (int(config.get('SFTP_TRANSFER_WORKERS', DEFAULT_WORKERS) or DEFAULT_WORKERS),
+                int(config.get('SFTP_TRANSFER_BANDWIDTH_LIMIT_KBPS', 0) or 0))
+    return DEFAULT_WORKERS, 0
+
+
+def _expand_remote_item(sftp_client, remote_path, local_path):
+    """Liste (remote_file, local_file, size) pour un fichier ou un dossier distant (récursif)."""
+    attr = sftp_client.stat(remote_path)
+    if not stat.S_ISDIR(attr.st_mode):
+        return [(remote_path, local_path, attr.st_size)]
+
+    os.makedirs(local_path, exist_ok=True)
+    files = []
+    for entry in sftp_client.listdir_attr(remote_path):
+        if entry.filename in ('.', '..'):
+            continue
+        child_remote = f"{remote_path.rstrip('/')}/{entry.filename}"
+        child_local = os.path.join(local_path, entry.filename)
+        if stat.S_ISDIR(entry.st_mode):
+            files.extend(_expand_remote_item(sftp_client, child_remote, child_local))
+        else:
+            files.append((child_remote, child_local, entry.st_size))
+    return files
+
+
+def download_file(sftp_client, remote_path, local_path, remote_size, limiter=None):
+    """
+    Télécharge un fichier en reprenant depuis `local_path + '.part'` s'il existe.
+    Lève IOError si la taille finale ne correspond pas (le .part est conservé).
+    """
+    if os.path.isfile(local_path) and os.path.getsize(local_path) == remote_size:
+        return False  # Déjà complet : rien à transférer
+
+    os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+    part_path = local_path + PART_SUFFIX
+    offset = os.path.getsize(part_path) if os.path.isfile(part_path) else 0
+    if offset > remote_size:
+        offset = 0
+
+    with sftp_client.open(remote_path, 'rb') as remote_file:
+        remote_file.seek(offset)
+        if limiter is None:
+            remote_file.prefetch(remote_size, max_concurrent_requests=PREFETCH_MAX_REQUESTS)
+        # Avec une limite de débit, pas de prefetch : chaque read() part sur le
+        # réseau, donc le seau à jetons cadence bien le transfert lui-même.
+        with open(part_path, 'ab' if offset else 'wb') as local_file:
+            remaining = remote_size - offset
+            while remaining > 0:
+                data = remote_file.read(min(READ_CHUNK_SIZE, remaining))
+                if not data:
+                    break
+                local_file.write(data)
+                remaining -= len(data)
+                if limiter:
+                    limiter.consume(len(data))
+
+    written = os.path.getsize(part_path)
+    if written != remote_size:
+        raise IOError(f"Taille incohérente pour '{remote_path}': {written} octets reçus, {remote_size} attendus.")
+    os.replace(part_path, local_path)
+    return True
+
+
+def download_items(items, transport, logger=None, workers=None, bandwidth_limit_kbps=None, retries=DEFAULT_RETRIES):
+    """
+    Rapatrie plusieurs items (fichiers ou dossiers) en parallèle sur `transport`.
+
+    :param items: itérable de tuples (key, remote_path, local_path).
+    :param transport: paramiko.Transport déjà authentifié ; il n'est pas fermé ici.
+    :return: dict {key: bool} — True si tous les fichiers de l'item sont complets.
+    """
+    logger = logger or (current_app.logger if has_app_context() else module_logger)
+    default_workers, default_limit = _transfer_settings()
+    workers = workers or default_workers
+    bandwidth_limit_kbps = default_limit if bandwidth_limit_kbps is None else bandwidth_limit_kbps
+
+    items = list(items)
+    results = {key: True for key, _, _ in items}
+    if not items:
+        return results
+
+    # 1. Inventaire des fichiers à transférer (un seul canal)
+    jobs = []
+    listing_client = paramiko.SFTPClient.from_transport(transport)
+    try:
+        listing_client.get_channel().settimeout(CHANNEL_TIMEOUT_SECONDS)
+        for key, remote_path, local_path in items:
+            try:
+                files = _expand_remote_item(listing_client, remote_path, local_path)
+            except FileNotFoundError:
+                logger.error(f"SFTP Transfer: Le chemin distant '{remote_path}' n'existe pas.")
+                results[key] = False
+                continue
+            except Exception as e:
+                logger.error(f"SFTP Transfer: Impossible de lister '{remote_path}': {type(e).__name__} - {e}")
+                results[key] = False
+                continue
+            limiter = _RateLimiter(bandwidth_limit_kbps * 1024) if bandwidth_limit_kbps > 0 else None
+            jobs.extend((key, remote_file, local_file, size, limiter) for remote_file, local_file, size in files)
+    finally:
+        listing_client.close()
+
+    # Les plus gros fichiers d'abord pour équilibrer les canaux
+    jobs.sort(key=lambda job: job[3], reverse=True)
+    job_queue = queue.Queue()
+    for job in jobs:
+        job_queue.put(job)
+
+    results_lock = threading.Lock()
+    stats = {'files': 0, 'skipped': 0, 'bytes': 0}
+
+    def _worker():
+        sftp_client = None
+        try:
+            while True:
+                try:
+                    key, remote_file, local_file, size, limiter = job_queue.get_nowait()
+                except queue.Empty:
+                    return
+                with results_lock:
+                    if not results[key]:
+                        continue  # Un autre fichier de l'item a déjà échoué
+                for attempt in range(retries + 1):
+                    try:
+                        if sftp_client is None:
+                            sftp_client = paramiko.SFTPClient.from_transport(transport)
+                            sftp_client.get_channel().settimeout(CHANNEL_TIMEOUT_SECONDS)
+                        transferred = download_file(sftp_client, remote_file, local_file, size, limiter)
+                        with results_lock:
+                            stats['files' if transferred else 'skipped'] += 1
+                            stats['bytes'] += size if transferred else 0
+                        break
+                    except Exception as e:
+                        logger.warning(f"SFTP Transfer: Échec sur '{remote_file}' (tentative {attempt + 1}/{retries + 1}): {type(e).__name__} - {e}")
+                        if sftp_client is not None:
+                            try:
+                                sftp_client.close()
+                            except Exception:
+                                pass
+                            sftp_client = None
+                        if attempt == retries or not transport.is_active():
+                            with results_lock:
+                                results[key] = False
+                            break
+        finally:
+            if sftp_client is not None:
+                sftp_client.close()
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=_worker, name=f"sftp-transfer-{i}", daemon=True)
+               for i in range(max(1, min(workers, len(jobs))))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"SFTP Transfer: {stats['files']} fichier(s) transféré(s), {stats['skipped']} déjà complet(s), "
+                f"{stats['bytes'] / (1024 * 1024):.1f} Mo en {elapsed:.1f}s via {len(threads)} canal(aux). "
+                f"Items OK: {sum(1 for ok in results.values() if ok)}/{len(results)}.")
+    return results
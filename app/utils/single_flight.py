@@ -0,0 +1,117 @@
+# app/utils/single_flight.py
+"""
+Coalescence des requêtes amont identiques (« single-flight »).
+
+Quand plusieurs threads demandent la même ressource au même moment (mêmes
+service + clé), un seul appel part réellement ; les autres attendent sa fin et
+reçoivent une copie de son résultat (ou la même exception). Rien n'est mis en
+cache : dès que l'appel en vol est terminé, la demande suivante repart à l'amont.
+"""
+import copy
+import functools
+import threading
+
+_lock = threading.Lock()
+_in_flight = {}
+_stats = {}
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+def _count(namespace, field):
+    stats = _stats.setdefault(namespace, {'calls': 0, 'executed': 0, 'coalesced': 0})
+    stats[field] += 1
+
+
+def do(namespace, key, func):
+    """
+    Exécute func() sauf si un appel (namespace, key) est déjà en vol, auquel cas
+    attend sa fin et retourne une copie de son résultat.
+    """
+    flight_key = (namespace, key)
+    with _lock:
+        _count(namespace, 'calls')
+        call = _in_flight.get(flight_key)
+        leader = call is None
+        if leader:
+            call = _Call()
+            _in_flight[flight_key] = call
+            _count(namespace, 'executed')
+        else:
+            call.waiters += 1
+            _count(namespace, 'coalesced')
+
+    if not leader:
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        # Copie : un appelant qui modifie son résultat ne doit pas affecter les autres
+        return copy.deepcopy(call.result)
+
+    result = None
+    try:
+        result = func()
+        return result
+    except BaseException as e:
+        call.error = e
+        raise
+    finally:
+        with _lock:
+            _in_flight.pop(flight_key, None)
+            waiters = call.waiters
+        if waiters and call.error is None:
+            # Figé avant de rendre la main : le résultat de l'appelant principal reste à lui
+            call.result = copy.deepcopy(result)
+        call.event.set()
+
+
+def _freeze(value):
+    """Transforme arguments/params en clé hashable et stable."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted((_freeze(v) for v in value), key=repr))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value if isinstance(value, (str, int, float, bool, type(None))) else str(value)
+
+
+def make_key(*args, **kwargs):
+    return (_freeze(args), _freeze(kwargs))
+
+
+def coalesce(namespace):
+    """
+    Décorateur de méthode : les appels concurrents avec les mêmes arguments
+    (hors self) partagent une seule exécution.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (func.__name__,) + make_key(*args, **kwargs)
+            return do(namespace, key, lambda: func(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def get_single_flight_stats():
+    """Par service : appels reçus, exécutés réellement et coalescés, plus les appels en vol."""
+    with _lock:
+        snapshot = {namespace: dict(stats) for namespace, stats in _stats.items()}
+        for namespace, _ in _in_flight:
+            snapshot.setdefault(namespace, {'calls': 0, 'executed': 0, 'coalesced': 0})
+            snapshot[namespace]['in_flight'] = snapshot[namespace].get('in_flight', 0) + 1
+        return snapshot
+
+
+def reset_single_flight_stats():
+    with _lock:
+        _stats.clear()
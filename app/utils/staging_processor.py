@@ -1,6 +1,5 @@
 # app/utils/staging_processor.py
 import os
-import stat
 import shutil
 import paramiko
 import time
@@ -8,21 +7,17 @@ import re
 from flask import current_app
 from pathlib import Path
 
-from . import mapping_manager, arr_client
+from . import mapping_manager, arr_client, sftp_transfer, sftp_pool
 from app.utils.arr_client import parse_media_name
 
 def _connect_sftp():
-    """Establishes an SFTP connection using settings from current_app.config."""
+    """Emprunte une session SFTP au pool partagé (à rendre avec sftp_pool.release_sftp)."""
     sftp_host = current_app.config['SEEDBOX_SFTP_HOST']
     sftp_port = current_app.config['SEEDBOX_SFTP_PORT']
     sftp_user = current_app.config['SEEDBOX_SFTP_USER']
-    sftp_password = current_app.config['SEEDBOX_SFTP_PASSWORD']
 
     try:
-        transport = paramiko.Transport((sftp_host, sftp_port))
-        transport.set_keepalive(30)
-        transport.connect(username=sftp_user, password=sftp_password)
-        sftp = paramiko.SFTPClient.from_transport(transport)
+        sftp, transport = sftp_pool.acquire_sftp()
         current_app.logger.info(f"Staging Processor: Successfully connected to SFTP server: {sftp_host}")
         return sftp, transport
     except paramiko.ssh_exception.AuthenticationException:
@@ -32,19 +27,6 @@ def _connect_sftp():
         current_app.logger.error(f"Staging Processor: SFTP connection failed for {sftp_user}@{sftp_host}:{sftp_port} - {type(e).__name__}: {e}")
         return None, None
 
-def _get_r_recursive(sftp_client, remotedir, localdir):
-    """
-    Recursively download a directory from a remote SFTP server.
-    """
-    for item_attr in sftp_client.listdir_attr(remotedir):
-        remote_path = os.path.join(remotedir, item_attr.filename).replace('\\', '/')
-        local_path = os.path.join(localdir, item_attr.filename)
-        if stat.S_ISDIR(item_attr.st_mode):
-            os.makedirs(local_path, exist_ok=True)
-            _get_r_recursive(sftp_client, remote_path, local_path)
-        else:
-            sftp_client.get(remote_path, local_path)
-
 def _apply_path_mapping(original_path):
     """Applies the remote path mapping from config if it exists."""
     mapping_str = current_app.config.get('SEEDBOX_SFTP_REMOTE_PATH_MAPPING')
@@ -60,51 +42,49 @@ def _apply_path_mapping(original_path):
                 return new_path
     return original_path
 
-def _rapatriate_item(item, sftp_client, folder_name):
+def _build_rapatriation_job(item, folder_name):
+    """Retourne (torrent_hash, chemin distant, chemin local) pour un item, ou None si le chemin distant manque."""
     release_name = item.get('release_name')
     original_remote_path = item.get('seedbox_download_path')
 
     if not original_remote_path:
         current_app.logger.error(f"Échec du rapatriement pour '{release_name}': Le chemin 'seedbox_download_path' est manquant dans le mapping.")
         mapping_manager.update_torrent_status_in_map(item.get('torrent_hash'), 'error_missing_path', 'Chemin distant manquant dans le mapping.')
-        return False
+        return None
 
     remote_path = _apply_path_mapping(original_remote_path)
     raw_local_path = os.path.join(current_app.config['LOCAL_STAGING_PATH'], folder_name)
     local_path = os.path.normpath(raw_local_path)
 
     current_app.logger.info(f"Rapatriement de '{release_name}' (dossier: {folder_name}) depuis '{remote_path}' vers '{local_path}'")
+    return item.get('torrent_hash'), remote_path, local_path
 
-    try:
-        # Définir un timeout pour les opérations SFTP (ex: 10 minutes pour les gros fichiers)
-        sftp_client.get_channel().settimeout(600)
-
-        current_app.logger.debug(f"SFTP_DEBUG: Tentative de sftp.stat sur '{remote_path}'")
-        file_attr = sftp_client.stat(remote_path)
-        current_app.logger.debug(f"SFTP_DEBUG: sftp.stat réussi.")
-        is_directory = stat.S_ISDIR(file_attr.st_mode)
-
-        if is_directory:
-            current_app.logger.info(f"'{remote_path}' est un dossier. Téléchargement récursif.")
-            os.makedirs(local_path, exist_ok=True)
-            _get_r_recursive(sftp_client, remote_path, local_path)
-            current_app.logger.info(f"Téléchargement du dossier '{remote_path}' réussi.")
+def _rapatriate_items(items_with_folders, transport):
+    """
+    Rapatrie plusieurs items en parallèle via le moteur sftp_transfer.
+    `items_with_folders` : liste de (item, folder_name). Retourne {torrent_hash: bool}.
+    """
+    results = {}
+    jobs = []
+    for item, folder_name in items_with_folders:
+        job = _build_rapatriation_job(item, folder_name)
+        if job is None:
+            results[item.get('torrent_hash')] = False
         else:
-            current_app.logger.info(f"'{remote_path}' est un fichier. Téléchargement direct.")
-            os.makedirs(os.path.dirname(local_path), exist_ok=True)
-            current_app.logger.debug(f"SFTP_DEBUG: Tentative de sftp.get sur '{remote_path}'")
-            sftp_client.get(remote_path, local_path)
-            current_app.logger.debug(f"SFTP_DEBUG: sftp.get réussi.")
-            current_app.logger.info(f"Téléchargement du fichier '{remote_path}' réussi.")
+            jobs.append(job)
 
-        return True
+    if jobs:
+        try:
+            results.update(sftp_transfer.download_items(jobs, transport))
+        except Exception as e:
+            current_app.logger.error(f"Échec du rapatriement groupé: {type(e).__name__} - {e}", exc_info=True)
+            results.update({job[0]: False for job in jobs})
+    return results
 
-    except FileNotFoundError:
-        current_app.logger.error(f"Le chemin distant '{remote_path}' n'existe pas.", exc_info=True)
-        return False
-    except Exception as e:
-        current_app.logger.error(f"Échec du rapatriement pour '{remote_path}': {type(e).__name__} - {e}", exc_info=True)
-        return False
+def _rapatriate_item(item, sftp_client, folder_name):
+    """Rapatrie un seul item en réutilisant le transport du client SFTP fourni."""
+    transport = sftp_client.get_channel().get_transport()
+    return _rapatriate_items([(item, folder_name)], transport).get(item.get('torrent_hash'), False)
 
 def _cleanup_staging(item_name):
     """
@@ -303,19 +283,30 @@ def process_pending_staging_items():
 
         logger.info(f"Staging Processor: Found {len(items_to_process)} items to process.")
 
+        # Tous les items 'pending_staging' sont rapatriés ensemble, en parallèle
+        pending_items = []
         for torrent_hash, item_data in items_to_process.items():
             item_data['torrent_hash'] = torrent_hash
+            if item_data.get('status') == 'pending_staging':
+                folder_name = item_data.get('folder_name', item_data['release_name'])
+                logger.info(f"Item '{folder_name}' is pending_staging. Starting rapatriation.")
+                pending_items.append((item_data, folder_name))
+        rapatriation_results = _rapatriate_items(pending_items, transport) if pending_items else {}
+
+        # Files d'attente Sonarr/Radarr téléchargées au plus une fois pour tout le cycle
+        queue_snapshot = arr_client.get_arr_queue_snapshot()
+
+        for torrent_hash, item_data in items_to_process.items():
             folder_name = item_data.get('folder_name', item_data['release_name'])
             current_status = item_data.get('status')
 
             # --- DÉBUT DE LA LOGIQUE D'AIGUILLAGE ---
             if current_status == 'pending_staging':
-                logger.info(f"Item '{folder_name}' is pending_staging. Starting rapatriation.")
-                if _rapatriate_item(item_data, sftp_client, folder_name):
+                if rapatriation_results.get(torrent_hash):
                     mapping_manager.update_torrent_status_in_map(torrent_hash, 'in_staging', 'Item successfully downloaded to staging.')
                     # Le statut est maintenant 'in_staging', le traitement se fera à la suite
                 else:
-                    # _rapatriate_item gère déjà le statut d'erreur, on passe au suivant
+                    # Échec (ou chemin manquant, statut déjà positionné) : on passe au suivant
                     continue
             # --- FIN DE LA LOGIQUE D'AIGUILLAGE ---
 
@@ -323,12 +314,12 @@ def process_pending_staging_items():
             # soit il vient d'être rapatrié et son statut a été mis à jour.
             # On peut donc procéder au traitement manuel/automatique.
 
-            queue_item_sonarr = arr_client.find_in_arr_queue_by_hash('sonarr', torrent_hash)
+            queue_item_sonarr = arr_client.find_in_arr_queue_by_hash('sonarr', torrent_hash, queue_snapshot)
             if queue_item_sonarr:
                 _handle_automatic_import(item_data, queue_item_sonarr, 'sonarr', folder_name)
                 continue
 
-            queue_item_radarr = arr_client.find_in_arr_queue_by_hash('radarr', torrent_hash)
+            queue_item_radarr = arr_client.find_in_arr_queue_by_hash('radarr', torrent_hash, queue_snapshot)
             if queue_item_radarr:
                 _handle_automatic_import(item_data, queue_item_radarr, 'radarr', folder_name)
                 continue
@@ -337,6 +328,6 @@ def process_pending_staging_items():
 
     finally:
         if transport:
-            logger.info("Staging Processor: Closing SFTP transport.")
-            transport.close()
+            logger.info("Staging Processor: Returning SFTP session to the pool.")
+            sftp_pool.release_sftp(sftp_client, transport)
         logger.info("Staging Processor: Cycle finished.")
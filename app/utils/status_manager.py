@@ -2,7 +2,7 @@
 
 from flask import current_app
 from app.utils.arr_client import get_radarr_movie_by_guid, parse_media_name, get_sonarr_series_details_by_tvdbid
-from app.utils.archive_manager import get_archived_media_by_id
+from app.utils.archive_manager import is_media_archived
 
 def get_media_statuses(title=None, tmdb_id=None, tvdb_id=None, media_type=None, parsed_data=None):
     """
@@ -143,7 +143,7 @@ def _check_archive_status(tmdb_id, tvdb_id, media_type):
     elif media_type == 'movie' and tmdb_id:
         archive_id = f'movie_{tmdb_id}'
 
-    if archive_id and get_archived_media_by_id(archive_id):
+    if archive_id and is_media_archived(archive_id):
         return 'ARCHIVED'
 
     return None
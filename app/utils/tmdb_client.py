@@ -1,10 +1,11 @@
-# app/utils/tmdb_client.py (LA VRAIE CORRECTION)
+# app/utils/tmdb_client.py
 import logging
 import time
 import functools
+import threading
 from flask import current_app
-from tmdbv3api import TMDb, Movie, Search, TV, Find
 from tmdbv3api.exceptions import TMDbException
+from app.utils import http_client, single_flight, metadata_cache
 
 logger = logging.getLogger(__name__)
 
@@ -55,15 +56,65 @@ def robust_request(retries=3, delay=10, backoff=2):
         return wrapper_robust_request
     return decorator_robust_request
 
+def _is_not_found(error):
+    """Vrai si TMDb a répondu que la ressource n'existe pas (réponse cachable en négatif)."""
+    message = str(error).lower()
+    return 'could not be found' in message or 'status_code: 404' in message
+
+TMDB_API_BASE_URL = "https://api.themoviedb.org/3"
+TMDB_IMAGE_BASE_URL = "https://image.tmdb.org/t/p/w500"
+
+_shared_client_lock = threading.Lock()
+_shared_client = None
+
+def get_tmdb_client():
+    """
+    Retourne le client TMDb partagé par toute l'application (recréé si la clé API change).
+    Lève ValueError si TMDB_API_KEY n'est pas configurée, comme TheMovieDBClient().
+    """
+    global _shared_client
+    api_key = current_app.config.get('TMDB_API_KEY')
+    client = _shared_client
+    if client is not None and client.api_key == api_key:
+        return client
+    with _shared_client_lock:
+        if _shared_client is None or _shared_client.api_key != api_key:
+            _shared_client = TheMovieDBClient()
+        return _shared_client
+
 class TheMovieDBClient:
+    """
+    Accès TMDb sans état partagé : la langue est passée à chaque requête (paramètre
+    `language`) au lieu de modifier la configuration globale de tmdbv3api, et les
+    appels passent par la session HTTP poolée du service 'tmdb'. Une même instance
+    peut donc être utilisée par plusieurs threads en parallèle (voir get_tmdb_client).
+    """
+
     def __init__(self):
         self.api_key = current_app.config.get('TMDB_API_KEY')
         if not self.api_key:
             raise ValueError("La clé API TMDb (TMDB_API_KEY) n'est pas configurée.")
-        self.tmdb = TMDb()
-        self.tmdb.api_key = self.api_key
-        self.tmdb.language = 'fr' # Langue par défaut
 
+    def _get(self, path, lang=None, **params):
+        """GET sur l'API TMDb v3. Lève TMDbException (avec le status code) si TMDb répond une erreur."""
+        params['api_key'] = self.api_key
+        if lang:
+            params['language'] = lang
+        response = http_client.request('tmdb', 'GET', f"{TMDB_API_BASE_URL}/{path.lstrip('/')}", params=params, timeout=15)
+        if response.status_code >= 400:
+            try:
+                message = response.json().get('status_message', response.reason)
+            except ValueError:
+                message = response.reason
+            raise TMDbException(f"status_code: {response.status_code}, {message}")
+        return response.json()
+
+    @staticmethod
+    def _image_url(poster_path):
+        return f"{TMDB_IMAGE_BASE_URL}{poster_path}" if poster_path else ""
+
+    @single_flight.coalesce('tmdb')
+    @metadata_cache.cached('tmdb', 'movie_details', tier=metadata_cache.TIER_MEDIUM)
     @robust_request()
     def get_movie_details(self, tmdb_id, lang='fr-FR'):
         """
@@ -73,41 +124,32 @@ class TheMovieDBClient:
             logger.error("La clé API TMDb n'est pas disponible.")
             return None
 
-        # ** LA CORRECTION CRUCIALE EST ICI **
-        original_lang = self.tmdb.language
         try:
             logger.info(f"Récupération des détails TMDb pour l'ID : {tmdb_id} en langue '{lang}'")
+            movie = self._get(f"movie/{tmdb_id}", lang=lang)
 
-            # 1. On change la langue de l'instance
-            self.tmdb.language = lang
-
-            movie_api = Movie()
-
-            # 2. On fait l'appel SANS le paramètre 'language'
-            movie = movie_api.details(tmdb_id)
-
-            # 3. On construit le dictionnaire de retour avec les bons noms de clés
-            release_date = getattr(movie, 'release_date', '')
+            release_date = movie.get('release_date') or ''
             year = release_date.split('-')[0] if release_date else 'N/A'
 
             details = {
-                'id': movie.id,
-                'title': movie.title,
-                'original_title': movie.original_title,
-                'overview': movie.overview,
-                'poster': f"https://image.tmdb.org/t/p/w500{movie.poster_path}" if movie.poster_path else "",
+                'id': movie.get('id'),
+                'title': movie.get('title'),
+                'original_title': movie.get('original_title'),
+                'overview': movie.get('overview'),
+                'poster': self._image_url(movie.get('poster_path')),
                 'release_date': release_date,
                 'year': year,
-                'status': movie.status,
+                'status': movie.get('status'),
             }
             return details
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des détails TMDb pour {tmdb_id}: {e}", exc_info=True)
+            if not _is_not_found(e):
+                metadata_cache.skip_caching()
             return None
-        finally:
-            # 4. On restaure la langue d'origine, quoi qu'il arrive
-            self.tmdb.language = original_lang
 
+    @single_flight.coalesce('tmdb')
+    @metadata_cache.cached('tmdb', 'search_movie', tier=metadata_cache.TIER_MEDIUM)
     @robust_request()
     def search_movie(self, title, lang='fr-FR'):
         """
@@ -117,44 +159,36 @@ class TheMovieDBClient:
             logger.error("La clé API TMDb n'est pas disponible.")
             return []
 
-        original_lang = self.tmdb.language # Sauvegarde la langue originale
         try:
             logger.info(f"Recherche TMDb pour le titre : '{title}' en langue '{lang}'")
+            results = self._get("search/movie", lang=lang, query=title).get('results') or []
 
-            # 1. Changer la langue de l'instance globale avant l'appel
-            self.tmdb.language = lang
-
-            search = Search()
-
-            # 2. Appeler la recherche SANS le paramètre 'language'
-            results = search.movies(term=title)
-
-            # 3. Formatter les résultats (votre code existant est parfait)
             formatted_results = []
             for res in results:
                 # On force la conversion en str() pour les champs potentiellement problématiques
                 # et on fournit des valeurs par défaut sûres.
-                release_date = str(getattr(res, 'release_date', ''))
+                release_date = str(res.get('release_date') or '')
+                poster_path = res.get('poster_path')
 
                 formatted_results.append({
-                    'id': getattr(res, 'id', None),
-                    'title': str(getattr(res, 'title', 'Titre non disponible')),
-                    'original_title': str(getattr(res, 'original_title', '')),
-                    'overview': str(getattr(res, 'overview', '')),
-                    'poster_path': str(getattr(res, 'poster_path', '')),
+                    'id': res.get('id'),
+                    'title': str(res.get('title', 'Titre non disponible')),
+                    'original_title': str(res.get('original_title', '')),
+                    'overview': str(res.get('overview', '')),
+                    'poster_path': str(poster_path or ''),
                     'release_date': release_date,
                     'year': release_date.split('-')[0] if release_date else 'N/A',
-                    'poster_url': f"https://image.tmdb.org/t/p/w500{getattr(res, 'poster_path', '')}" if getattr(res, 'poster_path', None) else ''
+                    'poster_url': self._image_url(poster_path)
                 })
             return formatted_results
 
         except Exception as e:
             logger.error(f"Erreur lors de la recherche TMDb pour '{title}': {e}", exc_info=True)
+            metadata_cache.skip_caching()
             return []
-        finally:
-            # 4. Restaurer la langue originale, quoi qu'il arrive
-            self.tmdb.language = original_lang
 
+    @single_flight.coalesce('tmdb')
+    @metadata_cache.cached('tmdb', 'search_series', tier=metadata_cache.TIER_MEDIUM)
     @robust_request()
     def search_series(self, title, lang='fr-FR'):
         """
@@ -163,72 +197,82 @@ class TheMovieDBClient:
         if not self.api_key:
             logger.error("La clé API TMDb n'est pas disponible.")
             return []
-        original_lang = self.tmdb.language
         try:
-            self.tmdb.language = lang
-            search = Search()
-            results = search.tv_shows(term=title)
+            results = self._get("search/tv", lang=lang, query=title).get('results') or []
             formatted_results = []
             for res in results:
-                first_air_date = str(getattr(res, 'first_air_date', ''))
+                first_air_date = str(res.get('first_air_date') or '')
+                poster_path = res.get('poster_path')
                 formatted_results.append({
-                    'id': getattr(res, 'id', None),
-                    'name': str(getattr(res, 'name', 'Titre non disponible')),
-                    'original_name': str(getattr(res, 'original_name', '')),
-                    'overview': str(getattr(res, 'overview', '')),
-                    'poster_path': str(getattr(res, 'poster_path', '')),
+                    'id': res.get('id'),
+                    'name': str(res.get('name', 'Titre non disponible')),
+                    'original_name': str(res.get('original_name', '')),
+                    'overview': str(res.get('overview', '')),
+                    'poster_path': str(poster_path or ''),
                     'first_air_date': first_air_date,
                     'year': first_air_date.split('-')[0] if first_air_date else 'N/A',
-                    'poster_url': f"https://image.tmdb.org/t/p/w500{getattr(res, 'poster_path', '')}" if getattr(res, 'poster_path', None) else ''
+                    'poster_url': self._image_url(poster_path)
                 })
             return formatted_results
         except Exception as e:
             logger.error(f"Erreur lors de la recherche de série TMDb pour '{title}': {e}", exc_info=True)
+            metadata_cache.skip_caching()
             return []
-        finally:
-            self.tmdb.language = original_lang
 
+    @single_flight.coalesce('tmdb')
+    @metadata_cache.cached('tmdb', 'series_details', tier=metadata_cache.TIER_SHORT)
     @robust_request()
     def get_series_details(self, tmdb_id, lang='fr-FR'):
         """
         Récupère les détails d'une série depuis TMDb, y compris son TVDB ID.
         """
         if not self.api_key: return None
-        original_lang = self.tmdb.language
         try:
-            self.tmdb.language = lang
-            tv_api = TV()
-            series = tv_api.details(tmdb_id)
-            external_ids = tv_api.external_ids(tmdb_id)
+            # Les ids externes viennent dans la même réponse (append_to_response)
+            series = self._get(f"tv/{tmdb_id}", lang=lang, append_to_response='external_ids')
+            external_ids = series.get('external_ids') or {}
+            first_air_date = series.get('first_air_date')
             return {
-                'id': series.id, 'name': series.name, 'overview': series.overview,
-                'poster': f"https://image.tmdb.org/t/p/w500{series.poster_path}" if series.poster_path else "",
-                'year': series.first_air_date.split('-')[0] if hasattr(series, 'first_air_date') and series.first_air_date else 'N/A',
-                'status': series.status, 'tvdb_id': external_ids.get('tvdb_id') if external_ids else None,
-                'number_of_seasons': series.number_of_seasons, 'number_of_episodes': series.number_of_episodes
+                'id': series.get('id'), 'name': series.get('name'), 'overview': series.get('overview'),
+                'poster': self._image_url(series.get('poster_path')),
+                'year': first_air_date.split('-')[0] if first_air_date else 'N/A',
+                'status': series.get('status'), 'tvdb_id': external_ids.get('tvdb_id'),
+                'number_of_seasons': series.get('number_of_seasons'), 'number_of_episodes': series.get('number_of_episodes')
             }
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des détails de série TMDb pour {tmdb_id}: {e}", exc_info=True)
+            if not _is_not_found(e):
+                metadata_cache.skip_caching()
             return None
-        finally:
-            self.tmdb.language = original_lang
 
+    @single_flight.coalesce('tmdb')
     @robust_request()
     def find_series_by_tvdb_id(self, tvdb_id, lang='fr-FR'):
         """
         Trouve une série sur TMDb en utilisant son TVDB ID.
         """
         if not self.api_key: return None
-        original_lang = self.tmdb.language
+        tmdb_id = self.find_series_id_by_tvdb_id(tvdb_id)
+        if not tmdb_id:
+            return None
+        return self.get_series_details(tmdb_id, lang=lang)
+
+    @single_flight.coalesce('tmdb')
+    @metadata_cache.cached('tmdb', 'find_by_tvdb_id', tier=metadata_cache.TIER_LONG)
+    @robust_request()
+    def find_series_id_by_tvdb_id(self, tvdb_id):
+        """
+        Retourne l'ID TMDb de la série correspondant à un TVDB ID (None si aucune).
+        La correspondance ne change pas : elle est gardée longtemps en cache.
+        """
+        if not self.api_key: return None
         try:
-            self.tmdb.language = lang
-            find = Find()
-            results = find.find_by_tvdb_id(str(tvdb_id))
-            if results and results['tv_results']:
-                return self.get_series_details(results['tv_results'][0]['id'], lang=lang)
+            results = self._get(f"find/{tvdb_id}", external_source='tvdb_id')
+            if results and results.get('tv_results'):
+                return results['tv_results'][0]['id']
             return None
         except Exception as e:
             logger.error(f"Erreur lors de la recherche TMDb par TVDB ID {tvdb_id}: {e}", exc_info=True)
+            if not _is_not_found(e):
+                metadata_cache.skip_caching()
             return None
-        finally:
-            self.tmdb.language = original_lang
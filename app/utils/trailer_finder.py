@@ -1,5 +1,31 @@
+import threading
+from datetime import datetime, timezone
+
+from flask import current_app
 from googleapiclient.discovery import build
 
+from app.utils import metadata_cache, single_flight
+
+try:
+    from zoneinfo import ZoneInfo
+    # Le quota YouTube Data API est remis à zéro à minuit, heure du Pacifique
+    _QUOTA_TIMEZONE = ZoneInfo('America/Los_Angeles')
+except Exception:
+    _QUOTA_TIMEZONE = timezone.utc
+
+# Coût en unités de quota des appels utilisés (documentation YouTube Data API v3)
+SEARCH_QUOTA_COST = 100
+VIDEOS_LIST_QUOTA_COST = 1
+VIDEOS_LIST_MAX_IDS = 50
+DEFAULT_DAILY_QUOTA = 10000
+DEFAULT_INTERACTIVE_RESERVE = 2000
+DEFAULT_SEARCH_CACHE_TTL_HOURS = 72
+
+_services_local = threading.local()
+# Registre de secours quand le cache disque est désactivé
+_memory_usage_lock = threading.Lock()
+_memory_usage = {}
+
 def find_plex_trailer(plex_item, plex_server):
     """
     Recherche une bande-annonce et retourne une URL de streaming directe.
@@ -26,17 +52,103 @@ def find_plex_trailer(plex_item, plex_server):
 
     return None
 
-def find_youtube_trailer(query, api_key, page_token=None, max_results=5):
+# --- CLIENT YOUTUBE ---
+
+def _get_youtube_service(api_key):
+    """
+    Service googleapiclient réutilisé d'un appel à l'autre. httplib2 n'étant pas
+    thread-safe, chaque thread garde le sien (par clé API).
+    """
+    services = getattr(_services_local, 'services', None)
+    if services is None:
+        services = _services_local.services = {}
+    service = services.get(api_key)
+    if service is None:
+        service = services[api_key] = build('youtube', 'v3', developerKey=api_key, cache_discovery=False)
+    return service
+
+# --- REGISTRE DE QUOTA ---
+
+def _quota_period():
+    return datetime.now(_QUOTA_TIMEZONE).date().isoformat()
+
+def _quota_settings():
+    config = current_app.config
+    return (int(config.get('YOUTUBE_DAILY_QUOTA', DEFAULT_DAILY_QUOTA)),
+            int(config.get('YOUTUBE_QUOTA_INTERACTIVE_RESERVE', DEFAULT_INTERACTIVE_RESERVE)))
+
+def _get_quota_used(period):
+    used = metadata_cache.get_quota_usage('youtube', period)
+    if used is None:
+        with _memory_usage_lock:
+            used = _memory_usage.get(period, 0)
+    return used
+
+def _record_quota_usage(units):
+    period = _quota_period()
+    if metadata_cache.add_quota_usage('youtube', period, units) is None:
+        with _memory_usage_lock:
+            _memory_usage[period] = _memory_usage.get(period, 0) + units
+
+def _mark_quota_exhausted():
+    """YouTube a refusé l'appel (quotaExceeded) : le registre est aligné sur la limite."""
+    daily_quota, _ = _quota_settings()
+    missing = daily_quota - _get_quota_used(_quota_period())
+    if missing > 0:
+        _record_quota_usage(missing)
+
+def _is_quota_error(error):
+    return 'quotaExceeded' in str(error) or 'dailyLimitExceeded' in str(error)
+
+def get_youtube_quota_status():
+    """Consommation estimée du quota YouTube pour la journée en cours (heure du Pacifique)."""
+    daily_quota, reserve = _quota_settings()
+    period = _quota_period()
+    used = _get_quota_used(period)
+    return {
+        'period': period,
+        'used': used,
+        'daily_quota': daily_quota,
+        'remaining': max(0, daily_quota - used),
+        'interactive_reserve': reserve,
+    }
+
+def quota_allows(units, background=False):
+    """
+    Indique si `units` peuvent encore être dépensées aujourd'hui. Les tâches de
+    fond s'arrêtent avant la réserve gardée pour les recherches lancées depuis l'UI.
+    """
+    daily_quota, reserve = _quota_settings()
+    ceiling = daily_quota - (reserve if background else 0)
+    return _get_quota_used(_quota_period()) + units <= ceiling
+
+# --- RECHERCHE ET DÉTAILS ---
+
+def find_youtube_trailer(query, api_key, page_token=None, max_results=5, background=False):
     """
     Effectue une recherche paginée sur YouTube pour une seule requête.
     Retourne un dictionnaire avec les résultats et le token pour la page suivante.
+    Les réponses sont mises en cache par (requête, page, taille) ; si le quota du
+    jour ne permet pas la recherche, retourne une liste vide avec 'quota_exceeded'.
     """
     if not api_key:
         print("AVERTISSEMENT: Aucune clé API YouTube n'a été fournie.")
         return {'results': [], 'nextPageToken': None}
 
+    found, cached = metadata_cache.lookup('youtube', 'search', query, page_token, max_results)
+    if found:
+        return cached
+
+    return single_flight.do('youtube', ('search', query, page_token, max_results),
+                            lambda: _search_youtube(query, api_key, page_token, max_results, background))
+
+def _search_youtube(query, api_key, page_token, max_results, background):
+    if not quota_allows(SEARCH_QUOTA_COST, background=background):
+        print(f"AVERTISSEMENT: Quota YouTube insuffisant, recherche '{query}' reportée (arrière-plan: {background}).")
+        return {'results': [], 'nextPageToken': None, 'quota_exceeded': True}
+
     try:
-        youtube = build('youtube', 'v3', developerKey=api_key, cache_discovery=False)
+        youtube = _get_youtube_service(api_key)
 
         print(f"DEBUG: Recherche YouTube avec la requête : '{query}', page_token: {page_token}, max_results: {max_results}")
         request = youtube.search().list(
@@ -48,6 +160,7 @@ def find_youtube_trailer(query, api_key, page_token=None, max_results=5):
             pageToken=page_token
         )
         response = request.execute()
+        _record_quota_usage(SEARCH_QUOTA_COST)
 
         results = []
         if response.get('items'):
@@ -60,32 +173,65 @@ def find_youtube_trailer(query, api_key, page_token=None, max_results=5):
                 })
 
         next_page_token = response.get('nextPageToken')
-        return {'results': results, 'nextPageToken': next_page_token}
+        search_result = {'results': results, 'nextPageToken': next_page_token}
+        if results:
+            ttl_hours = float(current_app.config.get('YOUTUBE_SEARCH_CACHE_TTL_HOURS', DEFAULT_SEARCH_CACHE_TTL_HOURS))
+            metadata_cache.store('youtube', 'search', query, page_token, max_results, value=search_result, ttl_hours=ttl_hours)
+        else:
+            # Aucun résultat : conservé moins longtemps (cache négatif)
+            metadata_cache.store('youtube', 'search', query, page_token, max_results, value=search_result, tier='negative')
+        return search_result
 
     except Exception as e:
         print(f"ERREUR lors de la recherche sur YouTube : {e}")
+        if _is_quota_error(e):
+            _mark_quota_exhausted()
+            return {'results': [], 'nextPageToken': None, 'quota_exceeded': True}
         return {'results': [], 'nextPageToken': None}
 
-def get_videos_details(video_ids, api_key):
+def get_videos_details(video_ids, api_key, background=False):
     """
     Récupère les détails de plusieurs vidéos YouTube en un seul appel batch.
+    Les détails déjà connus sont servis depuis le cache (par videoId) : seuls
+    les ids manquants sont demandés à l'API.
     """
     if not api_key or not video_ids:
         return {}
 
-    try:
-        youtube = build('youtube', 'v3', developerKey=api_key, cache_discovery=False)
-
-        # On peut demander jusqu'à 50 IDs à la fois.
-        request = youtube.videos().list(
-            part="snippet,contentDetails",
-            id=",".join(video_ids)
-        )
-        response = request.execute()
-
-        video_details = {item['id']: item for item in response.get('items', [])}
-        return video_details
-
-    except Exception as e:
-        print(f"ERREUR lors de la récupération des détails des vidéos : {e}")
-        return {}
+    video_details = {}
+    missing_ids = []
+    for video_id in dict.fromkeys(video_ids):
+        found, item = metadata_cache.lookup('youtube', 'video_details', video_id)
+        if not found:
+            missing_ids.append(video_id)
+        elif item:
+            video_details[video_id] = item
+
+    # On peut demander jusqu'à 50 IDs à la fois.
+    for index in range(0, len(missing_ids), VIDEOS_LIST_MAX_IDS):
+        chunk = missing_ids[index:index + VIDEOS_LIST_MAX_IDS]
+        if not quota_allows(VIDEOS_LIST_QUOTA_COST, background=background):
+            print(f"AVERTISSEMENT: Quota YouTube insuffisant, détails de {len(chunk)} vidéo(s) non récupérés.")
+            break
+        try:
+            youtube = _get_youtube_service(api_key)
+            request = youtube.videos().list(
+                part="snippet,contentDetails",
+                id=",".join(chunk)
+            )
+            response = request.execute()
+            _record_quota_usage(VIDEOS_LIST_QUOTA_COST)
+        except Exception as e:
+            print(f"ERREUR lors de la récupération des détails des vidéos : {e}")
+            if _is_quota_error(e):
+                _mark_quota_exhausted()
+            break
+
+        fetched = {item['id']: item for item in response.get('items', [])}
+        for video_id in chunk:
+            # Vidéo supprimée ou privée : mémorisée comme absente (cache négatif)
+            metadata_cache.store('youtube', 'video_details', video_id,
+                                 value=fetched.get(video_id), tier=metadata_cache.TIER_LONG)
+        video_details.update(fetched)
+
+    return video_details
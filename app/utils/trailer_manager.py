@@ -1,6 +1,10 @@
+import atexit
+import copy
 import json
 import os
 import logging
+import threading
+import time
 from filelock import FileLock, Timeout
 from flask import current_app
 from datetime import datetime, timedelta
@@ -40,51 +44,178 @@ def _get_db_path_and_logger():
             raise
     return path, logger
 
-def _load_database():
-    """Charge la base de données depuis le fichier JSON avec un verrouillage de fichier."""
-    db_file, logger = _get_db_path_and_logger()
-    lock_file = db_file + ".lock"
-    lock = FileLock(lock_file, timeout=10)
+# --- STOCKAGE EN MÉMOIRE (WRITE-BEHIND) ---
+# La base est chargée une fois par processus et servie depuis la mémoire. Les
+# écritures modifient la copie en mémoire puis sont regroupées et persistées après
+# un court délai (TRAILER_DB_FLUSH_DELAY_SECONDS), par écriture atomique
+# (fichier temporaire + rename). Le mtime du fichier est surveillé pour recharger
+# les modifications faites par un autre processus ; nos clés non encore écrites
+# sont réappliquées par-dessus.
 
-    try:
-        with lock:
-            if not os.path.exists(db_file):
-                return {}
-            with open(db_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if not content.strip():
-                    logger.info(f"Le fichier de la base de données {db_file} est vide. Retourne une base de données vide.")
-                    return {}
+DEFAULT_FLUSH_DELAY_SECONDS = 2.0
+_MTIME_CHECK_INTERVAL_SECONDS = 1.0
+
+
+class _TrailerStore:
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.lock_file = db_file + ".lock"
+        self._lock = threading.RLock()
+        self._data = None
+        self._file_signature = None
+        self._last_check = 0.0
+        self._dirty_keys = set()
+        self._flush_timer = None
+
+    def _signature(self):
+        try:
+            stat_result = os.stat(self.db_file)
+            return (stat_result.st_mtime_ns, stat_result.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _read_file(self, logger):
+        if not os.path.exists(self.db_file):
+            return {}
+        with open(self.db_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if not content.strip():
+            logger.info(f"Le fichier de la base de données {self.db_file} est vide. Retourne une base de données vide.")
+            return {}
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            logger.error(f"Erreur de décodage JSON depuis {self.db_file}. Retourne une base de données vide.")
+            return {}
+
+    def _reload_locked(self, logger):
+        """Relit le fichier (verrou fichier tenu par l'appelant) et réapplique les clés non écrites."""
+        disk_data = self._read_file(logger)
+        if self._data is not None:
+            for key in self._dirty_keys:
+                if key in self._data:
+                    disk_data[key] = self._data[key]
+                else:
+                    disk_data.pop(key, None)
+        self._data = disk_data
+        self._file_signature = self._signature()
+
+    def data(self, logger):
+        """Dictionnaire en mémoire, rechargé si le fichier a été modifié par un autre processus."""
+        with self._lock:
+            now = time.monotonic()
+            if self._data is not None and now - self._last_check < _MTIME_CHECK_INTERVAL_SECONDS:
+                return self._data
+            self._last_check = now
+            if self._data is None or self._signature() != self._file_signature:
                 try:
-                    data = json.loads(content)
-                    return data
-                except json.JSONDecodeError:
-                    logger.error(f"Erreur de décodage JSON depuis {db_file}. Retourne une base de données vide.")
-                    return {}
-    except Timeout:
-        logger.error(f"Impossible d'acquérir le verrou pour {db_file} dans le temps imparti.")
-        raise
-    except Exception as e:
-        logger.error(f"Une erreur inattendue est survenue lors du chargement de la base de données {db_file}: {e}")
-        raise
-
-def _save_database(data):
-    """Sauvegarde la base de données dans le fichier JSON avec un verrouillage de fichier."""
+                    with FileLock(self.lock_file, timeout=10):
+                        self._reload_locked(logger)
+                except Timeout:
+                    logger.error(f"Impossible d'acquérir le verrou pour {self.db_file} dans le temps imparti.")
+                    if self._data is None:
+                        raise
+            return self._data
+
+    def put(self, key, entry, logger):
+        with self._lock:
+            self.data(logger)[key] = entry
+            self._mark_dirty(key, logger)
+
+    def delete(self, key, logger):
+        with self._lock:
+            self.data(logger).pop(key, None)
+            self._mark_dirty(key, logger)
+
+    def _mark_dirty(self, key, logger):
+        self._dirty_keys.add(key)
+        self._schedule_flush(logger)
+
+    def _schedule_flush(self, logger):
+        if self._flush_timer is not None:
+            return
+        try:
+            delay = float(current_app.config.get('TRAILER_DB_FLUSH_DELAY_SECONDS', DEFAULT_FLUSH_DELAY_SECONDS))
+        except RuntimeError:
+            delay = DEFAULT_FLUSH_DELAY_SECONDS
+        if delay <= 0:
+            self.flush(logger)
+            return
+        self._flush_timer = threading.Timer(delay, self.flush, args=(logger,))
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self, logger=None):
+        """Écrit les modifications en attente sur le disque (atomique : fichier temporaire + rename)."""
+        logger = logger or module_logger
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._dirty_keys:
+                return
+            try:
+                with FileLock(self.lock_file, timeout=10):
+                    if self._signature() != self._file_signature:
+                        self._reload_locked(logger)
+                    tmp_file = f"{self.db_file}.{os.getpid()}.tmp"
+                    with open(tmp_file, 'w', encoding='utf-8') as f:
+                        json.dump(self._data, f, ensure_ascii=False)
+                    os.replace(tmp_file, self.db_file)
+                    self._file_signature = self._signature()
+                    written = len(self._dirty_keys)
+                    self._dirty_keys.clear()
+                logger.debug(f"Base de données des bandes-annonces sauvegardée dans {self.db_file} ({written} entrée(s) modifiée(s)).")
+            except Timeout:
+                logger.error(f"Impossible d'acquérir le verrou pour {self.db_file} pour la sauvegarde. Nouvel essai au prochain changement.")
+            except Exception as e:
+                logger.error(f"Une erreur inattendue est survenue lors de la sauvegarde de la base de données dans {self.db_file}: {e}")
+
+
+_stores_lock = threading.Lock()
+_stores = {}
+
+
+def _get_store():
     db_file, logger = _get_db_path_and_logger()
-    lock_file = db_file + ".lock"
-    lock = FileLock(lock_file, timeout=10)
+    with _stores_lock:
+        store = _stores.get(db_file)
+        if store is None:
+            store = _stores[db_file] = _TrailerStore(db_file)
+    return store, logger
 
-    try:
-        with lock:
-            with open(db_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
-            logger.debug(f"Base de données des bandes-annonces sauvegardée dans {db_file}")
-    except Timeout:
-        logger.error(f"Impossible d'acquérir le verrou pour {db_file} pour la sauvegarde. Données non sauvegardées.")
-        raise
-    except Exception as e:
-        logger.error(f"Une erreur inattendue est survenue lors de la sauvegarde de la base de données dans {db_file}: {e}")
-        raise
+
+def flush_trailer_database():
+    """Force l'écriture des modifications en attente (arrêt de l'application, tests)."""
+    with _stores_lock:
+        stores = list(_stores.values())
+    for store in stores:
+        store.flush()
+
+
+atexit.register(flush_trailer_database)
+
+
+def _load_database():
+    """
+    Retourne la base des bandes-annonces (vue en mémoire, à ne pas modifier :
+    passer par _put_entry / _delete_entry).
+    """
+    store, logger = _get_store()
+    return store.data(logger)
+
+def _get_entry(db_key):
+    """Copie modifiable de l'entrée (dict vide si absente)."""
+    return copy.deepcopy(_load_database().get(db_key, {}))
+
+def _put_entry(db_key, entry):
+    store, logger = _get_store()
+    store.put(db_key, entry, logger)
+
+def _delete_entry(db_key):
+    store, logger = _get_store()
+    store.delete(db_key, logger)
 
 def _get_key(media_type, external_id):
     """Construit la clé de base de données standardisée."""
@@ -96,10 +227,9 @@ def get_trailer_info(media_type, external_id, title, year=None, page_token=None)
     Implémente la logique de cache, de verrouillage et de recherche externe.
     """
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
     _, logger = _get_db_path_and_logger()
 
-    entry = database.get(db_key, {})
+    entry = _get_entry(db_key)
 
     # Cas 1: La bande-annonce est verrouillée
     if entry.get('is_locked'):
@@ -113,8 +243,7 @@ def get_trailer_info(media_type, external_id, title, year=None, page_token=None)
                 'channel': ''
             }
             entry.pop('locked_video_id', None)
-            database[db_key] = entry # Met à jour la base de données en mémoire
-            _save_database(database) # Sauvegarde la migration sur le disque
+            _put_entry(db_key, entry) # Sauvegarde la migration (écriture différée)
 
         if entry.get('locked_video_data'):
             logger.info(f"Retourne la bande-annonce verrouillée pour {db_key}.")
@@ -165,8 +294,7 @@ def get_trailer_info(media_type, external_id, title, year=None, page_token=None)
     entry['last_search_timestamp'] = datetime.utcnow().isoformat()
     entry['is_locked'] = False # S'assurer que le statut est bien 'non verrouillé'
 
-    database[db_key] = entry
-    _save_database(database)
+    _put_entry(db_key, entry)
     logger.info(f"Résultats de recherche mis à jour pour {db_key}.")
 
     # Si on pagine, on ne retourne que les nouveaux résultats.
@@ -179,13 +307,30 @@ def get_trailer_info(media_type, external_id, title, year=None, page_token=None)
         'next_page_token': new_next_page_token
     }
 
+def store_prefetched_results(media_type, external_id, results):
+    """
+    Enregistre les résultats d'une recherche faite en arrière-plan, pour que
+    get_trailer_info les serve directement depuis le cache. N'écrase jamais une
+    bande-annonce verrouillée ni des résultats déjà présents. Retourne True si stocké.
+    """
+    db_key = _get_key(media_type, external_id)
+    entry = _get_entry(db_key)
+    if entry.get('is_locked') or entry.get('search_results'):
+        return False
+
+    entry['search_results'] = results
+    entry['next_page_token'] = None
+    entry['last_search_timestamp'] = datetime.utcnow().isoformat()
+    entry['is_locked'] = False
+    _put_entry(db_key, entry)
+    return True
+
 def lock_trailer(media_type, external_id, video_data):
     """
     Verrouille une bande-annonce pour un média. Si les données vidéo sont
     incomplètes (ajout manuel), elle les récupère depuis l'API YouTube.
     """
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
     _, logger = _get_db_path_and_logger()
 
     final_video_data = video_data
@@ -212,7 +357,7 @@ def lock_trailer(media_type, external_id, video_data):
         else:
             logger.error("Clé API YouTube non configurée. Impossible de récupérer les détails de la vidéo.")
 
-    entry = database.get(db_key, {})
+    entry = _get_entry(db_key)
     entry['is_locked'] = True
     entry['locked_video_data'] = final_video_data
     entry['last_updated_timestamp'] = datetime.utcnow().isoformat()
@@ -221,8 +366,7 @@ def lock_trailer(media_type, external_id, video_data):
     entry.pop('search_results', None)
     entry.pop('next_page_token', None)
 
-    database[db_key] = entry
-    _save_database(database)
+    _put_entry(db_key, entry)
     logger.info(f"Bande-annonce verrouillée pour {db_key} avec les données : {final_video_data}")
     return True
 
@@ -236,9 +380,26 @@ def get_trailer_status(media_type, external_id):
              'NONE' si aucune information n'est disponible.
     """
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
-    entry = database.get(db_key, {})
+    return _status_from_entry(_load_database().get(db_key, {}))
 
+def get_trailer_statuses(pairs):
+    """
+    Version groupée de get_trailer_status pour les vues en liste.
+
+    :param pairs: itérable de (media_type, external_id) ; un external_id vide donne 'NONE'.
+    :return: dict {(media_type, external_id): statut}, en une seule passe sur la base.
+    """
+    database = _load_database()
+    statuses = {}
+    for media_type, external_id in pairs:
+        if not media_type or not external_id:
+            statuses[(media_type, external_id)] = 'NONE'
+            continue
+        statuses[(media_type, external_id)] = _status_from_entry(database.get(_get_key(media_type, external_id), {}))
+    return statuses
+
+def _status_from_entry(entry):
+    """Calcule le statut ('LOCKED', 'UNLOCKED', 'NONE') d'une entrée de la base."""
     if entry.get('is_locked'):
         return 'LOCKED'
     if entry.get('search_results'):
@@ -269,8 +430,7 @@ def search_trailer_manually(media_type, external_id, query, page_token=None):
 
     # On récupère l'état de verrouillage actuel pour que l'UI reste cohérente
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
-    entry = database.get(db_key, {})
+    entry = _load_database().get(db_key, {})
     locked_video_data = entry.get('locked_video_data') if entry.get('is_locked') else None
 
     return {
@@ -287,8 +447,7 @@ def get_locked_trailer_video_id(media_type, external_id):
         str|None: L'ID de la vidéo YouTube, ou None si non verrouillée ou non trouvée.
     """
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
-    entry = database.get(db_key, {})
+    entry = _load_database().get(db_key, {})
 
     if entry.get('is_locked') and entry.get('locked_video_data'):
         return entry['locked_video_data'].get('videoId')
@@ -297,15 +456,15 @@ def get_locked_trailer_video_id(media_type, external_id):
 def unlock_trailer(media_type, external_id):
     """Déverrouille la bande-annonce pour un média."""
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
     _, logger = _get_db_path_and_logger()
 
-    if db_key in database:
-        database[db_key]['is_locked'] = False
-        database[db_key].pop('locked_video_id', None) # Ancien format
-        database[db_key].pop('locked_video_data', None) # Nouveau format
-        database[db_key]['last_updated_timestamp'] = datetime.utcnow().isoformat()
-        _save_database(database)
+    if db_key in _load_database():
+        entry = _get_entry(db_key)
+        entry['is_locked'] = False
+        entry.pop('locked_video_id', None) # Ancien format
+        entry.pop('locked_video_data', None) # Nouveau format
+        entry['last_updated_timestamp'] = datetime.utcnow().isoformat()
+        _put_entry(db_key, entry)
         logger.info(f"Bande-annonce déverrouillée pour {db_key}.")
         return True
 
@@ -315,12 +474,10 @@ def unlock_trailer(media_type, external_id):
 def clear_trailer_cache(media_type, external_id):
     """Supprime complètement l'entrée d'un média de la base de données."""
     db_key = _get_key(media_type, external_id)
-    database = _load_database()
     _, logger = _get_db_path_and_logger()
 
-    if db_key in database:
-        del database[db_key]
-        _save_database(database)
+    if db_key in _load_database():
+        _delete_entry(db_key)
         logger.info(f"Entrée du cache de bande-annonce effacée pour {db_key}.")
         return True
 
@@ -338,7 +495,7 @@ def clean_stale_entries(max_age_days=30):
     now = datetime.utcnow()
     max_age = timedelta(days=max_age_days)
 
-    for key, entry in database.items():
+    for key, entry in list(database.items()):
         # On ne nettoie que les entrées qui ne sont pas verrouillées
         if not entry.get('is_locked'):
             last_search_str = entry.get('last_search_timestamp')
@@ -359,8 +516,7 @@ def clean_stale_entries(max_age_days=30):
     if keys_to_delete:
         logger.info(f"Nettoyage de {len(keys_to_delete)} entrée(s) obsolète(s) de la base de données des bandes-annonces.")
         for key in keys_to_delete:
-            del database[key]
-        _save_database(database)
+            _delete_entry(key)
         return len(keys_to_delete)
 
     logger.info("Aucune entrée obsolète à nettoyer dans la base de données des bandes-annonces.")
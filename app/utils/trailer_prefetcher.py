@@ -0,0 +1,102 @@
+# app/utils/trailer_prefetcher.py
+"""
+Pré-chargement des bandes-annonces en arrière-plan.
+
+Parcourt les films Radarr et séries Sonarr (du plus récemment ajouté au plus
+ancien) dont la bande-annonce est au statut 'NONE', lance la recherche notée de
+l'agent et stocke les candidats dans la base des bandes-annonces : à l'ouverture
+de la modale, get_trailer_info les sert directement depuis le cache.
+
+Chaque passage est limité par un budget d'unités de quota YouTube, et s'arrête
+avant la part du quota journalier réservée aux recherches lancées depuis l'UI.
+"""
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.utils import trailer_manager
+from app.utils.arr_client import get_arr_catalog_records
+from app.utils.trailer_finder import (SEARCH_QUOTA_COST, VIDEOS_LIST_QUOTA_COST,
+                                      get_youtube_quota_status, quota_allows)
+
+DEFAULT_QUOTA_BUDGET = 2000
+# Pire cas d'une recherche notée : 3 requêtes search.list + 1 appel videos.list
+ITEM_WORST_CASE_COST = 3 * SEARCH_QUOTA_COST + VIDEOS_LIST_QUOTA_COST
+
+
+def _library_candidates():
+    """(media_type, external_id, title, year, added) des films et séries, les plus récents d'abord."""
+    candidates = []
+    for movie in get_arr_catalog_records('radarr'):
+        if movie.get('tmdbId') and movie.get('title'):
+            candidates.append(('movie', str(movie['tmdbId']), movie['title'], movie.get('year'), movie.get('added') or ''))
+    for series in get_arr_catalog_records('sonarr'):
+        if series.get('tvdbId') and series.get('title'):
+            candidates.append(('tv', str(series['tvdbId']), series['title'], series.get('year'), series.get('added') or ''))
+    # Dates ISO 8601 : l'ordre lexicographique suit l'ordre chronologique
+    candidates.sort(key=lambda candidate: candidate[4], reverse=True)
+    return candidates
+
+
+def _recently_attempted(entry, retry_after):
+    """Vrai si une recherche (même infructueuse) a déjà eu lieu pour cette entrée récemment."""
+    last_search_str = entry.get('last_search_timestamp')
+    if not last_search_str:
+        return False
+    try:
+        return datetime.utcnow() - datetime.fromisoformat(last_search_str) < retry_after
+    except ValueError:
+        return False
+
+
+def prefetch_missing_trailers(quota_budget=None):
+    """
+    Pré-charge les résultats de recherche des médias sans bande-annonce.
+    Retourne un résumé : médias examinés, pré-chargés, sans résultat, unités dépensées.
+    """
+    # Import local : le module agent importe ses routes, qui importent trailer_manager
+    from app.agent.services import _search_and_score_trailers
+
+    logger = current_app.logger
+    summary = {'candidates': 0, 'prefetched': 0, 'empty': 0, 'units_spent': 0, 'stopped_by': None}
+    if not current_app.config.get('YOUTUBE_API_KEY'):
+        logger.info("Trailer prefetch: clé API YouTube non configurée, rien à faire.")
+        return summary
+
+    if quota_budget is None:
+        quota_budget = int(current_app.config.get('TRAILER_PREFETCH_QUOTA_BUDGET', DEFAULT_QUOTA_BUDGET))
+    retry_after = timedelta(days=current_app.config.get('TRAILER_CACHE_AGE_DAYS', 7))
+
+    candidates = _library_candidates()
+    statuses = trailer_manager.get_trailer_statuses((media_type, external_id) for media_type, external_id, *_ in candidates)
+    database = trailer_manager._load_database()
+    pending = [candidate for candidate in candidates
+               if statuses[(candidate[0], candidate[1])] == 'NONE'
+               and not _recently_attempted(database.get(trailer_manager._get_key(candidate[0], candidate[1]), {}), retry_after)]
+    summary['candidates'] = len(pending)
+
+    start_used = get_youtube_quota_status()['used']
+    for media_type, external_id, title, year, _ in pending:
+        summary['units_spent'] = get_youtube_quota_status()['used'] - start_used
+        if summary['units_spent'] + ITEM_WORST_CASE_COST > quota_budget:
+            summary['stopped_by'] = 'budget'
+            break
+        if not quota_allows(ITEM_WORST_CASE_COST, background=True):
+            summary['stopped_by'] = 'daily_quota'
+            break
+
+        result = _search_and_score_trailers(title, year, 'show' if media_type == 'tv' else 'movie', background=True)
+        if result.get('quota_exceeded'):
+            summary['stopped_by'] = 'daily_quota'
+            break
+
+        results = result.get('results') if result.get('success') else []
+        # Même vide, la tentative est enregistrée pour ne pas relancer la recherche à chaque passage
+        if trailer_manager.store_prefetched_results(media_type, external_id, results or []):
+            summary['prefetched' if results else 'empty'] += 1
+
+    summary['units_spent'] = get_youtube_quota_status()['used'] - start_used
+    logger.info(f"Trailer prefetch: {summary['prefetched']} pré-chargé(s), {summary['empty']} sans résultat, "
+                f"{summary['units_spent']} unité(s) de quota sur {len(pending)} candidat(s)"
+                + (f" (arrêt : {summary['stopped_by']})." if summary['stopped_by'] else "."))
+    return summary
@@ -3,11 +3,16 @@
 import logging
 import time
 import functools
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
 from tvdb_v4_official import TVDB
 from config import Config
+from app.utils import single_flight, metadata_cache
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SEARCH_WORKERS = 5
+
 def robust_request_tvdb(retries=3, delay=30, backoff=2):
     """
     Décorateur pour rendre les appels à l'API TVDB plus robustes,
@@ -54,9 +59,13 @@ class CustomTVDBClient:
             except Exception as e:
                 logger.error(f"Failed to initialize TVDB client: {e}")
 
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'series_details', tier=metadata_cache.TIER_MEDIUM)
     @robust_request_tvdb()
     def get_series_details_by_id(self, tvdb_id, lang='fra'):
-        if not self.client: return None
+        if not self.client:
+            metadata_cache.skip_caching()
+            return None
         try:
             series_data = self.client.get_series(tvdb_id)
             if not series_data:
@@ -98,8 +107,11 @@ class CustomTVDBClient:
 
         except Exception as e:
             logger.error(f"Une erreur inattendue est survenue dans get_series_details_by_id pour {tvdb_id}: {e}")
+            metadata_cache.skip_caching()
             return None
 
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'search_series', tier=metadata_cache.TIER_MEDIUM)
     @robust_request_tvdb()
     def search_series(self, title, lang='fra', year=None):
         """
@@ -107,6 +119,7 @@ class CustomTVDBClient:
         """
         if not self.client:
             logger.error("Client TVDB non initialisé, recherche impossible.")
+            metadata_cache.skip_caching()
             return []
         try:
             logger.info(f"Recherche TVDB pour le titre : '{title}' en langue '{lang}' (Année: {year})")
@@ -117,14 +130,18 @@ class CustomTVDBClient:
             return results if results else []
         except Exception as e:
             logger.error(f"Erreur lors de la recherche TVDB pour '{title}': {e}", exc_info=True)
+            metadata_cache.skip_caching()
             return []
 
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'search_movie', tier=metadata_cache.TIER_MEDIUM)
     @robust_request_tvdb()
     def search_movie(self, title, lang='fra', year=None):
         """
         Recherche un film par son titre sur TVDB.
         """
         if not self.client:
+            metadata_cache.skip_caching()
             return []
         try:
             logger.info(f"Recherche TVDB pour le film : '{title}' en langue '{lang}' (Année: {year})")
@@ -135,8 +152,11 @@ class CustomTVDBClient:
             return results if results else []
         except Exception as e:
             logger.error(f"Erreur lors de la recherche film TVDB pour '{title}': {e}", exc_info=True)
+            metadata_cache.skip_caching()
             return []
 
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'search_and_translate_series', tier=metadata_cache.TIER_MEDIUM)
     @robust_request_tvdb(retries=3, delay=60) # Délai plus long car cette fonction peut faire plusieurs appels
     def search_and_translate_series(self, title, lang='fra'):
         """
@@ -146,6 +166,7 @@ class CustomTVDBClient:
         """
         if not self.client:
             logger.error("Client TVDB non initialisé.")
+            metadata_cache.skip_caching()
             return []
 
         logger.info(f"--- Recherche TVDB optimisée pour '{title}' ---")
@@ -160,56 +181,107 @@ class CustomTVDBClient:
 
             logger.info(f"  -> {len(search_results)} série(s) potentielle(s) trouvée(s).")
 
-            enriched_results = []
-            # On ne traite que les 5 premiers résultats pour la performance
-            for series_summary in search_results[:5]:
-                tvdb_id = series_summary.get('tvdb_id')
-                if not tvdb_id:
-                    continue
-
-                # On commence avec les données de base
-                # On récupère les détails complets pour avoir le nom original non traduit (avec fallback)
-                try:
-                    full_series_details = self.client.get_series(tvdb_id)
-                    original_name = full_series_details.get('name') if full_series_details else series_summary.get('name')
-                except Exception as e:
-                    logger.warning(f"  -> Impossible de récupérer les détails complets pour l'ID {tvdb_id} afin d'obtenir le nom original. Erreur: {e}")
-                    original_name = series_summary.get('name') # Fallback sécurisé
-
-                series_data = {
-                    'tvdb_id': tvdb_id,
-                    'name': series_summary.get('name'),
-                    'original_name': original_name,
-                    'year': series_summary.get('year'),
-                    'overview': series_summary.get('overview'),
-                    'poster_url': series_summary.get('image_url'),
-                    'slug': series_summary.get('slug')
-                }
-
-                # ÉTAPE 2: Tentative de traduction, gérée gracieusement
-                try:
-                    translation = self.client.get_series_translation(tvdb_id, lang)
-                    if translation:
-                        logger.info(f"  -> Traduction trouvée pour '{series_data['name']}' (ID: {tvdb_id})")
-                        series_data['name'] = translation.get('name') or series_data['name']
-                        series_data['overview'] = translation.get('overview') or series_data['overview']
-                except ValueError as e:
-                    # Cette exception est levée par la librairie pour une "NotFoundException".
-                    # C'est un cas normal (pas de traduction), donc on ne logue qu'en DEBUG.
-                    logger.debug(f"  -> Pas de traduction '{lang}' trouvée pour l'ID {tvdb_id}. C'est un cas normal.")
-                except Exception as e_translate:
-                    # Les autres erreurs sont plus graves
-                    logger.error(f"  -> Erreur inattendue lors de la traduction pour l'ID {tvdb_id}: {e_translate}")
-
-                enriched_results.append(series_data)
+            # On ne traite que les 5 premiers résultats pour la performance.
+            # Nom original et traduction de chaque résultat sont récupérés en parallèle (pool borné)
+            # et servis par le cache disque quand ils sont connus.
+            summaries = [summary for summary in search_results[:5] if summary.get('tvdb_id')]
+            if not summaries:
+                return []
+            app = current_app._get_current_object() if has_app_context() else None
+
+            def _enrich(series_summary):
+                if app is None:
+                    return metadata_cache.call_tracking_skip(self._build_translated_series, series_summary, lang)
+                with app.app_context():
+                    return metadata_cache.call_tracking_skip(self._build_translated_series, series_summary, lang)
+
+            workers = min(len(summaries), Config.TVDB_SEARCH_WORKERS or DEFAULT_SEARCH_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tvdb-search') as executor:
+                outcomes = list(executor.map(_enrich, summaries))
+            enriched_results = [series_data for series_data, _ in outcomes]
+            if any(skipped for _, skipped in outcomes):
+                # Un détail ou une traduction est en erreur : résultat partiel, à ne pas mettre en cache
+                metadata_cache.skip_caching()
 
             logger.info("--- Fin de la recherche TVDB optimisée ---")
             return enriched_results
 
         except Exception as e:
             logger.error(f"Erreur majeure dans search_and_translate_series pour '{title}': {e}", exc_info=True)
+            metadata_cache.skip_caching()
             return []
 
+    def _build_translated_series(self, series_summary, lang):
+        """Construit un résultat de search_and_translate_series (nom original + traduction)."""
+        tvdb_id = series_summary.get('tvdb_id')
+        translations = series_summary.get('translations') or {}
+        overviews = series_summary.get('overviews') or {}
+
+        # Le nom dans la langue d'origine est souvent déjà fourni par la recherche ;
+        # sinon on récupère les détails complets (avec fallback)
+        original_name = translations.get(series_summary.get('primary_language')) \
+            or self.get_series_original_name(tvdb_id) or series_summary.get('name') # Fallback sécurisé
+
+        series_data = {
+            'tvdb_id': tvdb_id,
+            'name': series_summary.get('name'),
+            'original_name': original_name,
+            'year': series_summary.get('year'),
+            'overview': series_summary.get('overview'),
+            'poster_url': series_summary.get('image_url'),
+            'slug': series_summary.get('slug')
+        }
+
+        # Traduction : celle renvoyée par la recherche si présente, sinon un appel (caché)
+        if lang in translations or lang in overviews:
+            translation = {'name': translations.get(lang), 'overview': overviews.get(lang)}
+        else:
+            translation = self.get_series_translation(tvdb_id, lang)
+        if translation:
+            logger.info(f"  -> Traduction trouvée pour '{series_data['name']}' (ID: {tvdb_id})")
+            series_data['name'] = translation.get('name') or series_data['name']
+            series_data['overview'] = translation.get('overview') or series_data['overview']
+        return series_data
+
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'series_translation', tier=metadata_cache.TIER_MEDIUM)
+    def get_series_translation(self, tvdb_id, lang):
+        """Traduction (nom, synopsis) d'une série ; None s'il n'en existe pas dans cette langue."""
+        if not self.client:
+            metadata_cache.skip_caching()
+            return None
+        try:
+            translation = self.client.get_series_translation(tvdb_id, lang)
+            return {'name': translation.get('name'), 'overview': translation.get('overview')} if translation else None
+        except ValueError:
+            # Cette exception est levée par la librairie pour une "NotFoundException".
+            # C'est un cas normal (pas de traduction), donc on ne logue qu'en DEBUG.
+            logger.debug(f"  -> Pas de traduction '{lang}' trouvée pour l'ID {tvdb_id}. C'est un cas normal.")
+            return None
+        except Exception as e_translate:
+            # Les autres erreurs sont plus graves
+            logger.error(f"  -> Erreur inattendue lors de la traduction pour l'ID {tvdb_id}: {e_translate}")
+            metadata_cache.skip_caching()
+            return None
+
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'original_name', tier=metadata_cache.TIER_LONG)
+    def get_series_original_name(self, tvdb_id):
+        """Nom original (non traduit) d'une série : ne change pas, gardé longtemps en cache."""
+        if not self.client:
+            metadata_cache.skip_caching()
+            return None
+        try:
+            full_series_details = self.client.get_series(tvdb_id)
+            return full_series_details.get('name') if full_series_details else None
+        except Exception as e:
+            logger.warning(f"  -> Impossible de récupérer les détails complets pour l'ID {tvdb_id} afin d'obtenir le nom original. Erreur: {e}")
+            metadata_cache.skip_caching()
+            return None
+
+    @single_flight.coalesce('tvdb')
+    @metadata_cache.cached('tvdb', 'season_episode_counts', tier=metadata_cache.TIER_SHORT,
+                           decode=lambda counts: {int(season): count for season, count in counts.items()})
     @robust_request_tvdb()
     def get_season_episode_counts(self, tvdb_id):
         """
@@ -218,6 +290,7 @@ class CustomTVDBClient:
         """
         if not self.client:
             logger.error("Client TVDB non initialisé.")
+            metadata_cache.skip_caching()
             return {}
 
         logger.info(f"Récupération du nombre d'épisodes pour la série TVDB ID: {tvdb_id}")
@@ -242,4 +315,5 @@ class CustomTVDBClient:
 
         except Exception as e:
             logger.error(f"Erreur lors de la récupération du nombre d'épisodes pour la série TVDB ID {tvdb_id}: {e}", exc_info=True)
+            metadata_cache.skip_caching()
             return {}
\ No newline at end of file
@@ -32,6 +32,13 @@ class Config:
     _plex_libraries_to_ignore_str = os.getenv('PLEX_LIBRARIES_TO_IGNORE', '')
     # Transforme la chaîne en une liste de noms, en retirant les espaces et les noms vides
     PLEX_LIBRARIES_TO_IGNORE = [name.strip() for name in _plex_libraries_to_ignore_str.split(',') if name.strip()]
+    # Durée de vie (secondes) des connexions Plex en cache : serveur admin, compte, utilisateurs gérés et leurs jetons
+    PLEX_HANDLE_CACHE_TTL_SECONDS = int(os.getenv('PLEX_HANDLE_CACHE_TTL_SECONDS', '1800').split('#')[0].strip())
+    # Délai minimal (secondes) entre deux vérifications d'une bibliothèque par l'index des facettes de filtres
+    PLEX_FACET_CHECK_INTERVAL_SECONDS = int(os.getenv('PLEX_FACET_CHECK_INTERVAL_SECONDS', '60').split('#')[0].strip())
+    # Miroir local (SQLite) des bibliothèques Plex ; vide = désactivé. Intervalle de synchronisation incrémentale (minutes, 0 = désactivé)
+    PLEX_MIRROR_DB_FILE = os.getenv('PLEX_MIRROR_DB_FILE', os.path.join(INSTANCE_FOLDER_PATH, 'plex_mirror.db')).split('#')[0].strip()
+    PLEX_MIRROR_SYNC_INTERVAL_MINUTES = int(os.getenv('PLEX_MIRROR_SYNC_INTERVAL_MINUTES', '30').split('#')[0].strip())
 
     # --- *ARR SUITE ---
     SONARR_URL = os.getenv('SONARR_URL')
@@ -44,6 +51,11 @@ class Config:
     DEFAULT_RADARR_ROOT_FOLDER = os.getenv('DEFAULT_RADARR_ROOT_FOLDER')
     DEFAULT_RADARR_PROFILE_ID = int(os.getenv('DEFAULT_RADARR_PROFILE_ID', '1').split('#')[0].strip())
     RADARR_TAG_ON_ARCHIVE = os.getenv('RADARR_TAG_ON_ARCHIVE', 'vu').split('#')[0].strip()
+    # Durée de vie (secondes) de l'instantané en mémoire des bibliothèques Radarr/Sonarr
+    ARR_CATALOG_TTL_SECONDS = int(os.getenv('ARR_CATALOG_TTL_SECONDS', '300').split('#')[0].strip())
+    # Pools de connexions HTTP keep-alive partagés par service (Radarr, Sonarr, Prowlarr, rTorrent)
+    HTTP_POOL_CONNECTIONS = int(os.getenv('HTTP_POOL_CONNECTIONS', '4').split('#')[0].strip())
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '16').split('#')[0].strip())
 
     PROWLARR_URL = os.getenv('PROWLARR_URL')
     PROWLARR_API_KEY = os.getenv('PROWLARR_API_KEY')
@@ -53,6 +65,8 @@ class Config:
     RTORRENT_USER = os.getenv('RTORRENT_USER')
     RTORRENT_PASSWORD = os.getenv('RTORRENT_PASSWORD')
     RTORRENT_SSL_VERIFY = os.getenv('RTORRENT_SSL_VERIFY', 'False').split('#')[0].strip().lower() in ('true', '1', 't')
+    # Intervalle (secondes) entre deux synchronisations complètes du cache d'état des torrents
+    RTORRENT_STATE_FULL_RESYNC_SECONDS = int(os.getenv('RTORRENT_STATE_FULL_RESYNC_SECONDS', '60').split('#')[0].strip())
 
     # --- SEEDBOX: SFTP ---
     SEEDBOX_SFTP_HOST = os.getenv('SEEDBOX_SFTP_HOST')
@@ -60,6 +74,13 @@ class Config:
     SEEDBOX_SFTP_USER = os.getenv('SEEDBOX_SFTP_USER')
     SEEDBOX_SFTP_PASSWORD = os.getenv('SEEDBOX_SFTP_PASSWORD')
     SEEDBOX_SFTP_REMOTE_PATH_MAPPING = os.getenv('SEEDBOX_SFTP_REMOTE_PATH_MAPPING', '').split('#')[0].strip()
+    # Moteur de rapatriement : canaux SFTP parallèles et limite de débit par item (0 = illimité)
+    SFTP_TRANSFER_WORKERS = int(os.getenv('SFTP_TRANSFER_WORKERS', '4').split('#')[0].strip())
+    SFTP_TRANSFER_BANDWIDTH_LIMIT_KBPS = int(os.getenv('SFTP_TRANSFER_BANDWIDTH_LIMIT_KBPS', '0').split('#')[0].strip())
+    # Pool de sessions SSH/SFTP réutilisées (taille max, éviction après inactivité, keepalive)
+    SFTP_POOL_MAX_SIZE = int(os.getenv('SFTP_POOL_MAX_SIZE', '4').split('#')[0].strip())
+    SFTP_POOL_MAX_IDLE_SECONDS = int(os.getenv('SFTP_POOL_MAX_IDLE_SECONDS', '300').split('#')[0].strip())
+    SFTP_POOL_KEEPALIVE_SECONDS = int(os.getenv('SFTP_POOL_KEEPALIVE_SECONDS', '30').split('#')[0].strip())
 
     # --- PATHS & DIRECTORIES ---
     # -- Chemins LOCAUX (sur la machine qui exécute MMS) --
@@ -90,15 +111,39 @@ class Config:
     # --- API Externes ---
     TVDB_API_KEY = os.getenv('TVDB_API_KEY')
     TVDB_PIN = os.getenv('TVDB_PIN')
+    # Nombre d'appels TVDB simultanés (nom original, traduction) par recherche de série
+    TVDB_SEARCH_WORKERS = int(os.getenv('TVDB_SEARCH_WORKERS', '5').split('#')[0].strip())
     TMDB_API_KEY = os.getenv('TMDB_API_KEY')
     YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+    # Quota YouTube Data API (unités/jour) et part réservée aux recherches lancées depuis l'UI
+    YOUTUBE_DAILY_QUOTA = int(os.getenv('YOUTUBE_DAILY_QUOTA', '10000').split('#')[0].strip())
+    YOUTUBE_QUOTA_INTERACTIVE_RESERVE = int(os.getenv('YOUTUBE_QUOTA_INTERACTIVE_RESERVE', '2000').split('#')[0].strip())
+    # Durée de vie (heures) des résultats de recherche YouTube en cache
+    YOUTUBE_SEARCH_CACHE_TTL_HOURS = float(os.getenv('YOUTUBE_SEARCH_CACHE_TTL_HOURS', '72').split('#')[0].strip())
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
     GEMINI_MODEL_NAME = os.getenv('GEMINI_MODEL_NAME', 'gemini-1.5-pro-latest')
+    # Cache disque (SQLite) des réponses TMDb/TVDB ; vide = désactivé. Durées de vie par palier, en heures
+    METADATA_CACHE_DB_FILE = os.getenv('METADATA_CACHE_DB_FILE', os.path.join(INSTANCE_FOLDER_PATH, 'metadata_cache.db')).split('#')[0].strip()
+    METADATA_CACHE_TTL_LONG_HOURS = float(os.getenv('METADATA_CACHE_TTL_LONG_HOURS', '720').split('#')[0].strip())
+    METADATA_CACHE_TTL_MEDIUM_HOURS = float(os.getenv('METADATA_CACHE_TTL_MEDIUM_HOURS', '24').split('#')[0].strip())
+    METADATA_CACHE_TTL_SHORT_HOURS = float(os.getenv('METADATA_CACHE_TTL_SHORT_HOURS', '6').split('#')[0].strip())
+    METADATA_CACHE_TTL_NEGATIVE_HOURS = float(os.getenv('METADATA_CACHE_TTL_NEGATIVE_HOURS', '2').split('#')[0].strip())
 
     # --- ADVANCED & TASKS ---
     TRAILER_DATABASE_FILE = os.getenv('TRAILER_DATABASE_FILE', os.path.join(INSTANCE_FOLDER_PATH, 'trailer_database.json'))
     ARCHIVE_DATABASE_FILE = os.getenv('ARCHIVE_DATABASE_FILE', os.path.join(INSTANCE_FOLDER_PATH, 'archive_database.json'))
+    # Cache disque (SQLite) des noms de release analysés par guessit ; vide = cache mémoire uniquement
+    RELEASE_PARSE_CACHE_FILE = os.getenv('RELEASE_PARSE_CACHE_FILE', os.path.join(INSTANCE_FOLDER_PATH, 'release_parse_cache.db')).split('#')[0].strip()
+    # Délai (secondes) de regroupement des écritures de la base des bandes-annonces avant sauvegarde
+    TRAILER_DB_FLUSH_DELAY_SECONDS = float(os.getenv('TRAILER_DB_FLUSH_DELAY_SECONDS', '2').split('#')[0].strip())
     TRAILER_CACHE_AGE_DAYS = int(os.getenv('TRAILER_CACHE_AGE_DAYS', '7').split('#')[0].strip())
+    # Pré-chargement des bandes-annonces en arrière-plan : intervalle (heures, 0 = désactivé) et budget de quota YouTube par passage
+    TRAILER_PREFETCH_INTERVAL_HOURS = int(os.getenv('TRAILER_PREFETCH_INTERVAL_HOURS', '6').split('#')[0].strip())
+    TRAILER_PREFETCH_QUOTA_BUDGET = int(os.getenv('TRAILER_PREFETCH_QUOTA_BUDGET', '2000').split('#')[0].strip())
+    # Synchronisation de l'historique fantôme : résolutions TMDb/TVDB en parallèle, débit maximal (appels/seconde) et point de reprise
+    HISTORY_SYNC_WORKERS = int(os.getenv('HISTORY_SYNC_WORKERS', '4').split('#')[0].strip())
+    HISTORY_SYNC_RATE_PER_SECOND = float(os.getenv('HISTORY_SYNC_RATE_PER_SECOND', '4').split('#')[0].strip())
+    HISTORY_SYNC_CHECKPOINT_FILE = os.getenv('HISTORY_SYNC_CHECKPOINT_FILE', os.path.join(INSTANCE_FOLDER_PATH, 'history_sync_checkpoint.json')).split('#')[0].strip()
     SCHEDULER_SFTP_SCAN_INTERVAL_MINUTES = int(os.getenv('SCHEDULER_SFTP_SCAN_INTERVAL_MINUTES', '15').split('#')[0].strip())
     ORPHAN_CLEANER_PERFORM_DELETION = os.getenv('ORPHAN_CLEANER_PERFORM_DELETION', 'False').split('#')[0].strip().lower() in ('true', '1', 't')
     _default_orphan_extensions_str = ".nfo,.jpg,.jpeg,.png,.txt,.srt,.sub,.idx,.lnk,.exe,.vsmeta,.edl"
@@ -114,6 +159,11 @@ class Config:
     _dashboard_prowlarr_categories_str = os.getenv('DASHBOARD_PROWLARR_CATEGORIES', '2000,5000') # Movie, TV
     DASHBOARD_PROWLARR_CATEGORIES = [int(cat.strip()) for cat in _dashboard_prowlarr_categories_str.split(',') if cat.strip()]
     DASHBOARD_REFRESH_INTERVAL_HOURS = int(os.getenv('DASHBOARD_REFRESH_INTERVAL_HOURS', '0').split('#')[0].strip())
+    # Enrichissement concurrent du dashboard : taille du pool et limites par service amont
+    DASHBOARD_ENRICH_WORKERS = int(os.getenv('DASHBOARD_ENRICH_WORKERS', '8').split('#')[0].strip())
+    DASHBOARD_TMDB_CONCURRENCY = int(os.getenv('DASHBOARD_TMDB_CONCURRENCY', '4').split('#')[0].strip())
+    DASHBOARD_TMDB_RATE_PER_SECOND = float(os.getenv('DASHBOARD_TMDB_RATE_PER_SECOND', '20').split('#')[0].strip())
+    DASHBOARD_ARR_CONCURRENCY = int(os.getenv('DASHBOARD_ARR_CONCURRENCY', '4').split('#')[0].strip())
     PROWLARR_MAX_PAGES = int(os.getenv('PROWLARR_MAX_PAGES', '100').split('#')[0].strip())
     PROWLARR_SEARCH_QUERY = os.getenv('PROWLARR_SEARCH_QUERY', '')
 
@@ -131,6 +181,11 @@ class Config:
         'PENDING_TORRENTS_MAP_FILE',
         os.path.join(INSTANCE_FOLDER_PATH, 'pending_torrents_map.json')
     ) # Si utilisé, vérifier sa pertinence ou migrer vers LOCAL_PROCESSED_LOG_PATH si fonction similaire
+    # Base SQLite (WAL) du map des torrents ; le JSON ci-dessus n'est plus lu que pour l'import initial
+    TORRENT_MAP_DB_FILE = os.getenv(
+        'TORRENT_MAP_DB_FILE',
+        os.path.join(INSTANCE_FOLDER_PATH, 'torrent_map.db')
+    )
     RTORRENT_POST_ADD_DELAY_SECONDS = int(os.getenv('RTORRENT_POST_ADD_DELAY_SECONDS', '3').split('#')[0].strip()) # Spécifique à rTorrent, garder si pertinent
     # SFTP_SCANNER_GUARDFRAIL_ENABLED = os.getenv('SFTP_SCANNER_GUARDFRAIL_ENABLED', 'True').lower() == 'true' # Garder si cette logique est toujours utilisée
 
@@ -0,0 +1,103 @@
+# scripts/benchmark_release_parsing.py
+"""
+Micro-benchmark du parsing des noms de release (parse_media_name / parse_release_data).
+
+Simule une recherche Prowlarr de N résultats construite à partir d'un corpus de
+noms réels : une même release revient d'un indexeur à l'autre, et une recherche
+relancée retombe sur les mêmes noms. Compare le coût sans cache (guessit et
+regex à chaque appel) au coût avec le cache LRU.
+
+Usage : python scripts/benchmark_release_parsing.py [--results 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.utils import arr_client, release_parser  # noqa: E402
+
+CORPUS = [
+    "The.Last.of.Us.S01E01.MULTi.1080p.WEB.H264-FW",
+    "The.Last.of.Us.S01.MULTi.2160p.WEB.H265-FW",
+    "House.of.the.Dragon.S02E03.VOSTFR.1080p.WEB.H264-SUPPLY",
+    "Severance.S02E10.MULTi.1080p.ATVP.WEB-DL.DDP5.1.H.264-FLUX",
+    "The.Bear.S03.COMPLETE.FRENCH.720p.WEB.x264-FRATERNiTY",
+    "Shogun.2024.S01E04.MULTi.1080p.WEB.x264-TFA",
+    "Fallout.2024.S01.MULTi.2160p.AMZN.WEB-DL.DDP5.1.HDR.H.265-NTb",
+    "Breaking.Bad.INTEGRALE.MULTi.1080p.BluRay.x264-AMB3R",
+    "Friends.1994.COMPLETE.SERIES.FRENCH.1080p.BluRay.x265-HTG",
+    "Doctor.Who.2005.S13E06.1080p.HDTV.x264-ORGANiC",
+    "The.Office.US.S05E14.720p.WEB-DL.AAC2.0.H.264",
+    "Arcane.S02E01.MULTi.1080p.NF.WEB-DL.DDP5.1.H.264-GHT",
+    "Loki.S01E01.1x01.FRENCH.WEB.x264-EXTREME",
+    "Dune.Part.Two.2024.MULTi.2160p.UHD.BluRay.x265-QTZ",
+    "Oppenheimer.2023.FRENCH.1080p.WEB.H264-FUNKY",
+    "Oppenheimer (2023) MULTi VFF 2160p 10bit 4KLight HDR BluRay x265 AAC 5.1-QTZ",
+    "Le.Comte.de.Monte-Cristo.2024.FRENCH.1080p.WEB-DL.H264-Slay3R",
+    "Anatomie.d.une.chute.2023.FRENCH.720p.BluRay.x264-LOST",
+    "Inception.2010.MULTi.TRUEFRENCH.1080p.BluRay.x264-ZT",
+    "The.Matrix.Trilogy.1999-2003.MULTi.1080p.BluRay.x264-FiDELiO",
+    "Harry.Potter.Integrale.MULTi.1080p.BluRay.x264-LiBERTAD",
+    "Alien.Romulus.2024.MULTi.VFF.1080p.WEBRip.x265-R3MiX",
+    "Gladiator.II.2024.FRENCH.HDTS.x264-NOTAG",
+    "Interstellar.2014.IMAX.MULTi.2160p.UHD.BluRay.REMUX.HDR.HEVC.DTS-HD.MA.5.1-TFA",
+    "Mad.Max.Fury.Road.2015.BLACK.AND.CHROME.EDITION.1080p.BluRay.x264-SPRiNTER",
+    "Spider-Man.Across.the.Spider-Verse.2023.MULTi.1080p.WEB.H264-FW",
+    "Les.Trois.Mousquetaires.D.Artagnan.2023.FRENCH.1080p.BluRay.x264-UTT",
+    "Mission.Impossible.Dead.Reckoning.Part.One.2023.MULTi.2160p.WEB.H265-TFA",
+    "The.Boys.S04E08.MULTi.1080p.AMZN.WEB-DL.DDP5.1.H.264-FLUX",
+    "Andor.S01.DOC.SUBPACK.FRENCH",
+    "Stranger.Things.Season.4.Episode.9.1080p.NF.WEBRip.DDP5.1.x264",
+    "Top.Gun.Maverick.2022.MULTi.1080p.BluRay.x264-ZEST",
+]
+
+
+def _build_results(count):
+    """Liste de `count` noms : ~1/4 de noms uniques (variantes d'indexeurs), le reste en doublons."""
+    unique = []
+    for index in range(max(1, count // 4)):
+        name = CORPUS[index % len(CORPUS)]
+        variant = index // len(CORPUS)
+        unique.append(name if variant == 0 else f"{name}.V{variant}")
+    return [unique[index % len(unique)] for index in range(count)]
+
+
+def _time(label, func, names):
+    started = time.perf_counter()
+    for name in names:
+        func(name)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<38} {elapsed * 1000:9.1f} ms  ({elapsed * 1e6 / len(names):8.1f} µs/nom)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--results', type=int, default=10000, help="Nombre de résultats de recherche simulés")
+    parser.add_argument('--baseline-sample', type=int, default=1000,
+                        help="Nombre de noms analysés sans cache (extrapolé à --results, guessit est lent)")
+    args = parser.parse_args()
+
+    names = _build_results(args.results)
+    sample = names[:min(args.baseline_sample, len(names))]
+    print(f"{len(names)} résultats simulés, {len(set(names))} noms uniques, corpus de {len(CORPUS)} releases.\n")
+
+    for label, cached, uncached, clear in (
+        ('parse_release_data (guessit)', release_parser.parse_release_data,
+         release_parser._parse_release_data_uncached, release_parser.clear_release_parse_cache),
+        ('parse_media_name (regex)', arr_client.parse_media_name,
+         arr_client._parse_media_name_cached.__wrapped__, arr_client._parse_media_name_cached.cache_clear),
+    ):
+        print(label)
+        baseline = _time(f"sans cache ({len(sample)} noms)", uncached, sample) * len(names) / len(sample)
+        print(f"  {'sans cache, extrapolé à ' + str(len(names)):<38} {baseline * 1000:9.1f} ms")
+        clear()
+        cold = _time("avec cache, 1re recherche", cached, names)
+        warm = _time("avec cache, recherche relancée", cached, names)
+        print(f"  gain : x{baseline / cold:.1f} (1re recherche), x{baseline / warm:.1f} (relancée)\n")
+
+
+if __name__ == '__main__':
+    main()